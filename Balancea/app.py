@@ -5,6 +5,8 @@ Aplicación principal con interfaz Tkinter
 
 import tkinter as tk
 from tkinter import ttk, messagebox
+import argparse
+import os
 import sys
 from pathlib import Path
 
@@ -41,6 +43,13 @@ from interfaz.panel_presupuestos import PanelPresupuestos
 
 # Importar gestores de datos
 from datos.gestor_transacciones import GestorTransacciones
+from datos.gestor_recurrentes import GestorRecurrentes
+from datos.gestor_presupuestos import GestorPresupuestos
+from datos import persistencia
+
+from utils.instrumentacion import registro as instrumentacion
+from utils.optimizador import Optimizador
+from utils.mantenimiento import ProgramadorMantenimiento, crear_tareas
 
 # Importar utilidades
 try:
@@ -108,9 +117,19 @@ class BalanceaApp:
 
     def inicializar_app(self):
         """Inicializa la aplicación"""
+        # Agrupar las ráfagas de ediciones en una escritura en segundo plano
+        persistencia.activar_guardado_diferido()
+
         # Inicializar gestor de datos
         self.gestor_datos = GestorTransacciones()
 
+        # Generar en un solo lote las ocurrencias recurrentes pendientes hasta hoy
+        self.gestor_recurrentes = GestorRecurrentes(self.gestor_datos)
+        self.gestor_recurrentes.materializar()
+
+        # Un solo gestor de presupuestos para dashboard, presupuestos y alertas
+        self.gestor_presupuestos = GestorPresupuestos(self.gestor_datos)
+
         # Ocultar splash
         self.progress.stop()
         self.splash_frame.destroy()
@@ -133,6 +152,51 @@ class BalanceaApp:
         # Mostrar mensaje en título
         self.root.after(100, lambda: self.mostrar_bienvenida())
 
+        # Revisar periódicamente las recurrentes (p. ej. si la app queda abierta de un día a otro)
+        self.programar_recurrentes()
+
+        # Avisar si un guardado en segundo plano falla (se sigue reintentando)
+        self.errores_guardado_avisados = set()
+        self.root.after(config.GUARDADO_DIFERIDO_MAX_MS, self.revisar_guardado)
+
+        # Compactación, backup, índices y estadísticas mientras el usuario no usa la app
+        self.optimizador = Optimizador(self.gestor_datos)
+        self.mantenimiento = ProgramadorMantenimiento(crear_tareas(self.gestor_datos, self.optimizador),
+                                                      self.root)
+        if config.MANTENIMIENTO_ACTIVO:
+            self.mantenimiento.iniciar()
+
+    def programar_recurrentes(self):
+        """Programa la siguiente revisión de transacciones recurrentes"""
+        self.root.after(config.RECURRENTES_INTERVALO_MINUTOS * 60 * 1000, self.materializar_recurrentes)
+
+    def materializar_recurrentes(self):
+        """Genera las ocurrencias recurrentes pendientes y refresca las vistas"""
+        try:
+            if self.gestor_recurrentes.materializar():
+                self.panel_transacciones.cargar_transacciones()
+                self.actualizar_dashboard()
+        finally:
+            self.programar_recurrentes()
+
+    def revisar_guardado(self):
+        """Muestra una vez cada archivo que el guardado diferido no logra escribir"""
+        try:
+            errores = persistencia.obtener_errores()
+            nuevos = {archivo: error for archivo, error in errores.items()
+                      if archivo not in self.errores_guardado_avisados}
+            # Un archivo que vuelve a fallar tras recuperarse se avisa de nuevo
+            self.errores_guardado_avisados = set(errores)
+            if nuevos:
+                detalle = "\n".join(f"• {os.path.basename(a)}: {e}" for a, e in nuevos.items())
+                messagebox.showerror(
+                    "Error al guardar",
+                    f"No se pudieron guardar los cambios en:\n{detalle}\n\n"
+                    "Se seguirá reintentando; revisa el espacio en disco y los permisos."
+                )
+        finally:
+            self.root.after(config.GUARDADO_DIFERIDO_MAX_MS, self.revisar_guardado)
+
     def configurar_estilo(self):
         """Configura el estilo visual de la aplicación"""
         style = ttk.Style()
@@ -163,11 +227,17 @@ class BalanceaApp:
         self.root.bind('<F5>', lambda e: self.actualizar_dashboard())
         self.root.bind('<Control-q>', lambda e: self.cerrar_aplicacion())
         self.root.bind('<Control-h>', lambda e: self.mostrar_bienvenida_manual())
+        self.root.bind('<Control-I>', lambda e: self.mostrar_instrumentacion())
 
     def mostrar_bienvenida_manual(self):
         """Muestra la ventana de bienvenida manualmente"""
         mostrar_ventana_bienvenida(self.root, self.gestor_datos)
 
+    def mostrar_instrumentacion(self):
+        """Muestra los tiempos de las operaciones instrumentadas"""
+        from utils.ventana_instrumentacion import mostrar_ventana_instrumentacion
+        mostrar_ventana_instrumentacion(self.root, instrumentacion)
+
     def mostrar_bienvenida(self):
         """Muestra mensaje de bienvenida"""
         total_trans = len(self.gestor_datos.transacciones)
@@ -233,7 +303,8 @@ class BalanceaApp:
         # Panel Dashboard (resumen)
         self.panel_dashboard = PanelDashboard(
             self.notebook,
-            self.gestor_datos
+            self.gestor_datos,
+            self.gestor_presupuestos
         )
         self.notebook.add(self.panel_dashboard, text="📊 Dashboard")
 
@@ -241,7 +312,8 @@ class BalanceaApp:
         self.panel_transacciones = PanelTransacciones(
             self.notebook,
             self.gestor_datos,
-            self.actualizar_dashboard
+            self.actualizar_dashboard,
+            self.gestor_recurrentes
         )
         self.notebook.add(self.panel_transacciones, text="💳 Transacciones")
 
@@ -255,28 +327,32 @@ class BalanceaApp:
         # Panel Presupuestos
         self.panel_presupuestos = PanelPresupuestos(
             self.notebook,
-            self.gestor_datos
+            self.gestor_datos,
+            self.gestor_presupuestos
         )
         self.notebook.add(self.panel_presupuestos, text="💰 Presupuestos")
 
         # Panel Resultados (gráficas)
         self.panel_resultados = PanelResultados(
             self.notebook,
-            self.gestor_datos
+            self.gestor_datos,
+            self.gestor_recurrentes
         )
         self.notebook.add(self.panel_resultados, text="📈 Análisis")
 
         # Panel Chat Financiero
         self.panel_chat = PanelChat(
             self.notebook,
-            self.gestor_datos
+            self.gestor_datos,
+            self.gestor_presupuestos
         )
         self.notebook.add(self.panel_chat, text="💬 Asistente IA")
 
         # Panel Alertas
         self.panel_alertas = PanelAlertas(
             self.notebook,
-            self.gestor_datos
+            self.gestor_datos,
+            self.gestor_presupuestos
         )
         self.notebook.add(self.panel_alertas, text="🔔 Alertas")
 
@@ -309,8 +385,30 @@ class BalanceaApp:
     def cerrar_aplicacion(self):
         """Cierra la aplicación de forma segura"""
         if messagebox.askokcancel("Salir", "¿Deseas cerrar Balancea?"):
-            # Guardar datos antes de cerrar
+            # Detener reportes en curso para no dejar archivos a medio escribir
+            for trabajo in self.panel_dashboard.gestor_trabajos.obtener_activos():
+                trabajo.cancelar()
+                trabajo.esperar(timeout=2)
+            self.mantenimiento.detener()
+
+            # Guardar datos antes de cerrar (y escribir lo que quedó pendiente)
             self.gestor_datos.guardar_datos()
+            persistencia.vaciar()
+            errores = persistencia.obtener_errores()
+            if errores:
+                detalle = "\n".join(f"• {os.path.basename(a)}: {e}" for a, e in errores.items())
+                if not messagebox.askyesno(
+                        "Error al guardar",
+                        f"No se pudieron guardar los cambios en:\n{detalle}\n\n"
+                        "¿Cerrar de todos modos? Esos cambios se perderán."):
+                    if config.MANTENIMIENTO_ACTIVO:
+                        self.mantenimiento.iniciar()
+                    return
+            persistencia.desactivar_guardado_diferido()
+
+            # Volcar los tiempos medidos durante la sesión
+            if instrumentacion.totales:
+                instrumentacion.volcar_json()
             self.root.destroy()
 
     def generar_datos_demo(self):
@@ -356,8 +454,6 @@ class BalanceaApp:
 
     def optimizar_sistema(self):
         """Optimiza el sistema"""
-        from utils.optimizador import Optimizador
-
         if messagebox.askyesno("Optimizar Sistema",
                                "Esto hará:\n\n"
                                "• Crear backup de datos\n"
@@ -365,12 +461,12 @@ class BalanceaApp:
                                "• Corregir IDs\n"
                                "• Limpiar backups antiguos\n\n"
                                "¿Continuar?"):
-            optimizador = Optimizador(self.gestor_datos)
-            resultados = optimizador.optimizar_todo()
+            # Compartido con el mantenimiento: reutiliza el índice de duplicados ya construido
+            resultados = self.optimizador.optimizar_todo()
 
             mensaje = f"""✅ Optimización Completa
 
-📦 Backup creado: {resultados['backup']['timestamp']}
+📦 Backup creado: {resultados['backup']['timestamp']} ({resultados['backup']['bytes_nuevos']:,} bytes nuevos)
 
 🧹 Duplicados eliminados: {resultados['duplicados_eliminados']}
 🔢 IDs corregidos: {resultados['ids_corregidos']}
@@ -386,12 +482,30 @@ class BalanceaApp:
             self.actualizar_dashboard()
 
 
-def main():
+def main(argumentos=None):
     """Función principal"""
-    root = tk.Tk()
-    app = BalanceaApp(root)
-    root.app = app
-    root.mainloop()
+    parser = argparse.ArgumentParser(description=config.APP_DESCRIPCION)
+    parser.add_argument('--profile', '--perfil', action='store_true', dest='perfil',
+                        help="perfilar por muestreo y guardar pilas colapsadas y un resumen en datos/")
+    args = parser.parse_args(argumentos)
+
+    perfilador = None
+    if args.perfil:
+        from utils.perfilador import PerfiladorMuestreo
+        perfilador = PerfiladorMuestreo()
+        perfilador.iniciar()
+
+    try:
+        root = tk.Tk()
+        app = BalanceaApp(root)
+        root.app = app
+        root.mainloop()
+    finally:
+        if perfilador:
+            perfilador.detener()
+            archivos = perfilador.guardar()
+            if archivos:
+                print(f"🔥 Perfil guardado en {archivos[0]} y {archivos[1]}")
 
 if __name__ == "__main__":
     main()
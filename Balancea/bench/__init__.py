@@ -0,0 +1,5 @@
+"""
+Benchmarks de Balancea
+Mide gestores, analizador y exportadores sobre libros sintéticos.
+Uso (desde la carpeta Balancea): python -m bench --help
+"""
@@ -0,0 +1,11 @@
+"""
+Punto de entrada: python -m bench
+"""
+
+import sys
+
+from bench.rendimiento import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Suite de Rendimiento
+Libros sintéticos de 1k, 100k y 1M filas (con las plantillas de GeneradorDemo),
+tiempos por caso en JSON y comparación contra una línea base guardada
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+# Ejecutable como 'python -m bench' o 'python bench/rendimiento.py' desde Balancea
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datos.gestor_transacciones import GestorTransacciones
+from datos.gestor_presupuestos import GestorPresupuestos
+from procesador.analizador import AnalizadorFinanciero
+from utils.exportador import Exportador
+from utils.generador_demo import GeneradorDemo
+
+
+TAMANOS = [1_000, 100_000, 1_000_000]
+SEMILLA = 42
+REPETICIONES = 3
+UMBRAL_REGRESION = 0.25  # 25% más lento que la línea base
+RUIDO_MINIMO = 0.002  # segundos: diferencias menores no cuentan como regresión
+
+CARPETA_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+ARCHIVO_RESULTADOS = os.path.join(CARPETA_RESULTADOS, 'ultimo.json')
+ARCHIVO_LINEA_BASE = os.path.join(CARPETA_RESULTADOS, 'linea_base.json')
+
+# Los libros terminan en una fecha fija para que cada semilla dé siempre los mismos datos
+FECHA_FINAL = date(2024, 12, 31)
+DIAS_HISTORIA = 3 * 365
+
+
+def generar_filas(n, semilla=SEMILLA):
+    """n transacciones (sin id) del generador masivo de GeneradorDemo, siempre iguales para una semilla"""
+    return GeneradorDemo(None).generar_filas_masivas(n, semilla, FECHA_FINAL, DIAS_HISTORIA)
+
+
+class Contexto:
+    """Libro, gestores y carpeta temporal de un tamaño"""
+
+    def __init__(self, n, semilla, carpeta):
+        self.n = n
+        self.carpeta = carpeta
+        self.archivo = os.path.join(carpeta, f'libro_{n}.csv')
+
+        self.gestor = GestorTransacciones(self.archivo)
+        self.gestor.transacciones = []
+        self.gestor.agregar_transacciones_lote(generar_filas(n, semilla))
+
+        self.presupuestos = GestorPresupuestos(self.gestor, os.path.join(carpeta, 'presupuestos.json'))
+        for categoria, (minimo, maximo) in GeneradorDemo.RANGOS_MONTO.items():
+            self.presupuestos.establecer_presupuesto(categoria, (minimo + maximo) * 10)
+
+        self.analizador = AnalizadorFinanciero(self.gestor)
+        self.exportador = Exportador(self.gestor)
+
+    def invalidar(self):
+        """Descarta las cachés del libro para medir en frío"""
+        self.gestor.marcar_modificado()
+
+    def ruta(self, nombre):
+        return os.path.join(self.carpeta, nombre)
+
+
+# (nombre, preparar(contexto) fuera del tiempo medido o None, ejecutar(contexto))
+CASOS = [
+    ('cargar_datos', None, lambda c: c.gestor.cargar_datos()),
+    ('guardar_datos', None, lambda c: c.gestor.guardar_datos()),
+    ('obtener_balance', Contexto.invalidar, lambda c: c.gestor.obtener_balance()),
+    ('obtener_gastos_por_categoria', Contexto.invalidar, lambda c: c.gestor.obtener_gastos_por_categoria()),
+    ('analizar_todo', Contexto.invalidar, lambda c: c.analizador.analizar_todo()),
+    ('presupuestos_resumen', Contexto.invalidar, lambda c: c.presupuestos.obtener_resumen()),
+    ('buscar_transacciones', None, lambda c: c.gestor.buscar_transacciones('uber')),
+    ('exportar_pdf', None, lambda c: c.exportador.generar_reporte_pdf(c.ruta('reporte.pdf'), incluir_graficas=False)),
+    ('exportar_excel', None, lambda c: c.exportador.exportar_excel(c.ruta('reporte.xlsx'))),
+]
+
+
+def medir(contexto, preparar, ejecutar, repeticiones):
+    """Tiempos (segundos) de cada repetición"""
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar(contexto)
+        inicio = time.perf_counter()
+        ejecutar(contexto)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def ejecutar_suite(tamanos=None, casos=None, repeticiones=REPETICIONES, semilla=SEMILLA, salida=print):
+    """
+    Ejecuta los casos seleccionados para cada tamaño.
+    Con más de 100k filas se hace una sola repetición.
+    Retorna {'caso@n': {'mediana', 'minimo', 'repeticiones'}}
+    """
+    tamanos = tamanos or TAMANOS
+    seleccion = [c for c in CASOS if not casos or c[0] in casos]
+    resultados = {}
+
+    for n in tamanos:
+        carpeta = tempfile.mkdtemp(prefix='balancea_bench_')
+        try:
+            salida(f"\n📦 Libro de {n:,} filas...")
+            contexto = Contexto(n, semilla, carpeta)
+            veces = repeticiones if n <= 100_000 else 1
+
+            for nombre, preparar, ejecutar in seleccion:
+                tiempos = medir(contexto, preparar, ejecutar, veces)
+                clave = f"{nombre}@{n}"
+                resultados[clave] = {
+                    'mediana': statistics.median(tiempos),
+                    'minimo': min(tiempos),
+                    'repeticiones': veces,
+                }
+                salida(f"  {nombre:<30} {resultados[clave]['mediana'] * 1000:>11.1f} ms")
+        finally:
+            shutil.rmtree(carpeta, ignore_errors=True)
+
+    return resultados
+
+
+def comparar(resultados, linea_base, umbral=UMBRAL_REGRESION):
+    """
+    Compara medianas contra la línea base.
+    Retorna [{'caso', 'actual', 'base', 'cambio', 'regresion'}] de los casos presentes en ambas
+    """
+    comparacion = []
+    for clave, actual in sorted(resultados.items()):
+        base = linea_base.get(clave)
+        if not base:
+            continue
+        cambio = actual['mediana'] / base['mediana'] - 1 if base['mediana'] > 0 else 0.0
+        regresion = cambio > umbral and actual['mediana'] - base['mediana'] > RUIDO_MINIMO
+        comparacion.append({
+            'caso': clave,
+            'actual': actual['mediana'],
+            'base': base['mediana'],
+            'cambio': cambio,
+            'regresion': regresion,
+        })
+    return comparacion
+
+
+def _leer_json(archivo):
+    with open(archivo, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _escribir_json(archivo, datos):
+    os.makedirs(os.path.dirname(os.path.abspath(archivo)), exist_ok=True)
+    with open(archivo, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+
+
+def main(argumentos=None):
+    """Ejecuta la suite; retorna 1 si hubo regresiones contra la línea base"""
+    parser = argparse.ArgumentParser(prog='python -m bench', description="Benchmarks de Balancea")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS,
+                        help="filas de cada libro sintético (por defecto 1000 100000 1000000)")
+    parser.add_argument('--casos', nargs='+', choices=[c[0] for c in CASOS],
+                        help="ejecutar solo estos casos")
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES)
+    parser.add_argument('--semilla', type=int, default=SEMILLA)
+    parser.add_argument('--salida', default=ARCHIVO_RESULTADOS, help="JSON de resultados")
+    parser.add_argument('--linea-base', default=ARCHIVO_LINEA_BASE, help="JSON con el que se compara")
+    parser.add_argument('--guardar-linea-base', action='store_true',
+                        help="guardar estos resultados como nueva línea base")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_REGRESION,
+                        help="fracción de aumento que cuenta como regresión (por defecto 0.25)")
+    args = parser.parse_args(argumentos)
+
+    resultados = ejecutar_suite(args.tamanos, args.casos, max(1, args.repeticiones), args.semilla)
+
+    documento = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'semilla': args.semilla,
+        'resultados': resultados,
+    }
+
+    regresiones = []
+    if os.path.exists(args.linea_base) and not args.guardar_linea_base:
+        comparacion = comparar(resultados, _leer_json(args.linea_base)['resultados'], args.umbral)
+        documento['comparacion'] = comparacion
+        regresiones = [c for c in comparacion if c['regresion']]
+
+        print(f"\n📊 Comparación con {args.linea_base}:")
+        for c in comparacion:
+            icono = "🔴" if c['regresion'] else "🟢"
+            print(f"  {icono} {c['caso']:<38} {c['base'] * 1000:>10.1f} → {c['actual'] * 1000:>10.1f} ms"
+                  f" ({c['cambio']:+.1%})")
+
+    _escribir_json(args.salida, documento)
+    print(f"\n💾 Resultados en {args.salida}")
+    if args.guardar_linea_base:
+        _escribir_json(args.linea_base, documento)
+        print(f"📌 Línea base guardada en {args.linea_base}")
+
+    if regresiones:
+        print(f"❌ {len(regresiones)} regresión(es) por encima del {args.umbral:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -37,6 +37,11 @@ RUTA_TRANSACCIONES = "datos/transacciones.csv"
 RUTA_CATEGORIAS = "datos/categorias.json"
 RUTA_CONFIGURACION = "datos/config.json"
 RUTA_BACKUPS = "datos/backups/"
+RUTA_TIPOS_CAMBIO = "datos/tipos_cambio.csv"
+
+# Guardado (escrituras atómicas; las ediciones seguidas se agrupan en segundo plano)
+GUARDADO_DIFERIDO_MS = 500  # espera tras el último cambio; 0 = guardar al instante
+GUARDADO_DIFERIDO_MAX_MS = 3000  # máximo que puede quedar un cambio sin escribir
 
 # Configuración de gráficas
 GRAFICAS_DPI = 100
@@ -46,12 +51,43 @@ GRAFICAS_COLORES = [
     '#F7DC6F', '#BB8FCE', '#85C1E2', '#F8B739', '#52B788'
 ]
 
+# Caché de gráficas renderizadas (PNG por contenido)
+CACHE_GRAFICAS_DIR = "datos/cache_graficas/"
+CACHE_GRAFICAS_MAX_MEMORIA_MB = 16
+CACHE_GRAFICAS_MAX_DISCO_MB = 64
+
 # Límites y validaciones
 MONTO_MINIMO = 0.01
 MONTO_MAXIMO = 999999999
 DESCRIPCION_MIN_CARACTERES = 3
 DESCRIPCION_MAX_CARACTERES = 200
 
+# Nombres de los meses (índice 1-12) para reportes y consultas
+NOMBRES_MES = ['', 'enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio',
+               'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre']
+
+# Cuentas y monedas
+CUENTA_PREDETERMINADA = "Principal"
+MONEDA_BASE = "MXN"  # moneda en la que se reportan los totales
+MONEDAS = ['MXN', 'USD', 'EUR']
+
+# Transacciones recurrentes
+RECURRENTES_INTERVALO_MINUTOS = 60  # revisión periódica de ocurrencias pendientes
+
+# Sugerencias de presupuesto
+PRESUPUESTO_SUGERENCIA_MESES = 6  # meses completos que se analizan
+PRESUPUESTO_SUGERENCIA_PERCENTIL = 75  # percentil del gasto mensual que cubre la sugerencia
+PRESUPUESTO_AJUSTE_ESTACIONAL = True  # con más de un año de historia
+
+# Instrumentación de rutas críticas (ventana Ctrl+Shift+I y JSON al salir)
+INSTRUMENTACION_ACTIVA = False  # también con la variable de entorno BALANCEA_INSTRUMENTACION=1
+INSTRUMENTACION_MAX_MUESTRAS = 5000  # búfer circular para p50/p95
+RUTA_INSTRUMENTACION = "datos/instrumentacion.json"
+
+# Perfilador por muestreo (python app.py --profile)
+PERFIL_INTERVALO_MS = 5  # intervalo entre muestras de la pila
+PERFIL_TOP_N = 25  # filas de cada tabla del resumen
+
 # Configuración de exportación
 FORMATOS_EXPORTACION = [
     ("CSV files", "*.csv"),
@@ -89,13 +125,50 @@ MENSAJES = {
 OLLAMA_URL = "http://localhost:11434/api/generate"
 OLLAMA_MODELO = "llama3.2:latest"
 OLLAMA_TIMEOUT = 30
+OLLAMA_HOST = "http://localhost:11434"
+OLLAMA_TIMEOUT_CONEXION = 5  # segundos para abrir la conexión
+OLLAMA_REINTENTOS = 3  # reintentos ante errores 5xx transitorios
+OLLAMA_CACHE_SALUD_SEGUNDOS = 15  # vigencia de la verificación de disponibilidad
+OLLAMA_KEEP_ALIVE = "30m"  # mantener el modelo cargado entre mensajes
+CHAT_CONTEXTO_MAX_TOKENS = 350  # presupuesto del bloque de datos financieros
+CHAT_MAX_TURNOS_CONTEXTO = 8  # turnos antes de reiniciar el contexto de Ollama
+
+# Caché de respuestas del asistente
+CHAT_CACHE_MAX_ENTRADAS = 200
+CHAT_CACHE_TTL_SEGUNDOS = 24 * 60 * 60
+CHAT_CACHE_EMBEDDINGS = False  # similitud semántica con embeddings locales de Ollama
+CHAT_CACHE_UMBRAL_SIMILITUD = 0.92
+OLLAMA_MODELO_EMBEDDINGS = "nomic-embed-text"
 
 # Configuración de alertas
 ALERTA_GASTO_INUSUAL_PORCENTAJE = 150  # 150% del promedio
 ALERTA_BALANCE_NEGATIVO = True
 ALERTA_PRESUPUESTO_EXCEDIDO = True
 
-# Configuración de backups
+# Configuración de backups (snapshots incrementales en RUTA_BACKUPS)
 BACKUP_AUTOMATICO = True
 BACKUP_FRECUENCIA_DIAS = 7
-BACKUP_MAX_ARCHIVOS = 10
\ No newline at end of file
+BACKUP_MAX_ARCHIVOS = 10  # snapshots más recientes que se conservan
+BACKUP_MENSUALES = 6  # además, el último snapshot de cada uno de estos meses
+BACKUP_REVISION_MINUTOS = 60  # cada cuánto se revisa si toca un backup
+BACKUP_ARCHIVOS = [
+    RUTA_TRANSACCIONES,
+    RUTA_CATEGORIAS,
+    RUTA_TIPOS_CAMBIO,
+    "datos/metas.json",
+    "datos/presupuestos.json",
+    "datos/recurrentes.json",
+]
+
+# Mantenimiento en segundo plano (solo mientras el usuario no usa la app)
+RUTA_MANTENIMIENTO = "datos/mantenimiento.json"
+MANTENIMIENTO_ACTIVO = True
+MANTENIMIENTO_INACTIVIDAD_SEGUNDOS = 60  # sin teclas, clics ni ratón
+MANTENIMIENTO_REVISION_SEGUNDOS = 10
+MANTENIMIENTO_INTERVALOS = {  # minutos entre ejecuciones de cada tarea
+    'compactacion': 30,
+    'snapshot': BACKUP_REVISION_MINUTOS,
+    'indices': 15,
+    'rotacion_backups': 24 * 60,
+    'estadisticas': 60,
+}
\ No newline at end of file
@@ -0,0 +1,291 @@
+"""
+Almacén de Backups
+Snapshots incrementales direccionados por contenido: cada archivo se parte en
+bloques (cortes en fin de línea elegidos por el contenido), cada bloque se
+guarda una sola vez comprimido con zlib bajo su SHA-256 y cada snapshot es un
+manifiesto con la lista de bloques de cada archivo
+"""
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+import config
+from datos import persistencia
+from utils.trabajos import TrabajoCancelado
+
+
+# Un fin de línea corta el bloque cuando el CRC de la línea cae en esta máscara
+# (en promedio cada 512 líneas), siempre entre los tamaños mínimo y máximo.
+# Al depender del contenido, insertar o borrar filas solo cambia los bloques vecinos
+MASCARA_CORTE = 0x1FF
+BLOQUE_MINIMO = 16 * 1024
+BLOQUE_MAXIMO = 256 * 1024
+
+NIVEL_COMPRESION = 6
+FORMATO_ID = '%Y%m%d_%H%M%S'
+
+
+def _verificar_cancelacion(cancelar):
+    """Punto de control: 'cancelar' es el threading.Event de la cola de trabajos (o None)"""
+    if cancelar is not None and cancelar.is_set():
+        raise TrabajoCancelado()
+
+
+def partir_en_bloques(contenido):
+    """Divide bytes en bloques que terminan en fin de línea (salvo el último o líneas enormes)"""
+    bloques = []
+    inicio = 0
+    posicion = 0
+    largo = len(contenido)
+
+    while posicion < largo:
+        fin_linea = contenido.find(b'\n', posicion)
+        fin = largo if fin_linea == -1 else fin_linea + 1
+
+        if fin - inicio > BLOQUE_MAXIMO:
+            # Cortar antes de esta línea; si ella sola excede el máximo, partirla
+            corte = posicion if posicion > inicio else inicio + BLOQUE_MAXIMO
+            bloques.append(contenido[inicio:corte])
+            inicio = posicion = corte
+            continue
+
+        if fin - inicio >= BLOQUE_MINIMO and zlib.crc32(contenido[posicion:fin]) & MASCARA_CORTE == 0:
+            bloques.append(contenido[inicio:fin])
+            inicio = fin
+        posicion = fin
+
+    if inicio < largo:
+        bloques.append(contenido[inicio:])
+    return bloques
+
+
+class AlmacenBackups:
+    """
+    Estructura en disco:
+        objetos/ab/abcdef...   bloque comprimido, nombrado por el SHA-256 del original
+        snapshots/AAAAMMDD_HHMMSS.json   manifiesto de un snapshot
+    """
+
+    # Un snapshot y una recolección de bloques nunca corren a la vez
+    _lock = threading.Lock()
+
+    def __init__(self, directorio=None, archivos=None):
+        self.directorio = directorio or config.RUTA_BACKUPS
+        self.archivos = list(archivos or config.BACKUP_ARCHIVOS)
+        self.dir_objetos = os.path.join(self.directorio, 'objetos')
+        self.dir_snapshots = os.path.join(self.directorio, 'snapshots')
+
+    # ---------- Bloques ----------
+
+    def _ruta_objeto(self, huella):
+        return os.path.join(self.dir_objetos, huella[:2], huella)
+
+    def _guardar_bloque(self, bloque):
+        """Guarda el bloque si no existe; retorna (huella, bytes escritos en disco)"""
+        huella = hashlib.sha256(bloque).hexdigest()
+        ruta = self._ruta_objeto(huella)
+        if os.path.exists(ruta):
+            return huella, 0
+        comprimido = zlib.compress(bloque, NIVEL_COMPRESION)
+        persistencia.escribir_atomico(ruta, lambda f: f.write(comprimido), binario=True)
+        return huella, len(comprimido)
+
+    def _leer_bloque(self, huella):
+        with open(self._ruta_objeto(huella), 'rb') as f:
+            bloque = zlib.decompress(f.read())
+        if hashlib.sha256(bloque).hexdigest() != huella:
+            raise ValueError(f"Bloque dañado: {huella}")
+        return bloque
+
+    # ---------- Snapshots ----------
+
+    def listar_snapshots(self):
+        """Manifiestos del más antiguo al más reciente"""
+        if not os.path.isdir(self.dir_snapshots):
+            return []
+        manifiestos = []
+        for nombre in sorted(os.listdir(self.dir_snapshots)):
+            if not nombre.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.dir_snapshots, nombre), 'r', encoding='utf-8') as f:
+                    manifiestos.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Advertencia: manifiesto ilegible ignorado ({nombre}): {e}")
+        return manifiestos
+
+    def ultimo_snapshot(self):
+        snapshots = self.listar_snapshots()
+        return snapshots[-1] if snapshots else None
+
+    def crear_snapshot(self, ahora=None, cancelar=None):
+        """
+        Respalda los archivos configurados guardando solo los bloques nuevos.
+        Si nada cambió desde el último snapshot no crea otro.
+        Con 'cancelar' activado se detiene entre bloques (TrabajoCancelado) sin
+        escribir el manifiesto; los bloques sueltos los recoge la retención.
+        Retorna el manifiesto con 'nuevo' (si se creó), 'bloques_nuevos' y 'bytes_nuevos'
+        """
+        # Respaldar lo que el usuario ya ve guardado
+        persistencia.vaciar()
+        with self._lock:
+            return self._crear_snapshot(ahora or datetime.now(), cancelar)
+
+    def _crear_snapshot(self, ahora, cancelar=None):
+        archivos = {}
+        bloques_nuevos = 0
+        bytes_nuevos = 0
+        for ruta in self.archivos:
+            _verificar_cancelacion(cancelar)
+            if not os.path.exists(ruta):
+                continue
+            with open(ruta, 'rb') as f:
+                contenido = f.read()
+
+            huellas = []
+            for bloque in partir_en_bloques(contenido):
+                _verificar_cancelacion(cancelar)
+                huella, escritos = self._guardar_bloque(bloque)
+                huellas.append(huella)
+                if escritos:
+                    bloques_nuevos += 1
+                    bytes_nuevos += escritos
+
+            archivos[ruta] = {
+                'tamano': len(contenido),
+                'sha256': hashlib.sha256(contenido).hexdigest(),
+                'bloques': huellas,
+            }
+
+        ultimo = self.ultimo_snapshot()
+        if ultimo and ultimo['archivos'] == archivos:
+            return dict(ultimo, nuevo=False, bloques_nuevos=0, bytes_nuevos=0)
+
+        id_snapshot = ahora.strftime(FORMATO_ID)
+        if ultimo and id_snapshot <= ultimo['id']:
+            # Dos snapshots en el mismo segundo: conservar el orden por id
+            id_snapshot = (datetime.strptime(ultimo['id'], FORMATO_ID) + timedelta(seconds=1)).strftime(FORMATO_ID)
+
+        manifiesto = {
+            'id': id_snapshot,
+            'fecha': ahora.isoformat(timespec='seconds'),
+            'archivos': archivos,
+            'bloques_nuevos': bloques_nuevos,
+            'bytes_nuevos': bytes_nuevos,
+        }
+        persistencia.escribir_atomico(
+            os.path.join(self.dir_snapshots, f"{id_snapshot}.json"),
+            lambda f: json.dump(manifiesto, f, ensure_ascii=False, indent=1))
+        return dict(manifiesto, nuevo=True)
+
+    def restaurar(self, id_snapshot, destino=None):
+        """
+        Reconstruye los archivos de un snapshot (verificando cada bloque y el archivo
+        completo). Sin 'destino' reemplaza los archivos originales; con 'destino' los
+        escribe en esa carpeta. Retorna las rutas escritas
+        """
+        manifiesto = next((m for m in self.listar_snapshots() if m['id'] == id_snapshot), None)
+        if manifiesto is None:
+            raise ValueError(f"No existe el snapshot {id_snapshot}")
+
+        escritos = []
+        for ruta, datos in manifiesto['archivos'].items():
+            contenido = b''.join(self._leer_bloque(h) for h in datos['bloques'])
+            if hashlib.sha256(contenido).hexdigest() != datos['sha256']:
+                raise ValueError(f"El archivo {ruta} del snapshot {id_snapshot} no coincide")
+
+            salida = os.path.join(destino, os.path.basename(ruta)) if destino else ruta
+            persistencia.escribir_atomico(salida, lambda f: f.write(contenido), binario=True)
+            escritos.append(salida)
+        return escritos
+
+    # ---------- Retención ----------
+
+    def aplicar_retencion(self, recientes=None, mensuales=None, cancelar=None):
+        """
+        Conserva los 'recientes' snapshots más nuevos y el último de cada uno de los
+        'mensuales' meses más recientes; borra el resto de manifiestos y los bloques
+        que ya no usa ninguno. Con 'cancelar' activado la recolección de bloques se
+        detiene entre carpetas; lo que quede se borra en la siguiente pasada.
+        Retorna (snapshots eliminados, bytes liberados)
+        """
+        recientes = recientes if recientes is not None else config.BACKUP_MAX_ARCHIVOS
+        mensuales = mensuales if mensuales is not None else config.BACKUP_MENSUALES
+        with self._lock:
+            return self._aplicar_retencion(recientes, mensuales, cancelar)
+
+    def _aplicar_retencion(self, recientes, mensuales, cancelar=None):
+        snapshots = self.listar_snapshots()
+
+        conservar = {m['id'] for m in snapshots[-recientes:]} if recientes > 0 else set()
+        ultimo_por_mes = {}
+        for m in snapshots:
+            ultimo_por_mes[m['id'][:6]] = m['id']
+        meses = sorted(ultimo_por_mes)[-mensuales:] if mensuales > 0 else []
+        conservar.update(ultimo_por_mes[mes] for mes in meses)
+
+        eliminados = 0
+        for m in snapshots:
+            if m['id'] not in conservar:
+                os.remove(os.path.join(self.dir_snapshots, f"{m['id']}.json"))
+                eliminados += 1
+
+        en_uso = {h for m in snapshots if m['id'] in conservar
+                  for datos in m['archivos'].values() for h in datos['bloques']}
+        return eliminados, self._recolectar_bloques(en_uso, cancelar)
+
+    def _recolectar_bloques(self, en_uso, cancelar=None):
+        """Borra los bloques que no aparecen en ningún manifiesto; retorna bytes liberados"""
+        liberados = 0
+        if not os.path.isdir(self.dir_objetos):
+            return liberados
+        for carpeta in os.scandir(self.dir_objetos):
+            _verificar_cancelacion(cancelar)
+            if not carpeta.is_dir():
+                continue
+            for objeto in os.scandir(carpeta.path):
+                if objeto.name not in en_uso:
+                    liberados += objeto.stat().st_size
+                    os.remove(objeto.path)
+        return liberados
+
+    # ---------- Programación ----------
+
+    def backup_pendiente(self, ahora=None, frecuencia_dias=None):
+        """Indica si pasaron 'frecuencia_dias' desde el último snapshot (o no hay ninguno)"""
+        frecuencia_dias = frecuencia_dias if frecuencia_dias is not None else config.BACKUP_FRECUENCIA_DIAS
+        ultimo = self.ultimo_snapshot()
+        if ultimo is None:
+            return True
+        ahora = ahora or datetime.now()
+        return ahora - datetime.fromisoformat(ultimo['fecha']) >= timedelta(days=frecuencia_dias)
+
+    def respaldar_si_corresponde(self, ahora=None, cancelar=None):
+        """Crea un snapshot y aplica la retención si toca; retorna el manifiesto o None"""
+        if not config.BACKUP_AUTOMATICO or not self.backup_pendiente(ahora):
+            return None
+        manifiesto = self.crear_snapshot(ahora, cancelar)
+        self.aplicar_retencion(cancelar=cancelar)
+        return manifiesto
+
+    def estadisticas(self):
+        """Snapshots, bloques y bytes en disco frente a lo que ocuparían las copias completas"""
+        snapshots = self.listar_snapshots()
+        bloques = 0
+        bytes_disco = 0
+        if os.path.isdir(self.dir_objetos):
+            for carpeta in os.scandir(self.dir_objetos):
+                if carpeta.is_dir():
+                    for objeto in os.scandir(carpeta.path):
+                        bloques += 1
+                        bytes_disco += objeto.stat().st_size
+        return {
+            'snapshots': len(snapshots),
+            'bloques': bloques,
+            'bytes_disco': bytes_disco,
+            'bytes_copias_completas': sum(d['tamano'] for m in snapshots for d in m['archivos'].values()),
+        }
@@ -7,6 +7,8 @@ import json
 import os
 from pathlib import Path
 
+from datos import persistencia
+
 
 class GestorCategorias:
     """Gestiona las categorías de ingresos y gastos"""
@@ -65,8 +67,7 @@ class GestorCategorias:
             categorias = self.categorias
 
         try:
-            with open(self.archivo_config, 'w', encoding='utf-8') as f:
-                json.dump(categorias, f, ensure_ascii=False, indent=2)
+            persistencia.guardar_json(self.archivo_config, categorias)
             self.categorias = categorias
             return True
         except Exception as e:
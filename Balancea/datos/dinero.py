@@ -0,0 +1,41 @@
+"""
+Dinero
+Montos exactos: centavos enteros para almacenar y sumar, Decimal para mostrar y exportar
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+CENTAVO = Decimal('0.01')
+
+
+def a_centavos(valor):
+    """
+    Convierte un monto (str, float, int o Decimal) a centavos enteros.
+    Los float se leen por su representación corta ('0.1', no 0.1000000000000000055...)
+    """
+    if isinstance(valor, float):
+        valor = repr(valor)
+    decimal = Decimal(str(valor).strip()).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+    if not decimal.is_finite():
+        raise ValueError(f"Monto inválido: {valor}")
+    return int(decimal * 100)
+
+
+def normalizar_monto(valor):
+    """Redondea un monto a centavos y lo retorna como el float más cercano"""
+    return a_centavos(valor) / 100
+
+
+def a_decimal(centavos):
+    """Centavos enteros -> Decimal con dos decimales"""
+    return Decimal(int(centavos)).scaleb(-2)
+
+
+def sumar(montos):
+    """Suma exacta de montos ya normalizados a centavos"""
+    return sum(round(m * 100) for m in montos) / 100
+
+
+def formatear(centavos, simbolo='$'):
+    """Formatea centavos para la interfaz: 123456 -> '$1,234.56'"""
+    return f"{simbolo}{a_decimal(centavos):,.2f}"
@@ -0,0 +1,125 @@
+"""
+Formato Columnar
+Exportación e importación del libro en Parquet y Arrow IPC (requiere pyarrow)
+"""
+
+import os
+
+import config
+from datos import dinero
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    PYARROW_DISPONIBLE = True
+except ImportError:
+    PYARROW_DISPONIBLE = False
+
+
+EXTENSIONES_PARQUET = ('.parquet', '.pq')
+EXTENSIONES_ARROW = ('.arrow', '.feather', '.ipc')
+
+# Grupos de filas pequeños: con el libro ordenado por fecha, permiten saltar
+# grupos completos al filtrar por rango de fechas
+FILAS_POR_GRUPO = 64 * 1024
+
+
+def obtener_esquema():
+    """Esquema tipado del libro"""
+    return pa.schema([
+        ('id', pa.string()),
+        ('fecha', pa.date32()),
+        ('descripcion', pa.string()),
+        ('monto', pa.decimal128(18, 2)),
+        ('tipo', pa.dictionary(pa.int8(), pa.string())),
+        ('categoria', pa.dictionary(pa.int16(), pa.string())),
+        ('cuenta', pa.dictionary(pa.int16(), pa.string())),
+        ('moneda', pa.dictionary(pa.int8(), pa.string())),
+    ])
+
+
+def _verificar_pyarrow():
+    if not PYARROW_DISPONIBLE:
+        raise ImportError("Se requiere pyarrow para Parquet/Arrow (pip install pyarrow)")
+
+
+def es_formato_columnar(archivo):
+    """Indica si la extensión del archivo es Parquet o Arrow"""
+    return os.path.splitext(archivo)[1].lower() in EXTENSIONES_PARQUET + EXTENSIONES_ARROW
+
+
+def a_tabla(transacciones):
+    """Convierte transacciones (dicts) a una tabla de Arrow ordenada por fecha"""
+    _verificar_pyarrow()
+    ordenadas = sorted(transacciones, key=lambda t: t['fecha'])
+    esquema = obtener_esquema()
+
+    columnas = [
+        pa.array([str(t['id']) for t in ordenadas], pa.string()),
+        pa.array([t['fecha'] for t in ordenadas], pa.string()).cast(pa.date32()),
+        pa.array([t['descripcion'] for t in ordenadas], pa.string()),
+        pa.array([dinero.a_decimal(round(t['monto'] * 100)) for t in ordenadas], pa.decimal128(18, 2)),
+        pa.array([t['tipo'] for t in ordenadas], pa.string()).dictionary_encode()
+          .cast(esquema.field('tipo').type),
+        pa.array([t['categoria'] for t in ordenadas], pa.string()).dictionary_encode()
+          .cast(esquema.field('categoria').type),
+        pa.array([t.get('cuenta') or config.CUENTA_PREDETERMINADA for t in ordenadas], pa.string()).dictionary_encode()
+          .cast(esquema.field('cuenta').type),
+        pa.array([t.get('moneda') or config.MONEDA_BASE for t in ordenadas], pa.string()).dictionary_encode()
+          .cast(esquema.field('moneda').type),
+    ]
+    return pa.Table.from_arrays(columnas, schema=esquema)
+
+
+def exportar(transacciones, archivo_destino):
+    """Exporta a Parquet o Arrow IPC según la extensión del archivo"""
+    _verificar_pyarrow()
+    tabla = a_tabla(transacciones)
+    extension = os.path.splitext(archivo_destino)[1].lower()
+
+    if extension in EXTENSIONES_ARROW:
+        opciones = ipc.IpcWriteOptions(compression='lz4')
+        with pa.OSFile(archivo_destino, 'wb') as sumidero:
+            with ipc.new_file(sumidero, tabla.schema, options=opciones) as escritor:
+                escritor.write_table(tabla, max_chunksize=FILAS_POR_GRUPO)
+    else:
+        pq.write_table(tabla, archivo_destino, compression='zstd',
+                       row_group_size=FILAS_POR_GRUPO, use_dictionary=['tipo', 'categoria', 'cuenta', 'moneda'])
+
+
+def importar(archivo_origen, fecha_inicio=None, fecha_fin=None):
+    """
+    Lee transacciones de un archivo Parquet o Arrow IPC.
+    El rango de fechas ('YYYY-MM-DD', inclusive) se aplica como predicado al
+    leer, por lo que en Parquet se descartan grupos de filas sin decodificarlos
+    """
+    _verificar_pyarrow()
+    extension = os.path.splitext(archivo_origen)[1].lower()
+    formato = 'ipc' if extension in EXTENSIONES_ARROW else 'parquet'
+    conjunto = ds.dataset(archivo_origen, format=formato)
+
+    filtro = None
+    if fecha_inicio:
+        filtro = ds.field('fecha') >= pa.scalar(fecha_inicio).cast(pa.date32())
+    if fecha_fin:
+        condicion = ds.field('fecha') <= pa.scalar(fecha_fin).cast(pa.date32())
+        filtro = condicion if filtro is None else filtro & condicion
+
+    tabla = conjunto.to_table(filter=filtro)
+
+    # Normalizar a los tipos del libro en memoria (fecha como texto, monto float en centavos exactos)
+    columnas = {
+        'id': tabla.column('id').cast(pa.string()),
+        'fecha': tabla.column('fecha').cast(pa.date32()).cast(pa.string()),
+        'descripcion': tabla.column('descripcion').cast(pa.string()),
+        'monto': tabla.column('monto').cast(pa.float64()),
+        'tipo': tabla.column('tipo'),
+        'categoria': tabla.column('categoria'),
+    }
+    # Los archivos anteriores a cuentas y monedas no traen esas columnas
+    for nombre in ('cuenta', 'moneda'):
+        if nombre in tabla.column_names:
+            columnas[nombre] = tabla.column(nombre)
+    return pa.table(columnas).to_pylist()
@@ -3,19 +3,35 @@ Gestor de Metas Financieras
 Maneja objetivos de ahorro y seguimiento
 """
 
+import calendar
 import json
+import math
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from datos import persistencia
+
+
+# Días de historial de aportes que definen el ritmo actual
+VENTANA_APORTES_DIAS = 90
+DIAS_POR_MES = 30.44
+
 
 class GestorMetas:
     """Gestiona las metas financieras del usuario"""
 
-    def __init__(self, archivo_metas="datos/metas.json"):
+    def __init__(self, archivo_metas="datos/metas.json", gestor_datos=None):
         self.archivo_metas = archivo_metas
         self.metas = []
 
+        # Libro de transacciones (opcional) para proyectar con la tendencia de ahorro
+        self.gestor_datos = gestor_datos
+        self._pronosticador = None
+
+        # id -> (clave de la meta y del ahorro, proyección)
+        self._proyecciones = {}
+
         # Crear directorio si no existe
         Path("datos").mkdir(exist_ok=True)
 
@@ -39,8 +55,7 @@ class GestorMetas:
     def guardar_metas(self):
         """Guarda las metas en el archivo JSON"""
         try:
-            with open(self.archivo_metas, 'w', encoding='utf-8') as f:
-                json.dump(self.metas, f, ensure_ascii=False, indent=2)
+            persistencia.guardar_json(self.archivo_metas, self.metas)
             return True
         except Exception as e:
             print(f"Error al guardar metas: {e}")
@@ -57,7 +72,8 @@ class GestorMetas:
             'fecha_limite': fecha_limite,
             'descripcion': descripcion,
             'completada': False,
-            'fecha_completada': None
+            'fecha_completada': None,
+            'aportes': []
         }
 
         self.metas.append(nueva_meta)
@@ -85,7 +101,14 @@ class GestorMetas:
         """Actualiza el monto actual de una meta"""
         for meta in self.metas:
             if meta['id'] == id_meta:
+                ajuste = float(monto_actual) - meta['monto_actual']
                 meta['monto_actual'] = float(monto_actual)
+                if ajuste:
+                    meta.setdefault('aportes', []).append({
+                        'fecha': datetime.now().strftime('%Y-%m-%d'),
+                        'monto': ajuste,
+                        'ajuste': True
+                    })
 
                 # Verificar si se completó
                 if meta['monto_actual'] >= meta['monto_objetivo'] and not meta['completada']:
@@ -99,11 +122,15 @@ class GestorMetas:
                 return True
         return False
 
-    def agregar_aporte(self, id_meta, monto_aporte):
-        """Agrega un aporte a una meta"""
+    def agregar_aporte(self, id_meta, monto_aporte, fecha=None):
+        """Agrega un aporte a una meta y lo registra en su historial"""
         for meta in self.metas:
             if meta['id'] == id_meta:
                 meta['monto_actual'] += float(monto_aporte)
+                meta.setdefault('aportes', []).append({
+                    'fecha': fecha or datetime.now().strftime('%Y-%m-%d'),
+                    'monto': float(monto_aporte)
+                })
 
                 # Verificar si se completó
                 if meta['monto_actual'] >= meta['monto_objetivo'] and not meta['completada']:
@@ -153,6 +180,131 @@ class GestorMetas:
         except:
             return None
 
+    def proyectar_fecha_completado(self, id_meta, pronostico):
+        """
+        Mes estimado en que se completa la meta si el flujo neto pronosticado
+        (ver procesador.pronostico) se destina a ella.
+        Retorna {'esperada', 'optimista', 'pesimista'} con 'YYYY-MM' o None
+        si no se alcanza dentro del horizonte
+        """
+        meta = self.obtener_meta_por_id(id_meta)
+        if not meta or not pronostico:
+            return None
+
+        restante = meta['monto_objetivo'] - meta['monto_actual']
+        if restante <= 0:
+            return {'esperada': (meta.get('fecha_completada') or '')[:7] or None,
+                    'optimista': None, 'pesimista': None}
+
+        def primer_mes(flujo):
+            acumulado = 0
+            for mes, ahorro in zip(pronostico['meses'], flujo):
+                acumulado += max(ahorro, 0)
+                if acumulado >= restante:
+                    return mes
+            return None
+
+        return {
+            'esperada': primer_mes(pronostico['flujo']['esperado']),
+            'optimista': primer_mes(pronostico['flujo']['superior']),
+            'pesimista': primer_mes(pronostico['flujo']['inferior']),
+        }
+
+    def _obtener_pronostico(self):
+        """Flujo neto pronosticado del libro (en caché por versión), o None sin libro"""
+        if self.gestor_datos is None:
+            return None
+        if self._pronosticador is None:
+            from procesador.pronostico import Pronosticador
+            self._pronosticador = Pronosticador(self.gestor_datos)
+        return self._pronosticador.pronosticar(meses=12)
+
+    def obtener_ritmo_aportes(self, meta, hoy=None):
+        """Aporte mensual promedio de los últimos VENTANA_APORTES_DIAS días (None sin aportes)"""
+        hoy = hoy or datetime.now().date()
+        inicio = (hoy - timedelta(days=VENTANA_APORTES_DIAS)).strftime('%Y-%m-%d')
+        recientes = [a for a in meta.get('aportes', []) if a['fecha'] >= inicio and not a.get('ajuste')]
+        if not recientes:
+            return None
+
+        total = sum(a['monto'] for a in recientes)
+        primero = datetime.strptime(min(a['fecha'] for a in recientes), '%Y-%m-%d').date()
+        # Al menos un mes de ventana: un solo aporte reciente no debe disparar el ritmo
+        dias = max((hoy - primero).days, 30)
+        return total / dias * DIAS_POR_MES if total > 0 else None
+
+    def obtener_proyeccion(self, id_meta):
+        """
+        Proyección de cumplimiento de una meta:
+        {'fecha_estimada', 'fuente' ('aportes' | 'ahorro' | None), 'ritmo_mensual',
+         'aporte_mensual_requerido', 'a_tiempo'}.
+        Se recalcula solo si cambia la meta, el flujo pronosticado del libro o el día
+        """
+        meta = self.obtener_meta_por_id(id_meta)
+        if not meta:
+            return None
+
+        hoy = datetime.now().date()
+        pronostico = self._obtener_pronostico()
+        aportes = meta.get('aportes', [])
+        clave = (
+            hoy, meta['monto_objetivo'], meta['monto_actual'], meta['fecha_limite'],
+            meta['completada'], len(aportes),
+            (aportes[-1]['fecha'], aportes[-1]['monto']) if aportes else None,
+            tuple(pronostico['flujo']['esperado']) if pronostico else None,
+        )
+
+        en_cache = self._proyecciones.get(id_meta)
+        if en_cache is None or en_cache[0] != clave:
+            en_cache = (clave, self._calcular_proyeccion(meta, hoy, pronostico))
+            self._proyecciones[id_meta] = en_cache
+        return en_cache[1]
+
+    def _calcular_proyeccion(self, meta, hoy, pronostico):
+        """Estima la fecha con el ritmo de aportes o, sin aportes recientes, con el ahorro pronosticado"""
+        resultado = {
+            'fecha_estimada': None,
+            'fuente': None,
+            'ritmo_mensual': 0.0,
+            'aporte_mensual_requerido': None,
+            'a_tiempo': None
+        }
+
+        restante = meta['monto_objetivo'] - meta['monto_actual']
+        if meta['completada'] or restante <= 0:
+            resultado['fecha_estimada'] = meta.get('fecha_completada')
+            resultado['a_tiempo'] = True
+            return resultado
+
+        limite = None
+        if meta['fecha_limite']:
+            limite = datetime.strptime(meta['fecha_limite'], '%Y-%m-%d').date()
+            meses_restantes = (limite - hoy).days / DIAS_POR_MES
+            resultado['aporte_mensual_requerido'] = (
+                round(restante / meses_restantes, 2) if meses_restantes >= 1 else round(restante, 2)
+            )
+
+        fecha = None
+        ritmo = self.obtener_ritmo_aportes(meta, hoy)
+        if ritmo:
+            fecha = hoy + timedelta(days=math.ceil(restante / ritmo * DIAS_POR_MES))
+            resultado['fuente'] = 'aportes'
+            resultado['ritmo_mensual'] = round(ritmo, 2)
+        elif pronostico:
+            mes = self.proyectar_fecha_completado(meta['id'], pronostico)['esperada']
+            positivos = [f for f in pronostico['flujo']['esperado'] if f > 0]
+            resultado['fuente'] = 'ahorro'
+            resultado['ritmo_mensual'] = round(sum(positivos) / len(pronostico['meses']), 2)
+            if mes:
+                año, numero = int(mes[:4]), int(mes[5:7])
+                fecha = datetime(año, numero, calendar.monthrange(año, numero)[1]).date()
+
+        if fecha:
+            resultado['fecha_estimada'] = fecha.strftime('%Y-%m-%d')
+        if limite:
+            resultado['a_tiempo'] = fecha is not None and fecha <= limite
+        return resultado
+
     def obtener_alerta_meta(self, id_meta):
         """Genera alerta según el estado de la meta"""
         meta = self.obtener_meta_por_id(id_meta)
@@ -206,6 +358,17 @@ class GestorMetas:
                     'mensaje': f"📅 {dias_restantes} días restantes para '{meta['nombre']}'"
                 })
 
+            # Ritmo insuficiente para llegar a tiempo
+            if dias_restantes >= 0 and not meta['completada']:
+                proyeccion = self.obtener_proyeccion(id_meta)
+                if proyeccion and proyeccion['a_tiempo'] is False:
+                    estimada = proyeccion['fecha_estimada'] or 'sin fecha estimada'
+                    alertas.append({
+                        'tipo': 'advertencia',
+                        'mensaje': f"📉 Al ritmo actual '{meta['nombre']}' se completaría: {estimada}. "
+                                   f"Se requieren ${proyeccion['aporte_mensual_requerido']:,.2f} al mes"
+                    })
+
         return alertas if alertas else None
 
     def generar_id(self):
@@ -1,13 +1,28 @@
 """
 Gestor de Presupuestos
-Maneja presupuestos por categoría y seguimiento
+Maneja presupuestos por categoría y periodo (mensual, semanal o personalizado),
+con remanente opcional y un acumulador de gasto alimentado por el libro
 """
 
+import calendar
 import json
 import os
-from datetime import datetime
+from bisect import bisect_right
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from datos import persistencia
+
+
+PERIODOS = ['mensual', 'semanal', 'personalizado']
+
+# Severidad de las alertas de presupuesto para el centro de alertas
+SEVERIDADES = {'peligro': 'alta', 'advertencia': 'media', 'info': 'baja'}
+
+
+def _a_fecha(texto):
+    return datetime.strptime(texto, '%Y-%m-%d').date()
+
 
 class GestorPresupuestos:
     """Gestiona presupuestos por categoría"""
@@ -15,7 +30,17 @@ class GestorPresupuestos:
     def __init__(self, gestor_datos, archivo_presupuestos="datos/presupuestos.json"):
         self.gestor_datos = gestor_datos
         self.archivo_presupuestos = archivo_presupuestos
+
+        # Gasto en centavos (moneda base) por (categoría, inicio del periodo).
+        # Se construye una vez y luego lo actualizan los deltas del libro
+        self._gastos = None
+        self._clave_gastos = None
+        self._remanentes = {}
+        self._evaluacion = None
+        self._sugeridor = None
+        self._version_config = 0
         self.presupuestos = {}
+        gestor_datos.suscribir_cambios(self._aplicar_cambios)
 
         # Crear directorio si no existe
         Path("datos").mkdir(exist_ok=True)
@@ -23,6 +48,20 @@ class GestorPresupuestos:
         # Cargar presupuestos
         self.cargar_presupuestos()
 
+    def cerrar(self):
+        """Deja de seguir los cambios del libro (para gestores temporales)"""
+        self.gestor_datos.desuscribir_cambios(self._aplicar_cambios)
+
+    @property
+    def presupuestos(self):
+        """Presupuestos por categoría"""
+        return self._presupuestos
+
+    @presupuestos.setter
+    def presupuestos(self, valor):
+        self._presupuestos = valor
+        self._marcar_config_modificada()
+
     def cargar_presupuestos(self):
         """Carga presupuestos desde archivo JSON"""
         if not os.path.exists(self.archivo_presupuestos):
@@ -31,7 +70,10 @@ class GestorPresupuestos:
 
         try:
             with open(self.archivo_presupuestos, 'r', encoding='utf-8') as f:
-                self.presupuestos = json.load(f)
+                presupuestos = json.load(f)
+                for presupuesto in presupuestos.values():
+                    self._completar_campos(presupuesto)
+                self.presupuestos = presupuestos
                 print(f"✓ Presupuestos cargados")
         except Exception as e:
             print(f"Error al cargar presupuestos: {e}")
@@ -40,30 +82,119 @@ class GestorPresupuestos:
     def guardar_presupuestos(self):
         """Guarda presupuestos en archivo JSON"""
         try:
-            with open(self.archivo_presupuestos, 'w', encoding='utf-8') as f:
-                json.dump(self.presupuestos, f, ensure_ascii=False, indent=2)
+            persistencia.guardar_json(self.archivo_presupuestos, self.presupuestos)
             return True
         except Exception as e:
             print(f"Error al guardar presupuestos: {e}")
             return False
 
-    def establecer_presupuesto(self, categoria, monto):
-        """Establece o actualiza presupuesto para una categoría"""
+    def _completar_campos(self, presupuesto):
+        """Migra presupuestos de monto único: mensuales, sin remanente y con historial de un periodo"""
+        presupuesto.setdefault('periodo', 'mensual')
+        presupuesto.setdefault('dias', None)
+        presupuesto.setdefault('acumular', False)
+        if not presupuesto.get('historial'):
+            creacion = presupuesto.get('fecha_creacion') or datetime.now().strftime('%Y-%m-%d')
+            presupuesto.setdefault('inicio', creacion)
+            presupuesto['historial'] = {self.inicio_periodo(presupuesto, creacion): presupuesto['monto']}
+
+    def _marcar_config_modificada(self):
+        """Un cambio en las definiciones invalida el acumulador de gasto"""
+        self._version_config += 1
+
+    # ===== PERIODOS =====
+
+    def inicio_periodo(self, presupuesto, fecha):
+        """Fecha 'YYYY-MM-DD' en que empieza el periodo del presupuesto que contiene 'fecha'"""
+        periodo = presupuesto.get('periodo', 'mensual')
+        if periodo == 'mensual':
+            return fecha[:7] + '-01'
+
+        dia = _a_fecha(fecha)
+        if periodo == 'semanal':
+            return (dia - timedelta(days=dia.weekday())).strftime('%Y-%m-%d')
+
+        ancla = _a_fecha(presupuesto['inicio'])
+        dias = int(presupuesto['dias'])
+        return (ancla + timedelta(days=(dia - ancla).days // dias * dias)).strftime('%Y-%m-%d')
+
+    def siguiente_periodo(self, presupuesto, inicio):
+        """Inicio del periodo que sigue al que empieza en 'inicio'"""
+        dia = _a_fecha(inicio)
+        periodo = presupuesto.get('periodo', 'mensual')
+        if periodo == 'mensual':
+            ultimo = calendar.monthrange(dia.year, dia.month)[1]
+            return (dia + timedelta(days=ultimo - dia.day + 1)).strftime('%Y-%m-%d')
+        paso = 7 if periodo == 'semanal' else int(presupuesto['dias'])
+        return (dia + timedelta(days=paso)).strftime('%Y-%m-%d')
+
+    def monto_periodo(self, presupuesto, inicio):
+        """Monto vigente en el periodo: el último registrado en el historial hasta 'inicio'"""
+        historial = presupuesto['historial']
+        inicios = sorted(historial)
+        posicion = bisect_right(inicios, inicio) - 1
+        return historial[inicios[max(posicion, 0)]]
+
+    # ===== ALTAS Y BAJAS =====
+
+    def establecer_presupuesto(self, categoria, monto, periodo=None, dias=None, acumular=None):
+        """
+        Establece o actualiza presupuesto para una categoría.
+        periodo: 'mensual', 'semanal' o 'personalizado' (cada 'dias' días);
+        acumular: el sobrante de cada periodo pasa al siguiente.
+        Sin periodo ni acumular se conservan los del presupuesto existente.
+        El monto aplica desde el periodo actual; los anteriores guardan el suyo
+        """
         if monto <= 0:
             return False
 
-        self.presupuestos[categoria] = {
-            'monto': float(monto),
-            'fecha_creacion': datetime.now().strftime('%Y-%m-%d'),
-            'mes_actual': datetime.now().strftime('%Y-%m')
-        }
-
+        hoy = datetime.now().strftime('%Y-%m-%d')
+        anterior = self.presupuestos.get(categoria)
+        periodo = periodo or (anterior.get('periodo', 'mensual') if anterior else 'mensual')
+        if periodo not in PERIODOS:
+            return False
+        if periodo == 'personalizado':
+            dias = dias or (anterior.get('dias') if anterior else None)
+            if not dias or int(dias) < 1:
+                return False
+            dias = int(dias)
+        else:
+            dias = None
+
+        mismo_periodo = anterior is not None and anterior.get('periodo', 'mensual') == periodo and anterior.get('dias') == dias
+        if mismo_periodo:
+            presupuesto = anterior
+        else:
+            # Nuevo presupuesto o cambio de periodo: el historial empieza de nuevo
+            presupuesto = {
+                'fecha_creacion': hoy,
+                'inicio': hoy,
+                'periodo': periodo,
+                'dias': dias,
+                'acumular': False,
+                'historial': {}
+            }
+
+        presupuesto['monto'] = float(monto)
+        if acumular is not None:
+            presupuesto['acumular'] = bool(acumular)
+        elif anterior is not None:
+            presupuesto['acumular'] = anterior.get('acumular', False)
+
+        inicio = self.inicio_periodo(presupuesto, hoy)
+        presupuesto['historial'][inicio] = float(monto)
+        presupuesto['periodo_actual'] = inicio
+        presupuesto['mes_actual'] = hoy[:7]
+
+        self.presupuestos[categoria] = presupuesto
+        self._marcar_config_modificada()
         return self.guardar_presupuestos()
 
     def eliminar_presupuesto(self, categoria):
         """Elimina presupuesto de una categoría"""
         if categoria in self.presupuestos:
             del self.presupuestos[categoria]
+            self._marcar_config_modificada()
             return self.guardar_presupuestos()
         return False
 
@@ -71,49 +202,149 @@ class GestorPresupuestos:
         """Obtiene presupuesto de una categoría"""
         return self.presupuestos.get(categoria, None)
 
-    def obtener_gasto_categoria_mes_actual(self, categoria):
-        """Obtiene el gasto actual de una categoría en el mes"""
-        fecha_actual = datetime.now()
-        mes_actual = fecha_actual.month
-        año_actual = fecha_actual.year
-
-        gastos = [t for t in self.gestor_datos.transacciones
-                  if t['tipo'] == 'Gasto'
-                  and t['categoria'] == categoria
-                  and datetime.strptime(t['fecha'], '%Y-%m-%d').month == mes_actual
-                  and datetime.strptime(t['fecha'], '%Y-%m-%d').year == año_actual]
+    # ===== ACUMULADOR DE GASTO =====
 
-        return sum([g['monto'] for g in gastos])
-
-    def obtener_porcentaje_uso(self, categoria):
-        """Calcula el porcentaje usado del presupuesto"""
-        presupuesto = self.obtener_presupuesto(categoria)
-        if not presupuesto:
-            return None
+    def _clave_libro(self, version=None):
+        gestor = self.gestor_datos
+        return (gestor.version if version is None else version, gestor.tipos_cambio.version,
+                gestor.moneda_base, self._version_config)
 
-        gasto_actual = self.obtener_gasto_categoria_mes_actual(categoria)
-        porcentaje = (gasto_actual / presupuesto['monto']) * 100
+    def _centavos(self, t):
+        """Monto de la transacción en centavos de moneda base (0 si falta el tipo de cambio)"""
+        return self.gestor_datos.centavos_en_base(t)
 
-        return porcentaje
+    def _sumar(self, gastos, t, signo, inicios):
+        """Suma la transacción al periodo de su categoría (si es gasto presupuestado)"""
+        presupuesto = self.presupuestos.get(t['categoria'])
+        if t['tipo'] != 'Gasto' or presupuesto is None:
+            return
 
-    def obtener_saldo_restante(self, categoria):
-        """Obtiene el saldo restante del presupuesto"""
-        presupuesto = self.obtener_presupuesto(categoria)
-        if not presupuesto:
-            return None
+        # Inicio del periodo memorizado por (categoría, fecha): las fechas se repiten mucho
+        clave_fecha = (t['categoria'], t['fecha'])
+        inicio = inicios.get(clave_fecha)
+        if inicio is None:
+            inicio = inicios[clave_fecha] = self.inicio_periodo(presupuesto, t['fecha'])
+
+        clave = (t['categoria'], inicio)
+        centavos = gastos.get(clave, 0) + signo * self._centavos(t)
+        if centavos:
+            gastos[clave] = centavos
+        else:
+            gastos.pop(clave, None)
+
+    def _obtener_gastos(self):
+        """
+        Retorna {(categoria, inicio_periodo): centavos}. Se reconstruye con un recorrido
+        del libro solo si cambiaron los presupuestos, los tipos de cambio, la moneda
+        base o el libro sin pasar por agregar/editar/eliminar
+        """
+        clave = self._clave_libro()
+        if self._gastos is None or self._clave_gastos != clave:
+            gastos = {}
+            inicios = {}
+            for t in self.gestor_datos.transacciones:
+                self._sumar(gastos, t, 1, inicios)
+            self._gastos = gastos
+            self._clave_gastos = clave
+            self._remanentes = {}
+        return self._gastos
+
+    def _aplicar_cambios(self, version_previa, cambios):
+        """Recibe los deltas del libro; si el acumulador no estaba al día se reconstruirá al leer"""
+        if self._gastos is None or self._clave_gastos != self._clave_libro(version_previa):
+            return
 
-        gasto_actual = self.obtener_gasto_categoria_mes_actual(categoria)
-        restante = presupuesto['monto'] - gasto_actual
+        inicios = {}
+        for t, signo in cambios:
+            self._sumar(self._gastos, t, signo, inicios)
+        self._clave_gastos = self._clave_libro()
+        self._remanentes = {}
+
+    # ===== ESTADO =====
+
+    def _remanente(self, categoria, presupuesto, inicio):
+        """
+        Sobrante acumulado de los periodos anteriores a 'inicio' (nunca negativo:
+        un exceso no se descuenta del siguiente). Memorizado hasta el próximo cambio
+        """
+        clave = (categoria, inicio)
+        if clave not in self._remanentes:
+            gastos = self._obtener_gastos()
+            sobrante = 0
+            periodo = min(presupuesto['historial'])
+            while periodo < inicio:
+                disponible = round(self.monto_periodo(presupuesto, periodo) * 100) + sobrante
+                sobrante = max(disponible - gastos.get((categoria, periodo), 0), 0)
+                periodo = self.siguiente_periodo(presupuesto, periodo)
+            self._remanentes[clave] = sobrante
+        return self._remanentes[clave]
+
+    def evaluar_presupuestos(self, fecha=None):
+        """
+        Estado de todos los presupuestos en el periodo que contiene 'fecha' (hoy
+        por defecto), de una vez: {categoria: {'periodo', 'inicio', 'fin', 'monto',
+        'remanente', 'disponible', 'gastado', 'restante', 'porcentaje', 'acumular'}}.
+        El gasto sale del acumulador (sin recorrer el libro) y el resultado se
+        reutiliza hasta el siguiente cambio del libro o de los presupuestos
+        """
+        fecha = fecha or datetime.now().strftime('%Y-%m-%d')
+        gastos = self._obtener_gastos()
+        clave = (self._clave_gastos, fecha)
+        if self._evaluacion is not None and self._evaluacion[0] == clave:
+            return self._evaluacion[1]
+
+        estados = {}
+        for categoria, presupuesto in self.presupuestos.items():
+            self._completar_campos(presupuesto)
+            inicio = self.inicio_periodo(presupuesto, fecha)
+            siguiente = self.siguiente_periodo(presupuesto, inicio)
+
+            monto = round(self.monto_periodo(presupuesto, inicio) * 100)
+            remanente = self._remanente(categoria, presupuesto, inicio) if presupuesto['acumular'] else 0
+            disponible = monto + remanente
+            gastado = gastos.get((categoria, inicio), 0)
+
+            estados[categoria] = {
+                'periodo': presupuesto['periodo'],
+                'inicio': inicio,
+                'fin': (_a_fecha(siguiente) - timedelta(days=1)).strftime('%Y-%m-%d'),
+                'monto': monto / 100,
+                'remanente': remanente / 100,
+                'disponible': disponible / 100,
+                'gastado': gastado / 100,
+                'restante': (disponible - gastado) / 100,
+                'porcentaje': gastado / disponible * 100 if disponible > 0 else 0,
+                'acumular': presupuesto['acumular']
+            }
+
+        self._evaluacion = (clave, estados)
+        return estados
+
+    def obtener_estado(self, categoria, fecha=None):
+        """Estado de un presupuesto (ver evaluar_presupuestos), o None si no hay presupuesto"""
+        return self.evaluar_presupuestos(fecha).get(categoria)
+
+    def obtener_gasto_periodo(self, categoria, fecha=None):
+        """Gasto de la categoría en el periodo de su presupuesto que contiene 'fecha'"""
+        estado = self.obtener_estado(categoria, fecha)
+        return estado['gastado'] if estado else 0
 
-        return restante
+    def obtener_gasto_categoria_mes_actual(self, categoria):
+        """Obtiene el gasto actual de una categoría en el periodo en curso"""
+        return self.obtener_gasto_periodo(categoria)
 
-    def verificar_alerta(self, categoria):
-        """Verifica si hay alertas para una categoría"""
-        porcentaje = self.obtener_porcentaje_uso(categoria)
+    def obtener_porcentaje_uso(self, categoria):
+        """Calcula el porcentaje usado del presupuesto (monto más remanente)"""
+        estado = self.obtener_estado(categoria)
+        return estado['porcentaje'] if estado else None
 
-        if porcentaje is None:
-            return None
+    def obtener_saldo_restante(self, categoria):
+        """Obtiene el saldo restante del presupuesto"""
+        estado = self.obtener_estado(categoria)
+        return estado['restante'] if estado else None
 
+    def _alertas_por_porcentaje(self, categoria, porcentaje):
+        """Alertas de una categoría según su porcentaje de uso"""
         alertas = []
 
         if porcentaje >= 100:
@@ -137,26 +368,39 @@ class GestorPresupuestos:
                 'mensaje': f"Presupuesto de '{categoria}' en {porcentaje:.1f}%"
             })
 
+        # Mismo formato que las alertas del analizador
+        for alerta in alertas:
+            alerta['titulo'] = f"💰 Presupuesto: {categoria}"
+            alerta['severidad'] = SEVERIDADES[alerta['tipo']]
+            alerta['categoria'] = 'presupuesto'
+
         return alertas
 
-    def obtener_todas_alertas(self):
-        """Obtiene todas las alertas de presupuestos"""
+    def verificar_alerta(self, categoria):
+        """Verifica si hay alertas para una categoría"""
+        porcentaje = self.obtener_porcentaje_uso(categoria)
+
+        if porcentaje is None:
+            return None
+
+        return self._alertas_por_porcentaje(categoria, porcentaje)
+
+    def obtener_todas_alertas(self, estados=None):
+        """Obtiene todas las alertas de presupuestos (de una evaluación en lote)"""
         alertas = []
 
-        for categoria in self.presupuestos.keys():
-            alertas_cat = self.verificar_alerta(categoria)
-            if alertas_cat:
-                alertas.extend(alertas_cat)
+        estados = estados if estados is not None else self.evaluar_presupuestos()
+        for categoria, estado in estados.items():
+            alertas.extend(self._alertas_por_porcentaje(categoria, estado['porcentaje']))
 
         return alertas
 
-    def obtener_resumen(self):
-        """Obtiene resumen de todos los presupuestos"""
-        total_presupuestado = sum([p['monto'] for p in self.presupuestos.values()])
+    def obtener_resumen(self, estados=None):
+        """Obtiene resumen de todos los presupuestos en su periodo en curso (de una evaluación en lote)"""
+        estados = list((estados if estados is not None else self.evaluar_presupuestos()).values())
 
-        total_gastado = 0
-        for categoria in self.presupuestos.keys():
-            total_gastado += self.obtener_gasto_categoria_mes_actual(categoria)
+        total_presupuestado = sum(e['disponible'] for e in estados)
+        total_gastado = sum(e['gastado'] for e in estados)
 
         porcentaje_uso_general = (total_gastado / total_presupuestado * 100) if total_presupuestado > 0 else 0
 
@@ -165,9 +409,8 @@ class GestorPresupuestos:
             'total_gastado': total_gastado,
             'saldo_restante': total_presupuestado - total_gastado,
             'porcentaje_uso': porcentaje_uso_general,
-            'categorias_con_presupuesto': len(self.presupuestos),
-            'categorias_excedidas': len([c for c in self.presupuestos.keys()
-                                         if self.obtener_porcentaje_uso(c) >= 100])
+            'categorias_con_presupuesto': len(estados),
+            'categorias_excedidas': len([e for e in estados if e['porcentaje'] >= 100])
         }
 
     def obtener_categorias_sin_presupuesto(self):
@@ -177,49 +420,39 @@ class GestorPresupuestos:
                                       if c not in self.presupuestos]
         return categorias_sin_presupuesto
 
-    def sugerir_presupuesto(self, categoria):
-        """Sugiere un presupuesto basado en gastos históricos"""
-        # Calcular promedio de los últimos 3 meses
-        fecha_actual = datetime.now()
-
-        gastos_historicos = []
-        for i in range(3):
-            mes = fecha_actual.month - i
-            año = fecha_actual.year
-
-            if mes <= 0:
-                mes += 12
-                año -= 1
-
-            gastos_mes = [t['monto'] for t in self.gestor_datos.transacciones
-                          if t['tipo'] == 'Gasto'
-                          and t['categoria'] == categoria
-                          and datetime.strptime(t['fecha'], '%Y-%m-%d').month == mes
-                          and datetime.strptime(t['fecha'], '%Y-%m-%d').year == año]
+    def sugerir_presupuestos(self, meses=None, percentil=None, estacional=None):
+        """
+        Sugerencias mensuales de todas las categorías de gasto a la vez
+        (ver SugeridorPresupuestos.sugerir): {categoria: {'sugerencia', ...}}
+        """
+        if self._sugeridor is None:
+            from procesador.sugerencias_presupuesto import SugeridorPresupuestos
+            self._sugeridor = SugeridorPresupuestos(self.gestor_datos)
+        return self._sugeridor.sugerir(meses, percentil, estacional)
 
-            if gastos_mes:
-                gastos_historicos.append(sum(gastos_mes))
-
-        if gastos_historicos:
-            promedio = sum(gastos_historicos) / len(gastos_historicos)
-            # Agregar 10% de margen
-            sugerencia = promedio * 1.1
-            return round(sugerencia, 2)
-
-        return None
+    def sugerir_presupuesto(self, categoria):
+        """Sugiere un presupuesto mensual basado en gastos históricos (None sin historial)"""
+        sugerencia = self.sugerir_presupuestos().get(categoria)
+        return sugerencia['sugerencia'] if sugerencia else None
 
     def resetear_mes_nuevo(self):
-        """Verifica y resetea presupuestos para mes nuevo (opcional)"""
-        mes_actual = datetime.now().strftime('%Y-%m')
+        """
+        Avanza cada presupuesto a su periodo en curso. El gasto de cada periodo sale
+        del acumulador y el remanente se calcula al consultar, así que solo se
+        actualiza el periodo registrado. Retorna cuántos presupuestos cambiaron de periodo
+        """
+        hoy = datetime.now().strftime('%Y-%m-%d')
 
         reseteos = 0
-        for categoria, datos in self.presupuestos.items():
-            if datos.get('mes_actual') != mes_actual:
-                # Actualizar mes
-                datos['mes_actual'] = mes_actual
+        for datos in self.presupuestos.values():
+            self._completar_campos(datos)
+            inicio = self.inicio_periodo(datos, hoy)
+            if datos.get('periodo_actual') != inicio:
+                datos['periodo_actual'] = inicio
+                datos['mes_actual'] = hoy[:7]
                 reseteos += 1
 
         if reseteos > 0:
             self.guardar_presupuestos()
 
-        return reseteos
\ No newline at end of file
+        return reseteos
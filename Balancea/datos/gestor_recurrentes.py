@@ -0,0 +1,239 @@
+"""
+Gestor de Transacciones Recurrentes
+Reglas de recurrencia (sueldo, renta, suscripciones) que se materializan en lote
+hasta la fecha actual y se proyectan hacia el futuro sin guardarse
+"""
+
+import calendar
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from datos import dinero, persistencia
+
+
+# Frecuencias con paso fijo en días; 'mensual' repite el día del mes de inicio
+DIAS_POR_FRECUENCIA = {
+    'semanal': 7,
+    'quincenal': 14,
+}
+FRECUENCIAS = ['mensual', 'quincenal', 'semanal', 'personalizada']
+
+
+def _a_fecha(texto):
+    return datetime.strptime(texto, '%Y-%m-%d').date()
+
+
+def _sumar_meses(inicio, meses):
+    """Misma fecha 'meses' después, ajustando al último día si el mes es más corto"""
+    indice = inicio.month - 1 + meses
+    año, mes = inicio.year + indice // 12, indice % 12 + 1
+    return inicio.replace(year=año, month=mes, day=min(inicio.day, calendar.monthrange(año, mes)[1]))
+
+
+def generar_ocurrencias(regla, desde, hasta):
+    """
+    Fechas (date) de la regla entre 'desde' y 'hasta' inclusive.
+    Salta directo a la primera ocurrencia de la ventana, así que el costo depende
+    de las ocurrencias generadas y no de la antigüedad de la regla
+    """
+    inicio = _a_fecha(regla['fecha_inicio'])
+    if regla.get('fecha_fin'):
+        hasta = min(hasta, _a_fecha(regla['fecha_fin']))
+    desde = max(desde, inicio)
+    if desde > hasta:
+        return
+
+    if regla['frecuencia'] == 'mensual':
+        meses = (desde.year - inicio.year) * 12 + desde.month - inicio.month
+        fecha = _sumar_meses(inicio, meses)
+        if fecha < desde:
+            meses += 1
+            fecha = _sumar_meses(inicio, meses)
+        while fecha <= hasta:
+            yield fecha
+            meses += 1
+            fecha = _sumar_meses(inicio, meses)
+    else:
+        paso = DIAS_POR_FRECUENCIA.get(regla['frecuencia']) or int(regla['intervalo_dias'])
+        saltos = -(-(desde - inicio).days // paso)  # techo de la división
+        fecha = inicio + timedelta(days=saltos * paso)
+        while fecha <= hasta:
+            yield fecha
+            fecha += timedelta(days=paso)
+
+
+class GestorRecurrentes:
+    """Gestiona las reglas de transacciones recurrentes"""
+
+    def __init__(self, gestor_datos, archivo_reglas="datos/recurrentes.json"):
+        self.gestor_datos = gestor_datos
+        self.archivo_reglas = archivo_reglas
+        self.reglas = []
+
+        # Aumenta con cada carga o guardado (p. ej. para invalidar pronósticos)
+        self.version = 0
+
+        # Crear directorio si no existe
+        Path("datos").mkdir(exist_ok=True)
+
+        # Cargar reglas existentes
+        self.cargar_reglas()
+
+    def cargar_reglas(self):
+        """Carga las reglas desde el archivo JSON"""
+        self.version += 1
+        if not os.path.exists(self.archivo_reglas):
+            self.reglas = []
+            return
+
+        try:
+            with open(self.archivo_reglas, 'r', encoding='utf-8') as f:
+                self.reglas = json.load(f)
+                print(f"✓ {len(self.reglas)} reglas recurrentes cargadas")
+        except Exception as e:
+            print(f"Error al cargar reglas recurrentes: {e}")
+            self.reglas = []
+
+    def guardar_reglas(self):
+        """Guarda las reglas en el archivo JSON"""
+        self.version += 1
+        try:
+            persistencia.guardar_json(self.archivo_reglas, self.reglas)
+            return True
+        except Exception as e:
+            print(f"Error al guardar reglas recurrentes: {e}")
+            return False
+
+    def agregar_regla(self, descripcion, monto, tipo, categoria, frecuencia, fecha_inicio,
+                      fecha_fin=None, intervalo_dias=None, cuenta=None, moneda=None):
+        """
+        Agrega una regla de recurrencia.
+        frecuencia: 'mensual', 'quincenal' (cada 14 días), 'semanal' o
+        'personalizada' (cada 'intervalo_dias' días)
+        """
+        if frecuencia not in FRECUENCIAS:
+            raise ValueError(f"Frecuencia inválida: {frecuencia}")
+        if frecuencia == 'personalizada' and (not intervalo_dias or int(intervalo_dias) < 1):
+            raise ValueError("La frecuencia personalizada requiere un intervalo de días")
+
+        nueva_regla = {
+            'id': self.generar_id(),
+            'descripcion': descripcion,
+            'monto': dinero.normalizar_monto(monto),
+            'tipo': tipo,
+            'categoria': categoria,
+            'cuenta': cuenta,
+            'moneda': moneda,
+            'frecuencia': frecuencia,
+            'intervalo_dias': int(intervalo_dias) if intervalo_dias else None,
+            'fecha_inicio': fecha_inicio,
+            'fecha_fin': fecha_fin,
+            'ultima_generada': None,
+            'activa': True
+        }
+
+        self.reglas.append(nueva_regla)
+        self.guardar_reglas()
+        return nueva_regla
+
+    def eliminar_regla(self, id_regla):
+        """Elimina una regla (las transacciones ya generadas se conservan)"""
+        self.reglas = [r for r in self.reglas if r['id'] != id_regla]
+        return self.guardar_reglas()
+
+    def cambiar_estado(self, id_regla, activa):
+        """Pausa o reanuda una regla (al reanudar no se generan las fechas del periodo en pausa)"""
+        for regla in self.reglas:
+            if regla['id'] == id_regla:
+                if activa and not regla.get('activa', True):
+                    ayer = datetime.now().date() - timedelta(days=1)
+                    regla['ultima_generada'] = max(self._pendientes(regla) - timedelta(days=1), ayer).strftime('%Y-%m-%d')
+                regla['activa'] = bool(activa)
+                return self.guardar_reglas()
+        return False
+
+    def obtener_reglas(self):
+        """Retorna todas las reglas"""
+        return self.reglas
+
+    def generar_id(self):
+        """Genera un ID único para la regla"""
+        if not self.reglas:
+            return 1
+        return max(r['id'] for r in self.reglas) + 1
+
+    def _pendientes(self, regla):
+        """Primera fecha que la regla aún no ha generado"""
+        if regla.get('ultima_generada'):
+            return _a_fecha(regla['ultima_generada']) + timedelta(days=1)
+        return _a_fecha(regla['fecha_inicio'])
+
+    def obtener_proxima_ocurrencia(self, regla):
+        """Próxima fecha (date) aún no generada a partir de hoy, o None si ya no hay"""
+        desde = max(datetime.now().date(), self._pendientes(regla))
+        return next(generar_ocurrencias(regla, desde, _sumar_meses(desde, 12)), None)
+
+    def _crear_transaccion(self, regla, fecha):
+        return {
+            'fecha': fecha.strftime('%Y-%m-%d'),
+            'descripcion': regla['descripcion'],
+            'monto': regla['monto'],
+            'tipo': regla['tipo'],
+            'categoria': regla['categoria'],
+            'cuenta': regla.get('cuenta'),
+            'moneda': regla.get('moneda'),
+        }
+
+    def materializar(self, hasta=None):
+        """
+        Genera las ocurrencias pendientes de todas las reglas activas hasta
+        'hasta' (hoy por defecto) y las agrega al libro con un solo guardado.
+        Retorna el número de transacciones creadas
+        """
+        limite = _a_fecha(hasta) if hasta else datetime.now().date()
+        nuevas = []
+        reglas_avanzadas = []
+
+        for regla in self.reglas:
+            if not regla.get('activa', True):
+                continue
+            fechas = list(generar_ocurrencias(regla, self._pendientes(regla), limite))
+            if fechas:
+                nuevas.extend(self._crear_transaccion(regla, fecha) for fecha in fechas)
+                reglas_avanzadas.append((regla, fechas[-1]))
+
+        if not nuevas:
+            return 0
+
+        nuevas.sort(key=lambda t: t['fecha'])
+        self.gestor_datos.agregar_transacciones_lote(nuevas)
+
+        for regla, ultima in reglas_avanzadas:
+            regla['ultima_generada'] = ultima.strftime('%Y-%m-%d')
+        self.guardar_reglas()
+        return len(nuevas)
+
+    def proyectar(self, hasta, desde=None):
+        """
+        Ocurrencias futuras de las reglas activas hasta 'hasta', sin guardarlas.
+        Empieza después de lo ya materializado (o en 'desde' si es posterior).
+        Retorna transacciones con 'proyectada': True, ordenadas por fecha
+        """
+        limite = _a_fecha(hasta)
+        inicio_minimo = _a_fecha(desde) if desde else datetime.now().date() + timedelta(days=1)
+        proyectadas = []
+
+        for regla in self.reglas:
+            if not regla.get('activa', True):
+                continue
+            inicio = max(self._pendientes(regla), inicio_minimo)
+            for fecha in generar_ocurrencias(regla, inicio, limite):
+                transaccion = self._crear_transaccion(regla, fecha)
+                transaccion['proyectada'] = True
+                transaccion['id_regla'] = regla['id']
+                proyectadas.append(transaccion)
+
+        proyectadas.sort(key=lambda t: t['fecha'])
+        return proyectadas
@@ -4,18 +4,48 @@ Maneja todas las operaciones CRUD de transacciones
 """
 
 import csv
+import hashlib
+from bisect import bisect_left, bisect_right
 import os
 from datetime import datetime
 from pathlib import Path
+import numpy as np
 import pandas as pd
+import config
 from datos.config_categorias import GestorCategorias
+from datos.tipos_cambio import TablaTiposCambio
+from datos import dinero, formato_columnar, persistencia
+from utils.instrumentacion import instrumentar
 
 
 class GestorTransacciones:
     """Gestiona las transacciones financieras"""
 
-    def __init__(self, archivo_datos="datos/transacciones.csv"):
+    CAMPOS = ['id', 'fecha', 'descripcion', 'monto', 'tipo', 'categoria', 'cuenta', 'moneda']
+
+    def __init__(self, archivo_datos="datos/transacciones.csv", tipos_cambio=None):
         self.archivo_datos = archivo_datos
+
+        # Moneda en la que se reportan los totales (las filas conservan la suya)
+        self.moneda_base = config.MONEDA_BASE
+        self.tipos_cambio = tipos_cambio if tipos_cambio is not None else TablaTiposCambio(config.RUTA_TIPOS_CAMBIO)
+
+        # Versión del libro: cambia con cada modificación para invalidar cachés
+        self.version = 0
+        self._huella = None
+        self._indice_mensual = None
+        self._indice_fechas = None
+        self._columnas = None
+        self.monedas_sin_tipo_cambio = set()
+
+        # Agregados por (cuenta, moneda, tipo, fecha) en centavos nominales;
+        # las altas, ediciones y bajas los actualizan con deltas
+        self._agregados = None
+        self._version_agregados = None
+        self._conversiones = None
+
+        # Funciones avisadas de cada alta, edición o baja: f(version_previa, cambios)
+        self._suscriptores = []
         self.transacciones = []
 
         # Usar el gestor de categorías personalizable
@@ -28,10 +58,54 @@ class GestorTransacciones:
         # Cargar datos existentes
         self.cargar_datos()
 
+    @property
+    def transacciones(self):
+        """Lista de transacciones en memoria"""
+        return self._transacciones
+
+    @transacciones.setter
+    def transacciones(self, valor):
+        self._transacciones = valor
+        self.marcar_modificado()
+
+    def marcar_modificado(self):
+        """Incrementa la versión del libro (invalida resultados en caché)"""
+        self.version += 1
+
+    def obtener_huella(self):
+        """
+        Retorna un hash del contenido del libro.
+        A diferencia de 'version', es estable entre sesiones (sirve para cachés en disco).
+        """
+        if self._huella is None or self._huella[0] != self.version:
+            h = hashlib.sha1()
+            for t in self.transacciones:
+                h.update(f"{t['id']}|{t['fecha']}|{t['monto']}|{t['tipo']}|{t['categoria']}|"
+                         f"{self.cuenta_de(t)}|{self.moneda_de(t)}|{t['descripcion']}\n".encode('utf-8'))
+            self._huella = (self.version, h.hexdigest())
+        return self._huella[1]
+
     def obtener_categorias(self):
         """Retorna las categorías disponibles"""
         return self.gestor_categorias.obtener_categorias()
 
+    @staticmethod
+    def cuenta_de(t):
+        """Cuenta de una transacción (la predeterminada si no la trae)"""
+        return t.get('cuenta') or config.CUENTA_PREDETERMINADA
+
+    @staticmethod
+    def moneda_de(t):
+        """Moneda de una transacción (la base configurada si no la trae)"""
+        return t.get('moneda') or config.MONEDA_BASE
+
+    @staticmethod
+    def _completar_cuenta_moneda(t):
+        """Asigna cuenta y moneda predeterminadas a filas que no las traen (archivos anteriores)"""
+        t['cuenta'] = (t.get('cuenta') or '').strip() or config.CUENTA_PREDETERMINADA
+        t['moneda'] = (t.get('moneda') or '').strip().upper() or config.MONEDA_BASE
+
+    @instrumentar('transacciones.cargar', filas=lambda self: len(self.transacciones))
     def cargar_datos(self):
         """Carga transacciones desde el archivo CSV"""
         if not os.path.exists(self.archivo_datos):
@@ -52,11 +126,12 @@ class GestorTransacciones:
                 transacciones_validas = []
                 for t in self.transacciones:
                     try:
-                        t['monto'] = float(t['monto'])
+                        t['monto'] = dinero.normalizar_monto(t['monto'])
+                        self._completar_cuenta_moneda(t)
                         # Validar que tenga todos los campos necesarios
                         if all(k in t for k in ['id', 'fecha', 'descripcion', 'monto', 'tipo', 'categoria']):
                             transacciones_validas.append(t)
-                    except (ValueError, KeyError) as e:
+                    except (ValueError, KeyError, ArithmeticError) as e:
                         print(f"Advertencia: Transacción inválida ignorada: {e}")
                         continue
 
@@ -69,56 +144,136 @@ class GestorTransacciones:
 
     def crear_archivo_datos(self):
         """Crea el archivo CSV con encabezados"""
-        with open(self.archivo_datos, 'w', newline='', encoding='utf-8') as f:  # ✅ CORREGIDO
-            campos = ['id', 'fecha', 'descripcion', 'monto', 'tipo', 'categoria']
-            writer = csv.DictWriter(f, fieldnames=campos)
-            writer.writeheader()
+        persistencia.escribir_atomico(self.archivo_datos,
+                                      lambda f: csv.DictWriter(f, fieldnames=self.CAMPOS).writeheader(),
+                                      newline='')
 
     def guardar_datos(self):
-        """Guarda todas las transacciones en el archivo CSV"""
+        """Guarda todas las transacciones en el archivo CSV (al instante)"""
+        # Las ediciones en sitio siempre pasan por aquí antes de persistirse
+        self.marcar_modificado()
         try:
-            with open(self.archivo_datos, 'w', newline='', encoding='utf-8') as f:
-                campos = ['id', 'fecha', 'descripcion', 'monto', 'tipo', 'categoria']
-                writer = csv.DictWriter(f, fieldnames=campos)
-                writer.writeheader()
-                writer.writerows(self.transacciones)
+            persistencia.ejecutar(os.path.abspath(self.archivo_datos), self._escribir_archivo)
             return True
         except Exception as e:
             print(f"Error al guardar datos: {e}")
             return False
 
-    def agregar_transaccion(self, fecha, descripcion, monto, tipo, categoria):
-        """Agrega una nueva transacción"""
+    def _guardar_cambios(self):
+        """
+        Persiste una modificación ya versionada por el llamador. Con el guardado
+        diferido activo, las ediciones seguidas se escriben una sola vez
+        """
+        # La lista se copia aquí, en el hilo que modifica; las filas publicadas no se
+        # mutan (editar_transaccion las reemplaza), así que el hilo de guardado no ve
+        # una fila a medio editar
+        filas = list(self.transacciones)
+        try:
+            persistencia.programar(os.path.abspath(self.archivo_datos), lambda: self._escribir_archivo(filas))
+        except Exception as e:
+            print(f"Error al guardar datos: {e}")
+
+    @instrumentar('transacciones.guardar', filas=lambda self, *a: len(self.transacciones))
+    def _escribir_archivo(self, filas=None):
+        """
+        Escribe el libro completo de forma atómica (puede correr en el hilo de guardado).
+        filas: copia tomada por el llamador; por defecto, el libro actual
+        """
+        if filas is None:
+            filas = list(self.transacciones)
+
+        def escribir(f):
+            writer = csv.DictWriter(f, fieldnames=self.CAMPOS)
+            writer.writeheader()
+            writer.writerows(filas)
+
+        persistencia.escribir_atomico(self.archivo_datos, escribir, newline='')
+
+    def agregar_transaccion(self, fecha, descripcion, monto, tipo, categoria, cuenta=None, moneda=None):
+        """Agrega una nueva transacción (cuenta y moneda predeterminadas si no se indican)"""
+        version_previa = self.version
         nueva_transaccion = {
             'id': self.generar_id(),
             'fecha': fecha,
             'descripcion': descripcion,
-            'monto': float(monto),
+            'monto': dinero.normalizar_monto(monto),
             'tipo': tipo,
-            'categoria': categoria
+            'categoria': categoria,
+            'cuenta': cuenta,
+            'moneda': moneda
         }
+        self._completar_cuenta_moneda(nueva_transaccion)
 
         self.transacciones.append(nueva_transaccion)
-        self.guardar_datos()
+        self.marcar_modificado()
+        self._guardar_cambios()
+        self._notificar_cambios(version_previa, [(nueva_transaccion, 1)])
         return nueva_transaccion
 
-    def editar_transaccion(self, id_transaccion, fecha, descripcion, monto, tipo, categoria):
-        """Edita una transacción existente"""
-        for t in self.transacciones:
-            if t['id'] == id_transaccion:
+    @instrumentar('transacciones.agregar_lote', filas=lambda self, transacciones: len(transacciones))
+    def agregar_transacciones_lote(self, transacciones):
+        """
+        Agrega varias transacciones (dicts sin 'id') con un solo guardado.
+        Retorna la lista de transacciones creadas
+        """
+        version_previa = self.version
+        siguiente = int(self.generar_id())
+        nuevas = []
+        for i, t in enumerate(transacciones):
+            nueva = {
+                'id': str(siguiente + i),
+                'fecha': t['fecha'],
+                'descripcion': t['descripcion'],
+                'monto': dinero.normalizar_monto(t['monto']),
+                'tipo': t['tipo'],
+                'categoria': t['categoria'],
+                'cuenta': t.get('cuenta'),
+                'moneda': t.get('moneda')
+            }
+            self._completar_cuenta_moneda(nueva)
+            nuevas.append(nueva)
+
+        if not nuevas:
+            return nuevas
+
+        self.transacciones.extend(nuevas)
+        self.marcar_modificado()
+        self._guardar_cambios()
+        self._notificar_cambios(version_previa, [(t, 1) for t in nuevas])
+        return nuevas
+
+    def editar_transaccion(self, id_transaccion, fecha, descripcion, monto, tipo, categoria,
+                           cuenta=None, moneda=None):
+        """Edita una transacción existente (cuenta y moneda se conservan si no se indican)"""
+        version_previa = self.version
+        for i, anterior in enumerate(self.transacciones):
+            if anterior['id'] == id_transaccion:
+                # Fila nueva en lugar de mutar la existente: una escritura diferida en
+                # curso puede estar leyendo la anterior
+                t = dict(anterior)
                 t['fecha'] = fecha
                 t['descripcion'] = descripcion
-                t['monto'] = float(monto)
+                t['monto'] = dinero.normalizar_monto(monto)
                 t['tipo'] = tipo
                 t['categoria'] = categoria
-                self.guardar_datos()
+                t['cuenta'] = cuenta or self.cuenta_de(anterior)
+                t['moneda'] = moneda or self.moneda_de(anterior)
+                self._completar_cuenta_moneda(t)
+                self.transacciones[i] = t
+                self.marcar_modificado()
+                self._guardar_cambios()
+                self._notificar_cambios(version_previa, [(anterior, -1), (t, 1)])
                 return True
         return False
 
     def eliminar_transaccion(self, id_transaccion):
         """Elimina una transacción"""
+        version_previa = self.version
+        eliminadas = [t for t in self.transacciones if t['id'] == id_transaccion]
         self.transacciones = [t for t in self.transacciones if t['id'] != id_transaccion]
-        self.guardar_datos()
+        self.marcar_modificado()
+        self._guardar_cambios()
+        self._notificar_cambios(version_previa, [(t, -1) for t in eliminadas])
 
     def generar_id(self):
         """Genera un ID único para la transacción"""
@@ -145,33 +300,276 @@ class GestorTransacciones:
 
         return resultado
 
-    def obtener_balance(self):
-        """Calcula el balance total (ingresos - gastos)"""
-        ingresos = sum([t['monto'] for t in self.transacciones if t['tipo'] == 'Ingreso'])
-        gastos = sum([t['monto'] for t in self.transacciones if t['tipo'] == 'Gasto'])
-        return ingresos - gastos
-
-    def obtener_total_ingresos(self):
+    def _clave_conversion(self):
+        """Clave de las cachés expresadas en moneda base"""
+        return (self.version, self.tipos_cambio.version, self.moneda_base)
+
+    def _obtener_factor(self, moneda, fecha, destino, faltantes):
+        """
+        Factor de conversión. Sin tipo de cambio la fila queda fuera del total
+        (factor 0) y la moneda se anota en 'faltantes' para avisar al usuario
+        """
+        factor = self.tipos_cambio.obtener_factor(moneda, destino, fecha)
+        if factor is None:
+            faltantes.add(moneda)
+            return 0.0
+        return factor
+
+    def obtener_columnas(self):
+        """
+        Vista columnar del libro para agregaciones vectorizadas, por versión:
+        'centavos' (int64, en moneda base), 'grupo' (código de (tipo, categoria, mes)
+        por fila) y 'grupos' (lista de claves en orden de aparición)
+        """
+        clave = self._clave_conversion()
+        if self._columnas is None or self._columnas[0] != clave:
+            n = len(self.transacciones)
+            codigos = {}
+            grupo = np.fromiter(
+                (codigos.setdefault((t['tipo'], t['categoria'], t['fecha'][:7]), len(codigos))
+                 for t in self.transacciones), dtype=np.int64, count=n)
+            # Los montos ya están normalizados a centavos: el redondeo es exacto
+            centavos = np.rint(np.fromiter((t['monto'] for t in self.transacciones),
+                                           dtype=np.float64, count=n) * 100).astype(np.int64)
+
+            # Conversión a moneda base una sola vez por versión del libro y de la tabla;
+            # el factor se memoriza por (moneda, fecha), no por fila
+            faltantes = set()
+            if any(self.moneda_de(t) != self.moneda_base for t in self.transacciones):
+                factores = np.fromiter(
+                    (self._obtener_factor(self.moneda_de(t), t['fecha'], self.moneda_base, faltantes)
+                     for t in self.transacciones), dtype=np.float64, count=n)
+                centavos = np.floor(centavos * factores + 0.5).astype(np.int64)
+
+            columnas = {'centavos': centavos, 'grupo': grupo, 'grupos': list(codigos)}
+            self._columnas = (clave, columnas)
+            self.monedas_sin_tipo_cambio = faltantes
+        return self._columnas[1]
+
+    def _obtener_centavos_por_grupo(self):
+        """Suma entera de centavos por (tipo, categoria, mes)"""
+        columnas = self.obtener_columnas()
+        sumas = np.zeros(len(columnas['grupos']), dtype=np.int64)
+        np.add.at(sumas, columnas['grupo'], columnas['centavos'])
+        return columnas['grupos'], sumas
+
+    def obtener_totales_centavos(self, moneda=None):
+        """Retorna (ingresos, gastos) en centavos enteros de 'moneda' (por defecto la base)"""
+        if moneda and moneda != self.moneda_base:
+            ingresos = gastos = 0
+            for (_, tipo), monto in self._obtener_conversiones(moneda)['tipos'].items():
+                if tipo == 'Ingreso':
+                    ingresos += monto
+                elif tipo == 'Gasto':
+                    gastos += monto
+            return ingresos, gastos
+
+        ingresos = gastos = 0
+        for (tipo, _, _), monto in self.obtener_indice_mensual_centavos().items():
+            if tipo == 'Ingreso':
+                ingresos += monto
+            elif tipo == 'Gasto':
+                gastos += monto
+        return ingresos, gastos
+
+    def obtener_balance(self, moneda=None):
+        """Calcula el balance total (ingresos - gastos) en 'moneda' (por defecto la base)"""
+        ingresos, gastos = self.obtener_totales_centavos(moneda)
+        return (ingresos - gastos) / 100
+
+    def obtener_total_ingresos(self, moneda=None):
         """Calcula el total de ingresos"""
-        return sum([t['monto'] for t in self.transacciones if t['tipo'] == 'Ingreso'])
+        return self.obtener_totales_centavos(moneda)[0] / 100
 
-    def obtener_total_gastos(self):
+    def obtener_total_gastos(self, moneda=None):
         """Calcula el total de gastos"""
-        return sum([t['monto'] for t in self.transacciones if t['tipo'] == 'Gasto'])
+        return self.obtener_totales_centavos(moneda)[1] / 100
+
+    def obtener_monedas_sin_tipo_cambio(self, moneda=None):
+        """Monedas que quedaron fuera de los totales en 'moneda' por no tener tipo de cambio"""
+        if moneda and moneda != self.moneda_base:
+            return self._obtener_conversiones(moneda)['sin_tipo_cambio']
+        self.obtener_columnas()
+        return self.monedas_sin_tipo_cambio
+
+    def centavos_en_base(self, t):
+        """Monto de la transacción en centavos de moneda base (0 si falta el tipo de cambio)"""
+        centavos = round(t['monto'] * 100)
+        moneda = self.moneda_de(t)
+        if moneda == self.moneda_base:
+            return centavos
+        convertido = self.tipos_cambio.convertir_centavos(centavos, moneda, self.moneda_base, t['fecha'])
+        # Igual que los totales del libro: sin tipo de cambio no se mezclan monedas
+        return 0 if convertido is None else convertido
+
+    def monto_en_base(self, t):
+        """Monto de la transacción en moneda base"""
+        return self.centavos_en_base(t) / 100
+
+    def obtener_agregados(self):
+        """
+        Retorna {(cuenta, moneda, tipo, fecha): centavos} en la moneda de cada fila.
+        Se reconstruye solo si el libro cambió sin pasar por agregar/editar/eliminar
+        """
+        if self._agregados is None or self._version_agregados != self.version:
+            agregados = {}
+            for t in self.transacciones:
+                clave = (self.cuenta_de(t), self.moneda_de(t), t['tipo'], t['fecha'])
+                agregados[clave] = agregados.get(clave, 0) + round(t['monto'] * 100)
+            self._agregados = agregados
+            self._version_agregados = self.version
+        return self._agregados
+
+    def suscribir_cambios(self, funcion):
+        """
+        Registra funcion(version_previa, cambios) para recibir los deltas
+        [(transaccion, +1/-1)] de cada alta, edición o baja
+        """
+        self._suscriptores.append(funcion)
+
+    def desuscribir_cambios(self, funcion):
+        """Deja de avisar a funcion (registrada con suscribir_cambios)"""
+        if funcion in self._suscriptores:
+            self._suscriptores.remove(funcion)
+
+    def _notificar_cambios(self, version_previa, cambios):
+        """Actualiza los agregados y avisa a los suscriptores de un cambio"""
+        self._actualizar_agregados(version_previa, cambios)
+        for funcion in self._suscriptores:
+            funcion(version_previa, cambios)
+
+    def _actualizar_agregados(self, version_previa, cambios):
+        """Aplica [(transaccion, +1/-1)] si los agregados estaban al día antes del cambio"""
+        if self._agregados is None or self._version_agregados != version_previa:
+            return
+
+        for t, signo in cambios:
+            clave = (self.cuenta_de(t), self.moneda_de(t), t['tipo'], t['fecha'])
+            monto = self._agregados.get(clave, 0) + signo * round(t['monto'] * 100)
+            if monto:
+                self._agregados[clave] = monto
+            else:
+                self._agregados.pop(clave, None)
+        self._version_agregados = self.version
+
+    def _obtener_conversiones(self, moneda):
+        """
+        Totales convertidos a 'moneda' por cuenta y por tipo. Se convierte cada
+        agregado (cuenta, moneda, tipo, fecha), no cada fila, y el resultado se
+        reutiliza mientras no cambien el libro, la tabla de cambios ni la moneda
+        """
+        agregados = self.obtener_agregados()
+        clave = (self.version, self.tipos_cambio.version, moneda)
+        if self._conversiones is None or self._conversiones[0] != clave:
+            cuentas = {}
+            tipos = {}
+            faltantes = set()
+            for (cuenta, origen, tipo, fecha), centavos in agregados.items():
+                factor = self._obtener_factor(origen, fecha, moneda, faltantes)
+                convertido = int(np.floor(centavos * factor + 0.5))
+                signo = 1 if tipo == 'Ingreso' else -1
+                cuentas[cuenta] = cuentas.get(cuenta, 0) + signo * convertido
+                tipos[(cuenta, tipo)] = tipos.get((cuenta, tipo), 0) + convertido
+            self._conversiones = (clave, {'cuentas': cuentas, 'tipos': tipos,
+                                          'sin_tipo_cambio': faltantes})
+        return self._conversiones[1]
+
+    def obtener_saldos_por_cuenta(self, moneda=None):
+        """Retorna {cuenta: saldo} convertido a 'moneda' (por defecto la base)"""
+        cuentas = self._obtener_conversiones(moneda or self.moneda_base)['cuentas']
+        return {cuenta: centavos / 100 for cuenta, centavos in sorted(cuentas.items())}
+
+    def obtener_totales_por_moneda(self):
+        """Retorna {moneda: {'Ingreso': monto, 'Gasto': monto}} en la moneda original"""
+        totales = {}
+        for (_, moneda, tipo, _), centavos in self.obtener_agregados().items():
+            por_tipo = totales.setdefault(moneda, {'Ingreso': 0, 'Gasto': 0})
+            por_tipo[tipo] = por_tipo.get(tipo, 0) + centavos
+        return {moneda: {tipo: c / 100 for tipo, c in por_tipo.items()}
+                for moneda, por_tipo in sorted(totales.items())}
+
+    def obtener_cuentas(self):
+        """Cuentas con movimientos (siempre incluye la predeterminada)"""
+        cuentas = {cuenta for cuenta, _, _, _ in self.obtener_agregados()}
+        cuentas.add(config.CUENTA_PREDETERMINADA)
+        return sorted(cuentas)
+
+    def obtener_monedas(self):
+        """Monedas seleccionables: configuradas, con tipo de cambio o presentes en el libro"""
+        monedas = set(config.MONEDAS) | set(self.tipos_cambio.obtener_monedas())
+        monedas |= {moneda for _, moneda, _, _ in self.obtener_agregados()}
+        monedas.discard(self.moneda_base)
+        return [self.moneda_base] + sorted(monedas)
 
     def obtener_gastos_por_categoria(self):
         """Obtiene gastos agrupados por categoría"""
-        gastos = [t for t in self.transacciones if t['tipo'] == 'Gasto']
         categorias_dict = {}
 
-        for gasto in gastos:
-            cat = gasto['categoria']
-            if cat in categorias_dict:
-                categorias_dict[cat] += gasto['monto']
-            else:
-                categorias_dict[cat] = gasto['monto']
+        for (tipo, cat, _), monto in self.obtener_indice_mensual_centavos().items():
+            if tipo == 'Gasto':
+                categorias_dict[cat] = categorias_dict.get(cat, 0) + monto
+
+        return {cat: monto / 100 for cat, monto in categorias_dict.items()}
+
+    def obtener_indice_mensual_centavos(self):
+        """
+        Retorna totales exactos {(tipo, categoria, 'YYYY-MM'): centavos} en moneda base.
+        Se reutiliza mientras no cambien el libro, los tipos de cambio ni la moneda base.
+        """
+        clave = self._clave_conversion()
+        if self._indice_mensual is None or self._indice_mensual[0] != clave:
+            grupos, sumas = self._obtener_centavos_por_grupo()
+            centavos = dict(zip(grupos, sumas.tolist()))
+            montos = {clave_grupo: monto / 100 for clave_grupo, monto in centavos.items()}
+            self._indice_mensual = (clave, centavos, montos)
+        return self._indice_mensual[1]
+
+    def obtener_indice_mensual(self):
+        """Retorna totales agregados {(tipo, categoria, 'YYYY-MM'): monto}"""
+        self.obtener_indice_mensual_centavos()
+        return self._indice_mensual[2]
+
+    def obtener_totales_mes_centavos(self, mes):
+        """Retorna (ingresos, gastos) del mes 'YYYY-MM' en centavos de moneda base"""
+        ingresos = gastos = 0
+        for (tipo, _, mes_grupo), centavos in self.obtener_indice_mensual_centavos().items():
+            if mes_grupo != mes:
+                continue
+            if tipo == 'Ingreso':
+                ingresos += centavos
+            elif tipo == 'Gasto':
+                gastos += centavos
+        return ingresos, gastos
+
+    def obtener_indice_fechas(self):
+        """
+        Retorna (fechas, transacciones) ordenadas por fecha para búsquedas por rango.
+        Se reutiliza mientras no cambie el libro.
+        """
+        if self._indice_fechas is None or self._indice_fechas[0] != self.version:
+            ordenadas = sorted(self.transacciones, key=lambda t: t['fecha'])
+            self._indice_fechas = (self.version, [t['fecha'] for t in ordenadas], ordenadas)
+        return self._indice_fechas[1], self._indice_fechas[2]
+
+    def precalcular_indice_fechas(self):
+        """
+        Construye el índice por fecha desde otro hilo (mantenimiento en segundo plano).
+        La versión se lee antes que las filas y el índice solo se publica si el libro
+        no cambió mientras tanto. Retorna True si quedó publicado
+        """
+        version = self.version
+        ordenadas = sorted(list(self.transacciones), key=lambda t: t['fecha'])
+        if self.version != version:
+            return False
+        self._indice_fechas = (version, [t['fecha'] for t in ordenadas], ordenadas)
+        return True
 
-        return categorias_dict
+    def obtener_transacciones_periodo(self, fecha_inicio=None, fecha_fin=None):
+        """Transacciones entre dos fechas 'YYYY-MM-DD' (inclusive), ordenadas por fecha"""
+        fechas, ordenadas = self.obtener_indice_fechas()
+        inicio = bisect_left(fechas, fecha_inicio) if fecha_inicio else 0
+        fin = bisect_right(fechas, fecha_fin) if fecha_fin else len(fechas)
+        return ordenadas[inicio:fin]
 
     def obtener_dataframe(self):
         """Convierte las transacciones a DataFrame de pandas"""
@@ -189,12 +587,48 @@ class GestorTransacciones:
         return [t for t in self.transacciones
                 if termino in t['descripcion'].lower()]
 
+    def exportar_columnar(self, archivo_destino, transacciones=None):
+        """Exporta a Parquet (.parquet) o Arrow IPC (.arrow/.feather) con columnas tipadas"""
+        try:
+            formato_columnar.exportar(self.transacciones if transacciones is None else transacciones,
+                                      archivo_destino)
+            return True
+        except Exception as e:
+            print(f"Error al exportar: {e}")
+            return False
+
+    def importar_columnar(self, archivo_origen, fecha_inicio=None, fecha_fin=None, reemplazar=False):
+        """
+        Importa transacciones de Parquet o Arrow IPC, opcionalmente solo un rango de fechas.
+        reemplazar: sustituye el libro (conserva los ids); si no, agrega con ids nuevos.
+        Retorna el número de transacciones importadas, o None si hubo un error
+        """
+        try:
+            importadas = formato_columnar.importar(archivo_origen, fecha_inicio, fecha_fin)
+        except Exception as e:
+            print(f"Error al importar: {e}")
+            return None
+
+        for t in importadas:
+            t['monto'] = dinero.normalizar_monto(t['monto'])
+            self._completar_cuenta_moneda(t)
+
+        if reemplazar:
+            self.transacciones = importadas
+        else:
+            siguiente = int(self.generar_id())
+            for i, t in enumerate(importadas):
+                t['id'] = str(siguiente + i)
+            self.transacciones.extend(importadas)
+
+        self.guardar_datos()
+        return len(importadas)
+
     def exportar_csv(self, archivo_destino):
         """Exporta transacciones a un archivo CSV"""
         try:
             with open(archivo_destino, 'w', newline='', encoding='utf-8') as f:
-                campos = ['id', 'fecha', 'descripcion', 'monto', 'tipo', 'categoria']
-                writer = csv.DictWriter(f, fieldnames=campos)
+                writer = csv.DictWriter(f, fieldnames=self.CAMPOS)
                 writer.writeheader()
                 writer.writerows(self.transacciones)
             return True
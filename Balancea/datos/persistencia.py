@@ -0,0 +1,273 @@
+"""
+Persistencia Segura
+Escrituras atómicas (archivo temporal + fsync + rename) y guardados diferidos
+que agrupan ráfagas de cambios en una sola escritura en segundo plano
+"""
+
+import atexit
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+
+import config
+
+
+PERMISOS_PREDETERMINADOS = 0o644
+
+
+def _sincronizar_carpeta(carpeta):
+    """fsync de la carpeta para que el rename sobreviva a un corte de energía (no aplica en Windows)"""
+    if os.name == 'nt':
+        return
+    try:
+        descriptor = os.open(carpeta, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def escribir_atomico(archivo, escribir, binario=False, newline=None):
+    """
+    Escribe 'archivo' sin dejarlo nunca a medias: escribir(f) llena un temporal
+    en la misma carpeta, que se sincroniza a disco y reemplaza al original.
+    Si algo falla, el archivo anterior queda intacto y la excepción se propaga
+    """
+    carpeta = os.path.dirname(os.path.abspath(archivo))
+    os.makedirs(carpeta, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(prefix=f".{os.path.basename(archivo)}.", suffix='.tmp', dir=carpeta)
+    try:
+        if binario:
+            f = os.fdopen(descriptor, 'wb')
+        else:
+            f = os.fdopen(descriptor, 'w', encoding='utf-8', newline=newline)
+        with f:
+            escribir(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # mkstemp crea el temporal con 0600; conservar los permisos del original
+        try:
+            permisos = stat.S_IMODE(os.stat(archivo).st_mode)
+        except OSError:
+            permisos = PERMISOS_PREDETERMINADOS
+        os.chmod(temporal, permisos)
+
+        os.replace(temporal, archivo)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+
+    _sincronizar_carpeta(carpeta)
+
+
+def limpiar_temporales(carpeta, antiguedad_segundos=3600):
+    """
+    Borra los temporales de escrituras interrumpidas (p. ej. por un corte) con más
+    de 'antiguedad_segundos', para no tocar los de una escritura en curso.
+    Retorna cuántos borró
+    """
+    if not os.path.isdir(carpeta):
+        return 0
+    limite = time.time() - antiguedad_segundos
+    borrados = 0
+    for entrada in os.scandir(carpeta):
+        if not (entrada.is_file() and entrada.name.startswith('.') and entrada.name.endswith('.tmp')):
+            continue
+        try:
+            if entrada.stat().st_mtime < limite:
+                os.remove(entrada.path)
+                borrados += 1
+        except OSError:
+            pass
+    return borrados
+
+
+def guardar_json(archivo, datos, indent=2):
+    """
+    Serializa 'datos' ahora (en el hilo que llama) y escribe el archivo de forma
+    atómica, al instante o agrupado si el guardado diferido está activo
+    """
+    texto = json.dumps(datos, ensure_ascii=False, indent=indent)
+    programar(os.path.abspath(archivo), lambda: escribir_atomico(archivo, lambda f: f.write(texto)))
+
+
+class GuardadoDiferido:
+    """
+    Escrituras pendientes por archivo. Cada nuevo guardado del mismo archivo
+    reemplaza al anterior y pospone la escritura 'espera_ms', sin pasar de
+    'espera_maxima_ms' desde el primer cambio sin guardar.
+    Una escritura que falla (disco lleno, permisos) sigue pendiente y se
+    reintenta cada 'espera_maxima_ms'; el error queda en 'errores' para avisar
+    """
+
+    def __init__(self, espera_ms=None, espera_maxima_ms=None):
+        self.espera = (espera_ms if espera_ms is not None else config.GUARDADO_DIFERIDO_MS) / 1000
+        self.espera_maxima = (espera_maxima_ms if espera_maxima_ms is not None
+                              else config.GUARDADO_DIFERIDO_MAX_MS) / 1000
+        self.pendientes = {}  # clave -> [vence, limite, funcion]
+        self.errores = {}  # clave -> último error mientras no se logre escribir
+        self.escrituras = 0
+        self.agrupados = 0
+        self.fallos = 0
+
+        self._cambio = threading.Condition()
+        # Una escritura a la vez: una inmediata nunca queda por debajo de una diferida más vieja
+        self._escribiendo = threading.Lock()
+        self._hilo = None
+        self._detener = False
+
+    def programar(self, clave, funcion):
+        """Agenda funcion() como la escritura de 'clave', reemplazando la pendiente"""
+        ahora = time.monotonic()
+        with self._cambio:
+            pendiente = self.pendientes.get(clave)
+            limite = pendiente[1] if pendiente else ahora + self.espera_maxima
+            if pendiente:
+                self.agrupados += 1
+            self.pendientes[clave] = [min(ahora + self.espera, limite), limite, funcion]
+
+            if self._hilo is None:
+                self._detener = False
+                self._hilo = threading.Thread(target=self._trabajar, name="guardado_diferido", daemon=True)
+                self._hilo.start()
+            self._cambio.notify()
+
+    def ejecutar(self, clave, funcion):
+        """Escribe ahora, descartando la escritura pendiente de 'clave'"""
+        with self._escribiendo:
+            with self._cambio:
+                self.pendientes.pop(clave, None)
+            resultado = funcion()
+            with self._cambio:
+                self.errores.pop(clave, None)
+            return resultado
+
+    def vaciar(self):
+        """Escribe todo lo pendiente en el hilo que llama"""
+        with self._escribiendo:
+            with self._cambio:
+                funciones = [(c, p[2]) for c, p in self.pendientes.items()]
+                self.pendientes.clear()
+            for clave, funcion in funciones:
+                self._escribir(clave, funcion)
+
+    def detener(self):
+        """Vacía lo pendiente y termina el hilo; lo que no se pudo escribir queda en 'errores'"""
+        with self._cambio:
+            self._detener = True
+            self._cambio.notify()
+            hilo = self._hilo
+        if hilo is not None:
+            hilo.join()
+        self.vaciar()
+
+    def _trabajar(self):
+        while True:
+            with self._cambio:
+                while not self._detener:
+                    if self.pendientes:
+                        restante = min(p[0] for p in self.pendientes.values()) - time.monotonic()
+                        if restante <= 0:
+                            break
+                        self._cambio.wait(restante)
+                    else:
+                        self._cambio.wait()
+                if self._detener:
+                    self._hilo = None
+                    return
+
+            with self._escribiendo:
+                ahora = time.monotonic()
+                with self._cambio:
+                    vencidas = [c for c, p in self.pendientes.items() if p[0] <= ahora]
+                    funciones = [(c, self.pendientes.pop(c)[2]) for c in vencidas]
+                for clave, funcion in funciones:
+                    self._escribir(clave, funcion)
+
+    def _escribir(self, clave, funcion):
+        try:
+            funcion()
+        except Exception as e:
+            print(f"Error en guardado diferido ({clave}): {e}")
+            with self._cambio:
+                self.errores[clave] = str(e)
+                self.fallos += 1
+                # Conservar el cambio para reintentarlo (un guardado más nuevo lo reemplaza)
+                if clave not in self.pendientes:
+                    reintento = time.monotonic() + self.espera_maxima
+                    self.pendientes[clave] = [reintento, reintento, funcion]
+                    self._cambio.notify()
+            return False
+
+        with self._cambio:
+            self.errores.pop(clave, None)
+        self.escrituras += 1
+        return True
+
+
+# Guardado diferido de la aplicación (None: cada guardado escribe al instante)
+_diferido = None
+
+
+def activar_guardado_diferido(espera_ms=None, espera_maxima_ms=None):
+    """Agrupa los guardados siguientes; lo pendiente se escribe al salir del proceso"""
+    global _diferido
+    espera_ms = espera_ms if espera_ms is not None else config.GUARDADO_DIFERIDO_MS
+    if espera_ms <= 0 or _diferido is not None:
+        return _diferido
+    _diferido = GuardadoDiferido(espera_ms, espera_maxima_ms)
+    atexit.register(vaciar)
+    return _diferido
+
+
+def desactivar_guardado_diferido():
+    """
+    Escribe lo pendiente y vuelve a los guardados inmediatos.
+    Retorna {archivo: error} de lo que no se pudo escribir (vacío si todo quedó en disco)
+    """
+    global _diferido
+    diferido, _diferido = _diferido, None
+    if diferido is None:
+        return {}
+    diferido.detener()
+    return dict(diferido.errores)
+
+
+def programar(clave, funcion):
+    """Escritura que puede agruparse con las siguientes de la misma clave"""
+    if _diferido is None:
+        funcion()
+    else:
+        _diferido.programar(clave, funcion)
+
+
+def ejecutar(clave, funcion):
+    """Escritura inmediata que reemplaza la pendiente de la misma clave"""
+    if _diferido is None:
+        return funcion()
+    return _diferido.ejecutar(clave, funcion)
+
+
+def vaciar():
+    """Escribe los guardados pendientes (p. ej. antes de cerrar la aplicación)"""
+    if _diferido is not None:
+        _diferido.vaciar()
+
+
+def obtener_errores():
+    """{archivo: error} de los guardados diferidos que aún no se logran escribir"""
+    if _diferido is None:
+        return {}
+    with _diferido._cambio:
+        return dict(_diferido.errores)
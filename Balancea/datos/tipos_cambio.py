@@ -0,0 +1,173 @@
+"""
+Tipos de Cambio
+Tabla local de tipos de cambio por fecha, importada de CSV, con caché de conversiones
+"""
+
+import csv
+import math
+import os
+from bisect import bisect_right
+from pathlib import Path
+
+import config
+from datos import persistencia
+
+
+class TablaTiposCambio:
+    """
+    Tipos de cambio diarios expresados como unidades de la moneda base por
+    una unidad de cada moneda (columnas: fecha, moneda, tasa).
+    Para una fecha sin tipo publicado se usa el último anterior; si la fecha
+    es previa a todos, el primero disponible
+    """
+
+    CAMPOS = ['fecha', 'moneda', 'tasa']
+
+    # Límite de factores memorizados antes de vaciar la caché
+    MAX_CACHE = 100_000
+
+    def __init__(self, archivo="datos/tipos_cambio.csv", moneda_base=None):
+        self.archivo = archivo
+        self.moneda_base = moneda_base or config.MONEDA_BASE
+
+        # Cambia con cada modificación de la tabla (invalida conversiones en caché)
+        self.version = 0
+
+        # moneda -> (fechas ordenadas, tasas en el mismo orden)
+        self._series = {}
+        self._cache = {}
+
+        if archivo:
+            Path(os.path.dirname(archivo) or ".").mkdir(parents=True, exist_ok=True)
+            self.cargar()
+
+    def _marcar_modificado(self):
+        self.version += 1
+        self._cache.clear()
+
+    def _leer_csv(self, archivo):
+        """Lee filas (fecha, moneda, tasa) válidas de un CSV"""
+        filas = []
+        with open(archivo, 'r', encoding='utf-8') as f:
+            for fila in csv.DictReader(f):
+                try:
+                    fecha = fila['fecha'].strip()
+                    moneda = fila['moneda'].strip().upper()
+                    tasa = float(fila['tasa'])
+                    if len(fecha) != 10 or not moneda or not math.isfinite(tasa) or tasa <= 0:
+                        raise ValueError(f"fila inválida: {fila}")
+                    filas.append((fecha, moneda, tasa))
+                except (KeyError, ValueError, AttributeError) as e:
+                    print(f"Advertencia: Tipo de cambio ignorado: {e}")
+        return filas
+
+    def _incorporar(self, filas):
+        """Agrega filas a las series (una fecha repetida reemplaza la tasa anterior)"""
+        por_moneda = {}
+        for moneda, (fechas, tasas) in self._series.items():
+            por_moneda[moneda] = dict(zip(fechas, tasas))
+
+        for fecha, moneda, tasa in filas:
+            if moneda != self.moneda_base:
+                por_moneda.setdefault(moneda, {})[fecha] = tasa
+
+        self._series = {}
+        for moneda, tasas_por_fecha in por_moneda.items():
+            fechas = sorted(tasas_por_fecha)
+            self._series[moneda] = (fechas, [tasas_por_fecha[f] for f in fechas])
+        self._marcar_modificado()
+
+    def cargar(self):
+        """Carga la tabla desde su archivo CSV"""
+        if not os.path.exists(self.archivo) or os.path.getsize(self.archivo) == 0:
+            return
+
+        try:
+            self._series = {}
+            self._incorporar(self._leer_csv(self.archivo))
+        except Exception as e:
+            print(f"Error al cargar tipos de cambio: {e}")
+            self._series = {}
+
+    def guardar(self):
+        """Guarda la tabla completa en su archivo CSV"""
+        if not self.archivo:
+            return True
+        def escribir(f):
+            writer = csv.writer(f)
+            writer.writerow(self.CAMPOS)
+            for moneda in sorted(self._series):
+                fechas, tasas = self._series[moneda]
+                writer.writerows((fecha, moneda, repr(tasa)) for fecha, tasa in zip(fechas, tasas))
+
+        try:
+            persistencia.escribir_atomico(self.archivo, escribir, newline='')
+            return True
+        except Exception as e:
+            print(f"Error al guardar tipos de cambio: {e}")
+            return False
+
+    def importar_csv(self, archivo_origen):
+        """
+        Agrega los tipos de cambio de un CSV (fecha, moneda, tasa) y guarda la tabla.
+        Retorna el número de filas importadas, o None si hubo un error
+        """
+        try:
+            filas = self._leer_csv(archivo_origen)
+        except Exception as e:
+            print(f"Error al importar tipos de cambio: {e}")
+            return None
+
+        self._incorporar(filas)
+        self.guardar()
+        return len(filas)
+
+    def agregar_tasa(self, fecha, moneda, tasa):
+        """Registra (o reemplaza) el tipo de cambio de una moneda en una fecha"""
+        self._incorporar([(fecha, moneda.upper(), float(tasa))])
+        self.guardar()
+
+    def obtener_monedas(self):
+        """Monedas con tipo de cambio, incluida la base"""
+        return [self.moneda_base] + sorted(self._series)
+
+    def obtener_tasa(self, moneda, fecha):
+        """Unidades de moneda base por unidad de 'moneda' en 'fecha', o None si no hay datos"""
+        if moneda == self.moneda_base:
+            return 1.0
+
+        serie = self._series.get(moneda)
+        if serie is None:
+            return None
+
+        fechas, tasas = serie
+        posicion = bisect_right(fechas, fecha) - 1
+        return tasas[max(posicion, 0)]
+
+    def obtener_factor(self, origen, destino, fecha):
+        """
+        Factor para convertir de 'origen' a 'destino' en 'fecha' (cruzado a
+        través de la moneda base). Memorizado por (origen, destino, fecha)
+        """
+        if origen == destino:
+            return 1.0
+
+        clave = (origen, destino, fecha)
+        factor = self._cache.get(clave)
+        if factor is None and clave not in self._cache:
+            tasa_origen = self.obtener_tasa(origen, fecha)
+            tasa_destino = self.obtener_tasa(destino, fecha)
+            if tasa_origen is not None and tasa_destino is not None:
+                factor = tasa_origen / tasa_destino
+
+            if len(self._cache) >= self.MAX_CACHE:
+                self._cache.clear()
+            self._cache[clave] = factor
+        return factor
+
+    def convertir_centavos(self, centavos, origen, destino, fecha):
+        """Convierte centavos enteros entre monedas (None si falta un tipo de cambio)"""
+        factor = self.obtener_factor(origen, destino, fecha)
+        if factor is None:
+            return None
+        return int(math.floor(centavos * factor + 0.5))
@@ -7,15 +7,17 @@ import tkinter as tk
 from tkinter import ttk
 from procesador.analizador import AnalizadorFinanciero
 from datos.gestor_presupuestos import GestorPresupuestos
+from utils.instrumentacion import instrumentar
 
 
 class PanelAlertas(ttk.Frame):
     """Panel de alertas y notificaciones"""
 
-    def __init__(self, parent, gestor_datos):
+    def __init__(self, parent, gestor_datos, gestor_presupuestos=None):
         super().__init__(parent)
         self.gestor_datos = gestor_datos
         self.analizador = AnalizadorFinanciero(gestor_datos)
+        self.gestor_presupuestos = gestor_presupuestos or GestorPresupuestos(gestor_datos)
 
         self.crear_interfaz()
         self.actualizar_alertas()
@@ -117,6 +119,7 @@ class PanelAlertas(ttk.Frame):
 
         self._can_scroll_alertas = False
 
+    @instrumentar('panel.alertas')
     def actualizar_alertas(self):
         """Actualiza todas las alertas"""
         # Actualizar salud financiera
@@ -126,8 +129,10 @@ class PanelAlertas(ttk.Frame):
         for widget in self.frame_alertas_contenido.winfo_children():
             widget.destroy()
 
-        # Obtener nuevas alertas
-        alertas = self.analizador.analizar_todo()
+        # Obtener nuevas alertas (presupuestos evaluados en lote, primero los más graves)
+        alertas_presupuesto = self.gestor_presupuestos.obtener_todas_alertas()
+        alertas_presupuesto.sort(key=lambda a: a['severidad'] != 'alta')
+        alertas = alertas_presupuesto + self.analizador.analizar_todo()
 
         if not alertas:
             self.mostrar_sin_alertas()
@@ -7,16 +7,23 @@ Interacción con IA (Ollama) con contexto avanzado
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 import threading
+import queue
 from procesador.chat_financiero import ChatFinanciero
 
 
 class PanelChat(ttk.Frame):
     """Panel de chat con asistente IA mejorado"""
 
-    def __init__(self, parent, gestor_datos):
+    def __init__(self, parent, gestor_datos, gestor_presupuestos=None):
         super().__init__(parent)
         self.gestor_datos = gestor_datos
-        self.chat = ChatFinanciero(gestor_datos)
+        # El mismo gestor de presupuestos que la app: sin copias que recargar del disco
+        self.chat = ChatFinanciero(gestor_datos, gestor_presupuestos=gestor_presupuestos)
+
+        # Cola thread-safe: el hilo de Ollama produce, el hilo de Tk consume con after()
+        self.cola_respuestas = queue.Queue()
+        self.evento_cancelar = None
+        self.respuesta_en_curso = False
 
         self.crear_interfaz()
         self.verificar_ollama()
@@ -87,6 +94,12 @@ class PanelChat(ttk.Frame):
                                      command=self.enviar_mensaje)
         self.btn_enviar.pack(side=tk.LEFT, padx=5)
 
+        # Botón detener (cancela la generación en curso)
+        self.btn_detener = ttk.Button(frame_entrada, text="⏹ Detener",
+                                      command=self.detener_generacion,
+                                      state=tk.DISABLED)
+        self.btn_detener.pack(side=tk.LEFT, padx=(0, 5))
+
         # Botón limpiar
         btn_limpiar = ttk.Button(frame_entrada, text="🗑️ Limpiar",
                                  command=self.limpiar_chat)
@@ -121,30 +134,38 @@ class PanelChat(ttk.Frame):
 
     def verificar_ollama(self):
         """Verifica si Ollama está disponible"""
+        resultado = {}
 
         def verificar():
-            try:
-                import requests
-                response = requests.get("http://localhost:11434/api/tags", timeout=2)
-                if response.status_code == 200:
-                    self.lbl_estado.config(
-                        text=f"🟢 Ollama conectado - Modelo: {self.chat.modelo}",
-                        foreground='#27AE60'
-                    )
-                    self.btn_enviar.config(state=tk.NORMAL)
-                else:
-                    raise Exception()
-            except Exception:
-                self.lbl_estado.config(
-                    text="🔴 Ollama no disponible - Ejecuta 'ollama serve' en terminal",
-                    foreground='#E74C3C'
-                )
-                self.btn_enviar.config(state=tk.DISABLED)
+            # El botón "Verificar" siempre fuerza una consulta nueva
+            resultado['disponible'] = self.chat.cliente.verificar_disponible(forzar=True)
 
         thread = threading.Thread(target=verificar)
         thread.daemon = True
         thread.start()
 
+        self.after(100, lambda: self.aplicar_estado_ollama(thread, resultado))
+
+    def aplicar_estado_ollama(self, thread, resultado):
+        """Actualiza la etiqueta de estado desde el hilo de Tk"""
+        if thread.is_alive():
+            self.after(100, lambda: self.aplicar_estado_ollama(thread, resultado))
+            return
+
+        if resultado.get('disponible'):
+            self.lbl_estado.config(
+                text=f"🟢 Ollama conectado - Modelo: {self.chat.modelo}",
+                foreground='#27AE60'
+            )
+            if self.evento_cancelar is None:
+                self.btn_enviar.config(state=tk.NORMAL)
+        else:
+            self.lbl_estado.config(
+                text="🔴 Ollama no disponible - Ejecuta 'ollama serve' en terminal",
+                foreground='#E74C3C'
+            )
+            self.btn_enviar.config(state=tk.DISABLED)
+
     def mostrar_comandos(self):
         """Muestra ventana con comandos disponibles"""
         ventana = tk.Toplevel(self)
@@ -198,26 +219,101 @@ class PanelChat(ttk.Frame):
 
         # Deshabilitar botón mientras procesa
         self.btn_enviar.config(state=tk.DISABLED, text="⏳ Pensando...")
+        self.btn_detener.config(state=tk.NORMAL)
+
+        self.evento_cancelar = threading.Event()
+        self.respuesta_en_curso = False
 
         # Obtener respuesta en hilo separado
-        thread = threading.Thread(target=self.procesar_mensaje, args=(mensaje,))
+        thread = threading.Thread(target=self.procesar_mensaje,
+                                  args=(mensaje, self.evento_cancelar))
         thread.daemon = True
         thread.start()
 
-    def procesar_mensaje(self, mensaje):
-        """Procesa el mensaje y obtiene respuesta"""
-        resultado = self.chat.generar_respuesta(mensaje)
+        # Drenar la cola desde el hilo de Tk
+        self.after(50, self.drenar_cola)
+
+    def detener_generacion(self):
+        """Cancela la generación en curso"""
+        if self.evento_cancelar is not None:
+            self.evento_cancelar.set()
+        self.btn_detener.config(state=tk.DISABLED)
+
+    def procesar_mensaje(self, mensaje, cancelar):
+        """Procesa el mensaje en segundo plano y publica tokens en la cola"""
+        resultado = self.chat.generar_respuesta_stream(
+            mensaje,
+            al_recibir_token=lambda token: self.cola_respuestas.put(('token', token)),
+            cancelar=cancelar
+        )
+        self.cola_respuestas.put(('fin', resultado))
+
+    def drenar_cola(self):
+        """Vacía la cola de respuestas en el widget (solo desde el hilo de Tk)"""
+        tokens = []
+        resultado = None
+
+        try:
+            while True:
+                tipo, valor = self.cola_respuestas.get_nowait()
+                if tipo == 'token':
+                    tokens.append(valor)
+                else:
+                    resultado = valor
+                    break
+        except queue.Empty:
+            pass
+
+        if tokens:
+            self.agregar_tokens_asistente("".join(tokens))
+
+        if resultado is None:
+            self.after(50, self.drenar_cola)
+            return
+
+        self.mostrar_resultado(resultado)
+
+        # Rehabilitar botón
+        self.btn_enviar.config(state=tk.NORMAL, text="📤 Enviar")
+        self.btn_detener.config(state=tk.DISABLED)
+        self.evento_cancelar = None
+
+    def mostrar_resultado(self, resultado):
+        """Muestra el resultado final de una respuesta"""
+        if self.respuesta_en_curso:
+            # El texto ya se mostró token por token, solo cerrar el mensaje
+            self.text_chat.config(state=tk.NORMAL)
+            self.text_chat.insert(tk.END, "\n")
+            self.text_chat.config(state=tk.DISABLED)
+            self.respuesta_en_curso = False
+
+            if resultado['tipo'] == 'cancelado':
+                self.agregar_mensaje_sistema("Generación detenida.")
+            elif not resultado['exito']:
+                self.agregar_mensaje_error(f"Error: {resultado['error']}")
+            return
 
         if resultado['exito']:
-            if resultado['tipo'] == 'comando':
+            if resultado['tipo'] in ('comando', 'consulta'):
                 self.agregar_mensaje_comando(resultado['respuesta'])
             else:
                 self.agregar_mensaje_asistente(resultado['respuesta'])
+        elif resultado['tipo'] == 'cancelado':
+            self.agregar_mensaje_sistema("Generación detenida.")
         else:
             self.agregar_mensaje_error(f"Error: {resultado['error']}")
 
-        # Rehabilitar botón
-        self.btn_enviar.config(state=tk.NORMAL, text="📤 Enviar")
+    def agregar_tokens_asistente(self, texto):
+        """Agrega fragmentos de la respuesta en curso al chat"""
+        self.text_chat.config(state=tk.NORMAL)
+        if not self.respuesta_en_curso:
+            from datetime import datetime
+            timestamp = datetime.now().strftime("%H:%M")
+            self.text_chat.insert(tk.END, f"\n[{timestamp}] Asistente: ", 'asistente')
+            self.respuesta_en_curso = True
+        self.text_chat.insert(tk.END, texto)
+        self.text_chat.config(state=tk.DISABLED)
+        self.text_chat.see(tk.END)
 
     def agregar_mensaje_usuario(self, mensaje):
         """Agrega mensaje del usuario al chat"""
@@ -265,6 +361,8 @@ class PanelChat(ttk.Frame):
 
     def limpiar_chat(self):
         """Limpia el historial del chat"""
+        if self.evento_cancelar is not None:
+            self.detener_generacion()
         self.text_chat.config(state=tk.NORMAL)
         self.text_chat.delete(1.0, tk.END)
         self.text_chat.config(state=tk.DISABLED)
@@ -9,19 +9,24 @@ from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta
 import calendar
 from utils.exportador import Exportador
+from utils.trabajos import GestorTrabajos
+from utils.validadores import Validador
 from datos.gestor_metas import GestorMetas
 from datos.gestor_presupuestos import GestorPresupuestos
+from utils.instrumentacion import instrumentar
 
 
 class PanelDashboard(ttk.Frame):
     """Panel principal con resumen de finanzas"""
 
-    def __init__(self, parent, gestor_datos):
+    def __init__(self, parent, gestor_datos, gestor_presupuestos=None):
         super().__init__(parent)
         self.gestor_datos = gestor_datos
         self.exportador = Exportador(gestor_datos)
+        # Los reportes se generan en segundo plano para no congelar la ventana
+        self.gestor_trabajos = GestorTrabajos(self)
         self.gestor_metas = GestorMetas()
-        self.gestor_presupuestos = GestorPresupuestos(gestor_datos)
+        self.gestor_presupuestos = gestor_presupuestos or GestorPresupuestos(gestor_datos)
 
         self.crear_interfaz()
         self.actualizar_datos()
@@ -86,6 +91,19 @@ class PanelDashboard(ttk.Frame):
                                  command=self.exportar_reporte)
         btn_exportar.pack(side=tk.RIGHT, padx=5)
 
+        btn_tipos_cambio = ttk.Button(frame_header, text="💱 Tipos de Cambio",
+                                      command=self.importar_tipos_cambio)
+        btn_tipos_cambio.pack(side=tk.RIGHT, padx=5)
+
+        # Moneda de las tarjetas y saldos del dashboard (no cambia la moneda base de la app)
+        self.moneda_var = tk.StringVar(value=self.gestor_datos.moneda_base)
+        self.combo_moneda = ttk.Combobox(frame_header, textvariable=self.moneda_var,
+                                         values=self.gestor_datos.obtener_monedas(),
+                                         state='readonly', width=6)
+        self.combo_moneda.pack(side=tk.RIGHT, padx=5)
+        self.combo_moneda.bind('<<ComboboxSelected>>', self.cambiar_moneda)
+        ttk.Label(frame_header, text="Moneda:").pack(side=tk.RIGHT)
+
         # === TARJETAS DE RESUMEN PRINCIPAL ===
         self.crear_tarjeta("Balance Total", "balance", 1, 0, "#3498DB")
         self.crear_tarjeta("Total Ingresos", "ingresos", 1, 1, "#27AE60")
@@ -140,6 +158,16 @@ class PanelDashboard(ttk.Frame):
                                      font=('Arial', 11))
         self.lbl_promedio.grid(row=3, column=0, sticky=tk.W, pady=5)
 
+        self.lbl_cuentas = ttk.Label(frame_stats,
+                                     text="Saldos por cuenta: N/A",
+                                     font=('Arial', 11),
+                                     wraplength=350)
+        self.lbl_cuentas.grid(row=4, column=0, sticky=tk.W, pady=5)
+
+        self.lbl_aviso_moneda = ttk.Label(frame_stats, text="",
+                                          font=('Arial', 9), foreground='#E67E22')
+        self.lbl_aviso_moneda.grid(row=5, column=0, sticky=tk.W)
+
         # === COMPARATIVA CON MES ANTERIOR ===
         frame_comparativa = ttk.LabelFrame(self.frame_contenido, text="🔄 Comparativa con Mes Anterior", padding="20")
         frame_comparativa.grid(row=3, column=0, columnspan=4, pady=20, padx=20, sticky=(tk.W, tk.E))
@@ -226,6 +254,7 @@ class PanelDashboard(ttk.Frame):
         # Guardar referencia al label de valor
         setattr(self, f'lbl_{nombre}', lbl_valor)
 
+    @instrumentar('panel.dashboard')
     def actualizar_datos(self):
         """Actualiza todos los datos del dashboard - CON MENSAJE SIN DATOS"""
         # ✅ FIX: Verificar si hay transacciones y mostrar mensaje
@@ -321,18 +350,19 @@ class PanelDashboard(ttk.Frame):
                 self._canvas_ref.pack(side="left", fill="both", expand=True)
                 self._scrollbar_ref.pack(side="right", fill="y")
 
-        # Obtener datos generales
-        balance = self.gestor_datos.obtener_balance()
-        ingresos = self.gestor_datos.obtener_total_ingresos()
-        gastos = self.gestor_datos.obtener_total_gastos()
+        # Obtener datos generales en la moneda seleccionada
+        moneda = self.moneda_var.get()
+        balance = self.gestor_datos.obtener_balance(moneda)
+        ingresos = self.gestor_datos.obtener_total_ingresos(moneda)
+        gastos = self.gestor_datos.obtener_total_gastos(moneda)
 
         # Calcular tasa de ahorro
         tasa_ahorro = (balance / ingresos * 100) if ingresos > 0 else 0
 
         # Actualizar tarjetas principales
-        self.lbl_balance.config(text=f"${balance:,.2f}")
-        self.lbl_ingresos.config(text=f"${ingresos:,.2f}")
-        self.lbl_gastos.config(text=f"${gastos:,.2f}")
+        self.lbl_balance.config(text=self.formatear_monto(balance, moneda))
+        self.lbl_ingresos.config(text=self.formatear_monto(ingresos, moneda))
+        self.lbl_gastos.config(text=self.formatear_monto(gastos, moneda))
         self.lbl_ahorro.config(text=f"{tasa_ahorro:.1f}%")
 
         # Cambiar color del balance según sea positivo o negativo
@@ -370,13 +400,16 @@ class PanelDashboard(ttk.Frame):
                             if datetime.strptime(t['fecha'], '%Y-%m-%d').month == fecha_actual.month
                             and datetime.strptime(t['fecha'], '%Y-%m-%d').year == fecha_actual.year]
 
-        ingresos_mes = sum([t['monto'] for t in transacciones_mes if t['tipo'] == 'Ingreso'])
-        gastos_mes = sum([t['monto'] for t in transacciones_mes if t['tipo'] == 'Gasto'])
-        balance_mes = ingresos_mes - gastos_mes
+        # Totales del índice mensual, ya convertidos a moneda base
+        moneda = self.gestor_datos.moneda_base
+        ingresos, gastos = self.gestor_datos.obtener_totales_mes_centavos(fecha_actual.strftime('%Y-%m'))
+        ingresos_mes = ingresos / 100
+        gastos_mes = gastos / 100
+        balance_mes = (ingresos - gastos) / 100
 
-        self.lbl_ingresos_mes.config(text=f"Ingresos del mes: ${ingresos_mes:,.2f}")
-        self.lbl_gastos_mes.config(text=f"Gastos del mes: ${gastos_mes:,.2f}")
-        self.lbl_balance_mes.config(text=f"Balance del mes: ${balance_mes:,.2f}")
+        self.lbl_ingresos_mes.config(text=f"Ingresos del mes: {self.formatear_monto(ingresos_mes, moneda)}")
+        self.lbl_gastos_mes.config(text=f"Gastos del mes: {self.formatear_monto(gastos_mes, moneda)}")
+        self.lbl_balance_mes.config(text=f"Balance del mes: {self.formatear_monto(balance_mes, moneda)}")
 
         # Transacciones del mes
         self.lbl_trans_mes.config(text=f"Transacciones este mes: {len(transacciones_mes)}")
@@ -397,14 +430,58 @@ class PanelDashboard(ttk.Frame):
             self.lbl_categoria_max.config(text="Categoría top: N/A")
 
         # Promedio de gasto diario
-        gastos = self.gestor_datos.obtener_total_gastos()
+        moneda = self.moneda_var.get()
+        gastos = self.gestor_datos.obtener_total_gastos(moneda)
         if gastos > 0 and total_trans > 0:
             fechas_unicas = set([t['fecha'] for t in self.gestor_datos.transacciones])
             dias = len(fechas_unicas) if fechas_unicas else 1
             promedio = gastos / dias
-            self.lbl_promedio.config(text=f"Promedio diario: ${promedio:,.2f}")
+            self.lbl_promedio.config(text=f"Promedio diario: {self.formatear_monto(promedio, moneda)}")
         else:
-            self.lbl_promedio.config(text="Promedio diario: $0.00")
+            self.lbl_promedio.config(text=f"Promedio diario: {self.formatear_monto(0, moneda)}")
+
+        # Saldos por cuenta en la moneda seleccionada
+        saldos = self.gestor_datos.obtener_saldos_por_cuenta(moneda)
+        texto = " · ".join(f"{cuenta}: {self.formatear_monto(saldo, moneda)}" for cuenta, saldo in saldos.items())
+        self.lbl_cuentas.config(text=f"Saldos por cuenta: {texto or 'N/A'}")
+
+        faltantes = sorted(self.gestor_datos.obtener_monedas_sin_tipo_cambio(moneda))
+        self.lbl_aviso_moneda.config(
+            text=f"⚠ Sin tipo de cambio a {moneda} para {', '.join(faltantes)}: "
+                 f"esos movimientos no se incluyen en los totales"
+            if faltantes else ""
+        )
+
+    @staticmethod
+    def formatear_monto(monto, moneda):
+        """'$1,234.50 MXN': el código evita confundir monedas que usan el mismo símbolo"""
+        return f"${monto:,.2f} {moneda}"
+
+    def cambiar_moneda(self, event=None):
+        """Muestra las tarjetas y saldos en la moneda seleccionada"""
+        self.actualizar_datos()
+
+    def importar_tipos_cambio(self):
+        """Importa tipos de cambio desde un CSV (fecha, moneda, tasa)"""
+        archivo = filedialog.askopenfilename(
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            title="Importar tipos de cambio (fecha, moneda, tasa)"
+        )
+        if not archivo:
+            return
+
+        importadas = self.gestor_datos.tipos_cambio.importar_csv(archivo)
+        if importadas is None:
+            messagebox.showerror("Error", "No se pudo leer el archivo de tipos de cambio")
+            return
+
+        self.combo_moneda['values'] = self.gestor_datos.obtener_monedas()
+        self.actualizar_datos()
+        messagebox.showinfo(
+            "Tipos de Cambio",
+            f"{importadas} tipos de cambio importados.\n"
+            f"Las tasas son unidades de {self.gestor_datos.tipos_cambio.moneda_base} por unidad de cada moneda."
+        )
 
     def actualizar_comparativa(self):
         """Actualiza comparativa con mes anterior"""
@@ -413,27 +490,17 @@ class PanelDashboard(ttk.Frame):
         # Calcular mes anterior
         primer_dia_mes = fecha_actual.replace(day=1)
         ultimo_dia_mes_anterior = primer_dia_mes - timedelta(days=1)
-        mes_anterior = ultimo_dia_mes_anterior.month
-        año_anterior = ultimo_dia_mes_anterior.year
-
-        # Transacciones mes actual
-        trans_mes_actual = [t for t in self.gestor_datos.transacciones
-                           if datetime.strptime(t['fecha'], '%Y-%m-%d').month == fecha_actual.month
-                           and datetime.strptime(t['fecha'], '%Y-%m-%d').year == fecha_actual.year]
 
-        # Transacciones mes anterior
-        trans_mes_anterior = [t for t in self.gestor_datos.transacciones
-                             if datetime.strptime(t['fecha'], '%Y-%m-%d').month == mes_anterior
-                             and datetime.strptime(t['fecha'], '%Y-%m-%d').year == año_anterior]
+        # Calcular totales (índice mensual en moneda base)
+        ingresos, gastos = self.gestor_datos.obtener_totales_mes_centavos(fecha_actual.strftime('%Y-%m'))
+        ingresos_actual = ingresos / 100
+        gastos_actual = gastos / 100
+        balance_actual = (ingresos - gastos) / 100
 
-        # Calcular totales
-        ingresos_actual = sum([t['monto'] for t in trans_mes_actual if t['tipo'] == 'Ingreso'])
-        gastos_actual = sum([t['monto'] for t in trans_mes_actual if t['tipo'] == 'Gasto'])
-        balance_actual = ingresos_actual - gastos_actual
-
-        ingresos_anterior = sum([t['monto'] for t in trans_mes_anterior if t['tipo'] == 'Ingreso'])
-        gastos_anterior = sum([t['monto'] for t in trans_mes_anterior if t['tipo'] == 'Gasto'])
-        balance_anterior = ingresos_anterior - gastos_anterior
+        ingresos, gastos = self.gestor_datos.obtener_totales_mes_centavos(ultimo_dia_mes_anterior.strftime('%Y-%m'))
+        ingresos_anterior = ingresos / 100
+        gastos_anterior = gastos / 100
+        balance_anterior = (ingresos - gastos) / 100
 
         # Calcular diferencias
         diff_ingresos = ingresos_actual - ingresos_anterior
@@ -473,14 +540,14 @@ class PanelDashboard(ttk.Frame):
 
         # Obtener gastos y ordenar
         gastos = [t for t in self.gestor_datos.transacciones if t['tipo'] == 'Gasto']
-        gastos_ordenados = sorted(gastos, key=lambda x: x['monto'], reverse=True)[:5]
+        gastos_ordenados = sorted(gastos, key=self.gestor_datos.centavos_en_base, reverse=True)[:5]
 
-        # Mostrar top 5
+        # Mostrar top 5 (ordenados en moneda base, cada uno en su moneda original)
         for gasto in gastos_ordenados:
             self.tree_top.insert('', tk.END, values=(
                 gasto['fecha'],
                 gasto['descripcion'],
-                f"${gasto['monto']:,.2f}",
+                self.formatear_monto(gasto['monto'], self.gestor_datos.moneda_de(gasto)),
                 gasto['categoria']
             ))
 
@@ -530,15 +597,15 @@ class PanelDashboard(ttk.Frame):
         """Muestra diálogo para exportar reporte"""
         ventana = tk.Toplevel(self)
         ventana.title("Exportar Reporte")
-        ventana.geometry("400x250")
+        ventana.geometry("400x500")
         ventana.transient(self.winfo_toplevel())
         ventana.grab_set()
 
         # Centrar ventana
         ventana.update_idletasks()
         x = (ventana.winfo_screenwidth() // 2) - 200
-        y = (ventana.winfo_screenheight() // 2) - 125
-        ventana.geometry(f"400x250+{x}+{y}")
+        y = (ventana.winfo_screenheight() // 2) - 250
+        ventana.geometry(f"400x500+{x}+{y}")
 
         frame = ttk.Frame(ventana, padding="20")
         frame.pack(fill=tk.BOTH, expand=True)
@@ -548,6 +615,11 @@ class PanelDashboard(ttk.Frame):
 
         ttk.Label(frame, text="Selecciona el formato de exportación:").pack(pady=10)
 
+        # Opciones del libro de Excel
+        var_hojas_mes = tk.BooleanVar(value=False)
+        var_pivote = tk.BooleanVar(value=False)
+        var_graficas = tk.BooleanVar(value=True)
+
         def exportar_pdf():
             archivo = filedialog.asksaveasfilename(
                 defaultextension=".pdf",
@@ -557,11 +629,10 @@ class PanelDashboard(ttk.Frame):
 
             if archivo:
                 ventana.destroy()
-                if self.exportador.generar_reporte_pdf(archivo, incluir_graficas=True):
-                    messagebox.showinfo("Éxito",
-                                      f"Reporte PDF generado correctamente:\n{archivo}")
-                else:
-                    messagebox.showerror("Error", "No se pudo generar el reporte PDF")
+                self.iniciar_trabajo_reporte(
+                    "Reporte PDF", archivo,
+                    lambda progreso, cancelar: self.exportador.generar_reporte_pdf(
+                        archivo, incluir_graficas=True, progreso=progreso))
 
         def exportar_excel():
             archivo = filedialog.asksaveasfilename(
@@ -571,22 +642,130 @@ class PanelDashboard(ttk.Frame):
             )
 
             if archivo:
+                hojas_mes, pivote, graficas = var_hojas_mes.get(), var_pivote.get(), var_graficas.get()
                 ventana.destroy()
-                if self.exportador.exportar_excel(archivo):
-                    messagebox.showinfo("Éxito",
-                                      f"Reporte Excel generado correctamente:\n{archivo}")
-                else:
-                    messagebox.showerror("Error", "No se pudo generar el reporte Excel")
+                self.iniciar_trabajo_reporte(
+                    "Reporte Excel", archivo,
+                    lambda progreso, cancelar: self.exportador.exportar_excel(
+                        archivo, progreso=progreso, hojas_por_mes=hojas_mes,
+                        incluir_pivote=pivote, incluir_graficas=graficas))
 
         ttk.Button(frame, text="📄 Exportar como PDF",
                   command=exportar_pdf, width=25).pack(pady=10)
 
         ttk.Button(frame, text="📊 Exportar como Excel",
-                  command=exportar_excel, width=25).pack(pady=10)
+                  command=exportar_excel, width=25).pack(pady=(10, 2))
+
+        ttk.Checkbutton(frame, text="Excel: una hoja por mes",
+                        variable=var_hojas_mes).pack(anchor=tk.W, padx=60)
+        ttk.Checkbutton(frame, text="Excel: tabla categoría × mes",
+                        variable=var_pivote).pack(anchor=tk.W, padx=60)
+        ttk.Checkbutton(frame, text="Excel: incluir gráficas",
+                        variable=var_graficas).pack(anchor=tk.W, padx=60)
+
+        # Estado de cuenta con todas las transacciones de un periodo
+        ttk.Button(frame, text="🧾 Estado de Cuenta (PDF)",
+                  command=lambda: self.exportar_estado_cuenta(ventana, var_desde.get(), var_hasta.get()),
+                  width=25).pack(pady=(14, 2))
+
+        frame_periodo = ttk.Frame(frame)
+        frame_periodo.pack()
+        var_desde = tk.StringVar(value=datetime.now().strftime('%Y-01-01'))
+        var_hasta = tk.StringVar(value=datetime.now().strftime('%Y-%m-%d'))
+        ttk.Label(frame_periodo, text="Desde:").pack(side=tk.LEFT)
+        ttk.Entry(frame_periodo, textvariable=var_desde, width=11).pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(frame_periodo, text="Hasta:").pack(side=tk.LEFT)
+        ttk.Entry(frame_periodo, textvariable=var_hasta, width=11).pack(side=tk.LEFT, padx=2)
 
         ttk.Button(frame, text="Cancelar",
                   command=ventana.destroy, width=25).pack(pady=10)
 
+    def exportar_estado_cuenta(self, ventana, desde, hasta):
+        """Valida el periodo y encola el estado de cuenta (fechas vacías = sin límite)"""
+        desde, hasta = desde.strip() or None, hasta.strip() or None
+        for fecha in (desde, hasta):
+            if fecha:
+                valido, _, error = Validador.validar_fecha(fecha)
+                if not valido:
+                    messagebox.showerror("Error", error, parent=ventana)
+                    return
+
+        if desde and hasta and desde > hasta:
+            messagebox.showerror("Error", "La fecha inicial es posterior a la final", parent=ventana)
+            return
+
+        archivo = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF files", "*.pdf")],
+            title="Guardar Estado de Cuenta"
+        )
+
+        if archivo:
+            ventana.destroy()
+            self.iniciar_trabajo_reporte(
+                "Estado de Cuenta", archivo,
+                lambda progreso, cancelar: self.exportador.generar_estado_cuenta(
+                    archivo, fecha_inicio=desde, fecha_fin=hasta, progreso=progreso))
+
+    def iniciar_trabajo_reporte(self, nombre, archivo, funcion):
+        """Encola la generación de un reporte y muestra su progreso"""
+        ventana = tk.Toplevel(self)
+        ventana.title(f"Generando {nombre}")
+        ventana.geometry("380x150")
+        ventana.transient(self.winfo_toplevel())
+        ventana.resizable(False, False)
+
+        frame = ttk.Frame(ventana, padding="15")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        lbl_mensaje = ttk.Label(frame, text="En cola...")
+        lbl_mensaje.pack(anchor=tk.W, pady=(0, 8))
+
+        barra = ttk.Progressbar(frame, mode='determinate', maximum=100, length=340)
+        barra.pack(fill=tk.X)
+
+        frame_botones = ttk.Frame(frame)
+        frame_botones.pack(fill=tk.X, pady=(12, 0))
+
+        def al_progreso(trabajo):
+            if ventana.winfo_exists():
+                barra['value'] = trabajo.progreso * 100
+                lbl_mensaje.config(text=trabajo.mensaje)
+
+        def al_terminar(trabajo):
+            if ventana.winfo_exists():
+                ventana.destroy()
+            self.notificar_reporte(nombre, archivo, trabajo)
+
+        trabajo = self.gestor_trabajos.enviar(nombre, funcion,
+                                              al_progreso=al_progreso,
+                                              al_terminar=al_terminar)
+
+        def cancelar():
+            trabajo.cancelar()
+            lbl_mensaje.config(text="Cancelando...")
+            btn_cancelar.config(state=tk.DISABLED)
+
+        btn_cancelar = ttk.Button(frame_botones, text="Cancelar", command=cancelar)
+        btn_cancelar.pack(side=tk.RIGHT, padx=5)
+
+        # Cerrar la ventana no detiene el trabajo; se notificará al terminar
+        ttk.Button(frame_botones, text="Ocultar",
+                   command=ventana.destroy).pack(side=tk.RIGHT, padx=5)
+
+    def notificar_reporte(self, nombre, archivo, trabajo):
+        """Avisa al usuario que un reporte terminó"""
+        if trabajo.estado == 'cancelado':
+            return
+
+        self.bell()
+        if trabajo.estado == 'completado' and trabajo.resultado:
+            messagebox.showinfo("Éxito",
+                              f"{nombre} generado correctamente "
+                              f"({trabajo.duracion:.1f}s):\n{archivo}")
+        else:
+            messagebox.showerror("Error", f"No se pudo generar el {nombre.lower()}")
+
     def generar_datos_demo_desde_dashboard(self):
         """Genera datos demo desde el dashboard"""
         # Esta función debe estar en la clase principal (app.py)
@@ -8,6 +8,7 @@ from tkinter import ttk, messagebox
 from datetime import datetime
 from tkcalendar import DateEntry
 from datos.gestor_metas import GestorMetas
+from utils.instrumentacion import instrumentar
 
 
 class PanelMetas(ttk.Frame):
@@ -19,7 +20,7 @@ class PanelMetas(ttk.Frame):
     def __init__(self, parent, gestor_datos):
         super().__init__(parent)
         self.gestor_datos = gestor_datos
-        self.gestor_metas = GestorMetas()
+        self.gestor_metas = GestorMetas(gestor_datos=gestor_datos)
         self.meta_seleccionada = None
 
         self.crear_interfaz()
@@ -303,6 +304,7 @@ class PanelMetas(ttk.Frame):
                 font=('Arial', 8)
             )
 
+    @instrumentar('panel.metas')
     def actualizar_metas(self):
         """Actualiza la visualización de metas"""
         # Limpiar frame
@@ -464,6 +466,24 @@ class PanelMetas(ttk.Frame):
                                 bg='white', fg=color_dias)
             lbl_dias.pack(side=tk.LEFT, padx=10)
 
+        # Fecha estimada (en caché por meta; solo se recalcula si cambió)
+        if not meta['completada']:
+            proyeccion = self.gestor_metas.obtener_proyeccion(meta['id'])
+            if proyeccion and proyeccion['fecha_estimada']:
+                origen = "aportes" if proyeccion['fuente'] == 'aportes' else "ahorro pronosticado"
+                texto_proyeccion = f"📈 Estimada: {proyeccion['fecha_estimada']} ({origen})"
+            elif proyeccion and proyeccion['fuente']:
+                texto_proyeccion = "📈 Sin fecha estimada al ritmo actual"
+            else:
+                texto_proyeccion = ""
+
+            if texto_proyeccion:
+                lbl_proyeccion = tk.Label(frame_info, text=texto_proyeccion,
+                                          font=('Arial', 9),
+                                          bg='white',
+                                          fg='#E74C3C' if proyeccion['a_tiempo'] is False else '#3498DB')
+                lbl_proyeccion.pack(side=tk.LEFT, padx=10)
+
         # Descripción
         if meta['descripcion']:
             lbl_desc = tk.Label(frame_info, text=meta['descripcion'],
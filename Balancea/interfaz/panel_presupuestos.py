@@ -5,16 +5,18 @@ Gestión y seguimiento de presupuestos por categoría
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datos.gestor_presupuestos import GestorPresupuestos
+import config
+from datos.gestor_presupuestos import GestorPresupuestos, PERIODOS
+from utils.instrumentacion import instrumentar
 
 
 class PanelPresupuestos(ttk.Frame):
     """Panel para gestionar presupuestos"""
 
-    def __init__(self, parent, gestor_datos):
+    def __init__(self, parent, gestor_datos, gestor_presupuestos=None):
         super().__init__(parent)
         self.gestor_datos = gestor_datos
-        self.gestor_presupuestos = GestorPresupuestos(gestor_datos)
+        self.gestor_presupuestos = gestor_presupuestos or GestorPresupuestos(gestor_datos)
 
         # Resetear mes si es necesario
         self.gestor_presupuestos.resetear_mes_nuevo()
@@ -112,14 +114,18 @@ class PanelPresupuestos(ttk.Frame):
         # Frame de estado vacío dentro de la sección lista
         self.empty_state_frame = ttk.Frame(self.frame_lista)
 
+    @instrumentar('panel.presupuestos')
     def actualizar_presupuestos(self):
         """Actualiza la visualización de presupuestos"""
         # Limpiar frame
         for widget in self.frame_presupuestos.winfo_children():
             widget.destroy()
 
+        # Evaluar todos los presupuestos de una vez (resumen y tarjetas)
+        estados = self.gestor_presupuestos.evaluar_presupuestos()
+
         # Actualizar resumen
-        resumen = self.gestor_presupuestos.obtener_resumen()
+        resumen = self.gestor_presupuestos.obtener_resumen(estados)
         self.lbl_presupuestado.config(
             text=f"💵 Presupuestado: ${resumen['total_presupuestado']:,.2f}"
         )
@@ -145,8 +151,8 @@ class PanelPresupuestos(ttk.Frame):
             self.canvas_pres.pack(side="left", fill="both", expand=True)
             self.scrollbar_pres.pack(side="right", fill="y")
 
-            for categoria in sorted(self.gestor_presupuestos.presupuestos.keys()):
-                self.crear_tarjeta_presupuesto(categoria)
+            for categoria in sorted(estados):
+                self.crear_tarjeta_presupuesto(categoria, estados[categoria])
 
             self._update_scroll_state()
         else:
@@ -186,12 +192,11 @@ class PanelPresupuestos(ttk.Frame):
         # Forzar actualización de la geometría
         self.empty_state_frame.update_idletasks()
 
-    def crear_tarjeta_presupuesto(self, categoria):
-        """Crea una tarjeta visual para un presupuesto"""
-        presupuesto = self.gestor_presupuestos.obtener_presupuesto(categoria)
-        gasto_actual = self.gestor_presupuestos.obtener_gasto_categoria_mes_actual(categoria)
-        porcentaje = self.gestor_presupuestos.obtener_porcentaje_uso(categoria)
-        saldo = self.gestor_presupuestos.obtener_saldo_restante(categoria)
+    def crear_tarjeta_presupuesto(self, categoria, estado):
+        """Crea una tarjeta visual para un presupuesto a partir de su estado evaluado"""
+        gasto_actual = estado['gastado']
+        porcentaje = estado['porcentaje']
+        saldo = estado['restante']
 
         # Determinar color según porcentaje
         if porcentaje >= 100:
@@ -225,11 +230,18 @@ class PanelPresupuestos(ttk.Frame):
 
         # Monto
         lbl_monto = tk.Label(frame_top,
-                            text=f"${gasto_actual:,.2f} / ${presupuesto['monto']:,.2f}",
+                            text=f"${gasto_actual:,.2f} / ${estado['disponible']:,.2f}",
                             font=('Arial', 11),
                             bg='white', fg='#7F8C8D')
         lbl_monto.pack(side=tk.RIGHT)
 
+        # Periodo en curso y remanente de periodos anteriores
+        texto_periodo = f"{estado['periodo'].capitalize()}: {estado['inicio']} a {estado['fin']}"
+        if estado['acumular']:
+            texto_periodo += f" | Remanente: ${estado['remanente']:,.2f}"
+        tk.Label(frame_int, text=texto_periodo, font=('Arial', 9),
+                 bg='white', fg='#7F8C8D').pack(anchor=tk.W)
+
         # Barra de progreso
         frame_barra = tk.Frame(frame_int, bg='white')
         frame_barra.pack(fill=tk.X, pady=10)
@@ -295,9 +307,9 @@ class PanelPresupuestos(ttk.Frame):
         ventana.grab_set()
 
         # Tamaño y mínimos para que no se corten botones
-        ventana.geometry("500x360")
+        ventana.geometry("500x460")
         try:
-            ventana.minsize(480, 340)
+            ventana.minsize(480, 440)
             ventana.resizable(True, True)
         except Exception:
             pass
@@ -332,19 +344,23 @@ class PanelPresupuestos(ttk.Frame):
         combo_cat.current(0)
 
         # Monto
-        ttk.Label(frame, text="Monto mensual:").pack(anchor=tk.W, pady=(10, 0))
+        ttk.Label(frame, text="Monto por periodo:").pack(anchor=tk.W, pady=(10, 0))
         entry_monto = ttk.Entry(frame, width=30)
         entry_monto.pack(fill=tk.X, pady=5)
 
+        obtener_periodo = self.crear_campos_periodo(frame)
+
         # Sugerencia
         def mostrar_sugerencia():
             categoria = combo_cat.get()
             if categoria:
-                sugerencia = self.gestor_presupuestos.sugerir_presupuesto(categoria)
-                if sugerencia:
-                    lbl_sugerencia.config(
-                        text=f"💡 Sugerencia basada en historial: ${sugerencia:,.2f}"
-                    )
+                detalle = self.gestor_presupuestos.sugerir_presupuestos().get(categoria)
+                if detalle and detalle['sugerencia'] > 0:
+                    sugerencia = detalle['sugerencia']
+                    texto = f"💡 Sugerencia mensual: ${sugerencia:,.2f} (P{config.PRESUPUESTO_SUGERENCIA_PERCENTIL} de {detalle['meses']} meses"
+                    if detalle['factor_estacional'] != 1:
+                        texto += f", temporada ×{detalle['factor_estacional']:.2f}"
+                    lbl_sugerencia.config(text=texto + ")")
                     entry_monto.delete(0, tk.END)
                     entry_monto.insert(0, str(sugerencia))
                 else:
@@ -373,8 +389,9 @@ class PanelPresupuestos(ttk.Frame):
                 monto = float(monto_str)
                 if monto <= 0:
                     raise ValueError
+                periodo, dias, acumular = obtener_periodo()
 
-                if self.gestor_presupuestos.establecer_presupuesto(categoria, monto):
+                if self.gestor_presupuestos.establecer_presupuesto(categoria, monto, periodo, dias, acumular):
                     ventana.destroy()
                     self.actualizar_presupuestos()
                     messagebox.showinfo("Éxito",
@@ -400,9 +417,9 @@ class PanelPresupuestos(ttk.Frame):
         ventana.grab_set()
 
         # Tamaño y mínimos para evitar recortes
-        ventana.geometry("480x260")
+        ventana.geometry("480x400")
         try:
-            ventana.minsize(460, 240)
+            ventana.minsize(460, 380)
             ventana.resizable(True, True)
         except Exception:
             pass
@@ -422,13 +439,16 @@ class PanelPresupuestos(ttk.Frame):
         entry_monto.select_range(0, tk.END)
         entry_monto.focus()
 
+        obtener_periodo = self.crear_campos_periodo(frame, presupuesto_actual)
+
         def guardar():
             try:
                 monto = float(entry_monto.get())
                 if monto <= 0:
                     raise ValueError
+                periodo, dias, acumular = obtener_periodo()
 
-                if self.gestor_presupuestos.establecer_presupuesto(categoria, monto):
+                if self.gestor_presupuestos.establecer_presupuesto(categoria, monto, periodo, dias, acumular):
                     ventana.destroy()
                     self.actualizar_presupuestos()
                     messagebox.showinfo("Éxito", "Presupuesto actualizado")
@@ -438,6 +458,48 @@ class PanelPresupuestos(ttk.Frame):
         ttk.Button(frame, text="💾 Guardar", command=guardar).pack(pady=10)
         ventana.bind('<Return>', lambda e: guardar())
 
+    def crear_campos_periodo(self, frame, presupuesto=None):
+        """
+        Agrega los campos de periodo, días y remanente al diálogo.
+        Retorna una función que lee (periodo, dias, acumular); lanza ValueError si los días no son válidos
+        """
+        presupuesto = presupuesto or {}
+
+        frame_periodo = ttk.Frame(frame)
+        frame_periodo.pack(fill=tk.X, pady=5)
+
+        ttk.Label(frame_periodo, text="Periodo:").pack(side=tk.LEFT)
+        combo_periodo = ttk.Combobox(frame_periodo, values=PERIODOS, state='readonly', width=14)
+        combo_periodo.set(presupuesto.get('periodo', 'mensual'))
+        combo_periodo.pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(frame_periodo, text="Días:").pack(side=tk.LEFT, padx=(10, 0))
+        entry_dias = ttk.Entry(frame_periodo, width=6)
+        if presupuesto.get('dias'):
+            entry_dias.insert(0, str(presupuesto['dias']))
+        entry_dias.pack(side=tk.LEFT, padx=5)
+
+        def actualizar_dias(event=None):
+            entry_dias.config(state='normal' if combo_periodo.get() == 'personalizado' else 'disabled')
+
+        combo_periodo.bind('<<ComboboxSelected>>', actualizar_dias)
+        actualizar_dias()
+
+        var_acumular = tk.BooleanVar(value=presupuesto.get('acumular', False))
+        ttk.Checkbutton(frame, text="Acumular el sobrante al siguiente periodo",
+                        variable=var_acumular).pack(anchor=tk.W, pady=5)
+
+        def obtener():
+            periodo = combo_periodo.get()
+            dias = None
+            if periodo == 'personalizado':
+                dias = int(entry_dias.get())
+                if dias < 1:
+                    raise ValueError
+            return periodo, dias, var_acumular.get()
+
+        return obtener
+
     def eliminar_presupuesto(self, categoria):
         """Elimina un presupuesto"""
         if messagebox.askyesno("Confirmar",
@@ -11,14 +11,18 @@ from matplotlib.figure import Figure
 import pandas as pd
 from datetime import datetime
 import calendar
+from utils.visualizacion import dibujar_pastel_gastos
+from procesador.pronostico import Pronosticador
+from utils.instrumentacion import instrumentar
 
 
 class PanelResultados(ttk.Frame):
     """Panel de gráficas y análisis"""
 
-    def __init__(self, parent, gestor_datos):
+    def __init__(self, parent, gestor_datos, gestor_recurrentes=None):
         super().__init__(parent)
         self.gestor_datos = gestor_datos
+        self.pronosticador = Pronosticador(gestor_datos, gestor_recurrentes)
 
         # Configurar estilo de matplotlib
         plt.style.use('seaborn-v0_8-darkgrid')
@@ -33,10 +37,21 @@ class PanelResultados(ttk.Frame):
                           font=('Arial', 16, 'bold'))
         titulo.grid(row=0, column=0, columnspan=2, pady=10)
 
-        # Botón de actualizar
-        btn_actualizar = ttk.Button(self, text="🔄 Actualizar Gráficas",
-                                    command=self.actualizar_graficas)
-        btn_actualizar.grid(row=0, column=2, padx=10, pady=10, sticky=tk.E)
+        # Controles: horizonte del pronóstico y botón de actualizar
+        frame_controles = ttk.Frame(self)
+        frame_controles.grid(row=0, column=2, padx=10, pady=10, sticky=tk.E)
+
+        ttk.Label(frame_controles, text="Pronóstico (meses):").pack(side=tk.LEFT)
+        self.horizonte_var = tk.StringVar(value='6')
+        combo_horizonte = ttk.Combobox(frame_controles, textvariable=self.horizonte_var,
+                                       values=[str(m) for m in range(1, 13)],
+                                       state='readonly', width=4)
+        combo_horizonte.pack(side=tk.LEFT, padx=5)
+        combo_horizonte.bind('<<ComboboxSelected>>', lambda e: self.actualizar_graficas(forzar=True))
+
+        btn_actualizar = ttk.Button(frame_controles, text="🔄 Actualizar Gráficas",
+                                    command=lambda: self.actualizar_graficas(forzar=True))
+        btn_actualizar.pack(side=tk.LEFT, padx=5)
 
         # Frame para las gráficas (3 gráficas en grid)
         self.frame_graficas = ttk.Frame(self)
@@ -52,9 +67,18 @@ class PanelResultados(ttk.Frame):
         self.canvas_pastel = None
         self.canvas_barras = None
         self.canvas_linea = None
+        self.canvas_pronostico = None
 
-    def actualizar_graficas(self):
+        # Versión del libro dibujada (evita redibujar si los datos no cambiaron)
+        self.version_graficas = None
+
+    @instrumentar('panel.resultados')
+    def actualizar_graficas(self, forzar=False):
         """Actualiza todas las gráficas"""
+        if not forzar and self.version_graficas == self.gestor_datos.version:
+            return
+        self.version_graficas = self.gestor_datos.version
+
         # Limpiar gráficas anteriores
         for widget in self.frame_graficas.winfo_children():
             widget.destroy()
@@ -64,10 +88,11 @@ class PanelResultados(ttk.Frame):
             self.mostrar_mensaje_sin_datos()
             return
 
-        # Crear las 3 gráficas
+        # Crear las 3 gráficas y el pronóstico
         self.crear_grafica_pastel()
         self.crear_grafica_barras()
         self.crear_grafica_linea()
+        self.crear_grafica_pronostico()
 
     def mostrar_mensaje_sin_datos(self):
         """Muestra mensaje cuando no hay datos"""
@@ -88,26 +113,8 @@ class PanelResultados(ttk.Frame):
         fig = Figure(figsize=(5, 4), dpi=100)
         ax = fig.add_subplot(111)
 
-        # Datos para el pastel
-        categorias = list(gastos_cat.keys())
-        valores = list(gastos_cat.values())
-
-        # Colores personalizados
-        colores = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8',
-                   '#F7DC6F', '#BB8FCE', '#85C1E2', '#F8B739', '#52B788']
-
-        # Crear gráfica de pastel
-        wedges, texts, autotexts = ax.pie(valores, labels=categorias, autopct='%1.1f%%',
-                                           colors=colores[:len(categorias)],
-                                           startangle=90)
-
-        # Mejorar apariencia
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontsize(9)
-            autotext.set_weight('bold')
-
-        ax.set_title('Gastos por Categoría', fontsize=12, fontweight='bold', pad=20)
+        # Mismo dibujo que el de los reportes
+        dibujar_pastel_gastos(ax, gastos_cat)
 
         # Integrar en Tkinter
         canvas = FigureCanvasTkAgg(fig, master=self.frame_graficas)
@@ -118,25 +125,22 @@ class PanelResultados(ttk.Frame):
 
     def crear_grafica_barras(self):
         """Crea gráfica de barras comparando ingresos vs gastos"""
-        # Obtener datos
-        df = self.gestor_datos.obtener_dataframe()
-
-        if df.empty:
+        if not self.gestor_datos.transacciones:
             return
 
-        # Agrupar por mes
-        df['mes'] = df['fecha'].dt.to_period('M')
-
-        # Separar ingresos y gastos
-        ingresos_mes = df[df['tipo'] == 'Ingreso'].groupby('mes')['monto'].sum()
-        gastos_mes = df[df['tipo'] == 'Gasto'].groupby('mes')['monto'].sum()
+        # Agrupar por mes desde el índice mensual (centavos en moneda base)
+        ingresos_mes = {}
+        gastos_mes = {}
+        for (tipo, _, mes), centavos in self.gestor_datos.obtener_indice_mensual_centavos().items():
+            destino = ingresos_mes if tipo == 'Ingreso' else gastos_mes
+            destino[mes] = destino.get(mes, 0) + centavos / 100
 
         # Crear figura
         fig = Figure(figsize=(5, 4), dpi=100)
         ax = fig.add_subplot(111)
 
         # Obtener todos los meses únicos
-        todos_meses = sorted(set(ingresos_mes.index) | set(gastos_mes.index))
+        todos_meses = sorted(set(ingresos_mes) | set(gastos_mes))
 
         # Preparar datos para la gráfica
         x = range(len(todos_meses))
@@ -221,4 +225,54 @@ class PanelResultados(ttk.Frame):
         self.frame_graficas.columnconfigure(0, weight=1)
         self.frame_graficas.columnconfigure(1, weight=1)
         self.frame_graficas.columnconfigure(2, weight=1)
-        self.frame_graficas.rowconfigure(0, weight=1)
\ No newline at end of file
+        self.frame_graficas.rowconfigure(0, weight=1)
+
+    def crear_grafica_pronostico(self):
+        """Crea gráfica del balance histórico y pronosticado con banda de confianza"""
+        pronostico = self.pronosticador.pronosticar(meses=int(self.horizonte_var.get()))
+        if not pronostico:
+            return
+
+        # Balance al cierre de cada mes de historia (últimos 12)
+        flujo_mes = {}
+        for (tipo, _, mes), monto in self.gestor_datos.obtener_indice_mensual().items():
+            signo = 1 if tipo == 'Ingreso' else -1
+            flujo_mes[mes] = flujo_mes.get(mes, 0) + signo * monto
+        meses_hist = sorted(m for m in flujo_mes if m < pronostico['meses'][0])
+        acumulado = 0
+        balances_hist = []
+        for mes in meses_hist:
+            acumulado += flujo_mes[mes]
+            balances_hist.append(acumulado)
+        meses_hist, balances_hist = meses_hist[-12:], balances_hist[-12:]
+
+        fig = Figure(figsize=(15, 3.5), dpi=100)
+        ax = fig.add_subplot(111)
+
+        x_hist = list(range(len(meses_hist)))
+        x_pron = [len(meses_hist) + i for i in range(len(pronostico['meses']))]
+        balance = pronostico['balance']
+
+        ax.plot(x_hist, balances_hist, marker='o', linewidth=2, color='#3498DB', label='Balance')
+        ax.plot(x_pron, balance['esperado'], marker='o', linestyle='--', linewidth=2,
+                color='#9B59B6', label='Pronóstico')
+        ax.fill_between(x_pron, balance['inferior'], balance['superior'], color='#9B59B6',
+                        alpha=0.2, label=f"Intervalo {pronostico['nivel']:.0%}")
+
+        ax.set_xticks(x_hist + x_pron)
+        ax.set_xticklabels(meses_hist + pronostico['meses'], rotation=45, ha='right')
+        ax.set_ylabel('Balance ($)', fontweight='bold')
+        ax.set_title(f"Pronóstico de Balance ({pronostico['metodo']}, "
+                     f"{pronostico['meses_historia']} meses de historia)",
+                     fontsize=12, fontweight='bold')
+        ax.legend(loc='upper left')
+        ax.grid(True, alpha=0.3)
+        fig.tight_layout()
+
+        canvas = FigureCanvasTkAgg(fig, master=self.frame_graficas)
+        canvas.draw()
+        canvas.get_tk_widget().grid(row=1, column=0, columnspan=3, padx=10, pady=10,
+                                    sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        self.canvas_pronostico = canvas
+        self.frame_graficas.rowconfigure(1, weight=1)
@@ -8,6 +8,10 @@ from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 from tkcalendar import DateEntry
 import csv
+import config
+from datos import formato_columnar
+from datos.gestor_recurrentes import GestorRecurrentes, FRECUENCIAS
+from utils.instrumentacion import instrumentar
 
 
 class PanelTransacciones(ttk.Frame):
@@ -17,10 +21,11 @@ class PanelTransacciones(ttk.Frame):
     MAX_DESCRIPCION_CARACTERES = 50
     MAX_DESCRIPCION_DISPLAY = 50  # Para mostrar en lista
 
-    def __init__(self, parent, gestor_datos, callback_actualizar):
+    def __init__(self, parent, gestor_datos, callback_actualizar, gestor_recurrentes=None):
         super().__init__(parent)
         self.gestor_datos = gestor_datos
         self.callback_actualizar = callback_actualizar
+        self.gestor_recurrentes = gestor_recurrentes or GestorRecurrentes(gestor_datos)
         self.transaccion_seleccionada = None
 
         self.crear_interfaz()
@@ -64,13 +69,17 @@ class PanelTransacciones(ttk.Frame):
                                          command=self.limpiar_filtros)
         btn_limpiar_filtros.grid(row=0, column=6, padx=5, pady=5)
 
-        btn_exportar = ttk.Button(frame_busqueda, text="📥 Exportar CSV",
+        btn_exportar = ttk.Button(frame_busqueda, text="📥 Exportar",
                                  command=self.exportar_transacciones)
         btn_exportar.grid(row=0, column=7, padx=5, pady=5)
 
+        btn_importar = ttk.Button(frame_busqueda, text="📤 Importar",
+                                  command=self.importar_transacciones)
+        btn_importar.grid(row=0, column=8, padx=5, pady=5)
+
         btn_gestionar_cat = ttk.Button(frame_busqueda, text="⚙️ Categorías",
                                        command=self.gestionar_categorias)
-        btn_gestionar_cat.grid(row=0, column=8, padx=5, pady=5)
+        btn_gestionar_cat.grid(row=0, column=9, padx=5, pady=5)
 
         # === SECCIÓN FORMULARIO ===
         frame_formulario = ttk.LabelFrame(self, text="Nueva Transacción", padding="10")
@@ -120,11 +129,26 @@ class PanelTransacciones(ttk.Frame):
         self.categoria_var = tk.StringVar()
         self.categoria_combo = ttk.Combobox(frame_formulario, textvariable=self.categoria_var,
                                            state='readonly', width=20)
-        self.categoria_combo.grid(row=2, column=1, columnspan=3, sticky=(tk.W, tk.E), padx=5, pady=5)
+        self.categoria_combo.grid(row=2, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
+
+        # Cuenta (se puede escribir una nueva)
+        ttk.Label(frame_formulario, text="Cuenta:").grid(row=2, column=2, sticky=tk.W, pady=5)
+        self.cuenta_var = tk.StringVar(value=config.CUENTA_PREDETERMINADA)
+        self.cuenta_combo = ttk.Combobox(frame_formulario, textvariable=self.cuenta_var,
+                                         values=self.gestor_datos.obtener_cuentas(), width=15)
+        self.cuenta_combo.grid(row=2, column=3, sticky=(tk.W, tk.E), padx=5, pady=5)
+
+        # Moneda
+        ttk.Label(frame_formulario, text="Moneda:").grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.moneda_var = tk.StringVar(value=config.MONEDA_BASE)
+        self.moneda_combo = ttk.Combobox(frame_formulario, textvariable=self.moneda_var,
+                                         values=self.gestor_datos.obtener_monedas(),
+                                         state='readonly', width=15)
+        self.moneda_combo.grid(row=3, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
 
         # Botones de acción
         frame_botones = ttk.Frame(frame_formulario)
-        frame_botones.grid(row=3, column=0, columnspan=4, pady=10)
+        frame_botones.grid(row=4, column=0, columnspan=4, pady=10)
 
         self.btn_agregar = ttk.Button(frame_botones, text="➕ Agregar", command=self.agregar_transaccion)
         self.btn_agregar.pack(side=tk.LEFT, padx=5)
@@ -138,6 +162,9 @@ class PanelTransacciones(ttk.Frame):
         self.btn_limpiar = ttk.Button(frame_botones, text="🔄 Limpiar", command=self.limpiar_formulario)
         self.btn_limpiar.pack(side=tk.LEFT, padx=5)
 
+        self.btn_recurrentes = ttk.Button(frame_botones, text="🔁 Recurrentes", command=self.gestionar_recurrentes)
+        self.btn_recurrentes.pack(side=tk.LEFT, padx=5)
+
         # === SECCIÓN LISTA DE TRANSACCIONES ===
         self.frame_lista = ttk.LabelFrame(self, text="Historial de Transacciones", padding="10")
         self.frame_lista.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), padx=5, pady=5)
@@ -260,6 +287,8 @@ class PanelTransacciones(ttk.Frame):
         transacciones = sorted(transacciones, key=lambda x: x['fecha'], reverse=True)
         for t in transacciones:
             monto_formato = f"${t['monto']:,.2f}"
+            if self.gestor_datos.moneda_de(t) != config.MONEDA_BASE:
+                monto_formato += f" {self.gestor_datos.moneda_de(t)}"
             descripcion_display = self.truncar_descripcion(t['descripcion'])
             self.tree.insert('', tk.END, values=(
             t['fecha'],
@@ -278,10 +307,11 @@ class PanelTransacciones(ttk.Frame):
         self.cargar_transacciones()
 
     def exportar_transacciones(self):
-        """Exporta a CSV SOLO las transacciones que coinciden con los filtros activos"""
+        """Exporta SOLO las transacciones que coinciden con los filtros activos (CSV, Parquet o Arrow)"""
         archivo = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            filetypes=[("CSV files", "*.csv"), ("Parquet files", "*.parquet"),
+                       ("Arrow files", "*.arrow"), ("All files", "*.*")],
             title="Exportar transacciones filtradas"
         )
 
@@ -289,10 +319,19 @@ class PanelTransacciones(ttk.Frame):
             return
 
         filas = self.obtener_transacciones_filtradas()
+
+        if formato_columnar.es_formato_columnar(archivo):
+            if not formato_columnar.PYARROW_DISPONIBLE:
+                messagebox.showerror("Error", "Instala pyarrow para exportar a Parquet/Arrow:\n\npip install pyarrow")
+            elif self.gestor_datos.exportar_columnar(archivo, filas):
+                messagebox.showinfo("Éxito", f"Transacciones filtradas exportadas a:\n{archivo}")
+            else:
+                messagebox.showerror("Error", "No se pudo exportar el archivo")
+            return
+
         try:
             with open(archivo, 'w', newline='', encoding='utf-8') as f:
-                campos = ['id', 'fecha', 'descripcion', 'monto', 'tipo', 'categoria']
-                writer = csv.DictWriter(f, fieldnames=campos)
+                writer = csv.DictWriter(f, fieldnames=self.gestor_datos.CAMPOS)
                 writer.writeheader()
                 writer.writerows(filas)
             messagebox.showinfo("Éxito", f"Transacciones filtradas exportadas a:\n{archivo}")
@@ -300,10 +339,37 @@ class PanelTransacciones(ttk.Frame):
             print(f"Error al exportar: {e}")
             messagebox.showerror("Error", "No se pudo exportar el archivo")
 
+    def importar_transacciones(self):
+        """Agrega transacciones desde un archivo Parquet o Arrow"""
+        if not formato_columnar.PYARROW_DISPONIBLE:
+            messagebox.showerror("Error", "Instala pyarrow para importar Parquet/Arrow:\n\npip install pyarrow")
+            return
+
+        archivo = filedialog.askopenfilename(
+            filetypes=[("Parquet/Arrow", "*.parquet *.arrow *.feather"), ("All files", "*.*")],
+            title="Importar transacciones"
+        )
+
+        if not archivo:
+            return
+
+        cantidad = self.gestor_datos.importar_columnar(archivo)
+        if cantidad is None:
+            messagebox.showerror("Error", "No se pudo importar el archivo")
+            return
+
+        self.cargar_transacciones()
+        self.callback_actualizar()
+        messagebox.showinfo("Éxito", f"{cantidad} transacciones importadas")
+
     def gestionar_categorias(self):
         """Abre ventana para gestionar categorías"""
         VentanaCategorias(self, self.gestor_datos)
 
+    def gestionar_recurrentes(self):
+        """Abre ventana para gestionar transacciones recurrentes"""
+        VentanaRecurrentes(self, self.gestor_recurrentes)
+
     def agregar_transaccion(self):
         """Agrega una nueva transacción"""
         if not self.validar_campos():
@@ -319,7 +385,8 @@ class PanelTransacciones(ttk.Frame):
         if len(descripcion) > self.MAX_DESCRIPCION_CARACTERES:
             descripcion = descripcion[:self.MAX_DESCRIPCION_CARACTERES]
 
-        self.gestor_datos.agregar_transaccion(fecha, descripcion, monto, tipo, categoria)
+        self.gestor_datos.agregar_transaccion(fecha, descripcion, monto, tipo, categoria,
+                                              self.cuenta_var.get().strip(), self.moneda_var.get())
 
         self.cargar_transacciones()
         self.limpiar_formulario()
@@ -347,7 +414,8 @@ class PanelTransacciones(ttk.Frame):
 
         self.gestor_datos.editar_transaccion(
             self.transaccion_seleccionada['id'],
-            fecha, descripcion, monto, tipo, categoria
+            fecha, descripcion, monto, tipo, categoria,
+            self.cuenta_var.get().strip(), self.moneda_var.get()
         )
 
         self.cargar_transacciones()
@@ -378,7 +446,7 @@ class PanelTransacciones(ttk.Frame):
             # Buscar la transacción completa (con descripción sin truncar)
             for t in self.gestor_datos.transacciones:
                 if (t['fecha'] == valores[0] and
-                    float(t['monto']) == float(valores[2].replace('$', '').replace(',', ''))):
+                    float(t['monto']) == float(valores[2].replace('$', '').replace(',', '').split()[0])):
                     self.transaccion_seleccionada = t
                     break
 
@@ -399,6 +467,8 @@ class PanelTransacciones(ttk.Frame):
             self.tipo_var.set(self.transaccion_seleccionada['tipo'])
             self.actualizar_categorias()
             self.categoria_var.set(self.transaccion_seleccionada['categoria'])
+            self.cuenta_var.set(self.gestor_datos.cuenta_de(self.transaccion_seleccionada))
+            self.moneda_var.set(self.gestor_datos.moneda_de(self.transaccion_seleccionada))
 
     def limpiar_formulario(self):
         """Limpia todos los campos del formulario"""
@@ -408,6 +478,10 @@ class PanelTransacciones(ttk.Frame):
         self.monto_entry.delete(0, tk.END)
         self.tipo_var.set('')
         self.categoria_var.set('')
+        self.cuenta_var.set(config.CUENTA_PREDETERMINADA)
+        self.moneda_var.set(config.MONEDA_BASE)
+        self.cuenta_combo['values'] = self.gestor_datos.obtener_cuentas()
+        self.moneda_combo['values'] = self.gestor_datos.obtener_monedas()
         self.transaccion_seleccionada = None
         self.btn_editar.config(state=tk.DISABLED)
         self.btn_eliminar.config(state=tk.DISABLED)
@@ -468,6 +542,7 @@ class PanelTransacciones(ttk.Frame):
 
         return True
 
+    @instrumentar('panel.transacciones', filas=lambda self: len(self.tree.get_children()))
     def cargar_transacciones(self):
         """Carga todas las transacciones en el Treeview - CON MENSAJE VACÍO"""
         for item in self.tree.get_children():
@@ -535,6 +610,8 @@ class PanelTransacciones(ttk.Frame):
             # Mostrar transacciones normalmente
             for t in transacciones:
                 monto_formato = f"${t['monto']:,.2f}"
+                if self.gestor_datos.moneda_de(t) != config.MONEDA_BASE:
+                    monto_formato += f" {self.gestor_datos.moneda_de(t)}"
                 descripcion_display = self.truncar_descripcion(t['descripcion'])
 
                 self.tree.insert('', tk.END, values=(
@@ -729,5 +806,148 @@ class VentanaCategorias(tk.Toplevel):
             messagebox.showinfo("Éxito", "Categorías restauradas")
 
 
+class VentanaRecurrentes(tk.Toplevel):
+    """Ventana para gestionar reglas de transacciones recurrentes"""
+
+    def __init__(self, panel, gestor_recurrentes):
+        super().__init__(panel)
+        self.panel = panel
+        self.gestor_recurrentes = gestor_recurrentes
+        self.title("Transacciones Recurrentes")
+        self.geometry("760x420")
+        self.transient(panel)
+        self.grab_set()
+
+        self.crear_interfaz()
+        self.cargar_reglas()
+
+    def crear_interfaz(self):
+        """Crea la interfaz de gestión de recurrentes"""
+        titulo = ttk.Label(self, text="🔁 Transacciones Recurrentes",
+                          font=('Arial', 14, 'bold'))
+        titulo.pack(pady=10)
+
+        frame = ttk.Frame(self, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        columnas = ('Descripción', 'Monto', 'Tipo', 'Frecuencia', 'Próxima', 'Estado')
+        self.tree = ttk.Treeview(frame, columns=columnas, show='headings', height=10)
+        for columna, ancho in zip(columnas, (220, 100, 80, 110, 100, 80)):
+            self.tree.heading(columna, text=columna)
+            self.tree.column(columna, width=ancho)
+        self.tree.grid(row=0, column=0, columnspan=6, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        # Nueva regla a partir del formulario de transacciones
+        ttk.Label(frame, text="Frecuencia:").grid(row=1, column=0, sticky=tk.W, pady=10)
+        self.frecuencia_var = tk.StringVar(value='mensual')
+        ttk.Combobox(frame, textvariable=self.frecuencia_var, values=FRECUENCIAS,
+                     state='readonly', width=14).grid(row=1, column=1, sticky=tk.W, padx=5)
+
+        ttk.Label(frame, text="Cada (días):").grid(row=1, column=2, sticky=tk.W)
+        self.intervalo_entry = ttk.Entry(frame, width=6)
+        self.intervalo_entry.grid(row=1, column=3, sticky=tk.W, padx=5)
+
+        ttk.Button(frame, text="➕ Crear desde formulario",
+                   command=self.crear_regla).grid(row=1, column=4, columnspan=2, padx=5)
+
+        frame_botones = ttk.Frame(frame)
+        frame_botones.grid(row=2, column=0, columnspan=6, pady=5)
+
+        ttk.Button(frame_botones, text="⏯️ Pausar/Reanudar",
+                   command=self.alternar_regla).pack(side=tk.LEFT, padx=5)
+        ttk.Button(frame_botones, text="🗑️ Eliminar",
+                   command=self.eliminar_regla).pack(side=tk.LEFT, padx=5)
+        ttk.Button(frame_botones, text="⚡ Generar pendientes",
+                   command=self.generar_pendientes).pack(side=tk.LEFT, padx=5)
+
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(0, weight=1)
+
+    def cargar_reglas(self):
+        """Muestra las reglas con su próxima ocurrencia"""
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
+        for regla in self.gestor_recurrentes.obtener_reglas():
+            proxima = self.gestor_recurrentes.obtener_proxima_ocurrencia(regla)
+            frecuencia = regla['frecuencia']
+            if frecuencia == 'personalizada':
+                frecuencia = f"cada {regla['intervalo_dias']} días"
+
+            self.tree.insert('', tk.END, iid=str(regla['id']), values=(
+                regla['descripcion'],
+                f"${regla['monto']:,.2f}",
+                regla['tipo'],
+                frecuencia,
+                proxima.strftime('%Y-%m-%d') if proxima else '-',
+                'Activa' if regla.get('activa', True) else 'Pausada'
+            ))
+
+    def _regla_seleccionada(self):
+        seleccion = self.tree.selection()
+        if not seleccion:
+            messagebox.showwarning("Advertencia", "Selecciona una regla", parent=self)
+            return None
+        return int(seleccion[0])
+
+    def crear_regla(self):
+        """Crea una regla con los datos del formulario (la fecha es la primera ocurrencia)"""
+        if not self.panel.validar_campos():
+            return
+
+        intervalo = None
+        if self.frecuencia_var.get() == 'personalizada':
+            try:
+                intervalo = int(self.intervalo_entry.get())
+                if intervalo < 1:
+                    raise ValueError
+            except ValueError:
+                messagebox.showwarning("Advertencia", "Ingresa un intervalo de días válido", parent=self)
+                return
+
+        self.gestor_recurrentes.agregar_regla(
+            self.panel.descripcion_entry.get().strip()[:self.panel.MAX_DESCRIPCION_CARACTERES],
+            float(self.panel.monto_entry.get()),
+            self.panel.tipo_var.get(),
+            self.panel.categoria_var.get(),
+            self.frecuencia_var.get(),
+            self.panel.fecha_entry.get_date().strftime('%Y-%m-%d'),
+            intervalo_dias=intervalo,
+            cuenta=self.panel.cuenta_var.get().strip(),
+            moneda=self.panel.moneda_var.get()
+        )
+        self.generar_pendientes(silencioso=True)
+
+    def alternar_regla(self):
+        """Pausa o reanuda la regla seleccionada"""
+        id_regla = self._regla_seleccionada()
+        if id_regla is None:
+            return
+        regla = next(r for r in self.gestor_recurrentes.obtener_reglas() if r['id'] == id_regla)
+        self.gestor_recurrentes.cambiar_estado(id_regla, not regla.get('activa', True))
+        self.cargar_reglas()
+
+    def eliminar_regla(self):
+        """Elimina la regla seleccionada"""
+        id_regla = self._regla_seleccionada()
+        if id_regla is None:
+            return
+        if messagebox.askyesno("Confirmar",
+                               "¿Eliminar la regla?\nLas transacciones ya generadas se conservan.",
+                               parent=self):
+            self.gestor_recurrentes.eliminar_regla(id_regla)
+            self.cargar_reglas()
+
+    def generar_pendientes(self, silencioso=False):
+        """Materializa las ocurrencias pendientes hasta hoy"""
+        generadas = self.gestor_recurrentes.materializar()
+        self.cargar_reglas()
+        if generadas:
+            self.panel.cargar_transacciones()
+            self.panel.callback_actualizar()
+        if not silencioso or generadas:
+            messagebox.showinfo("Recurrentes", f"{generadas} transacciones generadas", parent=self)
+
+
 # Importar para usar en VentanaCategorias
 import tkinter.simpledialog
\ No newline at end of file
@@ -6,6 +6,7 @@ Detecta anomalías y genera insights
 from datetime import datetime, timedelta
 from statistics import mean, median
 import calendar
+from utils.instrumentacion import instrumentar
 
 
 class AnalizadorFinanciero:
@@ -14,6 +15,7 @@ class AnalizadorFinanciero:
     def __init__(self, gestor_datos):
         self.gestor_datos = gestor_datos
 
+    @instrumentar('analizador.analizar_todo', filas=lambda self, *a, **k: len(self.gestor_datos.transacciones))
     def analizar_todo(self):
         """Ejecuta todos los análisis y retorna alertas"""
         alertas = []
@@ -52,6 +54,7 @@ class AnalizadorFinanciero:
 
         return alertas
 
+    @instrumentar('analizador.detectar_balance_negativo', filas=lambda self, *a, **k: len(self.gestor_datos.transacciones))
     def detectar_balance_negativo(self):
         """Detecta si el balance es negativo"""
         balance = self.gestor_datos.obtener_balance()
@@ -67,6 +70,7 @@ class AnalizadorFinanciero:
 
         return None
 
+    @instrumentar('analizador.detectar_gastos_inusuales', filas=lambda self, *a, **k: len(self.gestor_datos.transacciones))
     def detectar_gastos_inusuales(self):
         """Detecta gastos que sean significativamente mayores al promedio"""
         alertas = []
@@ -76,20 +80,20 @@ class AnalizadorFinanciero:
         if len(gastos) < 3:
             return alertas
 
-        # Calcular promedio y mediana
-        montos = [g['monto'] for g in gastos]
+        # Calcular promedio y mediana (en moneda base para no mezclar monedas)
+        montos = [self.gestor_datos.monto_en_base(g) for g in gastos]
         promedio = mean(montos)
         mediana_valor = median(montos)
 
         # Detectar gastos que sean 2x el promedio
         umbral = promedio * 2
 
-        for gasto in gastos:
-            if gasto['monto'] >= umbral:
+        for gasto, monto in zip(gastos, montos):
+            if monto >= umbral:
                 alertas.append({
                     'tipo': 'advertencia',
                     'titulo': '💸 Gasto Inusual Detectado',
-                    'mensaje': f"Gasto de ${gasto['monto']:,.2f} en '{gasto['descripcion']}' es {gasto['monto'] / promedio:.1f}x mayor que tu promedio (${promedio:,.2f})",
+                    'mensaje': f"Gasto de ${monto:,.2f} en '{gasto['descripcion']}' es {monto / promedio:.1f}x mayor que tu promedio (${promedio:,.2f})",
                     'severidad': 'media',
                     'categoria': 'gasto_inusual',
                     'detalles': gasto
@@ -97,6 +101,7 @@ class AnalizadorFinanciero:
 
         return alertas[:3]  # Máximo 3 alertas
 
+    @instrumentar('analizador.analizar_categoria_maxima', filas=lambda self, *a, **k: len(self.gestor_datos.transacciones))
     def analizar_categoria_maxima(self):
         """Analiza la categoría con más gastos"""
         gastos_cat = self.gestor_datos.obtener_gastos_por_categoria()
@@ -120,30 +125,22 @@ class AnalizadorFinanciero:
 
         return None
 
+    @instrumentar('analizador.comparar_con_mes_anterior', filas=lambda self, *a, **k: len(self.gestor_datos.transacciones))
     def comparar_con_mes_anterior(self):
         """Compara gastos con el mes anterior"""
         fecha_actual = datetime.now()
 
-        # Transacciones mes actual
-        trans_mes_actual = [t for t in self.gestor_datos.transacciones
-                            if datetime.strptime(t['fecha'], '%Y-%m-%d').month == fecha_actual.month
-                            and datetime.strptime(t['fecha'], '%Y-%m-%d').year == fecha_actual.year]
-
         # Mes anterior
         primer_dia_mes = fecha_actual.replace(day=1)
         ultimo_dia_mes_anterior = primer_dia_mes - timedelta(days=1)
-        mes_anterior = ultimo_dia_mes_anterior.month
-        año_anterior = ultimo_dia_mes_anterior.year
-
-        trans_mes_anterior = [t for t in self.gestor_datos.transacciones
-                              if datetime.strptime(t['fecha'], '%Y-%m-%d').month == mes_anterior
-                              and datetime.strptime(t['fecha'], '%Y-%m-%d').year == año_anterior]
+        mes_anterior = ultimo_dia_mes_anterior.strftime('%Y-%m')
 
-        if not trans_mes_anterior:
+        if not any(t['fecha'].startswith(mes_anterior) for t in self.gestor_datos.transacciones):
             return None
 
-        gastos_actual = sum([t['monto'] for t in trans_mes_actual if t['tipo'] == 'Gasto'])
-        gastos_anterior = sum([t['monto'] for t in trans_mes_anterior if t['tipo'] == 'Gasto'])
+        # Totales del índice mensual: centavos exactos en moneda base
+        gastos_actual = self.gestor_datos.obtener_totales_mes_centavos(fecha_actual.strftime('%Y-%m'))[1] / 100
+        gastos_anterior = self.gestor_datos.obtener_totales_mes_centavos(mes_anterior)[1] / 100
 
         if gastos_anterior == 0:
             return None
@@ -169,6 +166,7 @@ class AnalizadorFinanciero:
 
         return None
 
+    @instrumentar('analizador.analizar_tendencia', filas=lambda self, *a, **k: len(self.gestor_datos.transacciones))
     def analizar_tendencia(self):
         """Analiza la tendencia de gastos en los últimos días"""
         if len(self.gestor_datos.transacciones) < 5:
@@ -184,7 +182,7 @@ class AnalizadorFinanciero:
         if len(gastos_recientes) < 3:
             return None
 
-        total_reciente = sum([g['monto'] for g in gastos_recientes])
+        total_reciente = sum(self.gestor_datos.centavos_en_base(g) for g in gastos_recientes) / 100
         promedio_diario = total_reciente / 7
 
         # Calcular promedio histórico
@@ -194,7 +192,7 @@ class AnalizadorFinanciero:
 
         fechas_unicas = set([t['fecha'] for t in todos_gastos])
         dias_totales = len(fechas_unicas)
-        promedio_historico = sum([g['monto'] for g in todos_gastos]) / dias_totales
+        promedio_historico = self.gestor_datos.obtener_total_gastos() / dias_totales
 
         if promedio_diario > promedio_historico * 1.5:
             return {
@@ -207,6 +205,7 @@ class AnalizadorFinanciero:
 
         return None
 
+    @instrumentar('analizador.generar_recomendaciones', filas=lambda self, *a, **k: len(self.gestor_datos.transacciones))
     def generar_recomendaciones(self):
         """Genera recomendaciones basadas en los datos"""
         recomendaciones = []
@@ -0,0 +1,189 @@
+"""
+Caché de Respuestas del Asistente
+Evita repetir consultas al LLM para preguntas ya respondidas
+"""
+
+import json
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+import config
+from datos import persistencia
+
+
+def normalizar_pregunta(texto):
+    """Normaliza una pregunta: minúsculas, sin acentos ni signos de puntuación"""
+    texto = unicodedata.normalize('NFD', texto.lower())
+    texto = ''.join(c for c in texto if unicodedata.category(c) != 'Mn')
+    texto = re.sub(r'[^a-z0-9ñ ]+', ' ', texto)
+    return ' '.join(texto.split())
+
+
+def similitud_coseno(a, b):
+    """Calcula la similitud coseno entre dos vectores"""
+    producto = sum(x * y for x, y in zip(a, b))
+    norma = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return producto / norma if norma else 0.0
+
+
+class CacheRespuestas:
+    """
+    Caché LRU/TTL de respuestas, ligada a la versión de los datos.
+    La versión debe ser estable entre sesiones (ej. GestorTransacciones.obtener_huella)
+    """
+
+    # Primeras palabras de una pregunta de seguimiento ("¿y el mes pasado?", "¿y en comida?")
+    PALABRAS_SEGUIMIENTO = ('y', 'e', 'entonces', 'tambien', 'ademas')
+
+    def __init__(self, archivo_cache="datos/cache_respuestas.json", max_entradas=None,
+                 ttl_segundos=None, funcion_embedding=None, umbral_similitud=None):
+        self.archivo_cache = archivo_cache
+        self.max_entradas = max_entradas or config.CHAT_CACHE_MAX_ENTRADAS
+        self.ttl_segundos = ttl_segundos or config.CHAT_CACHE_TTL_SEGUNDOS
+        self.funcion_embedding = funcion_embedding
+        self.umbral_similitud = umbral_similitud or config.CHAT_CACHE_UMBRAL_SIMILITUD
+
+        # pregunta normalizada -> entrada; el orden refleja el uso (LRU)
+        self.entradas = OrderedDict()
+        self._embeddings_recientes = {}
+
+        self.cargar_cache()
+
+    def cargar_cache(self):
+        """Carga la caché desde disco descartando entradas vencidas"""
+        if not self.archivo_cache or not os.path.exists(self.archivo_cache):
+            return
+
+        try:
+            with open(self.archivo_cache, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+
+            ahora = time.time()
+            for entrada in datos:
+                if ahora - entrada['creado'] < self.ttl_segundos:
+                    self.entradas[entrada['clave']] = entrada
+        except Exception as e:
+            print(f"Error al cargar caché de respuestas: {e}")
+            self.entradas = OrderedDict()
+
+    def guardar_cache(self):
+        """Guarda la caché en disco"""
+        if not self.archivo_cache:
+            return True
+
+        try:
+            persistencia.guardar_json(self.archivo_cache, list(self.entradas.values()), indent=None)
+            return True
+        except Exception as e:
+            print(f"Error al guardar caché de respuestas: {e}")
+            return False
+
+    def es_seguimiento(self, pregunta):
+        """Indica si la pregunta continúa la anterior y su sentido depende de la conversación"""
+        palabras = normalizar_pregunta(pregunta).split()
+        return not palabras or palabras[0] in self.PALABRAS_SEGUIMIENTO
+
+    def es_cacheable(self, pregunta, contexto=None):
+        """
+        Indica si la respuesta vale para cualquier conversación: no es de seguimiento
+        y no se generó sobre un contexto de Ollama con turnos previos
+        """
+        return not contexto and not self.es_seguimiento(pregunta)
+
+    def obtener(self, pregunta, version):
+        """Retorna la respuesta en caché para la pregunta y versión, o None"""
+        if self.es_seguimiento(pregunta):
+            return None
+        self.invalidar(version)
+
+        clave = normalizar_pregunta(pregunta)
+        entrada = self.entradas.get(clave)
+
+        if entrada is None and self.funcion_embedding:
+            entrada = self._buscar_similar(clave)
+
+        if entrada is None:
+            return None
+
+        if time.time() - entrada['creado'] >= self.ttl_segundos:
+            del self.entradas[entrada['clave']]
+            return None
+
+        self.entradas.move_to_end(entrada['clave'])
+        return entrada['respuesta']
+
+    def guardar(self, pregunta, respuesta, version, contexto=None):
+        """
+        Guarda una respuesta y aplica la política de desalojo LRU.
+        contexto: el 'context' de Ollama con el que se generó (si lo hubo, no se guarda)
+        """
+        if not self.es_cacheable(pregunta, contexto):
+            return
+
+        clave = normalizar_pregunta(pregunta)
+        self.entradas[clave] = {
+            'clave': clave,
+            'respuesta': respuesta,
+            'version': version,
+            'creado': time.time(),
+            'embedding': self._obtener_embedding(clave)
+        }
+        self.entradas.move_to_end(clave)
+
+        while len(self.entradas) > self.max_entradas:
+            self.entradas.popitem(last=False)
+
+        self.guardar_cache()
+
+    def invalidar(self, version):
+        """Elimina las entradas calculadas con otra versión de los datos"""
+        obsoletas = [c for c, e in self.entradas.items() if e['version'] != version]
+        for clave in obsoletas:
+            del self.entradas[clave]
+
+        if obsoletas:
+            self.guardar_cache()
+
+    def limpiar(self):
+        """Vacía la caché"""
+        self.entradas.clear()
+        self._embeddings_recientes.clear()
+        self.guardar_cache()
+
+    def _buscar_similar(self, clave):
+        """Busca la entrada más parecida por similitud de embeddings"""
+        vector = self._obtener_embedding(clave)
+        if vector is None:
+            return None
+
+        mejor, mejor_similitud = None, self.umbral_similitud
+        for entrada in self.entradas.values():
+            if not entrada.get('embedding'):
+                continue
+            similitud = similitud_coseno(vector, entrada['embedding'])
+            if similitud >= mejor_similitud:
+                mejor, mejor_similitud = entrada, similitud
+
+        return mejor
+
+    def _obtener_embedding(self, clave):
+        """Calcula (y memoriza) el embedding de una pregunta normalizada"""
+        if not self.funcion_embedding:
+            return None
+
+        if clave not in self._embeddings_recientes:
+            try:
+                self._embeddings_recientes[clave] = self.funcion_embedding(clave)
+            except Exception as e:
+                print(f"Error al calcular embedding: {e}")
+                return None
+
+            # Solo se necesitan los de la pregunta en curso
+            while len(self._embeddings_recientes) > 8:
+                self._embeddings_recientes.pop(next(iter(self._embeddings_recientes)))
+
+        return self._embeddings_recientes[clave]
@@ -5,106 +5,56 @@ Versión optimizada con mejor manejo de errores
 
 import requests
 import json
+import socket
+import threading
 from datetime import datetime
 from procesador.analizador import AnalizadorFinanciero
+from procesador.cliente_ollama import ClienteOllama
+from procesador.constructor_contexto import ConstructorContexto
+from procesador.cache_respuestas import CacheRespuestas
+from procesador.motor_consultas import MotorConsultas
+import config
+from utils.instrumentacion import instrumentar
 
 
 class ChatFinanciero:
     """Gestiona la conversación con IA incluyendo contexto financiero"""
 
-    def __init__(self, gestor_datos, modelo="llama3.2:1b", url="http://localhost:11434/api/generate"):
+    def __init__(self, gestor_datos, modelo="llama3.2:1b", url="http://localhost:11434/api/generate",
+                 cliente=None, cache_respuestas=None, gestor_presupuestos=None):
         self.gestor_datos = gestor_datos
         self.analizador = AnalizadorFinanciero(gestor_datos)
         self.modelo = modelo
-        self.url = url
+        # Un solo cliente con conexiones persistentes para todas las solicitudes
+        self.cliente = cliente or ClienteOllama(host=url.split('/api/')[0])
+        self.url = self.cliente.url_generar
         self.historial = []
         # ✅ Configuración optimizada
-        self.timeout = 60  # Aumentado para modelos pesados
+        self.timeout = self.cliente.timeout  # Tiempo máximo entre fragmentos
         self.max_tokens = 200  # Reducido para respuestas más rápidas
 
-    def obtener_contexto_completo(self):
-        """Obtiene contexto financiero detallado para el prompt"""
-        # ✅ Permitir contexto mínimo incluso sin datos
-        if not self.gestor_datos.transacciones:
-            return """Eres un asistente financiero personal experto y amigable llamado 'Balancea AI'.
-
-SITUACIÓN: El usuario aún no tiene transacciones registradas, pero puedes ayudarlo.
-
-PUEDES HACER:
-- Responder preguntas generales sobre finanzas personales
-- Dar consejos sobre cómo empezar a gestionar sus finanzas
-- Explicar conceptos financieros básicos (ahorro, inversión, presupuesto, etc.)
-- Motivar al usuario a comenzar a registrar sus transacciones
-- Responder dudas sobre cómo usar la aplicación Balancea
-- Dar tips de educación financiera
-
-INSTRUCCIONES:
-- Responde en español de manera clara, concisa y amigable
-- Da consejos prácticos sobre gestión financiera
-- Si te preguntan sobre sus finanzas específicas, menciona que necesitas que registre transacciones primero
-- Mantén las respuestas breves (máximo 3-4 párrafos)
-- Usa emojis apropiados para hacer la conversación más amigable
-- Sé empático y motivador
-- Cuando sea relevante, sugiere usar el botón "Generar Demo" para explorar la app
-"""
+        # Contexto financiero en caché por versión del libro
+        self.constructor_contexto = ConstructorContexto(gestor_datos, self.analizador)
 
-        try:
-            balance = self.gestor_datos.obtener_balance()
-            ingresos = self.gestor_datos.obtener_total_ingresos()
-            gastos = self.gestor_datos.obtener_total_gastos()
-            gastos_cat = self.gestor_datos.obtener_gastos_por_categoria()
+        # Contexto de Ollama (tokens ya evaluados del system prompt y la conversación)
+        self.contexto_ollama = None
+        self.version_contexto = None
+        self.turnos_contexto = 0
 
-            # Salud financiera
-            salud = self.analizador.obtener_resumen_salud_financiera()
+        # Preguntas estructuradas (montos, top, comparativas) se responden sin el LLM
+        self.motor_consultas = MotorConsultas(gestor_datos, gestor_presupuestos)
 
-            # Alertas activas
-            try:
-                alertas = self.analizador.analizar_todo()
-                alertas_texto = "\n".join([f"- {a['titulo']}: {a['mensaje']}" for a in alertas[:3]]) if alertas else "No hay alertas"
-            except Exception as e:
-                print(f"Error al obtener alertas: {e}")
-                alertas = []
-                alertas_texto = "Error al procesar alertas"
-
-            contexto = f"""Eres un asistente financiero personal experto y amigable llamado 'Balancea AI'.
-
-DATOS FINANCIEROS DEL USUARIO:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-💰 Balance Total: ${balance:,.2f}
-📈 Total Ingresos: ${ingresos:,.2f}
-📉 Total Gastos: ${gastos:,.2f}
-📊 Tasa de Ahorro: {salud.get('tasa_ahorro', 0):.1f}%
-💚 Salud Financiera: {salud.get('nivel', 'N/A')} ({salud.get('puntuacion', 0)}/100)
-📝 Transacciones Registradas: {len(self.gestor_datos.transacciones)}
-
-DISTRIBUCIÓN DE GASTOS POR CATEGORÍA:
-"""
-
-            if gastos_cat:
-                for cat, monto in sorted(gastos_cat.items(), key=lambda x: x[1], reverse=True)[:5]:
-                    porcentaje = (monto / gastos * 100) if gastos > 0 else 0
-                    contexto += f"\n  • {cat}: ${monto:,.2f} ({porcentaje:.1f}%)"
-            else:
-                contexto += "\n  (Sin gastos registrados)"
-
-            if alertas:
-                contexto += f"\n\n⚠️ ALERTAS ACTIVAS ({len(alertas)}):\n{alertas_texto}"
-
-            contexto += """
-
-INSTRUCCIONES:
-- Responde en español de manera clara, concisa y amigable
-- Usa los datos proporcionados para dar respuestas específicas
-- Si el usuario pregunta sobre su situación financiera, usa los números exactos
-- Da consejos prácticos y accionables
-- Si no tienes suficiente información, menciona qué datos necesitas
-- Mantén las respuestas breves (máximo 3-4 párrafos)
-- Usa emojis apropiados para hacer la conversación más amigable
-- Si detectas problemas en las finanzas, sé empático pero honesto
-"""
-
-            return contexto
+        # Respuestas previas por pregunta normalizada y versión del libro
+        self.cache_respuestas = cache_respuestas or CacheRespuestas(
+            funcion_embedding=self.cliente.obtener_embedding if config.CHAT_CACHE_EMBEDDINGS else None
+        )
 
+    def obtener_contexto_completo(self):
+        """Obtiene contexto financiero detallado para el prompt"""
+        try:
+            sistema = self.constructor_contexto.obtener_sistema()
+            bloque = self.constructor_contexto.obtener_bloque_datos()
+            return f"{sistema}\n\n{bloque}" if bloque else sistema
         except Exception as e:
             print(f"❌ Error al obtener contexto: {e}")
             import traceback
@@ -113,6 +63,14 @@ INSTRUCCIONES:
 
     def generar_respuesta(self, mensaje_usuario):
         """Genera respuesta usando Ollama - OPTIMIZADO"""
+        return self.generar_respuesta_stream(mensaje_usuario, stream=False)
+
+    def generar_respuesta_stream(self, mensaje_usuario, al_recibir_token=None, cancelar=None, stream=True):
+        """
+        Genera respuesta leyendo los fragmentos NDJSON de Ollama conforme llegan.
+        al_recibir_token: callback que recibe cada fragmento de texto
+        cancelar: threading.Event que detiene la generación en curso
+        """
         # Detectar comandos especiales primero
         comando = self.detectar_comando(mensaje_usuario)
 
@@ -128,9 +86,36 @@ INSTRUCCIONES:
         # ✅ Ya NO retornamos mensaje predefinido, dejamos que Ollama procese
         # (Comentado para permitir que Ollama responda incluso sin datos)
 
+        # Consultas que se calculan directamente desde los datos
+        respuesta_local = self.motor_consultas.responder(mensaje_usuario)
+        if respuesta_local:
+            self.historial.append({'rol': 'usuario', 'mensaje': mensaje_usuario})
+            self.historial.append({'rol': 'asistente', 'mensaje': respuesta_local})
+            return {
+                'exito': True,
+                'respuesta': respuesta_local,
+                'tipo': 'consulta'
+            }
+
+        # Pregunta ya respondida con los mismos datos (solo si el turno no depende
+        # de la conversación: una respuesta con historial no vale para otra)
+        version = self.gestor_datos.obtener_huella()
+        respuesta_cache = None
+        if not self._depende_de_conversacion():
+            respuesta_cache = self.cache_respuestas.obtener(mensaje_usuario, version)
+        if respuesta_cache:
+            self.historial.append({'rol': 'usuario', 'mensaje': mensaje_usuario})
+            self.historial.append({'rol': 'asistente', 'mensaje': respuesta_cache})
+            return {
+                'exito': True,
+                'respuesta': respuesta_cache,
+                'tipo': 'ia',
+                'desde_cache': True
+            }
+
         # Obtener contexto completo
         try:
-            contexto = self.obtener_contexto_completo()
+            prompt, sistema, contexto, con_historial = self._construir_prompt(mensaje_usuario)
         except Exception as e:
             print(f"❌ Error al obtener contexto: {e}")
             return {
@@ -139,109 +124,61 @@ INSTRUCCIONES:
                 'tipo': 'error'
             }
 
-        # Construir historial de conversación
-        historial_texto = ""
-        for msg in self.historial[-4:]:  # Últimos 4 mensajes
-            rol = "Usuario" if msg['rol'] == 'usuario' else "Asistente"
-            historial_texto += f"{rol}: {msg['mensaje']}\n"
-
-        # Construir prompt completo
-        prompt = f"""{contexto}
-
-HISTORIAL RECIENTE:
-{historial_texto if historial_texto else "(Nueva conversación)"}
-
-Usuario: {mensaje_usuario}
-
-Asistente (responde de forma útil y específica basándote en los datos):"""
-
         try:
-            # ✅ Payload optimizado
-            payload = {
-                "model": self.modelo,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.7,
-                    "num_predict": self.max_tokens,
-                    "top_k": 40,
-                    "top_p": 0.9,
-                    "repeat_penalty": 1.1
-                }
-            }
+            payload = self._construir_payload(prompt, stream, sistema, contexto)
 
-            print(f"🤖 Enviando a Ollama (modelo: {self.modelo}, timeout: {self.timeout}s, max_tokens: {self.max_tokens})...")
-            response = requests.post(self.url, json=payload, timeout=self.timeout)
+            print(f"🤖 Enviando a Ollama (modelo: {self.modelo}, timeout: {self.timeout}s, max_tokens: {self.max_tokens}, stream: {stream})...")
+            response = self.cliente.generar(payload, stream=stream)
 
             print(f"📡 Status Code: {response.status_code}")
 
-            if response.status_code == 200:
-                response_data = response.json()
-                respuesta = response_data.get('response', '').strip()
+            if response.status_code != 200:
+                return self._error_por_status(response)
 
-                if not respuesta:
+            if stream:
+                respuesta, cancelada, error, contexto_nuevo = self._leer_stream(
+                    response, al_recibir_token, cancelar)
+                if error:
                     return {
                         'exito': False,
-                        'error': "Ollama no generó respuesta. Verifica que el modelo esté cargado correctamente.",
+                        'error': f"Error de Ollama: {error}",
                         'tipo': 'error'
                     }
+                if cancelada:
+                    return {
+                        'exito': False,
+                        'error': "Generación cancelada por el usuario.",
+                        'respuesta': respuesta.strip(),
+                        'tipo': 'cancelado'
+                    }
+            else:
+                response_data = response.json()
+                respuesta = response_data.get('response', '')
+                contexto_nuevo = response_data.get('context')
 
-                # Guardar en historial
-                self.historial.append({'rol': 'usuario', 'mensaje': mensaje_usuario})
-                self.historial.append({'rol': 'asistente', 'mensaje': respuesta})
+            respuesta = respuesta.strip()
 
-                return {
-                    'exito': True,
-                    'respuesta': respuesta,
-                    'tipo': 'ia'
-                }
-            elif response.status_code == 404:
+            if not respuesta:
                 return {
                     'exito': False,
-                    'error': f"""❌ Modelo '{self.modelo}' no encontrado
-
-💡 Solución:
-1. Abre una terminal
-2. Ejecuta: ollama pull {self.modelo}
-3. Espera a que descargue
-4. Vuelve a intentar aquí
-
-Si el modelo tarda mucho, prueba uno más ligero:
-• ollama pull llama3.2:1b (más rápido)""",
+                    'error': "Ollama no generó respuesta. Verifica que el modelo esté cargado correctamente.",
                     'tipo': 'error'
                 }
-            elif response.status_code == 500:
-                try:
-                    error_data = response.json()
-                    error_msg = error_data.get('error', 'Error desconocido')
-                except:
-                    error_msg = response.text[:200]
-
-                print(f"❌ Error 500 de Ollama: {error_msg}")
-
-                return {
-                    'exito': False,
-                    'error': f"""❌ Error interno de Ollama
 
-Posibles causas:
-1. Ollama no está ejecutándose correctamente
-2. El modelo está corrupto o no cargó bien
-3. Memoria insuficiente (RAM/VRAM)
+            # Guardar en historial
+            self.historial.append({'rol': 'usuario', 'mensaje': mensaje_usuario})
+            self.historial.append({'rol': 'asistente', 'mensaje': respuesta})
 
-💡 Soluciones:
-• Reinicia Ollama: Cierra la terminal de ollama y ejecuta nuevamente: ollama serve
-• Recarga el modelo: ollama pull {self.modelo}
-• Prueba un modelo más ligero: ollama pull llama3.2:1b
+            # Conservar el contexto para no re-evaluar el prompt en el siguiente turno
+            self._guardar_contexto_ollama(contexto_nuevo)
+            if not con_historial:
+                self.cache_respuestas.guardar(mensaje_usuario, respuesta, version, contexto)
 
-Detalles: {error_msg[:100]}""",
-                    'tipo': 'error'
-                }
-            else:
-                return {
-                    'exito': False,
-                    'error': f"Error de Ollama (código {response.status_code}). Verifica el servicio.",
-                    'tipo': 'error'
-                }
+            return {
+                'exito': True,
+                'respuesta': respuesta,
+                'tipo': 'ia'
+            }
 
         except requests.exceptions.ConnectionError:
             return {
@@ -283,6 +220,210 @@ Posibles causas:
                 'tipo': 'error'
             }
 
+    def _construir_prompt(self, mensaje_usuario):
+        """
+        Construye el prompt del turno.
+        Retorna (prompt, sistema, contexto, con_historial): si el contexto de Ollama
+        sigue vigente solo se envía el mensaje nuevo; si no, el bloque de datos e
+        historial. con_historial indica si la respuesta depende de turnos previos
+        """
+        if self._contexto_vigente():
+            return f"Usuario: {mensaje_usuario}\n\nAsistente:", None, self.contexto_ollama, True
+
+        # Reiniciar la conversación en Ollama con datos actualizados
+        self.contexto_ollama = None
+        self.turnos_contexto = 0
+        self.version_contexto = self.gestor_datos.version
+
+        sistema = self.constructor_contexto.obtener_sistema()
+        bloque = self.constructor_contexto.obtener_bloque_datos()
+
+        # Construir historial de conversación
+        historial_texto = ""
+        for msg in self.historial[-4:]:  # Últimos 4 mensajes
+            rol = "Usuario" if msg['rol'] == 'usuario' else "Asistente"
+            historial_texto += f"{rol}: {msg['mensaje']}\n"
+
+        prompt = f"""{bloque}
+
+HISTORIAL RECIENTE:
+{historial_texto if historial_texto else "(Nueva conversación)"}
+
+Usuario: {mensaje_usuario}
+
+Asistente (responde de forma útil y específica basándote en los datos):"""
+
+        return prompt, sistema, None, bool(historial_texto)
+
+    def _depende_de_conversacion(self):
+        """Indica si el prompt de este turno llevará turnos previos (contexto o historial)"""
+        return self._contexto_vigente() or bool(self.historial)
+
+    def _contexto_vigente(self):
+        """Indica si el contexto de Ollama se puede reutilizar en este turno"""
+        return (self.contexto_ollama is not None
+                and self.version_contexto == self.gestor_datos.version
+                and self.turnos_contexto < config.CHAT_MAX_TURNOS_CONTEXTO)
+
+    def _guardar_contexto_ollama(self, contexto):
+        """Guarda el contexto devuelto por Ollama al terminar un turno"""
+        if contexto:
+            self.contexto_ollama = contexto
+            self.turnos_contexto += 1
+        else:
+            self.contexto_ollama = None
+
+    def _construir_payload(self, prompt, stream, sistema=None, contexto=None):
+        """Construye el payload para la API de Ollama"""
+        payload = {
+            "model": self.modelo,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": config.OLLAMA_KEEP_ALIVE,
+            "options": {
+                "temperature": 0.7,
+                "num_predict": self.max_tokens,
+                "top_k": 40,
+                "top_p": 0.9,
+                "repeat_penalty": 1.1
+            }
+        }
+
+        if sistema:
+            payload["system"] = sistema
+        if contexto:
+            payload["context"] = contexto
+
+        return payload
+
+    @instrumentar('ollama.stream')
+    def _leer_stream(self, response, al_recibir_token, cancelar):
+        """
+        Lee la respuesta NDJSON línea por línea.
+        Retorna (texto acumulado, fue_cancelada, mensaje_error, contexto)
+        """
+        fragmentos = []
+        contexto = None
+        terminado = threading.Event()
+        if cancelar is not None:
+            # iter_lines bloquea hasta el siguiente token: otro hilo corta la conexión
+            # en cuanto se cancela, sin esperar a que Ollama produzca algo
+            threading.Thread(target=self._vigilar_cancelacion, args=(response, cancelar, terminado),
+                             name="cancelar_stream", daemon=True).start()
+        try:
+            for linea in response.iter_lines():
+                if cancelar is not None and cancelar.is_set():
+                    print("⏹️ Generación cancelada")
+                    return "".join(fragmentos), True, None, None
+
+                if not linea:
+                    continue
+
+                try:
+                    datos = json.loads(linea)
+                except ValueError:
+                    continue
+
+                if 'error' in datos:
+                    return "".join(fragmentos), False, datos['error'], None
+
+                token = datos.get('response', '')
+                if token:
+                    fragmentos.append(token)
+                    if al_recibir_token:
+                        al_recibir_token(token)
+
+                if datos.get('done'):
+                    contexto = datos.get('context')
+                    break
+            else:
+                if cancelar is not None and cancelar.is_set():
+                    print("⏹️ Generación cancelada")
+                    return "".join(fragmentos), True, None, None
+        except requests.exceptions.RequestException:
+            # La conexión cortada por la cancelación termina la lectura con error
+            if cancelar is None or not cancelar.is_set():
+                raise
+            print("⏹️ Generación cancelada")
+            return "".join(fragmentos), True, None, None
+        finally:
+            terminado.set()
+            # Cerrar la conexión libera a Ollama si se canceló a media generación
+            response.close()
+
+        return "".join(fragmentos), False, None, contexto
+
+    @staticmethod
+    def _vigilar_cancelacion(response, cancelar, terminado):
+        """Corta la conexión del stream si se cancela antes de terminar de leerlo"""
+        while not terminado.is_set():
+            if not cancelar.wait(0.1):
+                continue
+            if terminado.is_set():
+                return
+            # Cerrar la respuesta no despierta un recv bloqueado; apagar el socket sí.
+            # Tras leerse completa, urllib3 ya soltó la conexión y aquí no hay socket
+            conexion = getattr(response.raw, 'connection', None)
+            sock = getattr(conexion, 'sock', None)
+            if sock is None:
+                response.close()
+                return
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            return
+
+    def _error_por_status(self, response):
+        """Traduce un código de estado HTTP de Ollama a un resultado de error"""
+        if response.status_code == 404:
+            return {
+                'exito': False,
+                'error': f"""❌ Modelo '{self.modelo}' no encontrado
+
+💡 Solución:
+1. Abre una terminal
+2. Ejecuta: ollama pull {self.modelo}
+3. Espera a que descargue
+4. Vuelve a intentar aquí
+
+Si el modelo tarda mucho, prueba uno más ligero:
+• ollama pull llama3.2:1b (más rápido)""",
+                'tipo': 'error'
+            }
+        elif response.status_code == 500:
+            try:
+                error_data = response.json()
+                error_msg = error_data.get('error', 'Error desconocido')
+            except:
+                error_msg = response.text[:200]
+
+            print(f"❌ Error 500 de Ollama: {error_msg}")
+
+            return {
+                'exito': False,
+                'error': f"""❌ Error interno de Ollama
+
+Posibles causas:
+1. Ollama no está ejecutándose correctamente
+2. El modelo está corrupto o no cargó bien
+3. Memoria insuficiente (RAM/VRAM)
+
+💡 Soluciones:
+• Reinicia Ollama: Cierra la terminal de ollama y ejecuta nuevamente: ollama serve
+• Recarga el modelo: ollama pull {self.modelo}
+• Prueba un modelo más ligero: ollama pull llama3.2:1b
+
+Detalles: {error_msg[:100]}""",
+                'tipo': 'error'
+            }
+        else:
+            return {
+                'exito': False,
+                'error': f"Error de Ollama (código {response.status_code}). Verifica el servicio.",
+                'tipo': 'error'
+            }
+
     def detectar_comando(self, mensaje):
         """Detecta si el mensaje es un comando especial"""
         mensaje_lower = mensaje.lower().strip()
@@ -462,6 +603,8 @@ Salud: {salud.get('nivel', 'N/A')}
     def limpiar_historial(self):
         """Limpia el historial de conversación"""
         self.historial = []
+        self.contexto_ollama = None
+        self.turnos_contexto = 0
 
     def obtener_comandos_disponibles(self):
         """Retorna lista de comandos disponibles"""
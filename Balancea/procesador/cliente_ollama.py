@@ -0,0 +1,116 @@
+"""
+Cliente HTTP de Ollama
+Conexiones persistentes, reintentos y caché de disponibilidad
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+from utils.instrumentacion import instrumentar
+
+
+class ClienteOllama:
+    """Cliente de Ollama con pool de conexiones keep-alive"""
+
+    # Errores 5xx que suelen ser transitorios (proxy, servicio reiniciando)
+    ESTADOS_REINTENTABLES = (502, 503, 504)
+
+    def __init__(self, host=None, timeout=None, timeout_conexion=None,
+                 reintentos=None, cache_salud_segundos=None):
+        self.host = (host or config.OLLAMA_HOST).rstrip('/')
+        self.timeout = timeout if timeout is not None else config.OLLAMA_TIMEOUT
+        self.timeout_conexion = (timeout_conexion if timeout_conexion is not None
+                                 else config.OLLAMA_TIMEOUT_CONEXION)
+        self.reintentos = reintentos if reintentos is not None else config.OLLAMA_REINTENTOS
+        self.cache_salud_segundos = (cache_salud_segundos if cache_salud_segundos is not None
+                                     else config.OLLAMA_CACHE_SALUD_SEGUNDOS)
+
+        self.url_generar = f"{self.host}/api/generate"
+        self.url_modelos = f"{self.host}/api/tags"
+        self.url_embeddings = f"{self.host}/api/embeddings"
+
+        self.session = self._crear_sesion()
+
+        # Caché de la verificación de salud: (momento, disponible)
+        self._salud = None
+        self._lock_salud = threading.Lock()
+
+    def _crear_sesion(self):
+        """Crea la sesión con pool de conexiones y política de reintentos"""
+        politica = Retry(
+            total=self.reintentos,
+            connect=1,  # Si Ollama no está corriendo, fallar rápido
+            read=0,  # No repetir una generación que ya empezó
+            status=self.reintentos,
+            backoff_factor=0.5,
+            status_forcelist=self.ESTADOS_REINTENTABLES,
+            allowed_methods=frozenset(['GET', 'POST']),
+            raise_on_status=False
+        )
+
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=politica)
+
+        sesion = requests.Session()
+        sesion.mount('http://', adaptador)
+        sesion.mount('https://', adaptador)
+        sesion.headers.update({'Connection': 'keep-alive'})
+        return sesion
+
+    @instrumentar('ollama.generar')
+    def generar(self, payload, stream=False):
+        """Envía una solicitud a /api/generate reutilizando la conexión"""
+        return self.session.post(self.url_generar, json=payload, stream=stream,
+                                 timeout=(self.timeout_conexion, self.timeout))
+
+    @instrumentar('ollama.embedding')
+    def obtener_embedding(self, texto, modelo=None):
+        """Calcula el embedding de un texto con un modelo local"""
+        response = self.session.post(self.url_embeddings,
+                                     json={'model': modelo or config.OLLAMA_MODELO_EMBEDDINGS,
+                                           'prompt': texto},
+                                     timeout=(self.timeout_conexion, self.timeout))
+        response.raise_for_status()
+        return response.json()['embedding']
+
+    def verificar_disponible(self, forzar=False):
+        """Verifica si Ollama responde, usando el resultado en caché si es reciente"""
+        with self._lock_salud:
+            ahora = time.monotonic()
+            if (not forzar and self._salud is not None
+                    and ahora - self._salud[0] < self.cache_salud_segundos):
+                return self._salud[1]
+
+            try:
+                response = self.session.get(self.url_modelos,
+                                            timeout=(self.timeout_conexion, 2))
+                disponible = response.status_code == 200
+            except requests.exceptions.RequestException:
+                disponible = False
+
+            self._salud = (time.monotonic(), disponible)
+            return disponible
+
+    def listar_modelos(self):
+        """Retorna los nombres de los modelos instalados en Ollama"""
+        try:
+            response = self.session.get(self.url_modelos,
+                                        timeout=(self.timeout_conexion, self.timeout))
+            if response.status_code != 200:
+                return []
+            return [m.get('name') for m in response.json().get('models', [])]
+        except (requests.exceptions.RequestException, ValueError):
+            return []
+
+    def invalidar_salud(self):
+        """Descarta el resultado en caché de la verificación"""
+        with self._lock_salud:
+            self._salud = None
+
+    def cerrar(self):
+        """Cierra las conexiones del pool"""
+        self.session.close()
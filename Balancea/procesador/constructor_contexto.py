@@ -0,0 +1,221 @@
+"""
+Constructor de Contexto Financiero
+Bloque de datos compacto y en caché para los prompts del LLM
+"""
+
+from datetime import datetime, timedelta
+
+import config
+from procesador.analizador import AnalizadorFinanciero
+
+
+# Instrucciones estáticas: se envían como 'system' una sola vez por conversación
+SISTEMA_CON_DATOS = """Eres un asistente financiero personal experto y amigable llamado 'Balancea AI'.
+
+INSTRUCCIONES:
+- Responde en español de manera clara, concisa y amigable
+- Usa los datos proporcionados para dar respuestas específicas
+- Si el usuario pregunta sobre su situación financiera, usa los números exactos
+- Da consejos prácticos y accionables
+- Si no tienes suficiente información, menciona qué datos necesitas
+- Mantén las respuestas breves (máximo 3-4 párrafos)
+- Usa emojis apropiados para hacer la conversación más amigable
+- Si detectas problemas en las finanzas, sé empático pero honesto"""
+
+SISTEMA_SIN_DATOS = """Eres un asistente financiero personal experto y amigable llamado 'Balancea AI'.
+
+SITUACIÓN: El usuario aún no tiene transacciones registradas, pero puedes ayudarlo.
+
+PUEDES HACER:
+- Responder preguntas generales sobre finanzas personales
+- Dar consejos sobre cómo empezar a gestionar sus finanzas
+- Explicar conceptos financieros básicos (ahorro, inversión, presupuesto, etc.)
+- Motivar al usuario a comenzar a registrar sus transacciones
+- Responder dudas sobre cómo usar la aplicación Balancea
+- Dar tips de educación financiera
+
+INSTRUCCIONES:
+- Responde en español de manera clara, concisa y amigable
+- Da consejos prácticos sobre gestión financiera
+- Si te preguntan sobre sus finanzas específicas, menciona que necesitas que registre transacciones primero
+- Mantén las respuestas breves (máximo 3-4 párrafos)
+- Usa emojis apropiados para hacer la conversación más amigable
+- Sé empático y motivador
+- Cuando sea relevante, sugiere usar el botón "Generar Demo" para explorar la app"""
+
+
+class ConstructorContexto:
+    """Construye el bloque de datos financieros respetando un presupuesto de tokens"""
+
+    CARACTERES_POR_TOKEN = 4  # Aproximación para modelos tipo Llama
+
+    def __init__(self, gestor_datos, analizador=None, max_tokens=None):
+        self.gestor_datos = gestor_datos
+        self.analizador = analizador or AnalizadorFinanciero(gestor_datos)
+        self.max_tokens = max_tokens or config.CHAT_CONTEXTO_MAX_TOKENS
+
+        # Caché del bloque renderizado: (clave, bloque)
+        self._cache = None
+
+    @classmethod
+    def estimar_tokens(cls, texto):
+        """Estima el número de tokens de un texto"""
+        return len(texto) // cls.CARACTERES_POR_TOKEN + 1
+
+    def obtener_sistema(self):
+        """Retorna las instrucciones estáticas del asistente"""
+        if self.gestor_datos.transacciones:
+            return SISTEMA_CON_DATOS
+        return SISTEMA_SIN_DATOS
+
+    def obtener_bloque_datos(self):
+        """Retorna el bloque de datos, recalculándolo solo si cambió el libro"""
+        # La fecha forma parte de la clave: las tendencias dependen del día
+        clave = (self.gestor_datos.version, self.max_tokens,
+                 datetime.now().strftime('%Y-%m-%d'))
+
+        if self._cache is not None and self._cache[0] == clave:
+            return self._cache[1]
+
+        bloque = self._construir_bloque()
+        self._cache = (clave, bloque)
+        return bloque
+
+    def invalidar(self):
+        """Descarta el bloque en caché"""
+        self._cache = None
+
+    def _construir_bloque(self):
+        """Ensambla las secciones por prioridad hasta agotar el presupuesto"""
+        if not self.gestor_datos.transacciones:
+            return ""
+
+        # El resumen siempre se incluye completo
+        lineas = self._seccion_resumen()
+        usados = self.estimar_tokens("\n".join(lineas))
+
+        # Prioridad: categorías principales, alertas activas, tendencias recientes
+        for seccion in (self._seccion_categorias(), self._seccion_alertas(),
+                        self._seccion_tendencias()):
+            if not seccion:
+                continue
+
+            encabezado, elementos = seccion[0], seccion[1:]
+            costo_encabezado = self.estimar_tokens(encabezado)
+            agregados = []
+
+            for elemento in elementos:
+                costo = self.estimar_tokens(elemento)
+                extra = costo_encabezado if not agregados else 0
+                if usados + extra + costo > self.max_tokens:
+                    break
+                agregados.append(elemento)
+                usados += extra + costo
+
+            if agregados:
+                lineas.append("")
+                lineas.append(encabezado)
+                lineas.extend(agregados)
+
+        return "\n".join(lineas)
+
+    def _seccion_resumen(self):
+        """Totales generales y salud financiera"""
+        balance = self.gestor_datos.obtener_balance()
+        ingresos = self.gestor_datos.obtener_total_ingresos()
+        gastos = self.gestor_datos.obtener_total_gastos()
+        salud = self.analizador.obtener_resumen_salud_financiera()
+
+        return [
+            "DATOS FINANCIEROS DEL USUARIO:",
+            f"💰 Balance Total: ${balance:,.2f}",
+            f"📈 Total Ingresos: ${ingresos:,.2f}",
+            f"📉 Total Gastos: ${gastos:,.2f}",
+            f"📊 Tasa de Ahorro: {salud.get('tasa_ahorro', 0):.1f}%",
+            f"💚 Salud Financiera: {salud.get('nivel', 'N/A')} ({salud.get('puntuacion', 0)}/100)",
+            f"📝 Transacciones Registradas: {len(self.gestor_datos.transacciones)}",
+        ]
+
+    def _seccion_categorias(self):
+        """Categorías de gasto ordenadas por monto"""
+        gastos_cat = self.gestor_datos.obtener_gastos_por_categoria()
+        if not gastos_cat:
+            return None
+
+        total = sum(gastos_cat.values())
+        seccion = ["DISTRIBUCIÓN DE GASTOS POR CATEGORÍA:"]
+        for cat, monto in sorted(gastos_cat.items(), key=lambda x: x[1], reverse=True):
+            porcentaje = (monto / total * 100) if total > 0 else 0
+            seccion.append(f"  • {cat}: ${monto:,.2f} ({porcentaje:.1f}%)")
+
+        return seccion
+
+    def _seccion_alertas(self):
+        """Alertas activas del analizador"""
+        try:
+            alertas = self.analizador.analizar_todo()
+        except Exception as e:
+            print(f"Error al obtener alertas: {e}")
+            return None
+
+        if not alertas:
+            return None
+
+        seccion = [f"⚠️ ALERTAS ACTIVAS ({len(alertas)}):"]
+        seccion.extend(f"- {a['titulo']}: {a['mensaje']}" for a in alertas)
+        return seccion
+
+    def _seccion_tendencias(self):
+        """Gasto de los últimos 30 días contra los 30 anteriores (una sola pasada)"""
+        hoy = datetime.now()
+        inicio_reciente = (hoy - timedelta(days=30)).strftime('%Y-%m-%d')
+        inicio_previo = (hoy - timedelta(days=60)).strftime('%Y-%m-%d')
+
+        gasto_reciente = 0
+        gasto_previo = 0
+        ingreso_reciente = 0
+        delta_categoria = {}
+
+        for t in self.gestor_datos.transacciones:
+            fecha = t['fecha']
+            if fecha < inicio_previo:
+                continue
+
+            # Centavos en moneda base: no se suman montos de monedas distintas
+            centavos = self.gestor_datos.centavos_en_base(t)
+            reciente = fecha >= inicio_reciente
+            if t['tipo'] == 'Ingreso':
+                if reciente:
+                    ingreso_reciente += centavos
+                continue
+
+            signo = 1 if reciente else -1
+            if reciente:
+                gasto_reciente += centavos
+            else:
+                gasto_previo += centavos
+            delta_categoria[t['categoria']] = delta_categoria.get(t['categoria'], 0) + signo * centavos
+
+        if not gasto_reciente and not gasto_previo and not ingreso_reciente:
+            return None
+
+        gasto_reciente /= 100
+        gasto_previo /= 100
+        ingreso_reciente /= 100
+        delta_categoria = {cat: centavos / 100 for cat, centavos in delta_categoria.items()}
+
+        seccion = ["📅 TENDENCIA RECIENTE (últimos 30 días):"]
+
+        linea_gasto = f"- Gastos: ${gasto_reciente:,.2f}"
+        if gasto_previo > 0:
+            variacion = (gasto_reciente - gasto_previo) / gasto_previo * 100
+            linea_gasto += f" ({variacion:+.1f}% vs 30 días previos)"
+        seccion.append(linea_gasto)
+        seccion.append(f"- Ingresos: ${ingreso_reciente:,.2f}")
+
+        if delta_categoria:
+            cat_max = max(delta_categoria, key=delta_categoria.get)
+            if delta_categoria[cat_max] > 0:
+                seccion.append(f"- Mayor aumento: {cat_max} (+${delta_categoria[cat_max]:,.2f})")
+
+        return seccion
@@ -0,0 +1,282 @@
+"""
+Motor de Consultas Financieras
+Responde preguntas estructuradas directamente desde los datos, sin usar el LLM
+"""
+
+import heapq
+import re
+from datetime import datetime
+
+import config
+from procesador.cache_respuestas import normalizar_pregunta
+
+
+MESES = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
+    'julio': 7, 'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10,
+    'noviembre': 11, 'diciembre': 12
+}
+
+# Palabras comunes que el usuario usa en lugar del nombre de la categoría
+SINONIMOS_CATEGORIA = {
+    'comida': 'Alimentación', 'super': 'Alimentación', 'supermercado': 'Alimentación',
+    'restaurante': 'Alimentación', 'restaurantes': 'Alimentación', 'despensa': 'Alimentación',
+    'gasolina': 'Transporte', 'uber': 'Transporte', 'taxi': 'Transporte', 'auto': 'Transporte',
+    'luz': 'Servicios', 'agua': 'Servicios', 'internet': 'Servicios', 'telefono': 'Servicios',
+    'renta': 'Hogar', 'cine': 'Entretenimiento', 'netflix': 'Entretenimiento',
+    'salidas': 'Entretenimiento', 'doctor': 'Salud', 'farmacia': 'Salud', 'medicinas': 'Salud',
+    'escuela': 'Educación', 'cursos': 'Educación', 'libros': 'Educación',
+    'sueldo': 'Salario', 'nomina': 'Salario', 'quincena': 'Salario',
+}
+
+PALABRAS_INGRESO = ('ingrese', 'ingresos', 'ingreso', 'gane', 'ganado', 'recibi', 'cobre')
+PALABRAS_GASTO = ('gaste', 'gastos', 'gasto', 'gastado', 'pague', 'pagado')
+
+# Preguntas por el estado del presupuesto (las demás sobre presupuestos van al LLM)
+PATRON_ESTADO_PRESUPUESTO = (r'\bcomo voy\b|\bcomo van?\b|\bme queda\b'
+                             r'|\bestado\b|\brestante\b|\bme (?:he )?pasado\b|\bexcedi')
+
+# "¿Cuánto...?" que piden un hábito o un consejo, no un total: van al LLM
+PATRON_CALIFICADOR_MONTO = r'\bpromedio\b|\bnormalmente\b|\busualmente\b|\bdeberia\b|\bconviene\b'
+
+
+class MotorConsultas:
+    """Detecta la intención de una pregunta y la responde desde los índices del libro"""
+
+    def __init__(self, gestor_datos, gestor_presupuestos=None):
+        self.gestor_datos = gestor_datos
+        # El gestor compartido de la app; sin él, las preguntas de presupuesto van al LLM
+        self.gestor_presupuestos = gestor_presupuestos
+
+    def responder(self, mensaje):
+        """Retorna la respuesta calculada o None si la pregunta es abierta"""
+        texto = normalizar_pregunta(mensaje)
+        if not texto:
+            return None
+
+        try:
+            if 'presupuesto' in texto:
+                if self.gestor_presupuestos is not None and self._es_consulta_presupuesto(texto):
+                    return self.responder_presupuesto(texto)
+                return None
+
+            if re.search(r'\bcompara|\bvs\b|\bversus\b|\bcontra\b', texto):
+                respuesta = self.responder_comparacion(texto)
+                if respuesta:
+                    return respuesta
+
+            if re.search(r'\btop\b|\bmayores\b|\bmas grandes\b|\bprincipales\b', texto) \
+                    and re.search(r'\bgastos?\b', texto):
+                return self.responder_top(texto)
+
+            if self._es_consulta_monto(texto):
+                return self.responder_monto(texto)
+        except Exception as e:
+            print(f"Error en consulta local: {e}")
+
+        return None
+
+    # ===== INTENCIONES =====
+
+    def responder_monto(self, texto):
+        """¿Cuánto gasté/ingresé [en categoría] [en periodo]?"""
+        tipo = self._detectar_tipo(texto)
+        categoria = self._detectar_categoria(texto)
+        periodo = self._detectar_periodos(texto)
+        etiqueta, meses = periodo[0] if periodo else ('en total', None)
+
+        total = self._sumar(tipo, categoria, meses)
+
+        verbo = "Gastaste" if tipo == 'Gasto' else "Recibiste"
+        destino = f" en {categoria}" if categoria else ""
+        respuesta = f"💵 {verbo} ${total:,.2f}{destino} {etiqueta}."
+
+        if categoria and tipo == 'Gasto':
+            total_tipo = self._sumar(tipo, None, meses)
+            if total_tipo > 0:
+                respuesta += f"\nEso es el {total / total_tipo * 100:.1f}% de tus gastos en ese periodo."
+
+        return respuesta
+
+    def responder_top(self, texto):
+        """Top N gastos más grandes [del periodo]"""
+        coincidencia = re.search(r'\b(\d{1,2})\b', texto)
+        n = min(int(coincidencia.group(1)), 20) if coincidencia else 5
+        categoria = self._detectar_categoria(texto)
+        periodo = self._detectar_periodos(texto)
+        etiqueta, meses = periodo[0] if periodo else ('en total', None)
+        meses = set(meses) if meses else None
+
+        candidatos = (t for t in self.gestor_datos.transacciones
+                      if t['tipo'] == 'Gasto'
+                      and (categoria is None or t['categoria'] == categoria)
+                      and (meses is None or t['fecha'][:7] in meses))
+        top = heapq.nlargest(n, candidatos, key=lambda t: t['monto'])
+
+        if not top:
+            return f"📭 No encontré gastos {etiqueta}."
+
+        lineas = [f"💰 Top {len(top)} gastos {etiqueta}:"]
+        for i, t in enumerate(top, 1):
+            lineas.append(f"{i}. {t['descripcion']} ({t['categoria']}, {t['fecha']}): ${t['monto']:,.2f}")
+        return "\n".join(lineas)
+
+    def responder_comparacion(self, texto):
+        """Compara gastos e ingresos entre dos meses"""
+        periodos = self._detectar_periodos(texto)
+
+        if len(periodos) == 1 and re.search(r'\banterior\b|\bpasado\b', texto):
+            # "compara este mes con el anterior"
+            etiqueta, meses = periodos[0]
+            previo = self._mes_anterior(meses[0])
+            periodos.append((self._etiqueta_mes(previo), [previo]))
+
+        if len(periodos) < 2:
+            return None
+
+        (etiqueta_a, meses_a), (etiqueta_b, meses_b) = periodos[:2]
+        categoria = self._detectar_categoria(texto)
+        destino = f" en {categoria}" if categoria else ""
+
+        lineas = [f"🔄 Comparativa{destino}: {etiqueta_a} vs {etiqueta_b}"]
+        for tipo, nombre in (('Gasto', 'Gastos'), ('Ingreso', 'Ingresos')):
+            a = self._sumar(tipo, categoria, meses_a)
+            b = self._sumar(tipo, categoria, meses_b)
+            diferencia = a - b
+            variacion = f" ({diferencia / b * 100:+.1f}%)" if b else ""
+            lineas.append(f"{nombre}: ${a:,.2f} vs ${b:,.2f} → {diferencia:+,.2f}{variacion}")
+
+        return "\n".join(lineas)
+
+    def responder_presupuesto(self, texto):
+        """Estado de los presupuestos en su periodo actual"""
+        gestor = self.gestor_presupuestos
+
+        if not gestor.presupuestos:
+            return "📋 No tienes presupuestos configurados. Créalos en la pestaña 'Presupuestos'."
+
+        categoria = self._detectar_categoria(texto)
+        if categoria and categoria not in gestor.presupuestos:
+            return f"📋 No tienes presupuesto para {categoria}."
+
+        categorias = [categoria] if categoria else sorted(gestor.presupuestos)
+        lineas = ["💼 Estado de tus presupuestos en el periodo actual:"]
+        for cat in categorias:
+            estado = gestor.obtener_estado(cat)
+            porcentaje = estado['porcentaje']
+            icono = "🔴" if porcentaje >= 100 else "🟡" if porcentaje >= 80 else "🟢"
+            lineas.append(f"{icono} {cat}: ${estado['gastado']:,.2f} de ${estado['disponible']:,.2f} ({porcentaje:.1f}%)"
+                          f" | Restante: ${estado['restante']:,.2f}")
+
+        return "\n".join(lineas)
+
+    # ===== EXTRACCIÓN DE ENTIDADES =====
+
+    def _es_consulta_presupuesto(self, texto):
+        """Pregunta por el estado (cómo voy, cuánto me queda) o nombra una categoría presupuestada"""
+        if re.search(PATRON_ESTADO_PRESUPUESTO, texto):
+            return True
+        categoria = self._detectar_categoria(texto)
+        return categoria is not None and categoria in self.gestor_presupuestos.presupuestos
+
+    def _es_consulta_monto(self, texto):
+        """
+        ¿Cuánto gasté/ingresé...? con un periodo, una categoría o 'en total' explícitos
+        y sin calificadores (promedio, normalmente, debería...)
+        """
+        if not re.search(r'\bcuanto\b', texto) or not self._detectar_tipo(texto):
+            return False
+        if re.search(PATRON_CALIFICADOR_MONTO, texto):
+            return False
+        return bool(self._detectar_periodos(texto) or self._detectar_categoria(texto)
+                    or re.search(r'\ben total\b', texto))
+
+    def _detectar_tipo(self, texto):
+        """Detecta si la pregunta es sobre gastos o ingresos"""
+        palabras = set(texto.split())
+        if palabras.intersection(PALABRAS_INGRESO):
+            return 'Ingreso'
+        if palabras.intersection(PALABRAS_GASTO):
+            return 'Gasto'
+        return None
+
+    def _detectar_categoria(self, texto):
+        """Busca una categoría conocida (o un sinónimo) en el texto"""
+        relleno = f" {texto} "
+        for categorias in self.gestor_datos.categorias.values():
+            for categoria in categorias:
+                if f" {normalizar_pregunta(categoria)} " in relleno:
+                    return categoria
+
+        conocidas = {c for categorias in self.gestor_datos.categorias.values() for c in categorias}
+        for palabra in texto.split():
+            if SINONIMOS_CATEGORIA.get(palabra) in conocidas:
+                return SINONIMOS_CATEGORIA[palabra]
+
+        return None
+
+    def _detectar_periodos(self, texto):
+        """
+        Detecta periodos mencionados, en orden de aparición.
+        Retorna lista de (etiqueta, ['YYYY-MM', ...])
+        """
+        hoy = datetime.now()
+        mes_actual = f"{hoy.year:04d}-{hoy.month:02d}"
+        encontrados = []
+
+        for m in re.finditer(r'\beste mes\b', texto):
+            encontrados.append((m.start(), 'este mes', [mes_actual]))
+
+        for m in re.finditer(r'\b(?:el )?mes (?:pasado|anterior)\b', texto):
+            previo = self._mes_anterior(mes_actual)
+            encontrados.append((m.start(), f"en {self._etiqueta_mes(previo)}", [previo]))
+
+        for m in re.finditer(r'\bultimos (\d{1,2}) meses\b', texto):
+            n = int(m.group(1))
+            meses = [mes_actual]
+            for _ in range(n - 1):
+                meses.append(self._mes_anterior(meses[-1]))
+            encontrados.append((m.start(), f"en los últimos {n} meses", meses))
+
+        for m in re.finditer(r'\beste ano\b', texto):
+            meses = [f"{hoy.year:04d}-{mes:02d}" for mes in range(1, 13)]
+            encontrados.append((m.start(), f"en {hoy.year}", meses))
+
+        patron_meses = '|'.join(MESES)
+        for m in re.finditer(rf'\b({patron_meses})\b(?: (?:de |del )?(\d{{4}}))?', texto):
+            numero = MESES[m.group(1)]
+            if m.group(2):
+                año = int(m.group(2))
+            else:
+                # Un mes futuro sin año se refiere al del año pasado
+                año = hoy.year if numero <= hoy.month else hoy.year - 1
+            clave = f"{año:04d}-{numero:02d}"
+            encontrados.append((m.start(), f"en {self._etiqueta_mes(clave)}", [clave]))
+
+        encontrados.sort(key=lambda x: x[0])
+        return [(etiqueta, meses) for _, etiqueta, meses in encontrados]
+
+    # ===== CÁLCULOS =====
+
+    def _sumar(self, tipo, categoria=None, meses=None):
+        """Suma el índice mensual para un tipo, categoría y conjunto de meses"""
+        indice = self.gestor_datos.obtener_indice_mensual()
+        meses = set(meses) if meses else None
+
+        return sum(monto for (t, cat, mes), monto in indice.items()
+                   if t == tipo
+                   and (categoria is None or cat == categoria)
+                   and (meses is None or mes in meses))
+
+    @staticmethod
+    def _mes_anterior(clave_mes):
+        """'2025-01' -> '2024-12'"""
+        año, mes = int(clave_mes[:4]), int(clave_mes[5:7])
+        if mes == 1:
+            return f"{año - 1:04d}-12"
+        return f"{año:04d}-{mes - 1:02d}"
+
+    @staticmethod
+    def _etiqueta_mes(clave_mes):
+        """'2025-09' -> 'septiembre 2025'"""
+        return f"{config.NOMBRES_MES[int(clave_mes[5:7])]} {clave_mes[:4]}"
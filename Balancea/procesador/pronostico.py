@@ -0,0 +1,263 @@
+"""
+Pronóstico de Flujo de Efectivo
+Proyecta ingresos, gastos, balance y gasto por categoría de los próximos meses
+con suavizamiento exponencial (Holt amortiguado, o Holt-Winters si hay 2 años de historia)
+"""
+
+import calendar
+from datetime import datetime
+
+import numpy as np
+
+
+# Valores z de la normal para los niveles de confianza soportados
+VALORES_Z = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.9600}
+
+PERIODO_ESTACIONAL = 12
+MESES_MINIMOS = 3  # con menos historia se usa el promedio
+
+# Rejilla de parámetros: se evalúan todas las combinaciones a la vez y cada
+# serie se queda con la de menor error de un paso
+ALFAS = (0.1, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.0, 0.1, 0.3)
+GAMMA = 0.2
+AMORTIGUAMIENTO = 0.9
+
+
+def _mes_siguiente(mes, n=1):
+    año, numero = int(mes[:4]), int(mes[5:7]) - 1 + n
+    return f"{año + numero // 12:04d}-{numero % 12 + 1:02d}"
+
+
+def _rango_meses(inicio, fin):
+    """Meses 'YYYY-MM' de inicio a fin inclusive"""
+    meses = []
+    mes = inicio
+    while mes <= fin:
+        meses.append(mes)
+        mes = _mes_siguiente(mes)
+    return meses
+
+
+def suavizar(series, horizonte, estacional=False):
+    """
+    Ajusta suavizamiento exponencial a todas las filas de 'series' (k x n) a la vez.
+    Retorna (pronóstico k x horizonte, desviación del error de un paso k,
+    alfa k, beta k) para construir las bandas
+    """
+    k, n = series.shape
+    combinaciones = [(a, b) for a in ALFAS for b in BETAS]
+    c = len(combinaciones)
+
+    # Cada fila de 'y' es una serie con una combinación de parámetros
+    y = np.repeat(series, c, axis=0)
+    alfa = np.tile([a for a, _ in combinaciones], k)
+    beta = np.tile([b for _, b in combinaciones], k)
+    m = PERIODO_ESTACIONAL if estacional else 1
+    gamma = GAMMA if estacional else 0.0
+
+    if estacional:
+        # Valores iniciales con los dos primeros años: tendencia entre sus medias e
+        # índices como desviación de cada mes respecto a la recta de su año
+        años = y[:, :2 * m].reshape(len(y), 2, m)
+        medias = años.mean(axis=2)
+        tendencia = (medias[:, 1] - medias[:, 0]) / m
+        recta = tendencia[:, None, None] * (np.arange(m) - (m - 1) / 2)
+        estacion = (años - medias[:, :, None] - recta).mean(axis=1)
+        nivel = medias[:, 0] - tendencia * (m - 1) / 2
+    else:
+        inicial = min(n, 4) - 1
+        tendencia = (y[:, inicial] - y[:, 0]) / max(inicial, 1)
+        estacion = np.zeros((len(y), 1))
+        nivel = y[:, 0].copy()
+    errores = np.zeros((len(y), n - 1))
+
+    for t in range(1, n):
+        s = estacion[:, t % m]
+        prediccion = nivel + AMORTIGUAMIENTO * tendencia + s
+        errores[:, t - 1] = y[:, t] - prediccion
+
+        nivel_nuevo = alfa * (y[:, t] - s) + (1 - alfa) * (nivel + AMORTIGUAMIENTO * tendencia)
+        tendencia = beta * (nivel_nuevo - nivel) + (1 - beta) * AMORTIGUAMIENTO * tendencia
+        estacion[:, t % m] = gamma * (y[:, t] - nivel_nuevo) + (1 - gamma) * s
+        nivel = nivel_nuevo
+
+    # Mejor combinación por serie
+    sse = (errores ** 2).sum(axis=1).reshape(k, c)
+    mejor = sse.argmin(axis=1) + np.arange(k) * c
+
+    pasos = np.arange(1, horizonte + 1)
+    acumulado = np.cumsum(AMORTIGUAMIENTO ** pasos)
+    estaciones = estacion[mejor][:, (n + pasos - 1) % m]
+    pronostico = nivel[mejor, None] + tendencia[mejor, None] * acumulado + estaciones
+
+    sigma = np.sqrt(sse.min(axis=1) / max(n - 1, 1))
+    return pronostico, sigma, alfa[mejor], beta[mejor]
+
+
+class Pronosticador:
+    """Pronósticos mensuales del libro, reutilizados mientras no cambien los datos"""
+
+    def __init__(self, gestor_datos, gestor_recurrentes=None):
+        self.gestor_datos = gestor_datos
+        # Reglas recurrentes (opcional): sus ocurrencias futuras son un piso de cada mes
+        self.gestor_recurrentes = gestor_recurrentes
+        self._cache = {}
+        self._clave_datos = None
+
+    def _obtener_historia(self, mes_actual):
+        """
+        Matriz de montos mensuales completos (anteriores a 'mes_actual'):
+        filas = ingresos, gastos y cada categoría de gasto
+        """
+        indice = self.gestor_datos.obtener_indice_mensual_centavos()
+        meses_con_datos = sorted({mes for _, _, mes in indice if mes < mes_actual})
+        if not meses_con_datos:
+            return [], [], np.zeros((0, 0))
+
+        meses = _rango_meses(meses_con_datos[0], _mes_siguiente(mes_actual, -1))
+        posicion = {mes: i for i, mes in enumerate(meses)}
+        categorias = sorted({cat for tipo, cat, mes in indice if tipo == 'Gasto' and mes < mes_actual})
+        fila_categoria = {cat: 2 + i for i, cat in enumerate(categorias)}
+
+        matriz = np.zeros((2 + len(categorias), len(meses)))
+        for (tipo, cat, mes), centavos in indice.items():
+            if mes not in posicion:
+                continue
+            if tipo == 'Ingreso':
+                matriz[0, posicion[mes]] += centavos
+            elif tipo == 'Gasto':
+                matriz[1, posicion[mes]] += centavos
+                matriz[fila_categoria[cat], posicion[mes]] += centavos
+
+        return meses, categorias, matriz / 100
+
+    def pronosticar(self, meses=6, nivel=0.8, mes_actual=None):
+        """
+        Pronóstico de 'meses' meses (1-12) empezando por el mes en curso.
+        Retorna None si no hay al menos un mes completo de historia, o:
+        {'meses', 'metodo', 'nivel', 'ingresos', 'gastos', 'flujo', 'balance',
+         'categorias': {cat: serie}}, donde cada serie es
+        {'esperado': [...], 'inferior': [...], 'superior': [...]}
+        """
+        meses = max(1, min(int(meses), 12))
+        z = VALORES_Z.get(nivel, VALORES_Z[0.8])
+        mes_actual = mes_actual or datetime.now().strftime('%Y-%m')
+
+        gestor = self.gestor_datos
+        clave_datos = (gestor.version, gestor.tipos_cambio.version, gestor.moneda_base,
+                       self.gestor_recurrentes.version if self.gestor_recurrentes else None)
+        if clave_datos != self._clave_datos:
+            self._cache = {}
+            self._clave_datos = clave_datos
+
+        clave = (meses, nivel, mes_actual)
+        if clave not in self._cache:
+            self._cache[clave] = self._calcular(meses, z, nivel, mes_actual)
+        return self._cache[clave]
+
+    def _calcular(self, horizonte, z, nivel, mes_actual):
+        historia, categorias, matriz = self._obtener_historia(mes_actual)
+        n = len(historia)
+        if n == 0:
+            return None
+
+        if n < MESES_MINIMOS:
+            metodo = 'promedio'
+            pronostico = np.repeat(matriz.mean(axis=1, keepdims=True), horizonte, axis=1)
+            sigma = matriz.std(axis=1, ddof=1) if n > 1 else matriz[:, 0] * 0.25
+            varianza = np.repeat((sigma ** 2)[:, None], horizonte, axis=1)
+        else:
+            estacional = n >= 2 * PERIODO_ESTACIONAL
+            metodo = 'holt-winters' if estacional else 'holt'
+            pronostico, sigma, alfa, beta = suavizar(matriz, horizonte, estacional)
+
+            # Varianza a h pasos: sigma² (1 + Σ_{j<h} (alfa (1 + j beta))²)
+            j = np.arange(horizonte)
+            c = (alfa[:, None] * (1 + j[None, :] * beta[:, None])) ** 2
+            c[:, 0] = 0
+            varianza = (sigma ** 2)[:, None] * (1 + np.cumsum(c, axis=1))
+
+        # Lo que las reglas recurrentes ya comprometen cuenta aunque la historia aún
+        # no lo refleje (p. ej. una renta que empieza el mes próximo)
+        piso = self._obtener_piso_recurrente(mes_actual, horizonte, categorias)
+        faltantes = len(piso) - len(pronostico)
+        if faltantes:
+            pronostico = np.vstack([pronostico, np.zeros((faltantes, horizonte))])
+            varianza = np.vstack([varianza, np.zeros((faltantes, horizonte))])
+        pronostico = np.maximum(pronostico, piso)
+        desviacion = np.sqrt(varianza)
+
+        def serie(esperado, desv, minimo=0.0):
+            inferior = esperado - z * desv if minimo is None else np.maximum(esperado - z * desv, minimo)
+            return {
+                'esperado': np.round(esperado, 2).tolist(),
+                'inferior': np.round(inferior, 2).tolist(),
+                'superior': np.round(esperado + z * desv, 2).tolist(),
+            }
+
+        # Flujo neto y balance acumulado (ingresos y gastos como independientes)
+        flujo = pronostico[0] - pronostico[1]
+        varianza_flujo = varianza[0] + varianza[1]
+
+        ingresos_mes, gastos_mes = self._totales_mes(mes_actual)
+        balance_inicial = self.gestor_datos.obtener_balance() - (ingresos_mes - gastos_mes)
+        balance = balance_inicial + np.cumsum(flujo)
+
+        return {
+            'meses': [_mes_siguiente(mes_actual, i) for i in range(horizonte)],
+            'metodo': metodo,
+            'nivel': nivel,
+            'meses_historia': n,
+            'ingresos': serie(pronostico[0], desviacion[0], piso[0]),
+            'gastos': serie(pronostico[1], desviacion[1], piso[1]),
+            'flujo': serie(flujo, np.sqrt(varianza_flujo), minimo=None),
+            'balance': serie(balance, np.sqrt(np.cumsum(varianza_flujo)), minimo=None),
+            'categorias': {cat: serie(pronostico[i + 2], desviacion[i + 2], piso[i + 2])
+                           for i, cat in enumerate(categorias)},
+        }
+
+    def _obtener_piso_recurrente(self, mes_actual, horizonte, categorias):
+        """
+        Montos (filas = ingresos, gastos y cada categoría) de las ocurrencias aún no
+        generadas de las reglas recurrentes en cada mes del horizonte. Las categorías
+        que solo aparecen en las reglas se agregan al final de 'categorias'
+        """
+        if self.gestor_recurrentes is None:
+            return np.zeros((2 + len(categorias), horizonte))
+
+        ultimo = _mes_siguiente(mes_actual, horizonte - 1)
+        dias = calendar.monthrange(int(ultimo[:4]), int(ultimo[5:7]))[1]
+        columna = {_mes_siguiente(mes_actual, i): i for i in range(horizonte)}
+        fila_categoria = {cat: 2 + i for i, cat in enumerate(categorias)}
+
+        montos = {}
+        for t in self.gestor_recurrentes.proyectar(f"{ultimo}-{dias:02d}", desde=f"{mes_actual}-01"):
+            i = columna[t['fecha'][:7]]
+            centavos = self.gestor_datos.centavos_en_base(t)
+            if t['tipo'] == 'Ingreso':
+                filas = [0]
+            else:
+                if t['categoria'] not in fila_categoria:
+                    fila_categoria[t['categoria']] = 2 + len(categorias)
+                    categorias.append(t['categoria'])
+                filas = [1, fila_categoria[t['categoria']]]
+            for fila in filas:
+                montos[fila, i] = montos.get((fila, i), 0) + centavos
+
+        piso = np.zeros((2 + len(categorias), horizonte))
+        for (fila, i), centavos in montos.items():
+            piso[fila, i] = centavos / 100
+        return piso
+
+    def _totales_mes(self, mes):
+        """(ingresos, gastos) ya registrados en el mes"""
+        ingresos = gastos = 0
+        for (tipo, _, mes_indice), centavos in self.gestor_datos.obtener_indice_mensual_centavos().items():
+            if mes_indice != mes:
+                continue
+            if tipo == 'Ingreso':
+                ingresos += centavos
+            elif tipo == 'Gasto':
+                gastos += centavos
+        return ingresos / 100, gastos / 100
@@ -0,0 +1,126 @@
+"""
+Sugerencias de Presupuesto
+Sugiere el presupuesto mensual de todas las categorías a la vez a partir de la
+matriz categoría × mes del índice mensual (percentil del gasto y ajuste estacional)
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+import config
+from procesador.pronostico import PERIODO_ESTACIONAL, _mes_siguiente, _rango_meses
+
+
+# Límites del factor estacional para que un mes atípico no dispare la sugerencia
+FACTOR_ESTACIONAL_MINIMO = 0.5
+FACTOR_ESTACIONAL_MAXIMO = 2.0
+
+
+class SugeridorPresupuestos:
+    """Sugerencias de presupuesto, reutilizadas mientras no cambien los datos"""
+
+    def __init__(self, gestor_datos):
+        self.gestor_datos = gestor_datos
+        self._cache = {}
+        self._clave_datos = None
+
+    def _obtener_matriz(self, mes_objetivo):
+        """
+        Gasto en centavos por categoría (filas) y mes completo anterior a
+        'mes_objetivo' (columnas), con ceros en los meses sin gasto
+        """
+        indice = self.gestor_datos.obtener_indice_mensual_centavos()
+        claves = [(cat, mes) for (tipo, cat, mes) in indice if tipo == 'Gasto' and mes < mes_objetivo]
+        if not claves:
+            return [], [], np.zeros((0, 0), dtype=np.int64)
+
+        meses = _rango_meses(min(mes for _, mes in claves), _mes_siguiente(mes_objetivo, -1))
+        categorias = sorted({cat for cat, _ in claves})
+        posicion_mes = {mes: i for i, mes in enumerate(meses)}
+        posicion_cat = {cat: i for i, cat in enumerate(categorias)}
+
+        matriz = np.zeros((len(categorias), len(meses)), dtype=np.int64)
+        filas = np.fromiter((posicion_cat[cat] for cat, _ in claves), dtype=np.int64, count=len(claves))
+        columnas = np.fromiter((posicion_mes[mes] for _, mes in claves), dtype=np.int64, count=len(claves))
+        montos = np.fromiter((indice[('Gasto', cat, mes)] for cat, mes in claves), dtype=np.int64, count=len(claves))
+        np.add.at(matriz, (filas, columnas), montos)
+        return categorias, meses, matriz
+
+    def sugerir(self, meses=None, percentil=None, estacional=None, mes_objetivo=None):
+        """
+        Sugerencia mensual de cada categoría con gasto en los últimos 'meses' meses
+        completos: el percentil 'percentil' de su gasto mensual sin estacionalidad,
+        multiplicado por el factor estacional del mes objetivo (con al menos un año
+        completo de historia).
+        Retorna {categoria: {'sugerencia', 'percentil', 'promedio',
+        'factor_estacional', 'meses'}}
+        """
+        meses = max(1, int(meses or config.PRESUPUESTO_SUGERENCIA_MESES))
+        percentil = float(percentil if percentil is not None else config.PRESUPUESTO_SUGERENCIA_PERCENTIL)
+        estacional = config.PRESUPUESTO_AJUSTE_ESTACIONAL if estacional is None else estacional
+        mes_objetivo = mes_objetivo or datetime.now().strftime('%Y-%m')
+
+        gestor = self.gestor_datos
+        clave_datos = (gestor.version, gestor.tipos_cambio.version, gestor.moneda_base)
+        if clave_datos != self._clave_datos:
+            self._cache = {}
+            self._clave_datos = clave_datos
+
+        clave = (meses, percentil, bool(estacional), mes_objetivo)
+        if clave not in self._cache:
+            self._cache[clave] = self._calcular(meses, percentil, estacional, mes_objetivo)
+        return self._cache[clave]
+
+    def _calcular(self, meses, percentil, estacional, mes_objetivo):
+        categorias, historia, matriz = self._obtener_matriz(mes_objetivo)
+        if not categorias:
+            return {}
+
+        ventana = matriz[:, -meses:] / 100
+        mes_calendario = np.array([int(mes[5:7]) - 1 for mes in historia[-meses:]])
+        if estacional:
+            indices = self._indices_estacionales(historia, matriz)
+        else:
+            indices = np.ones((len(categorias), PERIODO_ESTACIONAL))
+
+        # Percentil del gasto sin estacionalidad, llevado al mes objetivo
+        base = np.percentile(ventana / indices[:, mes_calendario], percentil, axis=1)
+        factor = indices[:, int(mes_objetivo[5:7]) - 1]
+        sugerencia = base * factor
+        promedio = ventana.mean(axis=1)
+
+        return {
+            cat: {
+                'sugerencia': round(float(sugerencia[i]), 2),
+                'percentil': round(float(base[i]), 2),
+                'promedio': round(float(promedio[i]), 2),
+                'factor_estacional': round(float(factor[i]), 3),
+                'meses': ventana.shape[1],
+            }
+            for i, cat in enumerate(categorias) if ventana[i].any()
+        }
+
+    def _indices_estacionales(self, historia, matriz):
+        """
+        Índice (categoría × mes calendario) del gasto de cada mes respecto al promedio
+        mensual, con los últimos años completos de historia. 1 donde no hay al menos
+        un año completo o el mes no tiene gasto
+        """
+        indices = np.ones((matriz.shape[0], PERIODO_ESTACIONAL))
+        años = len(historia) // PERIODO_ESTACIONAL
+        if años == 0:
+            return indices
+
+        recientes = matriz[:, len(historia) - años * PERIODO_ESTACIONAL:]
+        primer_mes = int(historia[len(historia) - años * PERIODO_ESTACIONAL][5:7]) - 1
+
+        # Promedio por mes calendario: columnas agrupadas de 12 en 12 y reordenadas a enero-diciembre
+        por_mes = recientes.reshape(len(recientes), años, PERIODO_ESTACIONAL).mean(axis=1)
+        por_mes = np.roll(por_mes, primer_mes, axis=1)
+        media = recientes.mean(axis=1, keepdims=True)
+
+        validos = (media > 0) & (por_mes > 0)
+        cociente = np.divide(por_mes, media, out=np.ones_like(por_mes), where=validos)
+        indices[validos] = np.clip(cociente[validos], FACTOR_ESTACIONAL_MINIMO, FACTOR_ESTACIONAL_MAXIMO)
+        return indices
@@ -0,0 +1,141 @@
+"""
+Servidor Stub de Ollama
+Imita /api/tags y /api/generate en localhost para las pruebas
+"""
+
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class ServidorOllamaStub:
+    """Servidor HTTP local que responde como Ollama"""
+
+    def __init__(self, tokens=None, modelos=None, fallos_5xx=0, detener_tras=None):
+        self.tokens = tokens or ["Hola", ", soy", " Balancea", " AI."]
+        self.modelos = modelos or ["llama3.2:1b"]
+        self.fallos_pendientes = fallos_5xx
+
+        # Simula un modelo lento: tras 'detener_tras' tokens espera a 'continuar'
+        self.detener_tras = detener_tras
+        self.continuar = threading.Event()
+
+        # Contadores para verificar keep-alive, reintentos y caché
+        self.conexiones = 0
+        self.solicitudes = []
+        self.payloads = []
+        self._lock = threading.Lock()
+
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), self._crear_manejador())
+        self.servidor.daemon_threads = True
+        self.hilo = None
+
+    @property
+    def host(self):
+        """URL base del servidor"""
+        return f"http://127.0.0.1:{self.servidor.server_port}"
+
+    def iniciar(self):
+        """Inicia el servidor en un hilo de fondo"""
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.hilo.start()
+        return self
+
+    def detener(self):
+        """Detiene el servidor"""
+        self.continuar.set()
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.detener()
+
+    def _crear_manejador(self):
+        stub = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Necesario para keep-alive
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.conexiones += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _registrar(self):
+                with stub._lock:
+                    stub.solicitudes.append((self.command, self.path))
+                    if stub.fallos_pendientes > 0:
+                        stub.fallos_pendientes -= 1
+                        return True
+                return False
+
+            def _enviar_json(self, estado, datos):
+                cuerpo = json.dumps(datos).encode('utf-8')
+                self.send_response(estado)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def _enviar_fragmento(self, datos):
+                linea = (json.dumps(datos) + "\n").encode('utf-8')
+                self.wfile.write(f"{len(linea):X}\r\n".encode('ascii') + linea + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self._registrar():
+                    self._enviar_json(503, {'error': 'servicio no disponible'})
+                    return
+
+                if self.path == '/api/tags':
+                    self._enviar_json(200, {'models': [{'name': m} for m in stub.modelos]})
+                else:
+                    self._enviar_json(404, {'error': 'no encontrado'})
+
+            def do_POST(self):
+                longitud = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(longitud) or b'{}')
+
+                if self._registrar():
+                    self._enviar_json(503, {'error': 'servicio no disponible'})
+                    return
+
+                if self.path != '/api/generate':
+                    self._enviar_json(404, {'error': 'no encontrado'})
+                    return
+
+                with stub._lock:
+                    stub.payloads.append(payload)
+
+                if payload.get('model') not in stub.modelos:
+                    self._enviar_json(404, {'error': f"model '{payload.get('model')}' not found"})
+                    return
+
+                if not payload.get('stream', True):
+                    self._enviar_json(200, {'response': "".join(stub.tokens), 'done': True,
+                                            'context': [1, 2, 3]})
+                    return
+
+                # Respuesta NDJSON con codificación chunked
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    for i, token in enumerate(stub.tokens):
+                        if i == stub.detener_tras:
+                            stub.continuar.wait(10)
+                        self._enviar_fragmento({'response': token, 'done': False})
+                    self._enviar_fragmento({'response': '', 'done': True, 'context': [1, 2, 3]})
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # el cliente canceló y cortó la conexión
+
+        return Manejador
@@ -3,6 +3,7 @@ Tests del Sistema Balancea
 Pruebas automáticas de funcionalidades
 """
 
+import json
 import sys
 import os
 
@@ -13,7 +14,13 @@ from datos.gestor_transacciones import GestorTransacciones
 from datos.gestor_metas import GestorMetas
 from datos.gestor_presupuestos import GestorPresupuestos
 from procesador.analizador import AnalizadorFinanciero
-from datetime import datetime
+from procesador.chat_financiero import ChatFinanciero
+from procesador.cliente_ollama import ClienteOllama
+from procesador.cache_respuestas import CacheRespuestas
+from tests.servidor_ollama_stub import ServidorOllamaStub
+from utils.exportador import Exportador
+from utils.trabajos import GestorTrabajos
+from datetime import datetime, timedelta
 
 
 class TestSistema:
@@ -88,9 +95,274 @@ class TestSistema:
 
         self.test("Gastos por categoría", test_gastos_cat)
 
-        # Limpiar archivo de prueba
-        if os.path.exists("datos/test_transacciones.csv"):
-            os.remove("datos/test_transacciones.csv")
+        # Test 4: Sumas exactas en centavos
+        def test_centavos():
+            from datos import dinero
+            exacto = GestorTransacciones("datos/test_centavos.csv")
+            exacto.transacciones = [
+                {'id': str(i), 'fecha': '2024-01-01', 'descripcion': 'Café',
+                 'monto': dinero.normalizar_monto('0.10'), 'tipo': 'Gasto', 'categoria': 'Alimentación'}
+                for i in range(10000)
+            ]
+            assert sum(t['monto'] for t in exacto.transacciones) != 1000, "Se esperaba deriva en float"
+            assert exacto.obtener_total_gastos() == 1000, f"Total: {exacto.obtener_total_gastos()!r}"
+            assert exacto.obtener_totales_centavos() == (0, 100000), "Centavos incorrectos"
+            assert dinero.a_centavos("19.995") == 2000, "Redondeo incorrecto"
+            assert dinero.formatear(123456) == "$1,234.56", "Formato incorrecto"
+            if os.path.exists("datos/test_centavos.csv"):
+                os.remove("datos/test_centavos.csv")
+
+        self.test("Montos exactos en centavos", test_centavos)
+
+        # Test 5: Parquet / Arrow con filtro de fechas
+        def test_columnar():
+            from datos import formato_columnar
+            gestor.agregar_transaccion("2023-06-15", "Viaje", 2500, "Gasto", "Viajes")
+            for extension in ("parquet", "arrow"):
+                archivo = f"datos/test_transacciones.{extension}"
+                assert gestor.exportar_columnar(archivo), f"No se exportó {extension}"
+                tabla = formato_columnar.ds.dataset(archivo, format='ipc' if extension == 'arrow' else 'parquet')
+                assert str(tabla.schema.field('fecha').type) == 'date32[day]', "Fecha sin tipo"
+
+                destino = GestorTransacciones("datos/test_importacion.csv")
+                destino.transacciones = []
+                assert destino.importar_columnar(archivo, fecha_inicio="2024-01-01") == 2, "Filtro de fechas"
+                assert destino.obtener_balance() == 700, "Montos incorrectos tras importar"
+                assert destino.importar_columnar(archivo, fecha_fin="2023-12-31") == 1, "Filtro de fechas"
+                assert destino.transacciones[-1]['fecha'] == "2023-06-15", "Fecha incorrecta"
+                os.remove(archivo)
+
+        self.test("Exportar/importar Parquet y Arrow", test_columnar)
+
+        # Test 6: Cuentas, monedas y tipos de cambio
+        def test_multimoneda():
+            from datos.tipos_cambio import TablaTiposCambio
+            tabla = TablaTiposCambio(archivo=None, moneda_base="MXN")
+            tabla.agregar_tasa("2024-01-01", "USD", 17.0)
+            tabla.agregar_tasa("2024-02-01", "USD", 18.0)
+            assert tabla.obtener_tasa("USD", "2024-01-31") == 17.0, "Búsqueda por fecha incorrecta"
+
+            multi = GestorTransacciones("datos/test_multimoneda.csv", tipos_cambio=tabla)
+            multi.transacciones = []
+            multi.agregar_transaccion("2024-01-15", "Sueldo", 1000, "Ingreso", "Salario")
+            servidor = multi.agregar_transaccion("2024-02-10", "Servidor", 10, "Gasto", "Servicios",
+                                                 cuenta="Tarjeta", moneda="USD")
+            assert multi.obtener_balance() == 820, f"Balance en MXN: {multi.obtener_balance()}"
+            assert multi.obtener_balance("USD") == 48.82, f"Balance en USD: {multi.obtener_balance('USD')}"
+            assert multi.obtener_saldos_por_cuenta() == {'Principal': 1000, 'Tarjeta': -180}, "Saldos por cuenta"
+            assert multi.moneda_base == "MXN" and multi.obtener_balance() == 820, "Ver en USD cambió la base"
+
+            # Sin tipo de cambio la fila queda fuera del total y se avisa, en vez de sumar monedas
+            regalo = multi.agregar_transaccion("2024-02-11", "Regalo", 50, "Ingreso", "Otros", moneda="EUR")
+            assert multi.obtener_balance() == 820, "Sumó EUR al valor nominal"
+            assert multi.obtener_monedas_sin_tipo_cambio() == {"EUR"}, "No avisó la moneda faltante"
+            assert multi.obtener_monedas_sin_tipo_cambio("USD") == {"EUR"}, "No avisó la moneda faltante en USD"
+            multi.eliminar_transaccion(regalo['id'])
+            assert not multi.obtener_monedas_sin_tipo_cambio(), "Aviso obsoleto"
+
+            # La edición actualiza los agregados con deltas (igual que reconstruirlos)
+            multi.editar_transaccion(servidor['id'], "2024-01-20", "Servidor", 10, "Gasto", "Servicios")
+            assert multi.obtener_saldos_por_cuenta()['Tarjeta'] == -170, "Delta de edición"
+            incrementales = dict(multi.obtener_agregados())
+            multi._agregados = None
+            assert multi.obtener_agregados() == incrementales, "Agregados incrementales incorrectos"
+
+            # Reportes y análisis suman en moneda base, no al valor nominal de cada moneda
+            assert multi.centavos_en_base(multi.transacciones[1]) == 17000, "Conversión de la fila"
+            assert multi.obtener_totales_mes_centavos("2024-01") == (100000, 17000), "Totales del mes"
+            assert Exportador(multi).calcular_saldo_inicial("2024-02-01") == 830, "Saldo inicial mezcló monedas"
+
+            recargado = GestorTransacciones("datos/test_multimoneda.csv", tipos_cambio=tabla)
+            assert recargado.transacciones[1]['moneda'] == "USD", "Moneda no persistida"
+            assert recargado.obtener_totales_por_moneda()['USD']['Gasto'] == 10, "Totales por moneda"
+            os.remove("datos/test_multimoneda.csv")
+
+        self.test("Cuentas, monedas y tipos de cambio", test_multimoneda)
+
+        # Test 7: Reglas recurrentes materializadas en lote
+        def test_recurrentes():
+            from datos.gestor_recurrentes import GestorRecurrentes
+            libro = GestorTransacciones("datos/test_recurrentes.csv")
+            libro.transacciones = []
+            recurrentes = GestorRecurrentes(libro, "datos/test_recurrentes.json")
+            recurrentes.reglas = []
+            recurrentes.agregar_regla("Renta", 8000, "Gasto", "Servicios", "mensual", "2024-01-31")
+            recurrentes.agregar_regla("Gym", 100, "Gasto", "Salud", "personalizada", "2024-04-01",
+                                      intervalo_dias=10)
+
+            version = libro.version
+            assert recurrentes.materializar(hasta="2024-04-30") == 7, "Ocurrencias incorrectas"
+            assert libro.version == version + 1, "Se esperaba un solo guardado"
+            fechas = [t['fecha'] for t in libro.transacciones if t['descripcion'] == "Renta"]
+            assert fechas == ["2024-01-31", "2024-02-29", "2024-03-31", "2024-04-30"], f"Fechas: {fechas}"
+            assert recurrentes.materializar(hasta="2024-04-30") == 0, "Ocurrencias duplicadas"
+
+            proyectadas = recurrentes.proyectar("2024-06-30", desde="2024-05-01")
+            assert len(proyectadas) == 2 + 7, f"Proyección: {len(proyectadas)}"
+            assert all(t['proyectada'] for t in proyectadas), "Proyección sin marcar"
+            assert len(libro.transacciones) == 7, "La proyección no debe guardarse"
+
+            for archivo in ("datos/test_recurrentes.csv", "datos/test_recurrentes.json"):
+                os.remove(archivo)
+
+        self.test("Transacciones recurrentes", test_recurrentes)
+
+        # Test 8: Generador masivo determinista con una sola escritura
+        def test_generador_masivo():
+            from utils.generador_demo import GeneradorDemo
+            libro = GestorTransacciones("datos/test_masivo.csv")
+            libro.transacciones = []
+            generador = GeneradorDemo(libro)
+
+            filas = generador.generar_filas_masivas(20000, semilla=3, fecha_final="2024-12-31")
+            assert len(filas) == 20000, f"Filas: {len(filas)}"
+            assert filas == generador.generar_filas_masivas(20000, semilla=3, fecha_final="2024-12-31")
+            assert filas != generador.generar_filas_masivas(20000, semilla=4, fecha_final="2024-12-31")
+            assert filas[-5:] == generador.generar_filas_masivas(20000, semilla=3, fecha_final=datetime(2024, 12, 31))[-5:]
+            assert filas[-1]['fecha'] == "2024-12-31" and filas[0]['fecha'] >= "2022-01-01", "Rango de fechas"
+
+            rentas = {t['fecha'] for t in filas if t['descripcion'] == "Renta" and t['fecha'].endswith("-01")}
+            assert len(rentas) == 35, f"Rentas mensuales: {len(rentas)}"  # del 2022-01-02 al 2024-12-31
+            diciembre = sum(t['fecha'][5:7] == "12" for t in filas)
+            enero = sum(t['fecha'][5:7] == "01" for t in filas)
+            assert diciembre > enero, "Sin estacionalidad"
+
+            version = libro.version
+            assert generador.generar_transacciones_masivas(5000, semilla=3) == 5000
+            assert libro.version == version + 1, "Se esperaba un solo guardado"
+
+            assert generador.generar_transacciones_masivas(5000, semilla=3, archivo="datos/test_masivo_directo.csv") == 5000
+            directo = GestorTransacciones("datos/test_masivo_directo.csv")
+            assert len(directo.transacciones) == 5000 and directo.transacciones[0]['id'] == "1", "CSV directo"
+            assert list(directo.transacciones[0]) == GestorTransacciones.CAMPOS, "Columnas del CSV directo"
+
+            # Ambos generadores aceptan la fecha final como texto, date o datetime
+            libro.transacciones = []
+            generador.generar_transacciones_demo(10, semilla=1, fecha_final="2024-06-30")
+            fechas = [t['fecha'] for t in libro.transacciones]
+            assert max(fechas) == "2024-06-30" and min(fechas) == "2024-06-21", (min(fechas), max(fechas))
+
+            for archivo in ("datos/test_masivo.csv", "datos/test_masivo_directo.csv"):
+                os.remove(archivo)
+
+        self.test("Generador masivo de transacciones", test_generador_masivo)
+
+        # Test 9: Escrituras atómicas y guardado diferido
+        def test_guardado_atomico():
+            from datos import persistencia
+            archivo = "datos/test_atomico.csv"
+            libro = GestorTransacciones(archivo)
+            libro.transacciones = []
+            libro.agregar_transaccion("2024-01-01", "Inicial", 100, "Gasto", "Otro Gasto")
+            with open(archivo, 'r', encoding='utf-8') as f:
+                original = f.read()
+
+            def escritura_interrumpida(f):
+                f.write("id,fecha\n")
+                raise OSError("disco lleno")
+            try:
+                persistencia.escribir_atomico(archivo, escritura_interrumpida)
+                assert False, "La excepción no se propagó"
+            except OSError:
+                pass
+            with open(archivo, 'r', encoding='utf-8') as f:
+                assert f.read() == original, "El archivo quedó truncado"
+            assert not [a for a in os.listdir("datos") if a.endswith('.tmp')], "Quedó el temporal"
+
+            diferido = persistencia.activar_guardado_diferido(espera_ms=5000, espera_maxima_ms=10000)
+            try:
+                for i in range(20):
+                    libro.agregar_transaccion("2024-01-02", f"Ráfaga {i}", 10, "Gasto", "Otro Gasto")
+                assert len(GestorTransacciones(archivo).transacciones) == 1, "Escribió antes de tiempo"
+                persistencia.vaciar()
+                assert diferido.escrituras == 1 and diferido.agrupados == 19, \
+                    f"Escrituras: {diferido.escrituras}, agrupados: {diferido.agrupados}"
+                assert len(GestorTransacciones(archivo).transacciones) == 21, "Faltan filas"
+
+                libro.agregar_transaccion("2024-01-03", "Última", 10, "Gasto", "Otro Gasto")
+
+                # Editar reemplaza la fila: la escritura pendiente nunca ve una fila a medias
+                fila = libro.transacciones[-1]
+                libro.editar_transaccion(fila['id'], "2024-01-03", "Última", 25, "Gasto", "Otro Gasto")
+                assert fila['monto'] == 10 and libro.transacciones[-1]['monto'] == 25, "Editó la fila en sitio"
+            finally:
+                persistencia.desactivar_guardado_diferido()
+            escritas = GestorTransacciones(archivo).transacciones
+            assert len(escritas) == 22, "No se escribió lo pendiente"
+            assert escritas[-1]['monto'] == 25, "No se escribió la edición"
+            os.remove(archivo)
+
+            # Una escritura fallida no se descarta: queda pendiente, se avisa y se reintenta
+            import time
+            intentos = []
+
+            def escritura_inestable():
+                intentos.append(1)
+                if len(intentos) == 1:
+                    raise OSError("disco lleno")
+            inestable = persistencia.GuardadoDiferido(espera_ms=10, espera_maxima_ms=50)
+            inestable.programar("metas.json", escritura_inestable)
+            inestable.vaciar()
+            assert inestable.errores == {"metas.json": "disco lleno"}, inestable.errores
+            assert "metas.json" in inestable.pendientes, "Se perdió el cambio"
+            limite = time.monotonic() + 5
+            while inestable.errores and time.monotonic() < limite:
+                time.sleep(0.02)
+            inestable.detener()
+            assert len(intentos) == 2 and not inestable.errores, f"Intentos: {len(intentos)}"
+
+        self.test("Guardado atómico y diferido", test_guardado_atomico)
+
+        # Test 10: Backups incrementales direccionados por contenido
+        def test_backups():
+            import tempfile
+            from datos.almacen_backups import AlmacenBackups
+            from utils.generador_demo import GeneradorDemo
+
+            with tempfile.TemporaryDirectory() as carpeta:
+                libro = os.path.join(carpeta, "libro.csv")
+                metas = os.path.join(carpeta, "metas.json")
+                GeneradorDemo(None).generar_transacciones_masivas(20000, semilla=5, archivo=libro)
+                with open(metas, 'w', encoding='utf-8') as f:
+                    json.dump([{'id': 1, 'nombre': "Fondo"}], f)
+                with open(libro, 'rb') as f:
+                    original = f.read()
+
+                almacen = AlmacenBackups(os.path.join(carpeta, "backups"), [libro, metas])
+                primero = almacen.crear_snapshot(datetime(2024, 1, 1))
+                total_bloques = len(primero['archivos'][libro]['bloques'])
+                assert primero['nuevo'] and total_bloques > 5, f"Bloques: {total_bloques}"
+                assert primero['bytes_nuevos'] < len(original) / 2, "Sin compresión"
+                assert not almacen.crear_snapshot(datetime(2024, 1, 2))['nuevo'], "Snapshot sin cambios"
+
+                # Editar una fila a mitad del libro y agregar otra al final
+                lineas = original.split(b'\n')
+                lineas[10000] = lineas[10000].replace(b',Gasto,', b',Ingreso,')
+                lineas.insert(-1, b'20001,2024-12-31,Extra,1.00,Gasto,Otro Gasto,Principal,MXN')
+                with open(libro, 'wb') as f:
+                    f.write(b'\n'.join(lineas))
+                segundo = almacen.crear_snapshot(datetime(2024, 2, 1))
+                assert segundo['nuevo'] and segundo['bloques_nuevos'] <= 3, \
+                    f"Bloques nuevos: {segundo['bloques_nuevos']} de {total_bloques}"
+
+                restaurado = almacen.restaurar(primero['id'], os.path.join(carpeta, "restaurado"))
+                with open(restaurado[0], 'rb') as f:
+                    assert f.read() == original, "Restauración distinta del original"
+
+                assert not almacen.backup_pendiente(datetime(2024, 2, 5), frecuencia_dias=7)
+                assert almacen.backup_pendiente(datetime(2024, 2, 9), frecuencia_dias=7)
+
+                eliminados, liberados = almacen.aplicar_retencion(recientes=1, mensuales=0)
+                assert eliminados == 1 and liberados > 0, f"Retención: {eliminados}, {liberados}"
+                assert [m['id'] for m in almacen.listar_snapshots()] == [segundo['id']]
+                almacen.restaurar(segundo['id'], os.path.join(carpeta, "restaurado"))
+
+        self.test("Backups incrementales", test_backups)
+
+        # Limpiar archivos de prueba
+        for archivo in ("datos/test_transacciones.csv", "datos/test_importacion.csv"):
+            if os.path.exists(archivo):
+                os.remove(archivo)
 
     def test_gestor_metas(self):
         """Pruebas del gestor de metas"""
@@ -130,6 +402,26 @@ class TestSistema:
 
         self.test("Completar meta", test_completar)
 
+        # Test 4: Historial de aportes y proyección en caché
+        def test_proyeccion():
+            from datetime import timedelta
+            hoy = datetime.now()
+            meta = gestor.agregar_meta("Viaje", 12000, (hoy + timedelta(days=365)).strftime('%Y-%m-%d'))
+            for dias in (60, 30, 0):
+                gestor.agregar_aporte(meta['id'], 1000, (hoy - timedelta(days=dias)).strftime('%Y-%m-%d'))
+            assert len(gestor.obtener_meta_por_id(meta['id'])['aportes']) == 3, "Historial incompleto"
+
+            proyeccion = gestor.obtener_proyeccion(meta['id'])
+            assert proyeccion['fuente'] == 'aportes', f"Fuente: {proyeccion['fuente']}"
+            assert 1400 < proyeccion['ritmo_mensual'] < 1600, f"Ritmo: {proyeccion['ritmo_mensual']}"
+            assert proyeccion['a_tiempo'] is True, "Debería llegar a tiempo"
+            assert gestor.obtener_proyeccion(meta['id']) is proyeccion, "Sin caché"
+
+            gestor.agregar_aporte(meta['id'], 500)
+            assert gestor.obtener_proyeccion(meta['id']) is not proyeccion, "La caché no se invalidó"
+
+        self.test("Proyección de metas", test_proyeccion)
+
         # Limpiar
         if os.path.exists("datos/test_metas.json"):
             os.remove("datos/test_metas.json")
@@ -164,6 +456,107 @@ class TestSistema:
 
         self.test("Calcular porcentaje de uso", test_porcentaje)
 
+        # Test 3: Periodos, remanente y acumulador de gasto
+        def test_periodos():
+            hoy = datetime.now()
+            fecha_hoy = hoy.strftime('%Y-%m-%d')
+            hace_ocho = (hoy - timedelta(days=8)).strftime('%Y-%m-%d')
+
+            assert gestor.establecer_presupuesto("Transporte", 1000, acumular=True)
+            assert gestor.establecer_presupuesto("Entretenimiento", 300, periodo='semanal')
+            assert not gestor.establecer_presupuesto("Salud", 500, periodo='personalizado')
+            gestor.obtener_resumen()
+
+            gestor_trans.agregar_transaccion(fecha_hoy, "Gasolina", 400, "Gasto", "Transporte")
+            gestor_trans.agregar_transaccion(fecha_hoy, "Cine", 150, "Gasto", "Entretenimiento")
+            gestor_trans.agregar_transaccion(hace_ocho, "Concierto", 900, "Gasto", "Entretenimiento")
+
+            # El acumulador se actualizó con los deltas, sin reconstruirse
+            assert gestor._clave_gastos == gestor._clave_libro(), "Acumulador desactualizado"
+            semanal = gestor.obtener_estado("Entretenimiento")
+            assert semanal['gastado'] == 150 and semanal['porcentaje'] == 50, f"Semana incorrecta: {semanal}"
+
+            # El sobrante del mes pasa al siguiente
+            siguiente = gestor.siguiente_periodo(gestor.presupuestos["Transporte"], fecha_hoy[:8] + '01')
+            estado = gestor.obtener_estado("Transporte", siguiente)
+            assert estado['remanente'] == 600 and estado['disponible'] == 1600, f"Remanente incorrecto: {estado}"
+
+            # Una edición mueve el gasto de categoría
+            gasolina = [t for t in gestor_trans.transacciones if t['descripcion'] == "Gasolina"][0]
+            gestor_trans.editar_transaccion(gasolina['id'], fecha_hoy, "Gasolina", 400, "Gasto", "Entretenimiento")
+            assert gestor.obtener_gasto_periodo("Transporte") == 0
+            assert gestor.obtener_gasto_periodo("Entretenimiento") == 550
+
+            # Los deltas coinciden con una reconstrucción completa
+            incremental = dict(gestor._obtener_gastos())
+            gestor._gastos = None
+            assert gestor._obtener_gastos() == incremental, "Deltas distintos a la reconstrucción"
+
+        self.test("Periodos y remanente", test_periodos)
+
+        # Test 4: Evaluación de todos los presupuestos en lote
+        def test_evaluacion_lote():
+            fecha_hoy = datetime.now().strftime('%Y-%m-%d')
+            gestor_trans.agregar_transacciones_lote([
+                {'fecha': fecha_hoy, 'descripcion': f"Gasto {i}", 'monto': 10,
+                 'tipo': 'Gasto', 'categoria': f"Cat {i % 30}"}
+                for i in range(3000)
+            ])
+            for i in range(30):
+                gestor.establecer_presupuesto(f"Cat {i}", 1000 if i % 2 else 5000)
+
+            estados = gestor.evaluar_presupuestos()
+            assert estados is gestor.evaluar_presupuestos(), "La evaluación no se reutilizó"
+            assert estados["Cat 1"]['gastado'] == 1000 and estados["Cat 1"]['porcentaje'] == 100
+            assert estados["Cat 2"]['porcentaje'] == 20, f"Porcentaje: {estados['Cat 2']}"
+
+            resumen = gestor.obtener_resumen(estados)
+            assert resumen['categorias_con_presupuesto'] == 33, f"Resumen: {resumen}"
+            assert resumen['categorias_excedidas'] == 16, f"Excedidas: {resumen['categorias_excedidas']}"
+
+            alertas = gestor.obtener_todas_alertas(estados)
+            assert len([a for a in alertas if a['severidad'] == 'alta']) == 16, "Alertas en lote"
+            assert all('titulo' in a for a in alertas), "Alertas sin título"
+
+            # Una transacción nueva invalida la evaluación
+            gestor_trans.agregar_transaccion(fecha_hoy, "Extra", 500, "Gasto", "Cat 2")
+            assert gestor.obtener_estado("Cat 2")['gastado'] == 1500, "Evaluación desactualizada"
+
+        self.test("Evaluación de presupuestos en lote", test_evaluacion_lote)
+
+        # Test 5: Sugerencias por percentil con ajuste estacional
+        def test_sugerencias():
+            from procesador.sugerencias_presupuesto import SugeridorPresupuestos
+            historial = GestorTransacciones("datos/test_sugerencias.csv")
+            historial.transacciones = []
+            filas = []
+            for año in (2022, 2023):
+                for mes in range(1, 13):
+                    fecha = f"{año}-{mes:02d}-10"
+                    filas.append({'fecha': fecha, 'descripcion': "Súper", 'tipo': 'Gasto',
+                                  'categoria': "Alimentación", 'monto': 2000 if mes == 12 else 1000})
+                    filas.append({'fecha': fecha, 'descripcion': "Camión", 'tipo': 'Gasto',
+                                  'categoria': "Transporte", 'monto': 300 if mes % 2 else 100})
+            filas.append({'fecha': "2022-03-01", 'descripcion': "Doctor", 'tipo': 'Gasto',
+                          'categoria': "Salud", 'monto': 800})
+            historial.agregar_transacciones_lote(filas)
+
+            sugeridor = SugeridorPresupuestos(historial)
+            diciembre = sugeridor.sugerir(meses=6, percentil=75, mes_objetivo="2023-12")
+            assert diciembre["Alimentación"]['sugerencia'] == 2000, f"Diciembre: {diciembre['Alimentación']}"
+            assert "Salud" not in diciembre, "Categoría sin gasto reciente"
+
+            enero = sugeridor.sugerir(meses=6, percentil=75, mes_objetivo="2024-01")
+            assert enero["Alimentación"]['sugerencia'] == 1000, f"Enero: {enero['Alimentación']}"
+
+            sin_temporada = sugeridor.sugerir(meses=6, percentil=75, estacional=False, mes_objetivo="2024-01")
+            assert sin_temporada["Transporte"]['sugerencia'] == 300, f"P75: {sin_temporada['Transporte']}"
+            assert sin_temporada["Transporte"]['factor_estacional'] == 1
+            assert sugeridor.sugerir(meses=6, percentil=75, mes_objetivo="2024-01") is enero, "Sin caché"
+            os.remove("datos/test_sugerencias.csv")
+
+        self.test("Sugerencias de presupuesto", test_sugerencias)
+
         # Limpiar
         for archivo in ["datos/test_presupuestos.json", "datos/test_trans_presup.csv"]:
             if os.path.exists(archivo):
@@ -213,10 +606,570 @@ class TestSistema:
 
         self.test("Calcular salud financiera", test_salud)
 
+        # Test 3: Pronóstico de flujo y fecha estimada de metas
+        def test_pronostico():
+            from procesador.pronostico import Pronosticador
+            historia = GestorTransacciones("datos/test_pronostico.csv")
+            historia.transacciones = []
+            historia.agregar_transacciones_lote(
+                [{'fecha': f"2023-{mes:02d}-05", 'descripcion': "Sueldo", 'monto': 10000,
+                  'tipo': "Ingreso", 'categoria': "Salario"} for mes in range(1, 13)] +
+                [{'fecha': f"2023-{mes:02d}-10", 'descripcion': "Súper", 'monto': 4000 + 100 * mes,
+                  'tipo': "Gasto", 'categoria': "Alimentación"} for mes in range(1, 13)]
+            )
+            pronosticador = Pronosticador(historia)
+            pronostico = pronosticador.pronosticar(meses=6, mes_actual="2024-01")
+            assert pronostico['metodo'] == 'holt', f"Método: {pronostico['metodo']}"
+            assert pronostico['meses'][0] == "2024-01" and len(pronostico['meses']) == 6, "Meses"
+            gastos = pronostico['gastos']
+            assert all(i <= e <= s for i, e, s in zip(gastos['inferior'], gastos['esperado'], gastos['superior'])), \
+                "Bandas incorrectas"
+            assert gastos['esperado'][0] > 5000, f"Tendencia no capturada: {gastos['esperado'][0]}"
+            assert 'Alimentación' in pronostico['categorias'], "Falta pronóstico por categoría"
+            assert pronosticador.pronosticar(meses=6, mes_actual="2024-01") is pronostico, "Sin caché"
+
+            metas = GestorMetas("datos/test_metas_pronostico.json")
+            metas.metas = []
+            meta = metas.agregar_meta("Fondo", 20000)
+            proyeccion = metas.proyectar_fecha_completado(meta['id'], pronostico)
+            assert proyeccion['esperada'] in pronostico['meses'], f"Proyección: {proyeccion}"
+
+            historia.agregar_transaccion("2023-12-20", "Extra", 100, "Gasto", "Alimentación")
+            assert pronosticador.pronosticar(meses=6, mes_actual="2024-01") is not pronostico, \
+                "La caché no se invalidó"
+
+            # Una regla recurrente sin historia (renta desde febrero) entra al pronóstico
+            from datos.gestor_recurrentes import GestorRecurrentes
+            recurrentes = GestorRecurrentes(historia, "datos/test_pronostico_recurrentes.json")
+            recurrentes.reglas = []
+            recurrentes.agregar_regla("Renta", 8000, "Gasto", "Hogar", "mensual", "2024-02-01")
+            con_reglas = Pronosticador(historia, recurrentes).pronosticar(meses=6, mes_actual="2024-01")
+            renta = con_reglas['categorias']['Hogar']
+            assert renta['esperado'] == [0] + [8000] * 5 and renta['inferior'][1] == 8000, f"Renta: {renta}"
+            assert con_reglas['gastos']['esperado'][1] >= 8000, "El gasto total no incluye la renta"
+            for archivo in ("datos/test_pronostico.csv", "datos/test_metas_pronostico.json",
+                            "datos/test_pronostico_recurrentes.json"):
+                os.remove(archivo)
+
+        self.test("Pronóstico de flujo", test_pronostico)
+
+        # Test 4: Instrumentación de las reglas del analizador
+        def test_instrumentacion():
+            from utils.instrumentacion import registro
+            registro.reiniciar()
+            registro.desactivar()
+            analizador.analizar_todo()
+            assert not registro.totales, "Midió estando desactivada"
+
+            registro.activar()
+            try:
+                for _ in range(3):
+                    analizador.analizar_todo()
+                with registro.medir('prueba.bloque') as m:
+                    m.filas = 7
+            finally:
+                registro.desactivar()
+
+            estadisticas = registro.obtener_estadisticas()
+            regla = estadisticas['analizador.detectar_balance_negativo']
+            assert regla['llamadas'] == 3, f"Llamadas: {regla['llamadas']}"
+            assert regla['filas'] == 3 * len(gestor.transacciones), f"Filas: {regla['filas']}"
+            assert 0 <= regla['p50'] <= regla['p95'] <= regla['maximo'], "Percentiles incorrectos"
+            assert estadisticas['analizador.analizar_todo']['total'] >= regla['total'], "Total incorrecto"
+            assert estadisticas['prueba.bloque']['filas'] == 7, "Filas del bloque"
+
+            archivo = registro.volcar_json("datos/test_instrumentacion.json")
+            with open(archivo, 'r', encoding='utf-8') as f:
+                assert 'analizador.analizar_todo' in json.load(f)['operaciones'], "JSON incompleto"
+            os.remove(archivo)
+            registro.reiniciar()
+
+        self.test("Instrumentación", test_instrumentacion)
+
         # Limpiar
         if os.path.exists("datos/test_analisis.csv"):
             os.remove("datos/test_analisis.csv")
 
+    def test_cliente_ollama(self):
+        """Pruebas del cliente de Ollama contra el servidor stub"""
+        print("\n🤖 Testing Cliente Ollama...")
+
+        gestor = GestorTransacciones("datos/test_chat.csv")
+        gestor.transacciones = []
+
+        # Test 1: Keep-alive (varias solicitudes, una sola conexión)
+        def test_keep_alive():
+            with ServidorOllamaStub() as stub:
+                cliente = ClienteOllama(host=stub.host)
+                chat = ChatFinanciero(gestor, cliente=cliente,
+                                      cache_respuestas=CacheRespuestas(archivo_cache=None))
+                for _ in range(3):
+                    resultado = chat.generar_respuesta("Hola")
+                    assert resultado['exito'], f"Respuesta fallida: {resultado}"
+                cliente.cerrar()
+                assert stub.conexiones == 1, f"Se abrieron {stub.conexiones} conexiones"
+
+        self.test("Reutilizar conexión (keep-alive)", test_keep_alive)
+
+        # Test 2: Reintentos ante 5xx transitorios
+        def test_reintentos():
+            with ServidorOllamaStub(fallos_5xx=2) as stub:
+                cliente = ClienteOllama(host=stub.host)
+                cliente.session.adapters['http://'].max_retries.backoff_factor = 0
+                chat = ChatFinanciero(gestor, cliente=cliente,
+                                      cache_respuestas=CacheRespuestas(archivo_cache=None))
+                resultado = chat.generar_respuesta("Hola")
+                cliente.cerrar()
+                assert resultado['exito'], f"No se reintentó: {resultado}"
+                assert len(stub.solicitudes) == 3, f"Solicitudes: {len(stub.solicitudes)}"
+
+        self.test("Reintentar errores 5xx", test_reintentos)
+
+        # Test 3: Caché de verificación de salud
+        def test_cache_salud():
+            with ServidorOllamaStub() as stub:
+                cliente = ClienteOllama(host=stub.host, cache_salud_segundos=60)
+                assert cliente.verificar_disponible(), "Ollama stub no disponible"
+                assert cliente.verificar_disponible(), "Ollama stub no disponible"
+                cliente.cerrar()
+                assert len(stub.solicitudes) == 1, "La verificación no usó la caché"
+
+        self.test("Caché de disponibilidad", test_cache_salud)
+
+        # Test 4: Streaming token por token
+        def test_streaming():
+            with ServidorOllamaStub(tokens=["Uno", " dos", " tres"]) as stub:
+                cliente = ClienteOllama(host=stub.host)
+                chat = ChatFinanciero(gestor, cliente=cliente,
+                                      cache_respuestas=CacheRespuestas(archivo_cache=None))
+                tokens = []
+                resultado = chat.generar_respuesta_stream("Hola", al_recibir_token=tokens.append)
+                cliente.cerrar()
+                assert tokens == ["Uno", " dos", " tres"], f"Tokens: {tokens}"
+                assert resultado['respuesta'] == "Uno dos tres", "Respuesta incompleta"
+
+        self.test("Respuesta en streaming", test_streaming)
+
+        # Test 5: Cancelar mientras Ollama no envía tokens corta la espera
+        def test_cancelar_stream():
+            import threading
+            import time
+            with ServidorOllamaStub(tokens=["Uno", " dos"], detener_tras=1) as stub:
+                cliente = ClienteOllama(host=stub.host)
+                chat = ChatFinanciero(gestor, cliente=cliente,
+                                      cache_respuestas=CacheRespuestas(archivo_cache=None))
+                cancelar = threading.Event()
+                inicio = time.monotonic()
+                resultado = chat.generar_respuesta_stream(
+                    "Hola", al_recibir_token=lambda token: threading.Timer(0.2, cancelar.set).start(),
+                    cancelar=cancelar)
+                transcurrido = time.monotonic() - inicio
+                cliente.cerrar()
+                assert resultado['tipo'] == 'cancelado', f"Resultado: {resultado}"
+                assert resultado['respuesta'] == "Uno", "Se perdió el texto parcial"
+                assert transcurrido < 5, f"Esperó al siguiente token: {transcurrido:.1f}s"
+
+        self.test("Cancelar respuesta en streaming", test_cancelar_stream)
+
+        # Test 6: Reutilizar contexto de Ollama mientras el libro no cambie
+        def test_contexto_ollama():
+            gestor.agregar_transaccion(datetime.now().strftime('%Y-%m-%d'),
+                                       "Sueldo", 1000, "Ingreso", "Salario")
+            with ServidorOllamaStub() as stub:
+                cliente = ClienteOllama(host=stub.host)
+                chat = ChatFinanciero(gestor, cliente=cliente,
+                                      cache_respuestas=CacheRespuestas(archivo_cache=None))
+                chat.generar_respuesta("Hola")
+                chat.generar_respuesta("¿Y mi balance?")
+                gestor.agregar_transaccion(datetime.now().strftime('%Y-%m-%d'),
+                                           "Cine", 200, "Gasto", "Entretenimiento")
+                chat.generar_respuesta("¿Y ahora?")
+                cliente.cerrar()
+                primero, segundo, tercero = stub.payloads
+                assert 'system' in primero and 'context' not in primero, "Primer turno sin system"
+                assert 'context' in segundo and 'system' not in segundo, "No se reutilizó el contexto"
+                assert 'system' in tercero, "No se reinició el contexto tras cambiar los datos"
+
+        self.test("Reutilizar contexto de Ollama", test_contexto_ollama)
+
+        # Test 7: Bloque de datos en caché y dentro del presupuesto
+        def test_bloque_contexto():
+            chat = ChatFinanciero(gestor, cache_respuestas=CacheRespuestas(archivo_cache=None))
+            constructor = chat.constructor_contexto
+            constructor.max_tokens = 120
+            bloque = constructor.obtener_bloque_datos()
+            assert constructor.obtener_bloque_datos() is bloque, "El bloque no se tomó de la caché"
+            assert "Balance Total" in bloque, "Falta el resumen"
+            gestor.agregar_transaccion(datetime.now().strftime('%Y-%m-%d'),
+                                       "Taxi", 50, "Gasto", "Transporte")
+            assert constructor.obtener_bloque_datos() is not bloque, "La caché no se invalidó"
+
+        self.test("Caché del contexto financiero", test_bloque_contexto)
+
+        # Test 8: Caché de respuestas por pregunta normalizada
+        def test_cache_respuestas():
+            with ServidorOllamaStub() as stub:
+                cliente = ClienteOllama(host=stub.host)
+                chat = ChatFinanciero(gestor, cliente=cliente,
+                                      cache_respuestas=CacheRespuestas(archivo_cache=None))
+                primera = chat.generar_respuesta("¿Cómo puedo ahorrar más?")
+                otra = ChatFinanciero(gestor, cliente=cliente, cache_respuestas=chat.cache_respuestas)
+                segunda = otra.generar_respuesta("como puedo ahorrar mas")
+                assert segunda.get('desde_cache'), "La pregunta repetida no usó la caché"
+                assert segunda['respuesta'] == primera['respuesta'], "Respuesta distinta"
+                assert len(stub.payloads) == 1, "Se volvió a consultar a Ollama"
+
+                # Tras reiniciar el contexto el prompt lleva el historial: ni se sirve ni se guarda
+                gestor.agregar_transaccion(datetime.now().strftime('%Y-%m-%d'),
+                                           "Tacos", 80, "Gasto", "Alimentación")
+                tercera = chat.generar_respuesta("¿Cómo puedo ahorrar más?")
+                assert not tercera.get('desde_cache'), "Sirvió la caché dentro de una conversación"
+                assert "HISTORIAL RECIENTE:\nUsuario:" in stub.payloads[-1]['prompt'], "Sin historial"
+                nueva = ChatFinanciero(gestor, cliente=cliente, cache_respuestas=chat.cache_respuestas)
+                cuarta = nueva.generar_respuesta("¿Cómo puedo ahorrar más?")
+                cliente.cerrar()
+                assert not cuarta.get('desde_cache'), "Guardó una respuesta que dependía del historial"
+
+            # Las respuestas que dependen de la conversación no se comparten entre conversaciones
+            cache = CacheRespuestas(archivo_cache=None)
+            cache.guardar("¿Y en comida?", "Seguimiento", 1)
+            cache.guardar("¿Cuánto ahorré el mes pasado?", "Con contexto", 1, contexto=[1, 2, 3])
+            cache.guardar("¿Cómo puedo ahorrar más?", "Autocontenida", 1)
+            assert list(cache.entradas) == ["como puedo ahorrar mas"], list(cache.entradas)
+            cache.entradas["y el mes pasado"] = dict(cache.entradas["como puedo ahorrar mas"],
+                                                     clave="y el mes pasado")
+            assert cache.obtener("¿y el mes pasado?", 1) is None, "Sirvió un seguimiento desde la caché"
+
+        self.test("Caché de respuestas", test_cache_respuestas)
+
+        # Test 9: Consultas estructuradas resueltas sin el LLM
+        def test_motor_consultas():
+            gestor.agregar_transaccion("2024-03-05", "Gasolina", 300, "Gasto", "Transporte")
+            gestor.agregar_transaccion("2024-03-20", "Uber", 150.5, "Gasto", "Transporte")
+            gestor.agregar_transaccion("2024-04-02", "Metro", 40, "Gasto", "Transporte")
+            with ServidorOllamaStub() as stub:
+                cliente = ClienteOllama(host=stub.host)
+                chat = ChatFinanciero(gestor, cliente=cliente,
+                                      cache_respuestas=CacheRespuestas(archivo_cache=None))
+                monto = chat.generar_respuesta("¿Cuánto gasté en gasolina en marzo 2024?")
+                top = chat.generar_respuesta("top 2 gastos de marzo 2024")
+                comparativa = chat.generar_respuesta("compara abril 2024 vs marzo 2024")
+                cliente.cerrar()
+                assert monto['tipo'] == 'consulta', f"No se resolvió localmente: {monto}"
+                assert "$450.50" in monto['respuesta'], monto['respuesta']
+                assert top['respuesta'].index("Gasolina") < top['respuesta'].index("Uber"), "Orden incorrecto"
+                assert "$40.00 vs $450.50" in comparativa['respuesta'], comparativa['respuesta']
+                assert not stub.payloads, "Se consultó a Ollama"
+
+            # Solo el estado del presupuesto se responde con la tabla; lo demás va al LLM
+            import tempfile
+            from procesador.motor_consultas import MotorConsultas
+            with tempfile.TemporaryDirectory() as carpeta:
+                presupuestos = GestorPresupuestos(gestor, os.path.join(carpeta, "presupuestos.json"))
+                presupuestos.presupuestos = {}
+                presupuestos.establecer_presupuesto("Transporte", 1000)
+                motor = MotorConsultas(gestor, presupuestos)
+                assert motor.responder("¿Cómo debería armar mi presupuesto?") is None, "Pregunta abierta"
+                assert motor.responder("¿Cuánto gasto en promedio al mes?") is None, "Promedio como total"
+                assert motor.responder("¿Cuánto debería gastar en comida?") is None, "Consejo como total"
+                assert motor.responder("¿Cuánto gasto normalmente?") is None, "Hábito como total"
+                assert "en total" in motor.responder("¿Cuánto gasté en total?"), "Total explícito"
+                assert "Transporte" in motor.responder("¿Cómo voy con mi presupuesto?")
+                assert "Transporte" in motor.responder("presupuesto de gasolina")
+                version = presupuestos._version_config
+                motor.responder("¿Cuánto me queda del presupuesto?")
+                assert presupuestos._version_config == version, "Recargó los presupuestos del disco"
+
+                # Sin gestor inyectado no se crea (ni suscribe) otro: la pregunta va al LLM
+                suscriptores = len(gestor._suscriptores)
+                assert MotorConsultas(gestor).responder("¿Cómo voy con mi presupuesto?") is None
+                assert len(gestor._suscriptores) == suscriptores, "Creó otro gestor de presupuestos"
+                presupuestos.cerrar()
+                assert len(gestor._suscriptores) == suscriptores - 1, "Sigue suscrito al libro"
+
+        self.test("Consultas locales sin LLM", test_motor_consultas)
+
+        if os.path.exists("datos/test_chat.csv"):
+            os.remove("datos/test_chat.csv")
+
+    def test_reportes(self):
+        """Pruebas de la generación de reportes en segundo plano"""
+        print("\n📄 Testing Reportes...")
+
+        gestor = GestorTransacciones("datos/test_reportes.csv")
+        gestor.transacciones = []
+        for i in range(30):
+            gestor.agregar_transaccion(f"2024-0{1 + i % 3}-{10 + i % 15}", f"Compra {i}",
+                                       50 + i, "Gasto", ["Alimentación", "Transporte"][i % 2])
+        exportador = Exportador(gestor)
+        archivo_pdf = "datos/test_reporte.pdf"
+
+        # Las gráficas de los reportes van a una caché temporal, no a datos/cache_graficas
+        import tempfile
+        from utils import cache_graficas
+        carpeta_graficas = tempfile.TemporaryDirectory()
+        cache_previa = cache_graficas._cache_compartida
+        cache_graficas._cache_compartida = cache_graficas.CacheGraficas(directorio=carpeta_graficas.name)
+
+        # Test 1: PDF en segundo plano con progreso
+        def test_pdf_async():
+            trabajos = GestorTrabajos()
+            avances = []
+            trabajo = trabajos.enviar(
+                "PDF", lambda progreso, cancelar: exportador.generar_reporte_pdf(archivo_pdf, progreso=progreso),
+                al_progreso=lambda t: avances.append(t.progreso))
+            assert trabajo.esperar(timeout=60), "El reporte no terminó"
+            trabajos.procesar_eventos()
+            assert trabajo.estado == 'completado', f"Estado: {trabajo.estado} {trabajo.error}"
+            assert trabajo.resultado and os.path.getsize(archivo_pdf) > 0, "No se generó el PDF"
+            assert avances and avances == sorted(avances), f"Progreso: {avances}"
+
+        self.test("Reporte PDF en segundo plano", test_pdf_async)
+
+        # Test 2: Cancelación sin dejar archivo parcial
+        def test_cancelar():
+            if os.path.exists(archivo_pdf):
+                os.remove(archivo_pdf)
+            trabajos = GestorTrabajos()
+            finalizados = []
+
+            def generar(progreso, cancelar):
+                cancelar.set()  # Simula que el usuario cancela durante la generación
+                return exportador.generar_reporte_pdf(archivo_pdf, progreso=progreso)
+
+            trabajo = trabajos.enviar("PDF", generar, al_terminar=finalizados.append)
+            assert trabajo.esperar(timeout=60), "El trabajo no terminó"
+            trabajos.procesar_eventos()
+            assert trabajo.estado == 'cancelado', f"Estado: {trabajo.estado}"
+            assert finalizados == [trabajo], "No se notificó el fin del trabajo"
+            assert not os.path.exists(archivo_pdf), "Quedó un archivo parcial"
+
+        self.test("Cancelar reporte", test_cancelar)
+
+        # Test 3: Excel en streaming con hojas opcionales
+        archivo_excel = "datos/test_reporte.xlsx"
+
+        def test_excel_streaming():
+            from openpyxl import load_workbook
+            assert exportador.exportar_excel(archivo_excel, hojas_por_mes=True, incluir_pivote=True)
+            libro = load_workbook(archivo_excel, read_only=True)
+            hojas = libro.sheetnames
+            assert hojas[:4] == ['Transacciones', 'Resumen', 'Por Categoría', 'Categoría x Mes'], hojas
+            assert hojas[4:] == ['2024-01', '2024-02', '2024-03'], hojas
+            assert len(list(libro['Transacciones'].values)) == 31, "Faltan filas"
+            pivote = list(libro['Categoría x Mes'].values)
+            assert pivote[-1][-1] == round(gestor.obtener_total_gastos(), 2), "Total del pivote incorrecto"
+            libro.close()
+
+        self.test("Exportar Excel en streaming", test_excel_streaming)
+
+        # Test 4: Estado de cuenta de un periodo
+        def test_estado_cuenta():
+            periodo = gestor.obtener_transacciones_periodo("2024-02-01", "2024-02-29")
+            assert len(periodo) == 10, f"Transacciones en el periodo: {len(periodo)}"
+            assert [t['fecha'] for t in periodo] == sorted(t['fecha'] for t in periodo), "Sin ordenar"
+            assert exportador.generar_estado_cuenta(archivo_pdf, "2024-01-01", "2024-02-29")
+            assert os.path.getsize(archivo_pdf) > 0, "No se generó el estado de cuenta"
+
+            # Un periodo que no empieza con el libro abre con el saldo de lo anterior
+            previas = [t for t in gestor.transacciones if t['fecha'] < "2024-02-01"]
+            esperado = sum(t['monto'] if t['tipo'] == 'Ingreso' else -t['monto'] for t in previas)
+            assert previas, "El caso de prueba necesita movimientos previos"
+            assert exportador.calcular_saldo_inicial("2024-02-01") == round(esperado, 2), "Saldo inicial"
+            assert exportador.calcular_saldo_inicial(None) == 0
+            assert exportador.generar_estado_cuenta(archivo_pdf, "2024-02-01", "2024-02-29")
+
+        self.test("Estado de cuenta por periodo", test_estado_cuenta)
+
+        # Test 5: Caché de gráficas por contenido
+        def test_cache_graficas():
+            import tempfile
+            from utils.cache_graficas import CacheGraficas
+            from utils.visualizacion import dibujar_pastel_reporte
+
+            with tempfile.TemporaryDirectory() as directorio:
+                cache = CacheGraficas(directorio=directorio)
+                datos = [["Alimentación", 100.0], ["Transporte", 50.0]]
+                png = cache.obtener('pastel_gastos', datos, 4, 3, 72, dibujar_pastel_reporte)
+                assert png.startswith(b'\x89PNG'), "No es un PNG"
+                assert cache.obtener('pastel_gastos', datos, 4, 3, 72, dibujar_pastel_reporte) is png
+                cache.obtener('pastel_gastos', datos, 4, 3, 100, dibujar_pastel_reporte)
+                assert cache.renderizadas == 2, f"Renderizadas: {cache.renderizadas}"
+
+                # Una instancia nueva la toma de disco sin volver a dibujar
+                otra = CacheGraficas(directorio=directorio, max_disco_bytes=len(png) + 1)
+                assert otra.obtener('pastel_gastos', datos, 4, 3, 72, dibujar_pastel_reporte) == png
+                assert otra.aciertos_disco == 1 and otra.renderizadas == 0, "No se leyó de disco"
+                otra.obtener('pastel_gastos', datos[:1], 4, 3, 72, dibujar_pastel_reporte)
+                assert len(os.listdir(directorio)) == 1, "No se desalojó la imagen más antigua"
+
+            # El PDF de este grupo guardó su pastel en la caché temporal
+            assert os.listdir(carpeta_graficas.name), "El reporte no usó la caché temporal"
+
+        self.test("Caché de gráficas", test_cache_graficas)
+
+        # Test 6: Suite de benchmarks y comparación con la línea base
+        def test_benchmarks():
+            from bench import rendimiento
+            assert rendimiento.generar_filas(50, 7) == rendimiento.generar_filas(50, 7), "Libro no determinista"
+
+            resultados = rendimiento.ejecutar_suite([200], ['obtener_balance', 'buscar_transacciones'],
+                                                    repeticiones=1, salida=lambda *_: None)
+            assert set(resultados) == {'obtener_balance@200', 'buscar_transacciones@200'}, resultados
+
+            base = {'obtener_balance@200': {'mediana': 0.001}, 'exportar_pdf@200': {'mediana': 1.0}}
+            lento = {'obtener_balance@200': {'mediana': 0.01}}
+            comparacion = rendimiento.comparar(lento, base)
+            assert len(comparacion) == 1 and comparacion[0]['regresion'], "Regresión no detectada"
+            assert not rendimiento.comparar({'obtener_balance@200': {'mediana': 0.0011}}, base)[0]['regresion']
+
+        self.test("Suite de benchmarks", test_benchmarks)
+
+        # Test 7: Perfilador por muestreo con atribución al manejador de Tk
+        def test_perfilador():
+            import tempfile
+            import time
+            from utils.perfilador import PerfiladorMuestreo
+
+            # CallWrapper.__call__ de tkinter simulado: llama al manejador del evento
+            espacio = {}
+            exec(compile("def __call__(funcion):\n    return funcion()\n",
+                         os.path.join("tkinter", "__init__.py"), "exec"), espacio)
+
+            def manejador_lento():
+                fin = time.perf_counter() + 0.3
+                while time.perf_counter() < fin:
+                    sum(range(1000))
+
+            perfilador = PerfiladorMuestreo(intervalo_ms=1)
+            perfilador.iniciar()
+            espacio['__call__'](lambda: manejador_lento())
+            perfilador.detener()
+
+            assert perfilador.muestras > 10, f"Muestras: {perfilador.muestras}"
+            (principal, cuenta), = perfilador.manejadores.most_common(1)
+            assert principal.endswith("manejador_lento"), f"Manejador: {principal}"
+            assert cuenta > perfilador.muestras / 2, "Tiempo mal atribuido"
+
+            with tempfile.TemporaryDirectory() as carpeta:
+                colapsado, resumen = perfilador.guardar(carpeta)
+                with open(colapsado, 'r', encoding='utf-8') as f:
+                    lineas = f.read().splitlines()
+                assert all(l.rsplit(' ', 1)[1].isdigit() for l in lineas), "Formato colapsado inválido"
+                assert any('manejador_lento' in l for l in lineas), "Falta la pila del manejador"
+                with open(resumen, 'r', encoding='utf-8') as f:
+                    assert 'manejador_lento' in f.read(), "Resumen sin el manejador"
+
+            # Las funciones programadas con after() pasan por el 'callit' de tkinter
+            import tkinter
+            interprete = tkinter.Tcl()
+            por_after = PerfiladorMuestreo(intervalo_ms=1)
+
+            def refresco_periodico():
+                por_after.registrar_pila(sys._getframe())
+
+            interprete.after(0, refresco_periodico)
+            interprete.update()
+            assert list(por_after.manejadores) == [
+                f"test_sistema.py:{refresco_periodico.__qualname__}"], dict(por_after.manejadores)
+
+        self.test("Perfilador por muestreo", test_perfilador)
+
+        # Test 8: Mantenimiento en segundo plano solo con la interfaz inactiva
+        def test_mantenimiento():
+            import tempfile
+            import time
+            from datos.almacen_backups import AlmacenBackups
+            from utils.mantenimiento import ProgramadorMantenimiento, TareaMantenimiento, crear_tareas
+            from utils.optimizador import Optimizador
+
+            def ejecutar_pendientes(programador):
+                while programador.revisar() is not None:
+                    programador.en_curso[1].esperar(timeout=10)
+                    programador.trabajos.procesar_eventos()
+
+            with tempfile.TemporaryDirectory() as carpeta:
+                libro = GestorTransacciones(os.path.join(carpeta, "libro.csv"))
+                libro.transacciones = []
+                libro.agregar_transacciones_lote(
+                    [{'fecha': f"2024-01-{dia:02d}", 'descripcion': "Café", 'monto': 50,
+                      'tipo': "Gasto", 'categoria': "Alimentación"} for dia in (1, 2, 3, 3, 3)])
+                optimizador = Optimizador(libro)
+                almacen = AlmacenBackups(os.path.join(carpeta, "backups"), [libro.archivo_datos])
+                estado = os.path.join(carpeta, "mantenimiento.json")
+
+                programador = ProgramadorMantenimiento(crear_tareas(libro, optimizador, almacen),
+                                                       inactividad_segundos=0.2, archivo_estado=estado)
+                programador.registrar_actividad()
+                assert programador.revisar() is None, "Corrió con el usuario activo"
+
+                time.sleep(0.25)
+                ejecutar_pendientes(programador)
+                resultados = {n: e['resultado'] for n, e in programador.obtener_estado().items()}
+                assert all(e['ultima'] for e in programador.obtener_estado().values()), "Faltan tareas"
+                assert resultados['indices'] == {'duplicados': 2, 'indice_fechas': True}, resultados['indices']
+                assert resultados['snapshot']['nuevo'], "No se creó el snapshot"
+                assert resultados['estadisticas']['duplicados'] == 2, resultados['estadisticas']
+
+                # El botón de optimizar reutiliza el índice construido en segundo plano
+                assert optimizador.limpiar_transacciones_duplicadas() == 2
+                assert len(libro.transacciones) == 3
+
+                # Las ejecuciones se recuerdan entre sesiones
+                otra = ProgramadorMantenimiento(crear_tareas(libro, optimizador, almacen),
+                                                inactividad_segundos=0, archivo_estado=estado)
+                assert otra.revisar() is None, "Repitió tareas recién ejecutadas"
+
+                # Una tecla o clic cancela la tarea en curso; se reintenta después
+                def tarea_larga(progreso, cancelar):
+                    while True:
+                        progreso(0.5)
+                        time.sleep(0.01)
+                larga = TareaMantenimiento('larga', "Larga", tarea_larga, 60)
+                pausable = ProgramadorMantenimiento([larga], inactividad_segundos=0, archivo_estado='')
+                assert pausable.revisar() is larga
+                pausable.registrar_actividad()
+                assert pausable.en_curso[1].esperar(timeout=5), "No se canceló"
+                pausable.trabajos.procesar_eventos()
+                assert pausable.en_curso is None and larga.ultima is None, "La tarea cancelada no queda pendiente"
+
+                # El snapshot se interrumpe entre bloques sin dejar un manifiesto a medias
+                import threading
+                from utils.trabajos import TrabajoCancelado
+                cancelar = threading.Event()
+                cancelar.set()
+                snapshots = len(almacen.listar_snapshots())
+                libro.agregar_transaccion("2024-01-04", "Pan", 20, "Gasto", "Alimentación")
+                try:
+                    almacen.crear_snapshot(cancelar=cancelar)
+                    assert False, "El snapshot ignoró la cancelación"
+                except TrabajoCancelado:
+                    pass
+                assert len(almacen.listar_snapshots()) == snapshots, "Quedó un snapshot parcial"
+
+                # Si el trabajo ya había terminado cuando llegó la cancelación, cuenta como hecho
+                liberar = threading.Event()
+
+                def tarea_atomica(progreso, cancelar):
+                    liberar.wait(5)
+                    return {'hecho': True}
+                atomica = TareaMantenimiento('atomica', "Atómica", tarea_atomica, 60)
+                sin_pausa = ProgramadorMantenimiento([atomica], inactividad_segundos=0, archivo_estado='')
+                sin_pausa.revisar()
+                sin_pausa.registrar_actividad()
+                liberar.set()
+                sin_pausa.en_curso[1].esperar(timeout=5)
+                sin_pausa.trabajos.procesar_eventos()
+                assert atomica.ultima is not None and atomica.resultado == {'hecho': True}, "Se repetiría la tarea"
+
+        self.test("Mantenimiento en segundo plano", test_mantenimiento)
+
+        for archivo in ("datos/test_reportes.csv", archivo_pdf, archivo_excel):
+            if os.path.exists(archivo):
+                os.remove(archivo)
+        cache_graficas._cache_compartida = cache_previa
+        carpeta_graficas.cleanup()
+
     def ejecutar_todos(self):
         """Ejecuta todas las pruebas"""
         print("=" * 60)
@@ -227,6 +1180,8 @@ class TestSistema:
         self.test_gestor_metas()
         self.test_gestor_presupuestos()
         self.test_analizador()
+        self.test_cliente_ollama()
+        self.test_reportes()
 
         # Resumen
         print("\n" + "=" * 60)
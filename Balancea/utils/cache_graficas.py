@@ -0,0 +1,190 @@
+"""
+Caché de Gráficas
+Imágenes PNG direccionadas por contenido, en memoria y en disco, compartidas por los reportes
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+import config
+
+
+# Cambiar si se modifica el dibujo de alguna gráfica (invalida las imágenes guardadas)
+VERSION_GRAFICAS = 1
+
+
+class CacheGraficas:
+    """
+    Caché LRU de gráficas renderizadas.
+    La clave es el hash de los datos agregados, el tipo, el tamaño y los DPI,
+    así que una imagen solo se vuelve a dibujar si cambió lo que muestra
+    """
+
+    def __init__(self, directorio=None, max_memoria_bytes=None, max_disco_bytes=None):
+        self.directorio = directorio if directorio is not None else config.CACHE_GRAFICAS_DIR
+        self.max_memoria_bytes = max_memoria_bytes or config.CACHE_GRAFICAS_MAX_MEMORIA_MB * 1024 * 1024
+        self.max_disco_bytes = max_disco_bytes or config.CACHE_GRAFICAS_MAX_DISCO_MB * 1024 * 1024
+
+        # clave -> bytes PNG; el orden refleja el uso (LRU)
+        self.memoria = OrderedDict()
+        self.bytes_memoria = 0
+        self._lock = threading.Lock()
+
+        # Estadísticas
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.renderizadas = 0
+
+        if self.directorio:
+            Path(self.directorio).mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def calcular_clave(tipo, datos, ancho, alto, dpi):
+        """Hash del contenido de la gráfica"""
+        contenido = json.dumps([VERSION_GRAFICAS, tipo, datos, ancho, alto, dpi],
+                               ensure_ascii=False, default=str)
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+    def obtener(self, tipo, datos, ancho, alto, dpi, dibujar):
+        """
+        Retorna los bytes PNG de la gráfica, renderizándola solo si no está en caché.
+        datos: valores agregados serializables (deben determinar la imagen por completo)
+        dibujar(fig, datos): dibuja sobre una Figure de matplotlib (backend Agg)
+        """
+        clave = self.calcular_clave(tipo, datos, ancho, alto, dpi)
+
+        with self._lock:
+            png = self.memoria.get(clave)
+            if png is not None:
+                self.memoria.move_to_end(clave)
+                self.aciertos_memoria += 1
+                return png
+
+        png = self._leer_disco(clave)
+        if png is not None:
+            with self._lock:
+                self.aciertos_disco += 1
+                self._guardar_memoria(clave, png)
+            return png
+
+        png = self._renderizar(dibujar, datos, ancho, alto, dpi)
+        with self._lock:
+            self.renderizadas += 1
+            self._guardar_memoria(clave, png)
+        self._guardar_disco(clave, png)
+        return png
+
+    def limpiar(self):
+        """Vacía la caché en memoria y en disco"""
+        with self._lock:
+            self.memoria.clear()
+            self.bytes_memoria = 0
+
+        for archivo in self._archivos_disco():
+            try:
+                os.remove(archivo.path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _renderizar(dibujar, datos, ancho, alto, dpi):
+        """Dibuja la gráfica con Agg (sin pyplot, seguro fuera del hilo de Tk)"""
+        fig = Figure(figsize=(ancho, alto), dpi=dpi)
+        FigureCanvasAgg(fig)
+        dibujar(fig, datos)
+
+        buffer = BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+        return buffer.getvalue()
+
+    def _guardar_memoria(self, clave, png):
+        """Agrega a memoria y desaloja las menos usadas (llamar con el lock tomado)"""
+        if clave in self.memoria:
+            return
+
+        self.memoria[clave] = png
+        self.bytes_memoria += len(png)
+
+        while self.bytes_memoria > self.max_memoria_bytes and len(self.memoria) > 1:
+            _, antigua = self.memoria.popitem(last=False)
+            self.bytes_memoria -= len(antigua)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.png")
+
+    def _leer_disco(self, clave):
+        """Lee una imagen de disco y la marca como usada recientemente"""
+        if not self.directorio:
+            return None
+
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'rb') as f:
+                png = f.read()
+            os.utime(ruta)  # La fecha de modificación sirve como orden LRU
+            return png
+        except OSError:
+            return None
+
+    def _guardar_disco(self, clave, png):
+        """Escribe la imagen (vía archivo temporal) y depura si se excede el límite"""
+        if not self.directorio:
+            return
+
+        ruta = self._ruta(clave)
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporal, 'wb') as f:
+                f.write(png)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            print(f"Error al guardar gráfica en caché: {e}")
+            return
+
+        self._depurar_disco()
+
+    def _archivos_disco(self):
+        if not self.directorio or not os.path.isdir(self.directorio):
+            return []
+        return [a for a in os.scandir(self.directorio) if a.name.endswith('.png')]
+
+    def _depurar_disco(self):
+        """Elimina las imágenes usadas hace más tiempo hasta respetar el límite"""
+        archivos = []
+        for archivo in self._archivos_disco():
+            try:
+                estado = archivo.stat()
+                archivos.append((estado.st_mtime, estado.st_size, archivo.path))
+            except OSError:
+                continue
+
+        total = sum(tamaño for _, tamaño, _ in archivos)
+        for _, tamaño, ruta in sorted(archivos):
+            if total <= self.max_disco_bytes:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamaño
+            except OSError:
+                pass
+
+
+_cache_compartida = None
+_lock_compartida = threading.Lock()
+
+
+def obtener_cache_graficas():
+    """Instancia única compartida por el PDF, el Excel y los demás reportes"""
+    global _cache_compartida
+    with _lock_compartida:
+        if _cache_compartida is None:
+            _cache_compartida = CacheGraficas()
+        return _cache_compartida
@@ -9,21 +9,53 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
-from datetime import datetime
-import matplotlib.pyplot as plt
+from datetime import datetime, date, timedelta
 from io import BytesIO
-import pandas as pd
+import heapq
+import os
+import config
+from openpyxl import Workbook
+from openpyxl.drawing.image import Image as ImagenExcel
+from utils.trabajos import TrabajoCancelado
+from utils.cache_graficas import obtener_cache_graficas
+from datos import dinero
+from utils.visualizacion import dibujar_pastel_reporte
+from utils.instrumentacion import instrumentar
 
 
 class Exportador:
     """Clase para exportar reportes en diferentes formatos"""
 
+    FILAS_POR_BLOQUE = 5000  # Filas entre verificaciones de progreso/cancelación
+    MAX_FILAS_HOJA = 1048575  # Límite de filas de Excel sin el encabezado
+    FILAS_POR_TABLA = 100  # Tablas pequeñas: reportlab parte tablas grandes en tiempo cuadrático
+    FILAS_POR_PAGINA = 42  # Estimación para reportar el avance del estado de cuenta
+
     def __init__(self, gestor_datos):
         self.gestor_datos = gestor_datos
         self.styles = getSampleStyleSheet()
 
-    def generar_reporte_pdf(self, archivo_destino, incluir_graficas=True):
-        """Genera un reporte completo en PDF"""
+    @staticmethod
+    def _avanzar(progreso, fraccion, mensaje):
+        """Reporta avance; el callback de la cola lanza TrabajoCancelado si se canceló"""
+        if progreso:
+            progreso(fraccion, mensaje)
+
+    @staticmethod
+    def _eliminar_parcial(archivo_destino):
+        """Elimina un archivo a medio escribir tras una cancelación"""
+        try:
+            if os.path.exists(archivo_destino):
+                os.remove(archivo_destino)
+        except OSError:
+            pass
+
+    @instrumentar('exportar.pdf', filas=lambda self, *a, **k: len(self.gestor_datos.transacciones))
+    def generar_reporte_pdf(self, archivo_destino, incluir_graficas=True, progreso=None):
+        """
+        Genera un reporte completo en PDF.
+        progreso(fraccion, mensaje): callback opcional de la cola de trabajos
+        """
         try:
             # Crear documento
             doc = SimpleDocTemplate(archivo_destino, pagesize=letter,
@@ -34,34 +66,280 @@ class Exportador:
             elementos = []
 
             # Agregar encabezado
+            self._avanzar(progreso, 0.05, "Preparando encabezado...")
             elementos.extend(self._crear_encabezado())
 
             # Agregar resumen financiero
+            self._avanzar(progreso, 0.15, "Calculando resumen...")
             elementos.extend(self._crear_resumen_financiero())
 
             # Agregar tabla de transacciones recientes
+            self._avanzar(progreso, 0.25, "Generando tabla de transacciones...")
             elementos.extend(self._crear_tabla_transacciones())
 
             # Agregar gráficas si se solicita
             if incluir_graficas and len(self.gestor_datos.transacciones) > 0:
+                self._avanzar(progreso, 0.35, "Renderizando gráficas...")
                 elementos.append(PageBreak())
                 elementos.extend(self._crear_seccion_graficas())
 
             # Agregar top gastos
+            self._avanzar(progreso, 0.6, "Calculando top gastos...")
             elementos.extend(self._crear_top_gastos())
 
             # Agregar pie de página
             elementos.extend(self._crear_pie_pagina())
 
-            # Construir PDF
-            doc.build(elementos)
+            # Construir PDF (se verifica la cancelación en cada página)
+            self._avanzar(progreso, 0.7, "Construyendo PDF...")
+
+            def al_dibujar_pagina(canvas, documento):
+                self._avanzar(progreso, min(0.95, 0.7 + 0.05 * documento.page),
+                              f"Página {documento.page}...")
+
+            doc.build(elementos, onFirstPage=al_dibujar_pagina, onLaterPages=al_dibujar_pagina)
+            self._avanzar(progreso, 1.0, "Reporte PDF listo")
             return True
 
+        except TrabajoCancelado:
+            self._eliminar_parcial(archivo_destino)
+            raise
         except Exception as e:
             print(f"Error al generar PDF: {e}")
             return False
 
-    def _crear_encabezado(self):
+    @instrumentar('exportar.estado_cuenta', filas=lambda self, *a, **k: len(self.gestor_datos.transacciones))
+    def generar_estado_cuenta(self, archivo_destino, fecha_inicio=None, fecha_fin=None,
+                              progreso=None):
+        """
+        Genera un estado de cuenta con todas las transacciones del periodo.
+        Las tablas se paginan repitiendo el encabezado y cada mes cierra con sus
+        subtotales, calculados en una sola pasada sobre el índice por fecha.
+        El saldo acumulado parte del saldo de todo lo anterior a fecha_inicio.
+        Saldos y subtotales se acumulan en centavos enteros (sin deriva de float).
+        fecha_inicio / fecha_fin: 'YYYY-MM-DD' (inclusive); None = sin límite
+        """
+        try:
+            self._avanzar(progreso, 0.02, "Buscando transacciones del periodo...")
+            transacciones = self.gestor_datos.obtener_transacciones_periodo(fecha_inicio, fecha_fin)
+            saldo_inicial = self._saldo_inicial_centavos(fecha_inicio)
+
+            doc = SimpleDocTemplate(archivo_destino, pagesize=letter,
+                                    rightMargin=54, leftMargin=54,
+                                    topMargin=54, bottomMargin=36,
+                                    title="Estado de Cuenta - Balancea")
+
+            desde = fecha_inicio or (transacciones[0]['fecha'] if transacciones else '-')
+            hasta = fecha_fin or (transacciones[-1]['fecha'] if transacciones else '-')
+            periodo = f"Periodo: {desde} a {hasta}"
+
+            elementos = self._crear_encabezado("Estado de Cuenta")
+            elementos.append(Paragraph(periodo, self.styles['Normal']))
+            elementos.append(Spacer(1, 12))
+
+            if not transacciones:
+                elementos.append(Paragraph("No hay transacciones en el periodo seleccionado",
+                                           self.styles['Normal']))
+                doc.build(elementos)
+                return True
+
+            # Una pasada: filas por mes, subtotales y saldo acumulado
+            secciones = []
+            resumen_meses = []
+            mes_actual = None
+            filas = None
+            ingresos_mes = gastos_mes = 0
+            total_ingresos = total_gastos = 0
+            saldo = saldo_inicial
+            total = len(transacciones)
+
+            # Primera fila del estado: el saldo con el que abre el periodo
+            apertura = [fecha_inicio or transacciones[0]['fecha'], 'Saldo inicial', '', '',
+                        dinero.formatear(saldo_inicial)]
+
+            def cerrar_mes():
+                resumen_meses.append((mes_actual, ingresos_mes, gastos_mes, len(filas)))
+                secciones.append((mes_actual, filas, ingresos_mes, gastos_mes, saldo))
+
+            for i, t in enumerate(transacciones):
+                if i % 2000 == 0:
+                    self._avanzar(progreso, 0.05 + 0.25 * i / total,
+                                  f"Procesando transacciones {i:,}/{total:,}...")
+
+                mes = t['fecha'][:7]
+                if mes != mes_actual:
+                    if mes_actual is not None:
+                        cerrar_mes()
+                    mes_actual, filas = mes, []
+                    ingresos_mes = gastos_mes = 0
+
+                # Saldo y subtotales en moneda base; la línea muestra el monto original
+                centavos = self.gestor_datos.centavos_en_base(t)
+                importe = dinero.formatear(round(t['monto'] * 100))
+                moneda = self.gestor_datos.moneda_de(t)
+                if moneda != self.gestor_datos.moneda_base:
+                    importe += f" {moneda}"
+                if t['tipo'] == 'Ingreso':
+                    ingresos_mes += centavos
+                    total_ingresos += centavos
+                    saldo += centavos
+                else:
+                    gastos_mes += centavos
+                    total_gastos += centavos
+                    saldo -= centavos
+                    importe = '-' + importe
+
+                descripcion = t['descripcion']
+                filas.append([
+                    t['fecha'],
+                    descripcion[:38] + '...' if len(descripcion) > 38 else descripcion,
+                    t['categoria'],
+                    importe,
+                    dinero.formatear(saldo)
+                ])
+
+            cerrar_mes()
+
+            # Resumen del periodo y tabla índice por mes
+            elementos.extend(self._crear_resumen_periodo(total_ingresos, total_gastos, total,
+                                                         resumen_meses, saldo_inicial))
+
+            # Detalle por mes
+            self._avanzar(progreso, 0.35, "Maquetando tablas...")
+            for i, (mes, filas, ingresos_mes, gastos_mes, saldo_mes) in enumerate(secciones):
+                elementos.append(Paragraph(self._nombre_mes(mes), self.styles['Heading3']))
+                elementos.extend(self._crear_tablas_paginadas(filas, ingresos_mes, gastos_mes, saldo_mes,
+                                                              apertura if i == 0 else None))
+                elementos.append(Spacer(1, 14))
+
+            elementos.extend(self._crear_pie_pagina())
+
+            paginas_estimadas = max(1, total // self.FILAS_POR_PAGINA)
+
+            def al_dibujar_pagina(canvas, documento):
+                canvas.saveState()
+                canvas.setFont('Helvetica', 7)
+                canvas.setFillColor(colors.grey)
+                canvas.drawRightString(letter[0] - 54, 20, f"Página {documento.page}")
+                canvas.restoreState()
+                self._avanzar(progreso, min(0.98, 0.4 + 0.58 * documento.page / paginas_estimadas),
+                              f"Página {documento.page}...")
+
+            doc.build(elementos, onFirstPage=al_dibujar_pagina, onLaterPages=al_dibujar_pagina)
+            self._avanzar(progreso, 1.0, "Estado de cuenta listo")
+            return True
+
+        except TrabajoCancelado:
+            self._eliminar_parcial(archivo_destino)
+            raise
+        except Exception as e:
+            print(f"Error al generar estado de cuenta: {e}")
+            return False
+
+    def calcular_saldo_inicial(self, fecha_inicio):
+        """Saldo (ingresos - gastos) de todas las transacciones anteriores a fecha_inicio"""
+        return self._saldo_inicial_centavos(fecha_inicio) / 100
+
+    def _saldo_inicial_centavos(self, fecha_inicio):
+        if not fecha_inicio:
+            return 0
+        anterior = (datetime.strptime(fecha_inicio, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+        previas = self.gestor_datos.obtener_transacciones_periodo(None, anterior)
+        return sum(self.gestor_datos.centavos_en_base(t) * (1 if t['tipo'] == 'Ingreso' else -1)
+                   for t in previas)
+
+    def _crear_resumen_periodo(self, ingresos, gastos, total, resumen_meses, saldo_inicial=0):
+        """Totales del periodo (en centavos) e índice de meses con sus subtotales"""
+        elementos = [Paragraph("📊 Resumen del Periodo", self.styles['Heading2'])]
+
+        tabla = Table([
+            ['Saldo inicial', dinero.formatear(saldo_inicial)],
+            ['Total Ingresos', dinero.formatear(ingresos)],
+            ['Total Gastos', dinero.formatear(gastos)],
+            ['Neto', dinero.formatear(ingresos - gastos)],
+            ['Saldo final', dinero.formatear(saldo_inicial + ingresos - gastos)],
+            ['Movimientos', f'{total:,}'],
+        ], colWidths=[2.5 * inch, 2 * inch])
+        tabla.setStyle(TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ECF0F1')),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 4), (-1, 4), 'Helvetica-Bold'),
+        ]))
+        elementos.append(tabla)
+        elementos.append(Spacer(1, 14))
+
+        datos = [['Mes', 'Ingresos', 'Gastos', 'Neto', 'Movimientos']]
+        for mes, ingresos_mes, gastos_mes, movimientos in resumen_meses:
+            datos.append([self._nombre_mes(mes), dinero.formatear(ingresos_mes), dinero.formatear(gastos_mes),
+                          dinero.formatear(ingresos_mes - gastos_mes), f'{movimientos:,}'])
+
+        indice = Table(datos, colWidths=[1.6 * inch, 1.3 * inch, 1.3 * inch, 1.3 * inch, 1 * inch],
+                       repeatRows=1)
+        indice.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498DB')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ]))
+        elementos.append(indice)
+        elementos.append(PageBreak())
+        return elementos
+
+    def _crear_tablas_paginadas(self, filas, ingresos_mes, gastos_mes, saldo_mes, apertura=None):
+        """
+        Divide las filas de un mes en tablas con encabezado repetido en cada página;
+        la primera puede abrir con la fila de saldo inicial y la última lleva los
+        subtotales del mes (en centavos)
+        """
+        encabezado = ['Fecha', 'Descripción', 'Categoría', 'Monto', 'Saldo']
+        anchos = [0.85 * inch, 2.6 * inch, 1.25 * inch, 1 * inch, 1.1 * inch]
+        estilo_base = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498DB')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('ALIGN', (3, 0), (4, -1), 'RIGHT'),
+            ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ]
+
+        tablas = []
+        for inicio in range(0, len(filas), self.FILAS_POR_TABLA):
+            datos = [encabezado] + filas[inicio:inicio + self.FILAS_POR_TABLA]
+            estilo = list(estilo_base)
+
+            if inicio == 0 and apertura:
+                datos.insert(1, apertura)
+                estilo.append(('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Oblique'))
+
+            if inicio + self.FILAS_POR_TABLA >= len(filas):
+                n = len(datos)
+                datos.append(['', 'Subtotal ingresos', '', dinero.formatear(ingresos_mes), ''])
+                datos.append(['', 'Subtotal gastos', '', '-' + dinero.formatear(gastos_mes), ''])
+                datos.append(['', 'Neto del mes', '', dinero.formatear(ingresos_mes - gastos_mes),
+                              dinero.formatear(saldo_mes)])
+                estilo += [
+                    ('BACKGROUND', (0, n), (-1, -1), colors.HexColor('#ECF0F1')),
+                    ('FONTNAME', (0, n), (-1, -1), 'Helvetica-Bold'),
+                    ('LINEABOVE', (0, n), (-1, n), 1, colors.black),
+                ]
+
+            tabla = Table(datos, colWidths=anchos, repeatRows=1)
+            tabla.setStyle(TableStyle(estilo))
+            tablas.append(tabla)
+
+        return tablas
+
+    @staticmethod
+    def _nombre_mes(clave_mes):
+        """'2024-03' -> 'Marzo 2024'"""
+        return f"{config.NOMBRES_MES[int(clave_mes[5:7])].capitalize()} {clave_mes[:4]}"
+
+    def _crear_encabezado(self, subtitulo="Reporte Financiero"):
         """Crea el encabezado del reporte"""
         elementos = []
 
@@ -76,7 +354,7 @@ class Exportador:
         )
 
         elementos.append(Paragraph("💰 BALANCEA", titulo_style))
-        elementos.append(Paragraph("Reporte Financiero", self.styles['Heading2']))
+        elementos.append(Paragraph(subtitulo, self.styles['Heading2']))
 
         # Fecha del reporte
         fecha_style = ParagraphStyle(
@@ -143,9 +421,9 @@ class Exportador:
         elementos.append(Paragraph("💳 Últimas 10 Transacciones", self.styles['Heading2']))
         elementos.append(Spacer(1, 12))
 
-        # Obtener últimas 10 transacciones
-        trans = sorted(self.gestor_datos.transacciones,
-                       key=lambda x: x['fecha'], reverse=True)[:10]
+        # Obtener últimas 10 transacciones del índice ordenado por fecha
+        _, ordenadas = self.gestor_datos.obtener_indice_fechas()
+        trans = ordenadas[-10:][::-1]
 
         if not trans:
             elementos.append(Paragraph("No hay transacciones registradas", self.styles['Normal']))
@@ -198,33 +476,24 @@ class Exportador:
 
     def _generar_grafica_gastos_categoria(self):
         """Genera gráfica de pastel de gastos por categoría"""
-        gastos_cat = self.gestor_datos.obtener_gastos_por_categoria()
-
-        if not gastos_cat:
+        png = self._obtener_png_gastos_categoria()
+        if png is None:
             return None
 
-        # Crear gráfica
-        fig, ax = plt.subplots(figsize=(6, 4))
-
-        categorias = list(gastos_cat.keys())
-        valores = list(gastos_cat.values())
+        # Crear imagen para el PDF
+        img = Image(BytesIO(png), width=5 * inch, height=3.5 * inch)
+        return img
 
-        colores = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8',
-                   '#F7DC6F', '#BB8FCE', '#85C1E2', '#F8B739', '#52B788']
+    def _obtener_png_gastos_categoria(self):
+        """PNG del pastel de gastos; se reutiliza de la caché si los datos no cambiaron"""
+        gastos_cat = self.gestor_datos.obtener_gastos_por_categoria()
 
-        ax.pie(valores, labels=categorias, autopct='%1.1f%%',
-               colors=colores[:len(categorias)], startangle=90)
-        ax.set_title('Distribución de Gastos por Categoría', fontweight='bold')
+        if not gastos_cat:
+            return None
 
-        # Guardar en buffer
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-        buffer.seek(0)
-        plt.close()
-
-        # Crear imagen para el PDF
-        img = Image(buffer, width=5 * inch, height=3.5 * inch)
-        return img
+        datos = [[categoria, round(monto, 2)] for categoria, monto in gastos_cat.items()]
+        return obtener_cache_graficas().obtener('pastel_gastos', datos, 6, 4, 150,
+                                                dibujar_pastel_reporte)
 
     def _crear_top_gastos(self):
         """Crea sección de top gastos"""
@@ -233,8 +502,8 @@ class Exportador:
         elementos.append(Paragraph("💰 Top 5 Gastos Más Grandes", self.styles['Heading2']))
         elementos.append(Spacer(1, 12))
 
-        gastos = [t for t in self.gestor_datos.transacciones if t['tipo'] == 'Gasto']
-        top_gastos = sorted(gastos, key=lambda x: x['monto'], reverse=True)[:5]
+        gastos = (t for t in self.gestor_datos.transacciones if t['tipo'] == 'Gasto')
+        top_gastos = heapq.nlargest(5, gastos, key=lambda x: x['monto'])
 
         if not top_gastos:
             elementos.append(Paragraph("No hay gastos registrados", self.styles['Normal']))
@@ -291,42 +560,121 @@ class Exportador:
 
         return elementos
 
-    def exportar_excel(self, archivo_destino):
-        """Exporta transacciones a Excel"""
+    @instrumentar('exportar.excel', filas=lambda self, *a, **k: len(self.gestor_datos.transacciones))
+    def exportar_excel(self, archivo_destino, progreso=None, hojas_por_mes=False,
+                       incluir_pivote=False, incluir_graficas=False):
+        """
+        Exporta transacciones a Excel en modo streaming (openpyxl write-only).
+        Las filas se escriben directamente desde el libro de transacciones por
+        bloques, sin construir un DataFrame, por lo que la memoria no crece con
+        el número de filas.
+        hojas_por_mes: agrega una hoja por cada mes con sus transacciones
+        incluir_pivote: agrega una tabla categoría × mes
+        incluir_graficas: agrega una hoja con la gráfica de gastos (desde la caché)
+        """
         try:
-            df = self.gestor_datos.obtener_dataframe()
-
-            if df.empty:
+            transacciones = self.gestor_datos.transacciones
+            if not transacciones:
                 return False
 
-            # Crear escritor de Excel
-            with pd.ExcelWriter(archivo_destino, engine='openpyxl') as writer:
-                # Hoja de transacciones
-                df.to_excel(writer, sheet_name='Transacciones', index=False)
-
-                # Hoja de resumen
-                resumen_data = {
-                    'Concepto': ['Total Ingresos', 'Total Gastos', 'Balance', 'Total Transacciones'],
-                    'Valor': [
-                        self.gestor_datos.obtener_total_ingresos(),
-                        self.gestor_datos.obtener_total_gastos(),
-                        self.gestor_datos.obtener_balance(),
-                        len(self.gestor_datos.transacciones)
-                    ]
-                }
-                df_resumen = pd.DataFrame(resumen_data)
-                df_resumen.to_excel(writer, sheet_name='Resumen', index=False)
-
-                # Hoja de gastos por categoría
-                gastos_cat = self.gestor_datos.obtener_gastos_por_categoria()
-                if gastos_cat:
-                    df_categorias = pd.DataFrame(list(gastos_cat.items()),
-                                                 columns=['Categoría', 'Monto'])
-                    df_categorias = df_categorias.sort_values('Monto', ascending=False)
-                    df_categorias.to_excel(writer, sheet_name='Por Categoría', index=False)
-
+            self._avanzar(progreso, 0.02, "Preparando libro...")
+            libro = Workbook(write_only=True)
+            encabezados = list(self.gestor_datos.CAMPOS)
+
+            # Las hojas aparecen en el orden en que se crean
+            hoja_transacciones = libro.create_sheet('Transacciones')
+            hoja_transacciones.append(encabezados)
+            hoja_resumen = libro.create_sheet('Resumen')
+            hoja_categorias = libro.create_sheet('Por Categoría')
+            hoja_pivote = libro.create_sheet('Categoría x Mes') if incluir_pivote else None
+            hoja_graficas = libro.create_sheet('Gráficas') if incluir_graficas else None
+
+            indice = self.gestor_datos.obtener_indice_mensual_centavos()
+            meses = sorted({mes for _, _, mes in indice})
+            hojas_mes = {}
+            if hojas_por_mes:
+                for mes in meses:
+                    hojas_mes[mes] = libro.create_sheet(mes)
+                    hojas_mes[mes].append(encabezados)
+
+            # Transacciones por bloques (con hojas de continuación si se excede el límite de Excel)
+            total = len(transacciones)
+            filas_hoja = 0
+            continuacion = 1
+            for inicio in range(0, total, self.FILAS_POR_BLOQUE):
+                self._avanzar(progreso, 0.05 + 0.8 * inicio / total,
+                              f"Escribiendo transacciones {inicio:,}/{total:,}...")
+
+                for t in transacciones[inicio:inicio + self.FILAS_POR_BLOQUE]:
+                    if filas_hoja >= self.MAX_FILAS_HOJA:
+                        continuacion += 1
+                        hoja_transacciones = libro.create_sheet(f'Transacciones ({continuacion})')
+                        hoja_transacciones.append(encabezados)
+                        filas_hoja = 0
+
+                    fila = [t['id'], self._fecha_excel(t['fecha']), t['descripcion'],
+                            t['monto'], t['tipo'], t['categoria'],
+                            self.gestor_datos.cuenta_de(t), self.gestor_datos.moneda_de(t)]
+                    hoja_transacciones.append(fila)
+                    filas_hoja += 1
+
+                    if hojas_por_mes:
+                        hojas_mes[t['fecha'][:7]].append(fila)
+
+            # Hoja de resumen
+            self._avanzar(progreso, 0.88, "Escribiendo resumen...")
+            hoja_resumen.append(['Concepto', 'Valor'])
+            ingresos, gastos = self.gestor_datos.obtener_totales_centavos()
+            hoja_resumen.append(['Total Ingresos', dinero.a_decimal(ingresos)])
+            hoja_resumen.append(['Total Gastos', dinero.a_decimal(gastos)])
+            hoja_resumen.append(['Balance', dinero.a_decimal(ingresos - gastos)])
+            hoja_resumen.append(['Total Transacciones', total])
+
+            # Hoja de gastos por categoría
+            hoja_categorias.append(['Categoría', 'Monto'])
+            gastos_cat = self.gestor_datos.obtener_gastos_por_categoria()
+            for categoria, monto in sorted(gastos_cat.items(), key=lambda x: x[1], reverse=True):
+                hoja_categorias.append([categoria, monto])
+
+            # Tabla dinámica de gastos: categoría × mes, a partir del índice mensual
+            if incluir_pivote:
+                hoja_pivote.append(['Categoría'] + meses + ['Total'])
+                for categoria in sorted(gastos_cat):
+                    valores = [indice.get(('Gasto', categoria, mes), 0) for mes in meses]
+                    hoja_pivote.append([categoria] + [dinero.a_decimal(v) for v in valores]
+                                       + [dinero.a_decimal(sum(valores))])
+                totales = [sum(indice.get(('Gasto', c, mes), 0) for c in gastos_cat) for mes in meses]
+                hoja_pivote.append(['Total'] + [dinero.a_decimal(v) for v in totales]
+                                   + [dinero.a_decimal(sum(totales))])
+
+            if incluir_graficas:
+                self._avanzar(progreso, 0.9, "Agregando gráficas...")
+                png = self._obtener_png_gastos_categoria()
+                if png:
+                    try:
+                        imagen = ImagenExcel(BytesIO(png))  # Requiere Pillow
+                        imagen.anchor = 'B2'
+                        hoja_graficas.add_image(imagen)
+                    except ImportError:
+                        hoja_graficas.append(["Instala Pillow para incluir gráficas en Excel"])
+
+            self._avanzar(progreso, 0.92, "Guardando archivo...")
+            libro.save(archivo_destino)
+
+            self._avanzar(progreso, 1.0, "Reporte Excel listo")
             return True
 
+        except TrabajoCancelado:
+            self._eliminar_parcial(archivo_destino)
+            raise
         except Exception as e:
             print(f"Error al exportar a Excel: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    @staticmethod
+    def _fecha_excel(fecha):
+        """Convierte 'YYYY-MM-DD' a fecha para que Excel la reconozca como tal"""
+        try:
+            return date.fromisoformat(fecha)
+        except ValueError:
+            return fecha
@@ -3,13 +3,50 @@ Generador de Datos de Demostración
 Crea transacciones, metas y presupuestos de ejemplo
 """
 
+import csv
 import random
 from datetime import datetime, timedelta
 
+import numpy as np
+
+import config
+from datos.gestor_transacciones import GestorTransacciones
+
+
+CATEGORIAS_INGRESO = ('Salario', 'Freelance')
+RANGO_RENTA = (4000, 12000)
+RANGO_FREELANCE = (2000, 8000)
+
+# Peso relativo de cada mes (enero-diciembre) en el número de gastos generados
+FACTORES_TEMPORADA = (0.85, 0.85, 0.95, 1.0, 1.05, 0.95, 1.05, 1.05, 0.95, 1.0, 1.1, 1.35)
+
+
+def _fecha_final(valor):
+    """date, datetime o 'YYYY-MM-DD' (None = hoy) -> date"""
+    if valor is None:
+        return datetime.now().date()
+    if isinstance(valor, str):
+        return datetime.strptime(valor[:10], '%Y-%m-%d').date()
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor
+
 
 class GeneradorDemo:
     """Genera datos de demostración realistas"""
 
+    # Montos realistas de gasto según categoría
+    RANGOS_MONTO = {
+        'Alimentación': (50, 800),
+        'Transporte': (30, 500),
+        'Entretenimiento': (100, 600),
+        'Servicios': (200, 2000),
+        'Salud': (100, 1500),
+        'Educación': (200, 3000),
+        'Ropa': (200, 2000),
+        'Hogar': (100, 3000)
+    }
+
     def __init__(self, gestor_datos):
         self.gestor_datos = gestor_datos
 
@@ -57,69 +94,134 @@ class GeneradorDemo:
             ]
         }
 
-    def generar_transacciones_demo(self, num_dias=60):
-        """Genera transacciones de demostración de los últimos N días"""
-        transacciones_generadas = 0
+    def generar_transacciones_demo(self, num_dias=60, semilla=None, fecha_final=None):
+        """
+        Genera transacciones de demostración de los últimos N días (hasta
+        'fecha_final': date, datetime o 'YYYY-MM-DD', hoy por defecto) y las agrega
+        al libro con un solo guardado. Con 'semilla' el resultado es reproducible
+        """
+        generador = random.Random(semilla)
+        fecha_final = _fecha_final(fecha_final)
+        categorias_gasto = [c for c in self.plantillas if c not in CATEGORIAS_INGRESO]
+        transacciones = []
 
         # Generar transacciones diarias
         for i in range(num_dias):
-            fecha = datetime.now() - timedelta(days=i)
+            fecha = fecha_final - timedelta(days=i)
             fecha_str = fecha.strftime('%Y-%m-%d')
 
             # Generar 1-4 transacciones por día
-            num_trans_dia = random.randint(1, 4)
+            num_trans_dia = generador.randint(1, 4)
 
             for _ in range(num_trans_dia):
                 # 80% gastos, 20% ingresos (más realista)
-                if random.random() < 0.8:
+                if generador.random() < 0.8:
                     # Gasto
-                    categoria = random.choice(list(self.plantillas.keys()))
-
-                    # Saltar categorías de ingresos
-                    while categoria in ['Salario', 'Freelance']:
-                        categoria = random.choice(list(self.plantillas.keys()))
-
-                    descripcion = random.choice(self.plantillas[categoria])
+                    categoria = generador.choice(categorias_gasto)
+                    descripcion = generador.choice(self.plantillas[categoria])
 
                     # Montos realistas según categoría
-                    rangos_monto = {
-                        'Alimentación': (50, 800),
-                        'Transporte': (30, 500),
-                        'Entretenimiento': (100, 600),
-                        'Servicios': (200, 2000),
-                        'Salud': (100, 1500),
-                        'Educación': (200, 3000),
-                        'Ropa': (200, 2000),
-                        'Hogar': (100, 3000)
-                    }
-
-                    rango = rangos_monto.get(categoria, (50, 500))
-                    monto = round(random.uniform(*rango), 2)
-
-                    self.gestor_datos.agregar_transaccion(
-                        fecha_str, descripcion, monto, 'Gasto', categoria
-                    )
-                    transacciones_generadas += 1
+                    rango = self.RANGOS_MONTO.get(categoria, (50, 500))
+                    monto = round(generador.uniform(*rango), 2)
+
+                    transacciones.append({'fecha': fecha_str, 'descripcion': descripcion,
+                                          'monto': monto, 'tipo': 'Gasto', 'categoria': categoria})
 
                 else:
                     # Ingreso (principalmente salarios)
-                    if random.random() < 0.7:  # 70% salario
+                    if generador.random() < 0.7:  # 70% salario
                         categoria = 'Salario'
                         descripcion = 'Sueldo mensual'
-                        monto = round(random.uniform(8000, 20000), 2)
+                        monto = round(generador.uniform(8000, 20000), 2)
                     else:  # 30% freelance
                         categoria = 'Freelance'
-                        descripcion = random.choice(self.plantillas['Freelance'])
-                        monto = round(random.uniform(2000, 8000), 2)
+                        descripcion = generador.choice(self.plantillas['Freelance'])
+                        monto = round(generador.uniform(2000, 8000), 2)
 
                     # Solo agregar ingresos cada 15 días aprox
                     if i % 15 == 0:
-                        self.gestor_datos.agregar_transaccion(
-                            fecha_str, descripcion, monto, 'Ingreso', categoria
-                        )
-                        transacciones_generadas += 1
-
-        return transacciones_generadas
+                        transacciones.append({'fecha': fecha_str, 'descripcion': descripcion,
+                                              'monto': monto, 'tipo': 'Ingreso', 'categoria': categoria})
+
+        transacciones.sort(key=lambda t: t['fecha'])
+        return len(self.gestor_datos.agregar_transacciones_lote(transacciones))
+
+    def generar_filas_masivas(self, n, semilla=0, fecha_final=None, dias=3 * 365):
+        """
+        Genera exactamente 'n' transacciones (dicts sin id) ordenadas por fecha,
+        deterministas para una semilla, en los 'dias' días hasta 'fecha_final'
+        (date, datetime o 'YYYY-MM-DD', hoy por defecto):
+        - sueldo quincenal y renta mensual fijos (recurrentes)
+        - gastos con las plantillas y rangos de cada categoría, más frecuentes
+          en los meses de FACTORES_TEMPORADA, y 10% de ingresos freelance
+        Todo se sortea con arreglos de numpy, sin ciclos por fila
+        """
+        rng = np.random.default_rng(semilla)
+        fin = np.datetime64(_fecha_final(fecha_final).isoformat(), 'D')
+        calendario = fin - np.arange(dias)[::-1]
+        meses = calendario.astype('datetime64[M]')
+
+        # Recurrentes: sueldo cada 14 días y renta el primer día de cada mes
+        sueldo = round(float(rng.uniform(8000, 20000)), 2)
+        renta = round(float(rng.uniform(*RANGO_RENTA)), 2)
+        fechas_sueldo = calendario[::-14][::-1]
+        fechas_renta = calendario[calendario == meses.astype('datetime64[D]')]
+        recurrentes = sorted(
+            [(str(f), 'Pago quincenal', sueldo, 'Ingreso', 'Salario') for f in fechas_sueldo] +
+            [(str(f), 'Renta', renta, 'Gasto', 'Servicios') for f in fechas_renta]
+        )[-n:] if n else []
+
+        # Días sorteados con peso de temporada según el mes
+        m = n - len(recurrentes)
+        numero_mes = (meses.astype(int) % 12)
+        pesos = np.asarray(FACTORES_TEMPORADA)[numero_mes]
+        fechas = calendario[rng.choice(dias, size=m, p=pesos / pesos.sum())]
+
+        # Categoría, plantilla y monto por fila, indexando tablas planas por categoría
+        categorias = [c for c in self.plantillas if c not in CATEGORIAS_INGRESO] + ['Freelance']
+        freelance = len(categorias) - 1
+        codigo = np.where(rng.random(m) < 0.1, freelance, rng.integers(0, freelance, size=m))
+
+        cantidades = np.array([len(self.plantillas[c]) for c in categorias])
+        desplazamientos = np.concatenate(([0], np.cumsum(cantidades)[:-1]))
+        descripciones = np.array([d for c in categorias for d in self.plantillas[c]], dtype=object)
+        plantilla = desplazamientos[codigo] + (rng.random(m) * cantidades[codigo]).astype(int)
+
+        rangos = np.array([self.RANGOS_MONTO.get(c, RANGO_FREELANCE if c == 'Freelance' else (50, 500))
+                           for c in categorias])
+        montos = np.round(rangos[codigo, 0] + rng.random(m) * (rangos[codigo, 1] - rangos[codigo, 0]), 2)
+
+        nombres = np.array(categorias, dtype=object)[codigo]
+        tipos = np.where(codigo == freelance, 'Ingreso', 'Gasto').astype(object)
+
+        aleatorias = zip(np.datetime_as_string(fechas, unit='D').tolist(), descripciones[plantilla].tolist(),
+                         montos.tolist(), tipos.tolist(), nombres.tolist())
+        filas = [{'fecha': f, 'descripcion': d, 'monto': monto, 'tipo': t, 'categoria': c}
+                 for f, d, monto, t, c in recurrentes]
+        filas.extend({'fecha': f, 'descripcion': d, 'monto': monto, 'tipo': t, 'categoria': c}
+                     for f, d, monto, t, c in aleatorias)
+        filas.sort(key=lambda t: t['fecha'])
+        return filas
+
+    def generar_transacciones_masivas(self, n, semilla=0, fecha_final=None, dias=3 * 365, archivo=None):
+        """
+        Genera 'n' transacciones con generar_filas_masivas y las guarda con una
+        sola escritura: en el libro (agregar_transacciones_lote) o, si se indica
+        'archivo', directo a un CSV con el formato del libro. Retorna cuántas generó
+        """
+        filas = self.generar_filas_masivas(n, semilla, fecha_final, dias)
+        if archivo is None:
+            return len(self.gestor_datos.agregar_transacciones_lote(filas))
+
+        with open(archivo, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(GestorTransacciones.CAMPOS)
+            writer.writerows(
+                (i, t['fecha'], t['descripcion'], t['monto'], t['tipo'], t['categoria'],
+                 config.CUENTA_PREDETERMINADA, config.MONEDA_BASE)
+                for i, t in enumerate(filas, start=1)
+            )
+        return len(filas)
 
     def generar_metas_demo(self):
         """Genera metas de demostración"""
@@ -180,6 +282,7 @@ class GeneradorDemo:
 
         for categoria, monto in presupuestos_demo.items():
             gestor_presup.establecer_presupuesto(categoria, monto)
+        gestor_presup.cerrar()
 
         return len(presupuestos_demo)
 
@@ -7,6 +7,7 @@ import tkinter as tk
 from tkinter import messagebox
 from datetime import datetime, timedelta
 import locale
+from datos import dinero
 
 
 class FormatoUtil:
@@ -14,8 +15,8 @@ class FormatoUtil:
 
     @staticmethod
     def formatear_moneda(monto):
-        """Formatea un número como moneda"""
-        return f"${monto:,.2f}"
+        """Formatea un número como moneda (redondeo decimal exacto a centavos)"""
+        return dinero.formatear(dinero.a_centavos(monto))
 
     @staticmethod
     def formatear_fecha(fecha_str):
@@ -110,7 +111,8 @@ class AtajosUtil:
             'Ctrl+E': 'Exportar',
             'Delete': 'Eliminar selección',
             'F5': 'Actualizar',
-            'Esc': 'Cancelar/Limpiar'
+            'Esc': 'Cancelar/Limpiar',
+            'Ctrl+Shift+I': 'Tiempos (instrumentación)'
         }
 
     @staticmethod
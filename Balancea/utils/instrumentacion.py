@@ -0,0 +1,188 @@
+"""
+Instrumentación de Rutas Críticas
+Cuenta llamadas, duraciones (acumulada, p50, p95) y filas procesadas de las
+operaciones principales. Desactivada no agrega más que una comprobación por llamada
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import config
+
+
+class _Medicion:
+    """Contexto de una medición; 'filas' puede asignarse dentro del bloque"""
+
+    __slots__ = ('registro', 'nombre', 'filas', 'inicio')
+
+    def __init__(self, registro, nombre, filas):
+        self.registro = registro
+        self.nombre = nombre
+        self.filas = filas
+        self.inicio = 0.0
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.registro.registrar(self.nombre, time.perf_counter() - self.inicio, self.filas)
+        return False
+
+
+class _MedicionNula:
+    """Contexto compartido cuando la instrumentación está desactivada"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        return False
+
+    def __setattr__(self, nombre, valor):
+        pass
+
+
+_NULA = _MedicionNula()
+
+
+class RegistroInstrumentacion:
+    """
+    Muestras recientes en un búfer circular (para los percentiles) y totales
+    por operación desde que se activó (llamadas, segundos y filas)
+    """
+
+    def __init__(self, max_muestras=None, activo=False):
+        self.activo = activo
+        self.muestras = deque(maxlen=max_muestras or config.INSTRUMENTACION_MAX_MUESTRAS)
+        self.totales = {}  # nombre -> [llamadas, segundos, filas, maximo]
+        self.inicio = time.time()
+        self._lock = threading.Lock()
+
+    def activar(self):
+        self.activo = True
+
+    def desactivar(self):
+        self.activo = False
+
+    def reiniciar(self):
+        """Descarta muestras y totales"""
+        with self._lock:
+            self.muestras.clear()
+            self.totales = {}
+            self.inicio = time.time()
+
+    def registrar(self, nombre, duracion, filas=None):
+        """Agrega una muestra (segundos) de la operación 'nombre'"""
+        with self._lock:
+            self.muestras.append((nombre, duracion, filas))
+            total = self.totales.get(nombre)
+            if total is None:
+                total = self.totales[nombre] = [0, 0.0, 0, 0.0]
+            total[0] += 1
+            total[1] += duracion
+            total[2] += filas or 0
+            total[3] = max(total[3], duracion)
+
+    def medir(self, nombre, filas=None):
+        """
+        Context manager que mide el bloque:
+            with registro.medir('exportar.csv') as m:
+                ...
+                m.filas = len(filas)
+        """
+        if not self.activo:
+            return _NULA
+        return _Medicion(self, nombre, filas)
+
+    def instrumentar(self, nombre, filas=None):
+        """
+        Decorador que mide cada llamada de la función.
+        filas: función opcional que recibe los mismos argumentos y, tras la
+        llamada, retorna cuántas filas se procesaron
+        """
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                if not self.activo:
+                    return funcion(*args, **kwargs)
+                inicio = time.perf_counter()
+                try:
+                    return funcion(*args, **kwargs)
+                finally:
+                    duracion = time.perf_counter() - inicio
+                    try:
+                        procesadas = filas(*args, **kwargs) if filas else None
+                    except Exception:
+                        procesadas = None
+                    self.registrar(nombre, duracion, procesadas)
+            return envoltura
+        return decorador
+
+    def obtener_estadisticas(self):
+        """
+        Retorna {nombre: {'llamadas', 'total', 'promedio', 'p50', 'p95', 'maximo', 'filas'}}
+        con tiempos en segundos; p50 y p95 salen de las muestras recientes
+        """
+        with self._lock:
+            muestras = list(self.muestras)
+            totales = {nombre: list(valores) for nombre, valores in self.totales.items()}
+
+        recientes = {}
+        for nombre, duracion, _ in muestras:
+            recientes.setdefault(nombre, []).append(duracion)
+
+        estadisticas = {}
+        for nombre, (llamadas, total, filas, maximo) in totales.items():
+            duraciones = sorted(recientes.get(nombre, []))
+            estadisticas[nombre] = {
+                'llamadas': llamadas,
+                'total': total,
+                'promedio': total / llamadas,
+                'p50': self._percentil(duraciones, 50),
+                'p95': self._percentil(duraciones, 95),
+                'maximo': maximo,
+                'filas': filas,
+            }
+        return estadisticas
+
+    @staticmethod
+    def _percentil(ordenados, percentil):
+        """Percentil por el método del rango más cercano"""
+        if not ordenados:
+            return 0.0
+        posicion = max(0, -(-percentil * len(ordenados) // 100) - 1)
+        return ordenados[min(posicion, len(ordenados) - 1)]
+
+    def volcar_json(self, archivo=None):
+        """Guarda las estadísticas en JSON; retorna la ruta o None si falló"""
+        archivo = archivo or config.RUTA_INSTRUMENTACION
+        documento = {
+            'inicio': datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+            'fin': datetime.now().isoformat(timespec='seconds'),
+            'operaciones': self.obtener_estadisticas(),
+        }
+        try:
+            carpeta = os.path.dirname(os.path.abspath(archivo))
+            os.makedirs(carpeta, exist_ok=True)
+            with open(archivo, 'w', encoding='utf-8') as f:
+                json.dump(documento, f, ensure_ascii=False, indent=2)
+            return archivo
+        except Exception as e:
+            print(f"Error al guardar la instrumentación: {e}")
+            return None
+
+
+# Registro global de la aplicación
+registro = RegistroInstrumentacion(activo=config.INSTRUMENTACION_ACTIVA
+                                   or os.environ.get('BALANCEA_INSTRUMENTACION') == '1')
+
+medir = registro.medir
+instrumentar = registro.instrumentar
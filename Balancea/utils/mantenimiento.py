@@ -0,0 +1,258 @@
+"""
+Mantenimiento en Segundo Plano
+Ejecuta tareas periódicas (compactación, snapshot, índices, rotación de backups
+y estadísticas) en un hilo de baja prioridad, solo mientras el usuario no usa
+la aplicación; cualquier tecla o clic cancela la tarea en curso
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import config
+from datos import persistencia
+from datos.almacen_backups import AlmacenBackups
+from utils.trabajos import GestorTrabajos
+
+
+# Eventos de Tk que cuentan como actividad del usuario
+EVENTOS_ACTIVIDAD = ('<KeyPress>', '<ButtonPress>', '<Motion>')
+
+# Incremento de 'nice' del hilo de mantenimiento (Linux; en otros sistemas se ignora)
+PRIORIDAD_NICE = 10
+
+
+def _bajar_prioridad():
+    """Baja la prioridad del hilo actual frente al hilo de Tk"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PRIORIDAD_NICE)
+    except (AttributeError, OSError):
+        pass
+
+
+class TareaMantenimiento:
+    """
+    Tarea periódica.
+    funcion(progreso, cancelar) sigue la convención de GestorTrabajos: debe
+    consultar 'cancelar' (o llamar a progreso) entre pasos para ceder el paso al
+    usuario, y retorna un resultado serializable en JSON
+    """
+
+    def __init__(self, nombre, descripcion, funcion, intervalo_minutos):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.funcion = funcion
+        self.intervalo = timedelta(minutes=intervalo_minutos)
+
+        self.ultima = None
+        self.duracion = None
+        self.resultado = None
+        self.error = None
+
+    def pendiente(self, ahora):
+        """Indica si ya pasó su intervalo desde la última ejecución"""
+        return self.ultima is None or ahora - self.ultima >= self.intervalo
+
+
+class ProgramadorMantenimiento:
+    """
+    Lanza la siguiente tarea vencida cuando la interfaz lleva 'inactividad_segundos'
+    sin teclas, clics ni movimiento del ratón, de a una por vez. Con 'root' revisa
+    solo con after(); sin él, revisar() y trabajos.procesar_eventos() se llaman a mano
+    """
+
+    def __init__(self, tareas, root=None, inactividad_segundos=None, revision_segundos=None,
+                 archivo_estado=None):
+        self.tareas = {t.nombre: t for t in tareas}
+        self.root = root
+        self.inactividad = (inactividad_segundos if inactividad_segundos is not None
+                            else config.MANTENIMIENTO_INACTIVIDAD_SEGUNDOS)
+        self.revision_ms = int((revision_segundos or config.MANTENIMIENTO_REVISION_SEGUNDOS) * 1000)
+        self.archivo_estado = archivo_estado if archivo_estado is not None else config.RUTA_MANTENIMIENTO
+
+        # Hilo propio: el mantenimiento nunca hace esperar a los reportes del usuario
+        self.trabajos = GestorTrabajos(root)
+        self.ultima_actividad = time.monotonic()
+        self.en_curso = None  # (tarea, trabajo)
+        self._activo = False
+
+        self._cargar_estado()
+
+        if root is not None:
+            for evento in EVENTOS_ACTIVIDAD:
+                root.bind_all(evento, self.registrar_actividad, add='+')
+
+    def iniciar(self):
+        """Comienza las revisiones periódicas"""
+        if self._activo or self.root is None:
+            return
+        self._activo = True
+        self.root.after(self.revision_ms, self._sondear)
+
+    def _sondear(self):
+        if not self._activo:
+            return
+        self.revisar()
+        try:
+            self.root.after(self.revision_ms, self._sondear)
+        except Exception:
+            self._activo = False  # La ventana fue destruida
+
+    def detener(self, timeout=2):
+        """Deja de programar tareas y cancela la que esté corriendo"""
+        self._activo = False
+        if self.en_curso:
+            _, trabajo = self.en_curso
+            trabajo.cancelar()
+            trabajo.esperar(timeout=timeout)
+
+    def registrar_actividad(self, event=None):
+        """El usuario está usando la app: reiniciar la espera y ceder el paso"""
+        self.ultima_actividad = time.monotonic()
+        if self.en_curso:
+            self.en_curso[1].cancelar()
+
+    def inactivo(self):
+        return time.monotonic() - self.ultima_actividad >= self.inactividad
+
+    def revisar(self, ahora=None):
+        """
+        Lanza la siguiente tarea vencida si la interfaz está inactiva y no hay otra
+        en curso. Retorna la tarea lanzada o None
+        """
+        if self.en_curso or not self.inactivo():
+            return None
+
+        ahora = ahora or datetime.now()
+        tarea = next((t for t in self.tareas.values() if t.pendiente(ahora)), None)
+        if tarea is None:
+            return None
+
+        # La cola marca 'cancelado' todo trabajo cuya cancelación llegó antes de que
+        # lo revise, aunque la función ya hubiera terminado: distinguirlo aquí
+        completa = threading.Event()
+
+        def ejecutar(progreso, cancelar):
+            _bajar_prioridad()
+            resultado = tarea.funcion(progreso, cancelar)
+            completa.set()
+            return resultado
+
+        trabajo = self.trabajos.enviar(f"Mantenimiento: {tarea.descripcion}", ejecutar,
+                                       al_terminar=lambda t: self._al_terminar(tarea, t, completa.is_set()))
+        self.en_curso = (tarea, trabajo)
+        return tarea
+
+    def _al_terminar(self, tarea, trabajo, completa=False):
+        """
+        Registra el resultado (en el hilo de Tk). Una tarea interrumpida se reintenta
+        luego; la que terminó su trabajo antes de la cancelación cuenta como hecha
+        """
+        self.en_curso = None
+        if trabajo.estado == 'cancelado' and not completa:
+            return
+
+        tarea.ultima = datetime.now()
+        tarea.duracion = trabajo.duracion
+        tarea.resultado = trabajo.resultado if trabajo.estado in ('completado', 'cancelado') else None
+        tarea.error = trabajo.error
+        self._guardar_estado()
+
+    def obtener_estado(self):
+        """Retorna {nombre: {'descripcion', 'ultima', 'duracion', 'resultado', 'error'}}"""
+        return {
+            t.nombre: {
+                'descripcion': t.descripcion,
+                'ultima': t.ultima.isoformat(timespec='seconds') if t.ultima else None,
+                'duracion': t.duracion,
+                'resultado': t.resultado,
+                'error': t.error,
+            }
+            for t in self.tareas.values()
+        }
+
+    def _cargar_estado(self):
+        """Recupera la última ejecución de cada tarea para respetar los intervalos entre sesiones"""
+        if not self.archivo_estado or not os.path.exists(self.archivo_estado):
+            return
+        try:
+            with open(self.archivo_estado, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+            for nombre, datos in estado.items():
+                tarea = self.tareas.get(nombre)
+                if tarea and datos.get('ultima'):
+                    tarea.ultima = datetime.fromisoformat(datos['ultima'])
+                    tarea.duracion = datos.get('duracion')
+                    tarea.resultado = datos.get('resultado')
+                    tarea.error = datos.get('error')
+        except Exception as e:
+            print(f"Error al cargar estado de mantenimiento: {e}")
+
+    def _guardar_estado(self):
+        if not self.archivo_estado:
+            return
+        try:
+            persistencia.guardar_json(self.archivo_estado, self.obtener_estado())
+        except Exception as e:
+            print(f"Error al guardar estado de mantenimiento: {e}")
+
+
+def crear_tareas(gestor_datos, optimizador, almacen=None):
+    """Tareas de mantenimiento de la aplicación (intervalos en config.MANTENIMIENTO_INTERVALOS)"""
+    almacen = almacen or AlmacenBackups()
+    intervalos = config.MANTENIMIENTO_INTERVALOS
+
+    def compactar(progreso, cancelar):
+        # Escribir los guardados agrupados y quitar temporales de escrituras interrumpidas
+        persistencia.vaciar()
+        progreso(0.1, "Compactando")
+        carpetas = [os.path.dirname(os.path.abspath(gestor_datos.archivo_datos)), almacen.dir_snapshots]
+        if os.path.isdir(almacen.dir_objetos):
+            carpetas += [e.path for e in os.scandir(almacen.dir_objetos) if e.is_dir()]
+        temporales = 0
+        for i, carpeta in enumerate(carpetas):
+            progreso(0.1 + 0.9 * i / len(carpetas), "Compactando")
+            temporales += persistencia.limpiar_temporales(carpeta)
+        return {'temporales_eliminados': temporales}
+
+    def snapshot(progreso, cancelar):
+        manifiesto = almacen.respaldar_si_corresponde(cancelar=cancelar)
+        if manifiesto is None:
+            return {'snapshot': None}
+        return {'snapshot': manifiesto['id'], 'nuevo': manifiesto['nuevo'],
+                'bytes_nuevos': manifiesto['bytes_nuevos']}
+
+    def reconstruir_indices(progreso, cancelar):
+        duplicados = optimizador.construir_indice_duplicados(progreso)
+        progreso(0.9, "Índice por fecha")
+        return {'duplicados': duplicados, 'indice_fechas': gestor_datos.precalcular_indice_fechas()}
+
+    def rotar_backups(progreso, cancelar):
+        eliminados, liberados = almacen.aplicar_retencion(cancelar=cancelar)
+        return {'snapshots_eliminados': eliminados, 'bytes_liberados': liberados}
+
+    def recolectar_estadisticas(progreso, cancelar):
+        filas = list(gestor_datos.transacciones)
+        progreso(0.5, "Estadísticas")
+        fechas = [t['fecha'] for t in filas]
+        archivo = gestor_datos.archivo_datos
+        indice = optimizador.indice_duplicados
+        return {
+            'transacciones': len(filas),
+            'fecha_mas_antigua': min(fechas) if fechas else None,
+            'fecha_mas_reciente': max(fechas) if fechas else None,
+            'categorias': len({t['categoria'] for t in filas}),
+            'bytes_libro': os.path.getsize(archivo) if os.path.exists(archivo) else 0,
+            'duplicados': len(indice[1]) if indice and indice[0] == gestor_datos.version else None,
+            'backups': almacen.estadisticas(),
+        }
+
+    return [
+        TareaMantenimiento('compactacion', "Compactación", compactar, intervalos['compactacion']),
+        TareaMantenimiento('snapshot', "Snapshot de datos", snapshot, intervalos['snapshot']),
+        TareaMantenimiento('indices', "Índices de duplicados y fechas", reconstruir_indices, intervalos['indices']),
+        TareaMantenimiento('rotacion_backups', "Rotación de backups", rotar_backups, intervalos['rotacion_backups']),
+        TareaMantenimiento('estadisticas', "Estadísticas", recolectar_estadisticas, intervalos['estadisticas']),
+    ]
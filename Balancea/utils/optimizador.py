@@ -13,27 +13,51 @@ class Optimizador:
 
     def __init__(self, gestor_datos):
         self.gestor_datos = gestor_datos
-
-    def limpiar_transacciones_duplicadas(self):
-        """Elimina transacciones duplicadas"""
-        transacciones_unicas = []
+        # (versión del libro, posiciones de las filas repetidas)
+        self.indice_duplicados = None
+
+    @staticmethod
+    def _firma(t):
+        return f"{t['fecha']}_{t['descripcion']}_{t['monto']}_{t['tipo']}"
+
+    def construir_indice_duplicados(self, progreso=None):
+        """
+        Posiciones de las transacciones repetidas (todas menos la primera de cada firma).
+        Solo lee el libro, así que puede correr en segundo plano; el índice vale
+        mientras no cambie la versión del libro. Retorna cuántas hay
+        """
+        version = self.gestor_datos.version
+        filas = list(self.gestor_datos.transacciones)
         vistos = set()
-
-        for t in self.gestor_datos.transacciones:
-            # Crear firma única
-            firma = f"{t['fecha']}_{t['descripcion']}_{t['monto']}_{t['tipo']}"
-
-            if firma not in vistos:
-                transacciones_unicas.append(t)
+        repetidas = []
+
+        for i, t in enumerate(filas):
+            if progreso and i % 50000 == 0:
+                progreso(i / max(len(filas), 1), "Buscando duplicados")
+            firma = self._firma(t)
+            if firma in vistos:
+                repetidas.append(i)
+            else:
                 vistos.add(firma)
 
-        duplicados = len(self.gestor_datos.transacciones) - len(transacciones_unicas)
-        self.gestor_datos.transacciones = transacciones_unicas
+        if self.gestor_datos.version == version:
+            self.indice_duplicados = (version, repetidas)
+        return len(repetidas)
 
-        if duplicados > 0:
-            self.gestor_datos.guardar_datos()
+    def limpiar_transacciones_duplicadas(self):
+        """Elimina transacciones duplicadas (reutiliza el índice si sigue vigente)"""
+        if self.indice_duplicados is None or self.indice_duplicados[0] != self.gestor_datos.version:
+            self.construir_indice_duplicados()
+
+        repetidas = set(self.indice_duplicados[1])
+        if not repetidas:
+            return 0
 
-        return duplicados
+        self.gestor_datos.transacciones = [
+            t for i, t in enumerate(self.gestor_datos.transacciones) if i not in repetidas
+        ]
+        self.gestor_datos.guardar_datos()
+        return len(repetidas)
 
     def limpiar_transacciones_antiguas(self, dias=365):
         """Elimina transacciones más antiguas de X días"""
@@ -61,57 +85,29 @@ class Optimizador:
         return len(self.gestor_datos.transacciones)
 
     def crear_backup(self):
-        """Crea un backup de todos los datos"""
-        from pathlib import Path
-
-        backup_dir = Path("datos/backups")
-        backup_dir.mkdir(exist_ok=True)
-
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-        # Backup de transacciones
-        backup_trans = backup_dir / f"transacciones_{timestamp}.csv"
-        if os.path.exists("datos/transacciones.csv"):
-            import shutil
-            shutil.copy("datos/transacciones.csv", backup_trans)
-
-        # Backup de metas
-        backup_metas = backup_dir / f"metas_{timestamp}.json"
-        if os.path.exists("datos/metas.json"):
-            import shutil
-            shutil.copy("datos/metas.json", backup_metas)
-
-        # Backup de presupuestos
-        backup_presup = backup_dir / f"presupuestos_{timestamp}.json"
-        if os.path.exists("datos/presupuestos.json"):
-            import shutil
-            shutil.copy("datos/presupuestos.json", backup_presup)
+        """
+        Crea un snapshot incremental de todos los datos: solo se guardan
+        los bloques que cambiaron desde el snapshot anterior
+        """
+        from datos.almacen_backups import AlmacenBackups
 
+        snapshot = AlmacenBackups().crear_snapshot()
         return {
-            'transacciones': str(backup_trans),
-            'metas': str(backup_metas),
-            'presupuestos': str(backup_presup),
-            'timestamp': timestamp
+            'timestamp': snapshot['id'],
+            'nuevo': snapshot['nuevo'],
+            'archivos': list(snapshot['archivos']),
+            'bloques_nuevos': snapshot['bloques_nuevos'],
+            'bytes_nuevos': snapshot['bytes_nuevos']
         }
 
-    def limpiar_backups_antiguos(self, mantener=5):
-        """Mantiene solo los N backups más recientes"""
-        from pathlib import Path
-
-        backup_dir = Path("datos/backups")
-        if not backup_dir.exists():
-            return 0
-
-        # Obtener todos los backups
-        backups = sorted(backup_dir.glob("*.csv")) + sorted(backup_dir.glob("*.json"))
-        backups = sorted(backups, key=lambda x: x.stat().st_mtime, reverse=True)
-
-        # Eliminar antiguos
-        eliminados = 0
-        for backup in backups[mantener:]:
-            backup.unlink()
-            eliminados += 1
+    def limpiar_backups_antiguos(self, mantener=None):
+        """
+        Aplica la política de retención a los snapshots (los N más recientes más
+        uno por mes) y borra los bloques que ya no usa ninguno
+        """
+        from datos.almacen_backups import AlmacenBackups
 
+        eliminados, _ = AlmacenBackups().aplicar_retencion(recientes=mantener)
         return eliminados
 
     def obtener_estadisticas_sistema(self):
@@ -0,0 +1,167 @@
+"""
+Perfilador por Muestreo
+Toma la pila del hilo de Tk cada pocos milisegundos (sys._current_frames) y
+atribuye el tiempo a los manejadores de eventos. Escribe pilas colapsadas
+(compatibles con flamegraph.pl / speedscope) y un resumen con los más costosos
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import config
+
+
+# Marcas en las pilas colapsadas
+INACTIVO = '(inactivo)'  # mainloop esperando eventos
+FUERA_DE_EVENTOS = '(fuera de eventos)'  # arranque o código que no viene de Tk
+
+_ARCHIVO_TKINTER = os.path.join('tkinter', '__init__.py')
+_ARCHIVO_INSTRUMENTACION = os.path.join('utils', 'instrumentacion.py')
+
+
+def _etiqueta(codigo):
+    """'archivo.py:Clase.metodo' sin los separadores del formato colapsado"""
+    nombre = getattr(codigo, 'co_qualname', codigo.co_name)
+    return f"{os.path.basename(codigo.co_filename)}:{nombre}".replace(';', ',').replace(' ', '_')
+
+
+class PerfiladorMuestreo:
+    """
+    Muestreador de pila en un hilo aparte.
+    Cada muestra se cuenta en su pila completa (raíz → hoja) y en el manejador
+    de Tk que la originó: la primera función propia por debajo de CallWrapper
+    """
+
+    def __init__(self, intervalo_ms=None, hilo_id=None):
+        self.intervalo = (intervalo_ms or config.PERFIL_INTERVALO_MS) / 1000
+        self.hilo_id = hilo_id if hilo_id is not None else threading.main_thread().ident
+        self.pilas = Counter()  # 'a;b;c' -> muestras
+        self.manejadores = Counter()  # manejador -> muestras
+        self.muestras = 0
+        self.inicio = None
+        self.duracion = 0.0
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        """Comienza a muestrear en segundo plano"""
+        if self._hilo is not None:
+            return
+        self._detener.clear()
+        self.inicio = time.perf_counter()
+        self._hilo = threading.Thread(target=self._muestrear, name="perfilador", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Detiene el muestreo y espera al hilo"""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join()
+        self._hilo = None
+        self.duracion += time.perf_counter() - self.inicio
+
+    def _muestrear(self):
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_id)
+            if frame is not None:
+                self.registrar_pila(frame)
+
+    def registrar_pila(self, frame):
+        """Cuenta una muestra de la pila que termina en 'frame'"""
+        codigos = []
+        while frame is not None:
+            codigos.append(frame.f_code)
+            frame = frame.f_back
+        codigos.reverse()
+
+        # La función justo debajo del CallWrapper de tkinter es el manejador del evento
+        manejador = None
+        for i, codigo in enumerate(codigos):
+            if codigo.co_filename.endswith(_ARCHIVO_TKINTER) and codigo.co_name == '__call__':
+                manejador = self._primera_propia(codigos[i + 1:])
+                break
+
+        if manejador is None and codigos and codigos[-1].co_name == 'mainloop':
+            manejador = INACTIVO
+
+        etiquetas = [_etiqueta(c) for c in codigos
+                     if not c.co_filename.endswith(_ARCHIVO_INSTRUMENTACION)]
+        self.pilas[';'.join(etiquetas)] += 1
+        self.manejadores[manejador or FUERA_DE_EVENTOS] += 1
+        self.muestras += 1
+
+    @staticmethod
+    def _primera_propia(codigos):
+        """
+        Primera función que no sea una lambda, un envoltorio de instrumentación ni
+        código de tkinter (p. ej. el 'callit' con el que after() envuelve la función)
+        """
+        for codigo in codigos:
+            if codigo.co_name == '<lambda>':
+                continue
+            if codigo.co_filename.endswith((_ARCHIVO_INSTRUMENTACION, _ARCHIVO_TKINTER)):
+                continue
+            return _etiqueta(codigo)
+        return _etiqueta(codigos[0]) if codigos else None
+
+    def funciones(self):
+        """Retorna (propias, inclusivas): muestras como hoja y muestras en cualquier nivel"""
+        propias = Counter()
+        inclusivas = Counter()
+        for pila, cuenta in self.pilas.items():
+            etiquetas = pila.split(';')
+            propias[etiquetas[-1]] += cuenta
+            for etiqueta in set(etiquetas):
+                inclusivas[etiqueta] += cuenta
+        return propias, inclusivas
+
+    def escribir_colapsado(self, archivo):
+        """Una línea 'raiz;...;hoja muestras' por pila distinta"""
+        with open(archivo, 'w', encoding='utf-8') as f:
+            for pila, cuenta in sorted(self.pilas.items()):
+                f.write(f"{pila} {cuenta}\n")
+
+    def escribir_resumen(self, archivo, top=None):
+        """Resumen legible: manejadores y funciones con más muestras"""
+        top = top or config.PERFIL_TOP_N
+        total = max(self.muestras, 1)
+        ms_por_muestra = self.intervalo * 1000
+        propias, inclusivas = self.funciones()
+
+        lineas = [
+            f"Perfil de {config.APP_NOMBRE} - {datetime.now().isoformat(timespec='seconds')}",
+            f"Duración: {self.duracion:.1f} s, {self.muestras} muestras cada {ms_por_muestra:g} ms",
+            "",
+        ]
+        for titulo, contador in (("Manejadores de eventos", self.manejadores),
+                                 ("Funciones (tiempo propio)", propias),
+                                 ("Funciones (tiempo inclusivo)", inclusivas)):
+            lineas.append(f"== {titulo} ==")
+            lineas.append(f"{'muestras':>9} {'%':>6} {'~ms':>9}  nombre")
+            for nombre, cuenta in contador.most_common(top):
+                lineas.append(f"{cuenta:>9} {cuenta / total:>6.1%} {cuenta * ms_por_muestra:>9.0f}  {nombre}")
+            lineas.append("")
+
+        with open(archivo, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lineas))
+
+    def guardar(self, carpeta=None):
+        """
+        Escribe perfil_AAAAMMDD_HHMMSS.collapsed y .txt en 'carpeta'.
+        Retorna (archivo_colapsado, archivo_resumen) o None si falló
+        """
+        carpeta = carpeta or config.RUTA_DATOS
+        base = os.path.join(carpeta, f"perfil_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        try:
+            os.makedirs(carpeta, exist_ok=True)
+            self.escribir_colapsado(base + '.collapsed')
+            self.escribir_resumen(base + '.txt')
+            return base + '.collapsed', base + '.txt'
+        except Exception as e:
+            print(f"Error al guardar el perfil: {e}")
+            return None
@@ -0,0 +1,187 @@
+"""
+Cola de Trabajos en Segundo Plano
+Ejecuta tareas largas (reportes) fuera del hilo de Tk con progreso y cancelación
+"""
+
+import itertools
+import queue
+import threading
+import time
+
+
+class TrabajoCancelado(Exception):
+    """Se lanza dentro de un trabajo cuando el usuario lo cancela"""
+
+
+class Trabajo:
+    """Tarea enviada a la cola; su estado se consulta desde el hilo de Tk"""
+
+    _contador = itertools.count(1)
+
+    def __init__(self, descripcion, funcion, al_progreso=None, al_terminar=None):
+        self.id = next(self._contador)
+        self.descripcion = descripcion
+        self.funcion = funcion
+        self.al_progreso = al_progreso
+        self.al_terminar = al_terminar
+
+        self.estado = 'pendiente'  # pendiente, ejecutando, completado, cancelado, error
+        self.progreso = 0.0
+        self.mensaje = ''
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.duracion = None
+
+        self.evento_cancelar = threading.Event()
+        self._terminado = threading.Event()
+
+    @property
+    def terminado(self):
+        """Indica si el trabajo ya no se ejecutará más"""
+        return self._terminado.is_set()
+
+    def cancelar(self):
+        """Solicita la cancelación (el trabajo se detiene en su siguiente punto de control)"""
+        self.evento_cancelar.set()
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta que el trabajo termine"""
+        return self._terminado.wait(timeout)
+
+
+class GestorTrabajos:
+    """
+    Cola de trabajos con un hilo trabajador.
+    Las notificaciones se entregan en el hilo de Tk mediante after() si se
+    proporciona un widget; de lo contrario se procesan con procesar_eventos()
+    """
+
+    def __init__(self, widget=None, intervalo_ms=100):
+        self.widget = widget
+        self.intervalo_ms = intervalo_ms
+
+        self.cola_trabajos = queue.Queue()
+        # Cola thread-safe: el trabajador produce, el hilo de Tk consume
+        self.cola_eventos = queue.Queue()
+        self.trabajos = []
+
+        self._hilo = None
+        self._sondeo_activo = False
+        self._lock = threading.Lock()
+
+    def enviar(self, descripcion, funcion, al_progreso=None, al_terminar=None):
+        """
+        Encola un trabajo.
+        funcion(progreso, cancelar): progreso(fraccion, mensaje) reporta avance y
+        cancelar es un threading.Event que el trabajo debe consultar
+        """
+        trabajo = Trabajo(descripcion, funcion, al_progreso, al_terminar)
+        self.trabajos.append(trabajo)
+        self.cola_trabajos.put(trabajo)
+
+        self._iniciar_trabajador()
+        self._programar_sondeo()
+        return trabajo
+
+    def cancelar_todos(self):
+        """Cancela los trabajos pendientes y en ejecución"""
+        for trabajo in self.trabajos:
+            if not trabajo.terminado:
+                trabajo.cancelar()
+
+    def obtener_activos(self):
+        """Trabajos que aún no terminan"""
+        return [t for t in self.trabajos if not t.terminado]
+
+    def procesar_eventos(self):
+        """Entrega las notificaciones pendientes (llamar desde el hilo de Tk)"""
+        while True:
+            try:
+                evento, trabajo = self.cola_eventos.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                if evento == 'progreso' and trabajo.al_progreso:
+                    trabajo.al_progreso(trabajo)
+                elif evento == 'fin':
+                    self.trabajos.remove(trabajo)
+                    if trabajo.al_terminar:
+                        trabajo.al_terminar(trabajo)
+            except Exception as e:
+                print(f"Error al notificar trabajo '{trabajo.descripcion}': {e}")
+
+    def _iniciar_trabajador(self):
+        """Arranca el hilo trabajador si no está corriendo"""
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ejecutar, daemon=True)
+                self._hilo.start()
+
+    def _ejecutar(self):
+        """Bucle del hilo trabajador"""
+        while True:
+            try:
+                trabajo = self.cola_trabajos.get(timeout=1)
+            except queue.Empty:
+                with self._lock:
+                    if self.cola_trabajos.empty():
+                        self._hilo = None
+                        return
+                continue
+
+            self._ejecutar_trabajo(trabajo)
+
+    def _ejecutar_trabajo(self, trabajo):
+        """Ejecuta un trabajo y registra su estado final"""
+        inicio = time.perf_counter()
+
+        def progreso(fraccion, mensaje=''):
+            if trabajo.evento_cancelar.is_set():
+                raise TrabajoCancelado()
+            trabajo.progreso = max(0.0, min(1.0, fraccion))
+            trabajo.mensaje = mensaje
+            self.cola_eventos.put(('progreso', trabajo))
+
+        try:
+            if trabajo.evento_cancelar.is_set():
+                raise TrabajoCancelado()
+
+            trabajo.estado = 'ejecutando'
+            trabajo.resultado = trabajo.funcion(progreso, trabajo.evento_cancelar)
+
+            if trabajo.evento_cancelar.is_set():
+                raise TrabajoCancelado()
+            trabajo.estado = 'completado'
+            trabajo.progreso = 1.0
+        except TrabajoCancelado:
+            trabajo.estado = 'cancelado'
+        except Exception as e:
+            print(f"Error en trabajo '{trabajo.descripcion}': {e}")
+            trabajo.estado = 'error'
+            trabajo.error = str(e)
+        finally:
+            trabajo.duracion = time.perf_counter() - inicio
+            trabajo._terminado.set()
+            self.cola_eventos.put(('fin', trabajo))
+
+    def _programar_sondeo(self):
+        """Programa la entrega de eventos en el hilo de Tk"""
+        if self.widget is None or self._sondeo_activo:
+            return
+        self._sondeo_activo = True
+        self.widget.after(self.intervalo_ms, self._sondear)
+
+    def _sondear(self):
+        """Drena los eventos y se reprograma mientras haya trabajos activos"""
+        self.procesar_eventos()
+
+        try:
+            if self.trabajos or not self.cola_eventos.empty():
+                self.widget.after(self.intervalo_ms, self._sondear)
+                return
+        except Exception:
+            pass  # El widget fue destruido
+
+        self._sondeo_activo = False
@@ -4,7 +4,7 @@ Sistema de validación de datos
 """
 
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 
 
 class Validador:
@@ -102,7 +102,3 @@ class Validador:
     def sanitizar_texto(texto):
         """Limpia y sanitiza un texto"""
         return texto.strip()
-
-
-# Importar timedelta para validar_fecha
-from datetime import timedelta
\ No newline at end of file
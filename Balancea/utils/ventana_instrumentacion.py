@@ -0,0 +1,81 @@
+"""
+Ventana de Instrumentación
+Tabla en vivo con los tiempos de las operaciones medidas (Ctrl+Shift+I)
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from utils.instrumentacion import registro as registro_global
+
+
+INTERVALO_REFRESCO_MS = 1000
+
+COLUMNAS = [
+    ('llamadas', 'Llamadas', 70),
+    ('total', 'Total ms', 90),
+    ('p50', 'p50 ms', 80),
+    ('p95', 'p95 ms', 80),
+    ('maximo', 'Máx ms', 80),
+    ('filas', 'Filas', 90),
+]
+
+
+def mostrar_ventana_instrumentacion(parent, registro=None):
+    """Abre la ventana de tiempos; se refresca cada segundo mientras esté abierta"""
+    registro = registro or registro_global
+
+    ventana = tk.Toplevel(parent)
+    ventana.title("⏱️ Instrumentación")
+    ventana.geometry("720x420")
+    ventana.transient(parent)
+
+    barra = ttk.Frame(ventana, padding=5)
+    barra.pack(fill=tk.X)
+
+    var_activo = tk.BooleanVar(value=registro.activo)
+
+    def cambiar_activo():
+        if var_activo.get():
+            registro.activar()
+        else:
+            registro.desactivar()
+
+    ttk.Checkbutton(barra, text="Medir", variable=var_activo,
+                    command=cambiar_activo).pack(side=tk.LEFT, padx=5)
+    ttk.Button(barra, text="🗑️ Reiniciar", command=registro.reiniciar).pack(side=tk.LEFT, padx=5)
+
+    def guardar():
+        archivo = registro.volcar_json()
+        if archivo:
+            messagebox.showinfo("Instrumentación", f"Estadísticas guardadas en:\n{archivo}", parent=ventana)
+
+    ttk.Button(barra, text="💾 Guardar JSON", command=guardar).pack(side=tk.LEFT, padx=5)
+
+    tabla = ttk.Treeview(ventana, columns=[c[0] for c in COLUMNAS], show='tree headings')
+    tabla.heading('#0', text='Operación')
+    tabla.column('#0', width=200)
+    for clave, titulo, ancho in COLUMNAS:
+        tabla.heading(clave, text=titulo)
+        tabla.column(clave, width=ancho, anchor=tk.E)
+    tabla.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+    def refrescar():
+        if not ventana.winfo_exists():
+            return
+        tabla.delete(*tabla.get_children())
+        estadisticas = registro.obtener_estadisticas()
+        # Las operaciones más costosas arriba
+        for nombre, e in sorted(estadisticas.items(), key=lambda x: x[1]['total'], reverse=True):
+            tabla.insert('', tk.END, text=nombre, values=(
+                e['llamadas'],
+                f"{e['total'] * 1000:,.1f}",
+                f"{e['p50'] * 1000:,.2f}",
+                f"{e['p95'] * 1000:,.2f}",
+                f"{e['maximo'] * 1000:,.2f}",
+                f"{e['filas']:,}",
+            ))
+        ventana.after(INTERVALO_REFRESCO_MS, refrescar)
+
+    refrescar()
+    return ventana
@@ -0,0 +1,31 @@
+"""
+Visualización
+Funciones de dibujo compartidas por los paneles y los reportes
+"""
+
+import config
+
+
+def dibujar_pastel_gastos(ax, gastos_cat, titulo='Gastos por Categoría', etiquetas_blancas=True):
+    """Dibuja el pastel de gastos por categoría sobre un eje de matplotlib"""
+    categorias = list(gastos_cat.keys())
+    valores = list(gastos_cat.values())
+
+    _, _, autotexts = ax.pie(valores, labels=categorias, autopct='%1.1f%%',
+                             colors=config.GRAFICAS_COLORES[:len(categorias)],
+                             startangle=90)
+
+    if etiquetas_blancas:
+        for autotext in autotexts:
+            autotext.set_color('white')
+            autotext.set_fontsize(9)
+            autotext.set_weight('bold')
+
+    ax.set_title(titulo, fontsize=12, fontweight='bold', pad=20)
+
+
+def dibujar_pastel_reporte(fig, datos):
+    """Pastel de gastos para los reportes (recibe [(categoria, monto), ...])"""
+    dibujar_pastel_gastos(fig.add_subplot(111), dict(datos),
+                          titulo='Distribución de Gastos por Categoría',
+                          etiquetas_blancas=False)
@@ -13,6 +13,7 @@ imports_a_verificar = [
     ("config", "Configuración"),
     ("datos.gestor_transacciones", "Gestor de Transacciones"),
     ("datos.gestor_metas", "Gestor de Metas"),
+    ("datos.gestor_recurrentes", "Gestor de Recurrentes"),
     ("datos.config_categorias", "Configuración de Categorías"),
     ("interfaz.panel_dashboard", "Panel Dashboard"),
     ("interfaz.panel_transacciones", "Panel Transacciones"),
@@ -22,9 +23,14 @@ imports_a_verificar = [
     ("interfaz.panel_alertas", "Panel Alertas"),
     ("procesador.analizador", "Analizador"),
     ("procesador.chat_financiero", "Chat Financiero"),
+    ("procesador.cliente_ollama", "Cliente Ollama"),
+    ("procesador.motor_consultas", "Motor de consultas"),
+    ("procesador.sugerencias_presupuesto", "Sugerencias de presupuesto"),
     ("utils.helpers", "Helpers"),
     ("utils.validadores", "Validadores"),
     ("utils.ventana_bienvenida", "Ventana Bienvenida"),
+    ("utils.instrumentacion", "Instrumentación"),
+    ("utils.mantenimiento", "Mantenimiento"),
 ]
 
 for modulo, nombre in imports_a_verificar: